@@ -0,0 +1,104 @@
+"""Activity timeline of a recording taken from its JPEG frame sizes.
+
+The compressed size of an MJPEG frame follows the amount of detail in the
+scene, and how much it changes from one frame to the next follows motion.
+Both are already in the frame index written during capture, so the curve is
+built at finalization from a few bytes per frame without decoding anything.
+Each bucket stores the mean JPEG size and a 0-100 level of the mean
+frame-to-frame size change; runs of high levels are listed as segments the
+app can jump to. Long recordings get wider buckets so the curve stays small
+enough to live in the media index entry.
+"""
+
+from __future__ import annotations
+
+import math
+
+from app import frame_index
+
+
+ACTIVITY_VERSION = 1
+MAX_BUCKETS = 1800
+# A relative frame-to-frame size change this large maps to level 100 even in
+# a recording that never gets busier, so sensor noise stays near zero.
+MIN_FULL_SCALE_CHANGE = 0.02
+ACTIVE_LEVEL = 50
+
+
+def bucket_seconds(duration: float) -> int:
+    return max(1, math.ceil(duration / MAX_BUCKETS))
+
+
+def _active_segments(levels: list[int], width: int, duration: float) -> list[dict]:
+    segments = []
+    start = None
+    for position, level in enumerate(levels + [0]):
+        if level >= ACTIVE_LEVEL and start is None:
+            start = position
+        elif level < ACTIVE_LEVEL and start is not None:
+            segments.append({
+                "start": start * width,
+                "end": round(min(position * width, duration), 3),
+            })
+            start = None
+    return segments
+
+
+def compute(
+    raw_file: str | None,
+    fps: float,
+    frames: int | None = None,
+    timestamps_ms: list[int] | None = None,
+) -> dict | None:
+    """Return the activity timeline of the indexed frames of ``raw_file``.
+
+    Only the first ``frames`` records are used when given, matching what was
+    muxed. With capture ``timestamps_ms`` frames are bucketed by their
+    measured time rather than by ``frame / fps``.
+    """
+    if not raw_file or fps <= 0:
+        return None
+    sizes = []
+    for record in frame_index.iter_records(raw_file):
+        if frames is not None and len(sizes) >= frames:
+            break
+        sizes.append(record.size)
+    if not sizes:
+        return None
+    if timestamps_ms and len(timestamps_ms) >= len(sizes):
+        times = [(stamp - timestamps_ms[0]) / 1000.0 for stamp in timestamps_ms[:len(sizes)]]
+    else:
+        times = [number / fps for number in range(len(sizes))]
+    duration = times[-1] + 1.0 / fps
+    width = bucket_seconds(duration)
+    count = math.ceil(duration / width)
+    totals = [0] * count
+    changes = [0.0] * count
+    frame_counts = [0] * count
+    for number, (size, at) in enumerate(zip(sizes, times)):
+        bucket = min(count - 1, int(at // width))
+        totals[bucket] += size
+        frame_counts[bucket] += 1
+        if number:
+            previous = sizes[number - 1]
+            changes[bucket] += abs(size - previous) / max(1, size, previous)
+
+    mean_bytes = [
+        round(total / frame_count) if frame_count else 0
+        for total, frame_count in zip(totals, frame_counts)
+    ]
+    mean_changes = [
+        change / frame_count if frame_count else 0.0
+        for change, frame_count in zip(changes, frame_counts)
+    ]
+    full_scale = max(MIN_FULL_SCALE_CHANGE, max(mean_changes))
+    levels = [min(100, round(100 * change / full_scale)) for change in mean_changes]
+    return {
+        "version": ACTIVITY_VERSION,
+        "bucket_seconds": width,
+        "duration_seconds": round(duration, 3),
+        "frames": len(sizes),
+        "levels": levels,
+        "mean_frame_bytes": mean_bytes,
+        "active_segments": _active_segments(levels, width, duration),
+    }
@@ -3,10 +3,13 @@
 from __future__ import annotations
 
 import math
+import os
 import re
 import struct
 import subprocess
+import threading
 import time
+from collections import deque
 
 
 AUDIO_SAMPLE_RATE = 48_000
@@ -19,6 +22,9 @@ LEVEL_BUSY_ATTEMPTS = 4
 LEVEL_BUSY_RETRY_DELAY = 0.25
 AUDIO_BUFFER_TIME_US = 2_000_000
 AUDIO_PERIOD_TIME_US = 250_000
+AAC_SAMPLES_PER_FRAME = 1024
+ENCODER_DRAIN_TIMEOUT = 1.0
+STANDBY_READ_SIZE = 64 * 1024
 
 _ARECORD_DEVICE_RE = re.compile(
     r"^card\s+(?P<card_index>\d+):\s+"
@@ -114,6 +120,290 @@ def build_arecord_command(alsa_device: str) -> list[str]:
     ]
 
 
+def build_aac_stream_command(aac_file: str) -> list[str]:
+    """Encode PCM from stdin to ADTS AAC as it arrives."""
+    return [
+        "ffmpeg",
+        "-hide_banner",
+        "-loglevel", "warning",
+        "-nostats",
+        "-y",
+        "-f", "s16le",
+        "-ar", str(AUDIO_SAMPLE_RATE),
+        "-ac", str(AUDIO_CHANNELS),
+        "-i", "pipe:0",
+        "-c:a", "aac",
+        "-b:a", AUDIO_BITRATE,
+        # Every packet reaches the file immediately; the recorder times the
+        # first samples by the number of complete frames on disk.
+        "-flush_packets", "1",
+        "-f", "adts",
+        aac_file,
+    ]
+
+
+class EncodedAudioCapture:
+    """``arecord | ffmpeg`` AAC encoder pair that behaves like one ``Popen``.
+
+    Signals go to arecord only. The encoder then reads EOF, flushes its last
+    frames and exits by itself, so a normal stop never truncates the stream.
+    """
+
+    stdout = None
+
+    def __init__(self, arecord_command: list[str], encoder_command: list[str], stderr):
+        self.encoder = subprocess.Popen(
+            encoder_command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.DEVNULL,
+            stderr=stderr,
+        )
+        try:
+            self.recorder = subprocess.Popen(
+                arecord_command,
+                stdout=self.encoder.stdin,
+                stderr=stderr,
+            )
+        except (OSError, subprocess.SubprocessError):
+            self.encoder.kill()
+            self.encoder.wait()
+            raise
+        finally:
+            # Only arecord may hold the write end, or the encoder never sees EOF.
+            self.encoder.stdin.close()
+        self.pid = self.recorder.pid
+        self.pids = (self.recorder.pid, self.encoder.pid)
+
+    @property
+    def returncode(self):
+        return self.poll()
+
+    def poll(self):
+        return_code = self.recorder.poll()
+        if return_code is None or self.encoder.poll() is None:
+            return None
+        return return_code
+
+    def wait(self, timeout: float | None = None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        return_code = self.recorder.wait(timeout=timeout)
+        self.encoder.wait(
+            timeout=None
+            if deadline is None
+            else max(ENCODER_DRAIN_TIMEOUT, deadline - time.monotonic())
+        )
+        return return_code
+
+    def send_signal(self, sig) -> None:
+        self.recorder.send_signal(sig)
+
+    def terminate(self) -> None:
+        for process in (self.recorder, self.encoder):
+            if process.poll() is None:
+                process.terminate()
+
+    def kill(self) -> None:
+        for process in (self.recorder, self.encoder):
+            if process.poll() is None:
+                process.kill()
+
+
+class StandbyAudioCapture:
+    """arecord kept open while the recorder is idle.
+
+    PCM is read and dropped until ``arm`` names the destination; from the
+    next ALSA period on it goes to a PCM file or to a streaming AAC encoder.
+    With ``preroll_seconds`` the newest PCM of that length is kept instead
+    and ``arm`` writes it first. ``pause`` and ``resume`` stop and restart
+    persisting at the sample frame captured at the request, while arecord
+    stays open. Behaves like one ``Popen`` for the recorder, as
+    ``EncodedAudioCapture``.
+    """
+
+    stdout = None
+
+    def __init__(self, arecord_command: list[str], stderr, preroll_seconds: float = 0.0):
+        self.recorder = subprocess.Popen(
+            arecord_command,
+            stdout=subprocess.PIPE,
+            stderr=stderr,
+        )
+        self.encoder = None
+        self.pid = self.recorder.pid
+        self.bytes_received = 0
+        self._target = None
+        self._paused = False
+        self._persisting = True
+        self._switch_at = 0.0
+        frame_bytes = AUDIO_CHANNELS * 2
+        self._frame_bytes = frame_bytes
+        self._preroll_limit = (
+            int(preroll_seconds * AUDIO_SAMPLE_RATE) * frame_bytes
+            if preroll_seconds > 0
+            else 0
+        )
+        self._preroll: deque = deque()
+        self._preroll_bytes = 0
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(
+            target=self._pump,
+            name="medicam-audio-standby",
+            daemon=True,
+        )
+        self._thread.start()
+
+    @property
+    def pids(self):
+        if self.encoder is None:
+            return (self.recorder.pid,)
+        return (self.recorder.pid, self.encoder.pid)
+
+    @property
+    def returncode(self):
+        return self.poll()
+
+    def arm(
+        self,
+        audio_file: str,
+        encoder_command: list[str] | None = None,
+        stderr=None,
+    ) -> float:
+        """Persist PCM from now on and return when the persisted PCM began.
+
+        That is the arm time, less the pre-recorded PCM written ahead.
+        """
+        if encoder_command:
+            self.encoder = subprocess.Popen(
+                encoder_command,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.DEVNULL,
+                stderr=stderr,
+                bufsize=0,
+            )
+            target = self.encoder.stdin
+        else:
+            target = open(audio_file, "wb", buffering=0)
+        with self._lock:
+            preroll, self._preroll = b"".join(self._preroll), deque()
+            self._preroll_bytes = 0
+            target.write(preroll)
+            self._target = target
+            return time.monotonic() - len(preroll) / (
+                AUDIO_SAMPLE_RATE * self._frame_bytes
+            )
+
+    def pause(self) -> None:
+        with self._lock:
+            self._paused = True
+            self._switch_at = time.monotonic()
+
+    def resume(self) -> None:
+        with self._lock:
+            self._paused = False
+            self._switch_at = time.monotonic()
+
+    def _write_target(self, chunk: bytes, offset: int, arrived_at: float) -> None:
+        if self._persisting == (not self._paused):
+            if self._persisting:
+                self._target.write(chunk)
+            return
+        # A chunk ends with the PCM captured when it arrived. Switch at the
+        # byte captured when pause or resume was requested, rounded up to a
+        # sample frame boundary of the stream.
+        late_bytes = int((arrived_at - self._switch_at) * AUDIO_SAMPLE_RATE) * self._frame_bytes
+        cut = min(len(chunk), max(0, len(chunk) - late_bytes))
+        cut += -(offset + cut) % self._frame_bytes
+        if cut > len(chunk):
+            if self._persisting:
+                self._target.write(chunk)
+            return
+        if self._persisting:
+            self._target.write(chunk[:cut])
+        else:
+            self._target.write(chunk[cut:])
+        self._persisting = not self._paused
+
+    def _keep_preroll(self, chunk: bytes) -> None:
+        self._preroll.append(chunk)
+        self._preroll_bytes += len(chunk)
+        excess = self._preroll_bytes - self._preroll_limit
+        # Drop whole sample frames only: the ring starts at a stream offset
+        # that is a multiple of the frame size.
+        excess -= excess % -self._frame_bytes if excess > 0 else excess
+        while excess > 0:
+            oldest = self._preroll[0]
+            if len(oldest) <= excess:
+                self._preroll.popleft()
+                dropped = len(oldest)
+            else:
+                self._preroll[0] = oldest[excess:]
+                dropped = excess
+            self._preroll_bytes -= dropped
+            excess -= dropped
+
+    def _pump(self) -> None:
+        source = self.recorder.stdout.fileno()
+        try:
+            while chunk := os.read(source, STANDBY_READ_SIZE):
+                arrived_at = time.monotonic()
+                with self._lock:
+                    offset = self.bytes_received
+                    self.bytes_received += len(chunk)
+                    if self._target is not None:
+                        self._write_target(chunk, offset, arrived_at)
+                    elif self._preroll_limit:
+                        self._keep_preroll(chunk)
+        except OSError:
+            # The encoder died; stop arecord so the watchdog sees the exit.
+            if self.recorder.poll() is None:
+                self.recorder.terminate()
+        finally:
+            with self._lock:
+                target, self._target = self._target, None
+            if target is not None:
+                try:
+                    # EOF lets the encoder flush its last frames and exit.
+                    target.close()
+                except OSError:
+                    pass
+            self.recorder.stdout.close()
+
+    def poll(self):
+        return_code = self.recorder.poll()
+        if return_code is None or self._thread.is_alive():
+            return None
+        if self.encoder is not None and self.encoder.poll() is None:
+            return None
+        return return_code
+
+    def wait(self, timeout: float | None = None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        return_code = self.recorder.wait(timeout=timeout)
+        self._thread.join(
+            None if deadline is None else max(0.0, deadline - time.monotonic())
+        )
+        if self.encoder is not None:
+            self.encoder.wait(
+                timeout=None
+                if deadline is None
+                else max(ENCODER_DRAIN_TIMEOUT, deadline - time.monotonic())
+            )
+        return return_code
+
+    def send_signal(self, sig) -> None:
+        self.recorder.send_signal(sig)
+
+    def terminate(self) -> None:
+        for process in (self.recorder, self.encoder):
+            if process is not None and process.poll() is None:
+                process.terminate()
+
+    def kill(self) -> None:
+        for process in (self.recorder, self.encoder):
+            if process is not None and process.poll() is None:
+                process.kill()
+
+
 def measure_audio_level(
     configured_device: str | None = "auto",
     duration_seconds: int = 2,
@@ -6,15 +6,38 @@ import glob
 import json
 import os
 import platform
+import re
 import shlex
 import signal
 import shutil
 import stat
+import struct
 import subprocess
 import threading
 import time
 
-from app import audio, preview, storage_manager, utils
+from app import (
+    activity,
+    audio,
+    capture_writer,
+    events,
+    finalization,
+    frame_index,
+    frame_timestamps,
+    markers,
+    motion,
+    mp4_info,
+    mp4_mux,
+    preview,
+    segments,
+    standby,
+    storage_manager,
+    telemetry,
+    timelapse,
+    timing,
+    utils,
+    watchdog,
+)
 
 
 SETTINGS_FILE = "camera_settings.json"
@@ -24,6 +47,7 @@ FFMPEG_STARTUP_DELAY = 1.0
 CAPTURE_START_OBSERVATION_TIMEOUT = 3.0
 FFMPEG_STOP_TIMEOUT = 10.0
 FFMPEG_REMUX_TIMEOUT = 180.0
+FFMPEG_PROGRESS_POLL_SECONDS = 0.25
 REMUX_MIN_THROUGHPUT_BYTES_PER_SECOND = 4 * 1024 * 1024
 PROBE_MIN_THROUGHPUT_BYTES_PER_SECOND = 2 * 1024 * 1024
 FILE_PROCESSING_TIMEOUT_MARGIN = 120.0
@@ -37,18 +61,53 @@ RECORDING_STATE_FILE = os.environ.get(
     "MEDICAM_RECORDING_STATE_FILE",
     os.path.join(utils.VIDEOS_DIR, ".recording-state.json"),
 )
+FINALIZATION_QUEUE_FILE = os.environ.get(
+    "MEDICAM_FINALIZATION_QUEUE_FILE",
+    os.path.join(utils.VIDEOS_DIR, ".finalization-queue.json"),
+)
 MIN_RECORDING_FREE_BYTES = int(
     os.environ.get("MEDICAM_MIN_RECORDING_FREE_BYTES", 1024 * 1024 * 1024)
 )
-WATCHDOG_INTERVAL_SECONDS = 0.5
+RECORDING_MODES = {"raw", "fragmented", "segmented"}
+RECORDING_MODE = os.environ.get("MEDICAM_RECORDING_MODE", "raw").strip().lower()
+LIVE_MUX_READ_TIMEOUT_SECONDS = 2.0
+LIVE_MUX_FRAGMENT_SECONDS = 1.0
+LIVE_MUX_DRAIN_TIMEOUT = 10.0
+# The in-process muxer replaces the FFmpeg video remux; FFmpeg then only
+# encodes the small PCM track to AAC.
+NATIVE_MUX_ENABLED = os.environ.get(
+    "MEDICAM_NATIVE_MUX", "1"
+).strip().lower() in {"1", "true", "yes", "on"}
+# Audio is encoded to ADTS AAC while recording: ~1 MB instead of ~6 MB of
+# tmpfs per minute, and finalization only copies the finished AAC frames.
+AUDIO_STREAM_ENCODE_ENABLED = os.environ.get(
+    "MEDICAM_AUDIO_STREAM_ENCODE", "1"
+).strip().lower() in {"1", "true", "yes", "on"}
+ENCODED_AUDIO_SUFFIX = ".aac"
 HEALTHY_FRAME_DELIVERY_RATIO = 0.995
+# Queued finalization pauses while the active capture gets fewer frames to
+# disk than this share of its frame rate.
+FINALIZATION_THROTTLE_FPS_RATIO = float(
+    os.environ.get("MEDICAM_FINALIZATION_THROTTLE_FPS_RATIO", "0.97")
+)
+FINALIZATION_PRESSURE_WINDOW_SECONDS = 1.0
+# Longest ``/stop?wait=true`` holds the request before returning the job id.
+STOP_WAIT_TIMEOUT_SECONDS = max(
+    0.0, float(os.environ.get("MEDICAM_STOP_WAIT_SECONDS", "60"))
+)
 HEALTHY_AVG_FPS = 29.5
+# Separates the camera label in the file names of the non-default cameras.
+CAMERA_FILE_SEPARATOR = "--"
+STATUS_REFRESH_SECONDS = max(
+    0.1, float(os.environ.get("MEDICAM_STATUS_REFRESH_SECONDS", "0.5"))
+)
 
 camera_settings = {
     "resolution": "FHD",
     "fps": "30",
     "audio_enabled": True,
     "audio_device": "auto",
+    "camera_device": "auto",
 }
 
 # FullHD is intentionally the maximum supported resolution. The Linux recorder
@@ -68,27 +127,9 @@ SUPPORTED_FPS = {"30"}
 LEGACY_FPS_MAP = {"15": "30", "60": "30"}
 LINUX_INPUT_QUEUE_SIZE = "1024"
 
-capture_process = None
-audio_process = None
-ffmpeg_process = None
-ffmpeg_log_file = None
-recording_output_file = None
-recording_raw_file = None
-recording_audio_file = None
-recording_audio_device = None
-recording_audio_lead_seconds = 0.0
-recording_remux_command = None
-recording_phase = "idle"
-recording_started_at_monotonic = None
-recording_started_at_utc = None
-recording_camera_device = None
-recording_video_size = None
-recording_fps = None
-recording_capture_format = None
-recording_generation = 0
-last_recording_error = None
-recovery_state_loaded = False
-recording_lock = threading.RLock()
+_status_environment = None
+_status_refresher = None
+_status_refresher_lock = threading.Lock()
 
 
 def _preview_call(method: str, *args) -> None:
@@ -133,11 +174,17 @@ def _normalize_settings(settings: dict | None):
         or "auto"
     ).strip()
 
+    camera_device = str(
+        settings.get("camera_device", camera_settings["camera_device"])
+        or "auto"
+    ).strip()
+
     return {
         "resolution": resolution,
         "fps": fps,
         "audio_enabled": audio_enabled,
         "audio_device": audio_device or "auto",
+        "camera_device": camera_device or "auto",
     }
 
 
@@ -152,7 +199,15 @@ def _camera_candidates():
     configured_device = os.environ.get("MEDICAM_CAMERA_DEVICE")
     if configured_device:
         return [configured_device]
+    selected_device = camera_settings.get("camera_device", "auto")
+    if selected_device and selected_device != "auto":
+        # A chosen camera that is unplugged fails the start instead of
+        # silently recording from another one.
+        return [selected_device]
+    return _discovered_camera_paths()
 
+
+def _discovered_camera_paths():
     # The by-id link follows the UVC capture node even when /dev/videoN changes
     # after a USB reconnect. video-index0 is the image stream; index1 is metadata.
     candidates = sorted(glob.glob("/dev/v4l/by-id/*-video-index0"))
@@ -168,11 +223,32 @@ def _camera_candidates():
     return deduplicated
 
 
-def _find_linux_camera_device(timeout: float = CAMERA_DISCOVERY_TIMEOUT):
+def _camera_label(key: str):
+    """File-name safe label of a by-id camera path."""
+    name = os.path.basename(key)
+    if name.endswith("-video-index0"):
+        name = name[:-len("-video-index0")]
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", name)
+
+
+def _camera_path(path: str, key: str | None):
+    """``path`` for the default camera; a per-camera sibling for the others."""
+    if key is None:
+        return path
+    root, extension = os.path.splitext(path)
+    return f"{root}{CAMERA_FILE_SEPARATOR}{_camera_label(key)}{extension}"
+
+
+def _find_linux_camera_device(
+    timeout: float = CAMERA_DISCOVERY_TIMEOUT,
+    candidates=None,
+    exclude=frozenset(),
+):
+    """Wait for the first present candidate whose device is not in ``exclude``."""
     deadline = time.monotonic() + timeout
     while True:
-        for path in _camera_candidates():
-            if _is_character_device(path):
+        for path in candidates or _camera_candidates():
+            if _is_character_device(path) and os.path.realpath(path) not in exclude:
                 return path
 
         if time.monotonic() >= deadline:
@@ -180,6 +256,29 @@ def _find_linux_camera_device(timeout: float = CAMERA_DISCOVERY_TIMEOUT):
         time.sleep(0.25)
 
 
+def list_camera_devices():
+    """Connected UVC cameras, keyed by their stable ``/dev/v4l/by-id`` path."""
+    if platform.system() != "Linux":
+        return []
+    selected = _find_linux_camera_device(timeout=0.0)
+    states = {
+        os.path.realpath(recorder.recording_camera_device): recorder.recording_phase
+        for recorder in _all_recorders()
+        if recorder.recording_camera_device
+    }
+    return [
+        {
+            "id": path,
+            "name": os.path.basename(path),
+            "device": os.path.realpath(path),
+            "selected": path == selected,
+            "state": states.get(os.path.realpath(path), "idle"),
+        }
+        for path in _discovered_camera_paths()
+        if _is_character_device(path)
+    ]
+
+
 def find_camera_device(timeout: float = CAMERA_DISCOVERY_TIMEOUT):
     """Return the stable Linux camera path for diagnostics and recording."""
     if platform.system() == "Linux":
@@ -202,7 +301,22 @@ def _build_audio_temp_file(output_file: str):
     temp_dir = AUDIO_TEMP_DIR
     if not os.path.isdir(temp_dir) or not os.access(temp_dir, os.W_OK):
         temp_dir = os.path.dirname(output_file) or "."
-    return os.path.join(temp_dir, f"medicam-{os.path.basename(output_file)}.pcm")
+    suffix = ENCODED_AUDIO_SUFFIX if AUDIO_STREAM_ENCODE_ENABLED else ".pcm"
+    return os.path.join(temp_dir, f"medicam-{os.path.basename(output_file)}{suffix}")
+
+
+def _audio_is_encoded(audio_file: str | None):
+    return bool(audio_file) and audio_file.endswith(ENCODED_AUDIO_SUFFIX)
+
+
+def _encoded_audio_seconds(audio_file: str):
+    """Seconds of PCM the streaming encoder consumed, to within one frame."""
+    try:
+        frames = len(mp4_mux.read_adts(audio_file).frames)
+    except (OSError, struct.error, mp4_mux.Mp4MuxError):
+        return 0.0
+    # The encoder holds back one frame of lookahead beyond what it wrote.
+    return (frames + 1) * audio.AAC_SAMPLES_PER_FRAME / audio.AUDIO_SAMPLE_RATE
 
 
 def _build_linux_capture_command(
@@ -210,8 +324,10 @@ def _build_linux_capture_command(
     fps: str,
     raw_file: str,
     camera_device: str,
+    output_args: list[str] | None = None,
+    record_timestamps: bool = False,
 ):
-    return [
+    command = [
         "ffmpeg",
         "-hide_banner",
         "-loglevel", "warning",
@@ -229,9 +345,65 @@ def _build_linux_capture_command(
         "-map", "0:v:0",
         "-c:v", "copy",
         "-an",
+    ]
+    command.extend(output_args or [
         "-f", "mjpeg",
         "-flush_packets", "1",
         raw_file,
+    ])
+    if record_timestamps:
+        command.extend(frame_timestamps.capture_output_args(raw_file))
+    return command
+
+
+def _capture_writer_output_args():
+    # FFmpeg still flushes every packet, but into the capture writer's pipe;
+    # the writer decides how the bytes reach the card.
+    return ["-f", "mjpeg", "-flush_packets", "1", "pipe:1"]
+
+
+def _recording_mode():
+    mode = RECORDING_MODE if RECORDING_MODE in RECORDING_MODES else "raw"
+    return mode if platform.system() == "Linux" else "raw"
+
+
+def _build_live_mux_file(output_file: str):
+    # The suffix keeps the growing file out of the .mp4-only media library
+    # until /stop has closed the last fragment and renamed it atomically.
+    return f"{output_file}.part"
+
+
+def _segment_remux_builder(fps: str, audio_file: str | None, audio_lead_seconds: float):
+    def build(raw_segment, fragment_file, audio_offset, duration, timestamp_offset, with_audio):
+        return _build_linux_command(
+            raw_segment,
+            fps,
+            fragment_file,
+            audio_file=audio_file if with_audio else None,
+            audio_lead_seconds=audio_lead_seconds + audio_offset,
+            fragmented=True,
+            audio_duration_seconds=duration,
+            timestamp_offset_seconds=timestamp_offset,
+        )
+
+    return build
+
+
+def _recovery_source_exists(mode, raw_file, output_file):
+    if mode == "segmented" and output_file:
+        return bool(
+            segments.list_segments(output_file)
+            or os.path.isfile(segments.assembly_file(output_file))
+        )
+    return bool(raw_file and os.path.isfile(raw_file))
+
+
+def _follow_input_args():
+    # The file protocol keeps reading the growing capture and reports EOF
+    # only after no new data arrived for the timeout, i.e. after /stop.
+    return [
+        "-follow", "1",
+        "-rw_timeout", str(int(LIVE_MUX_READ_TIMEOUT_SECONDS * 1_000_000)),
     ]
 
 
@@ -241,7 +413,13 @@ def _build_linux_command(
     output_file: str,
     audio_file: str | None = None,
     audio_lead_seconds: float = 0.0,
+    live: bool = False,
+    fragmented: bool = False,
+    audio_duration_seconds: float | None = None,
+    timestamp_offset_seconds: float = 0.0,
+    chapters_file: str | None = None,
 ):
+    fragmented = fragmented or live
     command = [
         "ffmpeg",
         "-hide_banner",
@@ -250,20 +428,32 @@ def _build_linux_command(
         "-y",
         "-f", "mjpeg",
         "-framerate", fps,
-        "-i", raw_file,
     ]
+    if live:
+        command.extend(_follow_input_args())
+    command.extend(["-i", raw_file])
+    encoded_audio = _audio_is_encoded(audio_file)
     if audio_file:
-        command.extend([
-            "-f", "s16le",
-            "-ar", str(audio.AUDIO_SAMPLE_RATE),
-            "-ac", str(audio.AUDIO_CHANNELS),
-        ])
+        if encoded_audio:
+            command.extend(["-f", "aac"])
+        else:
+            command.extend([
+                "-f", "s16le",
+                "-ar", str(audio.AUDIO_SAMPLE_RATE),
+                "-ac", str(audio.AUDIO_CHANNELS),
+            ])
+        if live:
+            command.extend(_follow_input_args())
         # This USB camera only allows simultaneous UVC and ALSA capture when
         # the audio interface is opened first. Drop that short audio lead so
         # both tracks begin at the same wall-clock moment in the MP4 file.
         if audio_lead_seconds > 0:
             command.extend(["-ss", f"{audio_lead_seconds:.6f}"])
+        if audio_duration_seconds is not None:
+            command.extend(["-t", f"{audio_duration_seconds:.6f}"])
         command.extend(["-i", audio_file])
+    if chapters_file:
+        command.extend(["-f", "ffmetadata", "-i", chapters_file])
 
     command.extend([
         "-map", "0:v:0",
@@ -271,7 +461,15 @@ def _build_linux_command(
         # the raw V4L2 MJPEG capture into MP4; it does not decode or re-encode.
         "-c:v", "copy",
     ])
-    if audio_file:
+    if encoded_audio:
+        # The AAC was encoded while recording; only its frames are copied.
+        # Without -shortest a short audio track cannot cut the video.
+        command.extend([
+            "-map", "1:a:0",
+            "-c:a", "copy",
+            "-bsf:a", "aac_adtstoasc",
+        ])
+    elif audio_file:
         command.extend([
             "-map", "1:a:0",
             "-c:a", "aac",
@@ -287,10 +485,166 @@ def _build_linux_command(
         ])
     else:
         command.append("-an")
+    if chapters_file:
+        command.extend(["-map_chapters", "2" if audio_file else "1"])
+    if timestamp_offset_seconds > 0:
+        # Segments continue the timeline of the previous one so their
+        # fragments can be appended to a single MP4.
+        command.extend(["-output_ts_offset", f"{timestamp_offset_seconds:.6f}"])
+    if fragmented:
+        # Every MJPEG frame is a keyframe, so fragments are cut purely by
+        # duration. Closing the file only appends the last fragment and the
+        # small fragment index; the size of earlier fragments is irrelevant.
+        command.extend([
+            "-f", "mp4",
+            "-movflags", "+empty_moov+default_base_moof",
+            "-frag_duration", str(int(LIVE_MUX_FRAGMENT_SECONDS * 1_000_000)),
+        ])
     command.append(output_file)
     return command
 
 
+def _build_aac_encode_command(
+    audio_file: str,
+    aac_file: str,
+    audio_lead_seconds: float,
+    duration_seconds: float,
+):
+    command = [
+        "ffmpeg",
+        "-hide_banner",
+        "-loglevel", "warning",
+        "-nostats",
+        "-y",
+        "-f", "s16le",
+        "-ar", str(audio.AUDIO_SAMPLE_RATE),
+        "-ac", str(audio.AUDIO_CHANNELS),
+    ]
+    if audio_lead_seconds > 0:
+        command.extend(["-ss", f"{audio_lead_seconds:.6f}"])
+    command.extend([
+        "-i", audio_file,
+        "-c:a", "aac",
+        "-b:a", audio.AUDIO_BITRATE,
+        "-ar", str(audio.AUDIO_SAMPLE_RATE),
+        "-ac", str(audio.AUDIO_CHANNELS),
+        # Same repair as the full remux: fill missing samples with silence up
+        # to the exact video duration instead of shortening the video.
+        "-af", "aresample=async=1:first_pts=0,apad",
+        "-t", f"{duration_seconds:.6f}",
+        "-f", "adts",
+        aac_file,
+    ])
+    return command
+
+
+def _audio_bitrate_bits(value: str) -> int:
+    text = str(value).strip().lower()
+    multiplier = 1000 if text.endswith("k") else 1
+    return int(float(text.rstrip("k")) * multiplier)
+
+
+def _native_mux_recording(
+    raw_file: str,
+    output_file: str,
+    fps: float,
+    audio_file: str | None,
+    audio_lead_seconds: float,
+    log_output,
+    timeout: float,
+    job=None,
+):
+    """Wrap the indexed JPEGs into a faststart MP4 without an FFmpeg remux."""
+    frame_index.catch_up(raw_file)
+    frames = frame_index.IndexedFrames(raw_file)
+    if not frames:
+        raise mp4_mux.Mp4MuxError("no_video_frames")
+    timestamps = frame_timestamps.for_frames(raw_file, len(frames))
+    video_seconds = (
+        (timestamps[-1] - timestamps[0]) / 1000.0 + 1.0 / fps
+        if timestamps
+        else len(frames) / fps
+    )
+    warning_parts = []
+    audio_recovered = False
+    aac_track = None
+    audio_skip_samples = mp4_mux.AAC_PRIMING_SAMPLES
+    aac_file = None
+    try:
+        if _audio_is_encoded(audio_file) and os.path.isfile(audio_file):
+            try:
+                # Encoded while recording: the lead is trimmed with whole
+                # frames plus an edit list instead of re-encoding.
+                encoded_track = mp4_mux.read_adts(audio_file)
+                aac_track, audio_skip_samples = mp4_mux.trim_aac(
+                    encoded_track,
+                    round(audio_lead_seconds * encoded_track.sample_rate),
+                    round(video_seconds * encoded_track.sample_rate),
+                )
+                audio_recovered = True
+            except (OSError, struct.error, mp4_mux.Mp4MuxError):
+                warning_parts.append(
+                    "Audio could not be finalized; recovered video without audio"
+                )
+        elif audio_file and os.path.isfile(audio_file):
+            aac_file = f"{audio_file}.aac"
+            try:
+                encode_return_code = _run_ffmpeg(
+                    _build_aac_encode_command(
+                        audio_file,
+                        aac_file,
+                        audio_lead_seconds,
+                        video_seconds,
+                    ),
+                    log_output,
+                    timeout,
+                    job,
+                    phase="encoding_audio",
+                    expected_bytes=int(
+                        video_seconds * _audio_bitrate_bits(audio.AUDIO_BITRATE) / 8
+                    ),
+                )
+                if encode_return_code != 0:
+                    raise RuntimeError(f"AAC encoder exited with code {encode_return_code}")
+                aac_track = mp4_mux.read_adts(aac_file)
+                audio_recovered = True
+            except (OSError, RuntimeError, subprocess.SubprocessError):
+                warning_parts.append(
+                    "Audio could not be finalized; recovered video without audio"
+                )
+        elif audio_file:
+            warning_parts.append(
+                "Audio could not be finalized; recovered video without audio"
+            )
+        mp4_mux.write_mp4(
+            raw_file,
+            output_file,
+            frames,
+            fps,
+            audio=aac_track,
+            audio_bitrate=_audio_bitrate_bits(audio.AUDIO_BITRATE),
+            audio_skip_samples=audio_skip_samples,
+            chapters=markers.chapters(raw_file, fps, len(frames), timestamps),
+            timestamps_ms=timestamps,
+            progress=(
+                job.progress_callback(
+                    "muxing",
+                    sum(size for _offset, size in frames)
+                    + (
+                        sum(size for _offset, size in aac_track.frames)
+                        if aac_track
+                        else 0
+                    ),
+                )
+                if job is not None
+                else None
+            ),
+        )
+    finally:
+        _remove_file(aac_file)
+    return 0, audio_recovered, warning_parts
+
+
 def _build_windows_command(video_size: str, fps: str, output_file: str):
     return [
         "ffmpeg",
@@ -309,16 +663,28 @@ def _build_windows_command(video_size: str, fps: str, output_file: str):
     ]
 
 
-def _start_audio_capture(command, log_file, audio_file):
-    """Open ALSA before UVC and timestamp the first real PCM samples."""
+def _start_audio_capture(command, log_file, audio_file, timeline=None):
+    """Open ALSA before UVC and timestamp the first real PCM samples.
+
+    An ``.aac`` ``audio_file`` is written by a streaming AAC encoder fed from
+    arecord; otherwise arecord's raw PCM goes straight to the file.
+    """
+    encoded = _audio_is_encoded(audio_file)
     last_return_code = None
     for attempt in range(1, AUDIO_OPEN_ATTEMPTS + 1):
-        with open(audio_file, "wb") as audio_output:
-            process = subprocess.Popen(
+        if encoded:
+            process = audio.EncodedAudioCapture(
                 command,
-                stdout=audio_output,
-                stderr=log_file,
+                audio.build_aac_stream_command(audio_file),
+                log_file,
             )
+        else:
+            with open(audio_file, "wb") as audio_output:
+                process = subprocess.Popen(
+                    command,
+                    stdout=audio_output,
+                    stderr=log_file,
+                )
         launched_at = time.monotonic()
         deadline = launched_at + AUDIO_DATA_START_TIMEOUT
         while True:
@@ -327,17 +693,25 @@ def _start_audio_capture(command, log_file, audio_file):
                 break
 
             captured_bytes = _safe_file_size(audio_file)
-            if captured_bytes > 0:
-                observed_at = time.monotonic()
-                captured_seconds = captured_bytes / (
+            captured_seconds = (
+                _encoded_audio_seconds(audio_file)
+                if encoded and captured_bytes > 0
+                else captured_bytes / (
                     audio.AUDIO_SAMPLE_RATE
                     * audio.AUDIO_CHANNELS
                     * AUDIO_BYTES_PER_SAMPLE
                 )
+            )
+            if captured_seconds > 0:
+                observed_at = time.monotonic()
                 # arecord writes complete ALSA periods. Subtracting the data
                 # already present estimates when capture actually began and
                 # avoids treating device-open latency as recorded audio.
                 started_at = max(launched_at, observed_at - captured_seconds)
+                if timeline is not None:
+                    timeline.add(
+                        "audio_open", launched_at, observed_at, attempt=attempt
+                    )
                 return process, started_at
 
             if time.monotonic() >= deadline:
@@ -350,6 +724,14 @@ def _start_audio_capture(command, log_file, audio_file):
                 break
             time.sleep(AUDIO_DATA_POLL_INTERVAL)
 
+        if timeline is not None:
+            timeline.add(
+                "audio_open",
+                launched_at,
+                time.monotonic(),
+                attempt=attempt,
+                failed=True,
+            )
         _remove_file(audio_file)
         if attempt < AUDIO_OPEN_ATTEMPTS:
             log_file.write(
@@ -366,48 +748,30 @@ def _start_audio_capture(command, log_file, audio_file):
     )
 
 
-def _close_process_resources(process):
-    global ffmpeg_log_file
+def _start_live_mux(command, log_file):
+    """Launch the optional streaming muxer without risking the capture."""
+    try:
+        return subprocess.Popen(
+            command,
+            stdin=subprocess.DEVNULL,
+            stdout=log_file,
+            stderr=log_file,
+        )
+    except (OSError, subprocess.SubprocessError) as error:
+        # The raw MJPEG file remains the source of truth. Without the live
+        # muxer /stop simply falls back to the full remux.
+        log_file.write(f"[WARN] Streaming MP4 muxer did not start: {error}\n")
+        log_file.flush()
+        return None
 
-    if process is not None and process.stdin is not None:
-        try:
-            process.stdin.close()
-        except (BrokenPipeError, OSError):
-            pass
 
-    if ffmpeg_log_file is not None:
-        try:
-            ffmpeg_log_file.close()
-        finally:
-            ffmpeg_log_file = None
-
-
-def _clear_recording_state():
-    global capture_process, audio_process, ffmpeg_process
-    global recording_output_file, recording_raw_file, recording_audio_file
-    global recording_audio_device, recording_audio_lead_seconds
-    global recording_remux_command, recording_phase
-    global recording_started_at_monotonic, recording_started_at_utc
-    global recording_camera_device, recording_video_size, recording_fps
-    global recording_capture_format, recording_generation
-
-    capture_process = None
-    audio_process = None
-    ffmpeg_process = None
-    recording_output_file = None
-    recording_raw_file = None
-    recording_audio_file = None
-    recording_audio_device = None
-    recording_audio_lead_seconds = 0.0
-    recording_remux_command = None
-    recording_phase = "idle"
-    recording_started_at_monotonic = None
-    recording_started_at_utc = None
-    recording_camera_device = None
-    recording_video_size = None
-    recording_fps = None
-    recording_capture_format = None
-    recording_generation += 1
+def _finish_live_mux(process, timeout: float = LIVE_MUX_DRAIN_TIMEOUT):
+    """Wait until the streaming muxer reads EOF and closes its last fragment."""
+    try:
+        return process.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        _stop_capture_process(process)
+        return None
 
 
 def _stop_capture_process(process, timeout: float = 3.0):
@@ -449,9 +813,9 @@ def _remove_file(path: str | None):
         pass
 
 
-def _log_tail(max_lines: int = 20):
+def _log_tail(path: str, max_lines: int = 20):
     try:
-        with open(FFMPEG_LOG_FILE, "r", encoding="utf-8", errors="replace") as log:
+        with open(path, "r", encoding="utf-8", errors="replace") as log:
             return "".join(log.readlines()[-max_lines:]).strip()
     except OSError:
         return ""
@@ -490,18 +854,93 @@ def _file_processing_timeout(
     return max(minimum_seconds, estimated + FILE_PROCESSING_TIMEOUT_MARGIN)
 
 
+def _capture_metrics_sampler(audio_file: str | None):
+    """Sample the audio bytes and disk free once per telemetry second."""
+    def sample():
+        audio_bytes = _safe_file_size(audio_file) if audio_file else None
+        return audio_bytes, shutil.disk_usage(utils.VIDEOS_DIR).free
+
+    return sample
+
+
+def _run_ffmpeg(
+    command,
+    log_output,
+    timeout: float,
+    job=None,
+    phase: str | None = None,
+    expected_bytes: int = 0,
+):
+    """Run a finalization FFmpeg command and report its output bytes to ``job``.
+
+    ``-progress`` is inserted before the output path; a watcher enforces the
+    timeout, pauses FFmpeg while the active capture is starved and terminates
+    it once the job is cancelled.
+    """
+    if job is not None and phase is not None:
+        job.update(phase=phase, bytes_done=0, bytes_total=expected_bytes)
+    process = subprocess.Popen(
+        [*command[:-1], "-progress", "pipe:1", command[-1]],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=log_output,
+        text=True,
+    )
+    outcome = {}
+
+    def watch():
+        deadline = time.monotonic() + timeout
+        paused_at = None
+        while True:
+            try:
+                process.wait(timeout=FFMPEG_PROGRESS_POLL_SECONDS)
+                return
+            except subprocess.TimeoutExpired:
+                pass
+            now = time.monotonic()
+            if now >= deadline or (job is not None and job.cancel_requested):
+                if paused_at is not None:
+                    process.send_signal(signal.SIGCONT)
+                if now >= deadline:
+                    outcome["timed_out"] = True
+                    process.kill()
+                else:
+                    outcome["cancelled"] = True
+                    process.terminate()
+                return
+            if job is None or not hasattr(signal, "SIGSTOP"):
+                continue
+            # A stopped FFmpeg releases the SD card to the active capture;
+            # the time spent paused does not count against the timeout.
+            if job.should_pause():
+                if paused_at is None:
+                    process.send_signal(signal.SIGSTOP)
+                    paused_at = now
+            elif paused_at is not None:
+                process.send_signal(signal.SIGCONT)
+                deadline += now - paused_at
+                paused_at = None
+
+    watcher = threading.Thread(target=watch, name="medicam-ffmpeg-watch", daemon=True)
+    watcher.start()
+    for line in process.stdout:
+        key, _separator, value = line.strip().partition("=")
+        if key == "total_size" and value.isdigit() and job is not None:
+            job.update(bytes_done=int(value))
+    return_code = process.wait()
+    watcher.join()
+    process.stdout.close()
+    if outcome.get("timed_out"):
+        raise subprocess.TimeoutExpired(command, timeout)
+    if outcome.get("cancelled"):
+        raise finalization.FinalizationCancelled(job.id)
+    return return_code
+
+
 def _count_mjpeg_frames(path: str):
-    count = 0
-    previous = b""
-    try:
-        with open(path, "rb") as raw_file:
-            while chunk := raw_file.read(1024 * 1024):
-                data = previous + chunk
-                count += data.count(b"\xff\xd8")
-                previous = data[-1:]
-    except OSError:
-        return 0
-    return count
+    # Only the part of the file the frame-index sidecar has not seen yet is
+    # scanned; without a sidecar this is a plain SOI marker count.
+    return frame_index.count_frames(path)
 
 
 def _wait_for_first_capture_byte(
@@ -509,12 +948,23 @@ def _wait_for_first_capture_byte(
     process,
     launched_at: float,
     fps: float,
+    indexer=None,
+    preroll_seconds: float = 0.0,
 ):
-    """Return the closest observable timestamp to the first captured frame."""
+    """Return the closest observable timestamp to the first captured frame.
+
+    ``preroll_seconds`` of pre-recorded frames lead the file, so its first
+    frame may precede ``launched_at`` by that much.
+    """
     deadline = launched_at + CAPTURE_START_OBSERVATION_TIMEOUT
+    launched_at -= preroll_seconds
     while time.monotonic() < deadline:
         if _safe_file_size(path) > 0:
-            frames = _count_mjpeg_frames(path)
+            frames = (
+                indexer.count
+                if indexer is not None and indexer.count
+                else _count_mjpeg_frames(path)
+            )
             observed_at = time.monotonic()
             if frames > 0 and fps > 0:
                 return max(launched_at, observed_at - (frames / fps))
@@ -525,158 +975,6 @@ def _wait_for_first_capture_byte(
     return launched_at
 
 
-def _recording_duration_seconds():
-    if recording_started_at_monotonic is not None:
-        return max(0.0, time.monotonic() - recording_started_at_monotonic)
-    if recording_started_at_utc:
-        try:
-            started = datetime.fromisoformat(recording_started_at_utc)
-            if started.tzinfo is None:
-                started = started.replace(tzinfo=timezone.utc)
-            return max(
-                0.0,
-                (datetime.now(timezone.utc) - started).total_seconds(),
-            )
-        except (TypeError, ValueError):
-            pass
-    return 0.0
-
-
-def _set_last_error_locked(code: str, message: str, recoverable: bool = False):
-    global last_recording_error
-    last_recording_error = {
-        "code": code,
-        "message": str(message),
-        "at": _utc_now_iso(),
-        "recoverable": bool(recoverable),
-    }
-
-
-def _persist_recording_state_locked():
-    os.makedirs(os.path.dirname(RECORDING_STATE_FILE) or ".", exist_ok=True)
-    if recording_phase == "idle" and last_recording_error is None:
-        _remove_file(RECORDING_STATE_FILE)
-        _remove_file(f"{RECORDING_STATE_FILE}.tmp")
-        return
-
-    payload = {
-        "version": 1,
-        "phase": recording_phase,
-        "output_file": recording_output_file,
-        "raw_file": recording_raw_file,
-        "audio_file": recording_audio_file,
-        "audio_device": recording_audio_device,
-        "audio_lead_seconds": recording_audio_lead_seconds,
-        "started_at": recording_started_at_utc,
-        "camera_device": recording_camera_device,
-        "video_size": recording_video_size,
-        "fps": recording_fps,
-        "capture_format": recording_capture_format,
-        "last_error": last_recording_error,
-        "updated_at": _utc_now_iso(),
-    }
-    temporary = f"{RECORDING_STATE_FILE}.tmp"
-    with open(temporary, "w", encoding="utf-8") as state_file:
-        json.dump(payload, state_file, ensure_ascii=False)
-        state_file.flush()
-        os.fsync(state_file.fileno())
-    os.replace(temporary, RECORDING_STATE_FILE)
-
-
-def _restore_recording_state_locked():
-    global recovery_state_loaded, recording_phase
-    global recording_output_file, recording_raw_file, recording_audio_file
-    global recording_audio_device, recording_audio_lead_seconds
-    global recording_remux_command, recording_started_at_utc
-    global recording_camera_device, recording_video_size, recording_fps
-    global recording_capture_format, last_recording_error
-
-    if recovery_state_loaded:
-        return
-    recovery_state_loaded = True
-
-    saved = {}
-    try:
-        with open(RECORDING_STATE_FILE, "r", encoding="utf-8") as state_file:
-            loaded = json.load(state_file)
-            if isinstance(loaded, dict):
-                saved = loaded
-    except (OSError, json.JSONDecodeError, TypeError):
-        saved = {}
-
-    saved_error = saved.get("last_error")
-    if isinstance(saved_error, dict):
-        last_recording_error = dict(saved_error)
-
-    output_file = saved.get("output_file")
-    if not _path_is_within(output_file, utils.VIDEOS_DIR):
-        output_file = None
-    if output_file and not output_file.lower().endswith(".mp4"):
-        output_file = None
-
-    raw_file = f"{output_file}.mjpeg" if output_file else None
-    if not raw_file or not os.path.isfile(raw_file):
-        orphaned = sorted(
-            glob.glob(os.path.join(utils.VIDEOS_DIR, "*.mp4.mjpeg")),
-            key=lambda path: os.path.getmtime(path),
-        )
-        raw_file = orphaned[-1] if orphaned else None
-        output_file = raw_file[:-len(".mjpeg")] if raw_file else None
-
-    if raw_file and output_file:
-        audio_file = saved.get("audio_file")
-        valid_audio_location = (
-            _path_is_within(audio_file, AUDIO_TEMP_DIR)
-            or _path_is_within(audio_file, utils.VIDEOS_DIR)
-        )
-        if not valid_audio_location or not os.path.isfile(audio_file):
-            audio_file = None
-
-        recording_output_file = output_file
-        recording_raw_file = raw_file
-        recording_audio_file = audio_file
-        recording_audio_device = saved.get("audio_device")
-        recording_audio_lead_seconds = float(
-            saved.get("audio_lead_seconds") or 0.0
-        )
-        recording_started_at_utc = saved.get("started_at")
-        if not recording_started_at_utc:
-            recording_started_at_utc = datetime.fromtimestamp(
-                os.path.getmtime(raw_file), timezone.utc
-            ).isoformat()
-        recording_camera_device = saved.get("camera_device")
-        recording_video_size = saved.get("video_size") or "1920x1080"
-        recording_fps = str(saved.get("fps") or "30")
-        recording_capture_format = (
-            saved.get("capture_format") or "ffmpeg_v4l2_mjpeg_raw"
-        )
-        recording_remux_command = _build_linux_command(
-            raw_file,
-            recording_fps,
-            output_file,
-            audio_file=audio_file,
-            audio_lead_seconds=recording_audio_lead_seconds,
-        )
-        recording_phase = "interrupted"
-        if last_recording_error is None:
-            _set_last_error_locked(
-                "backend_restarted",
-                "Backend restarted before the recording was finalized",
-                recoverable=True,
-            )
-        _persist_recording_state_locked()
-        return
-
-    if saved.get("phase") in {"starting", "recording", "finalizing", "interrupted"}:
-        recording_phase = "idle"
-        _set_last_error_locked(
-            "recovery_source_missing",
-            "Interrupted recording source file is no longer available",
-            recoverable=False,
-        )
-        _persist_recording_state_locked()
-
-
 def _parse_rate(value):
     try:
         numerator, denominator = str(value).split("/", maxsplit=1)
@@ -697,7 +995,8 @@ def _run_ffprobe(path: str, count_frames: bool = False):
     command.extend([
         "-select_streams", "v:0",
         "-show_entries",
-        f"stream={frame_field},avg_frame_rate,width,height:format=duration",
+        f"stream={frame_field},avg_frame_rate,width,height,duration"
+        ":format=duration",
         "-of", "json",
         path,
     ])
@@ -721,27 +1020,70 @@ def _run_ffprobe(path: str, count_frames: bool = False):
     return json.loads(result.stdout)
 
 
-def _probe_recording(path: str, elapsed_seconds: float, expected_fps: float):
+def _probe_recording(
+    path: str,
+    elapsed_seconds: float,
+    expected_fps: float,
+    captured_frames: int | None = None,
+    capture_timing: dict | None = None,
+):
+    """Report delivery quality from MP4 metadata without reading the media.
+
+    The sample table (or the fragment headers) written by our own muxers
+    already lists every video frame, so this costs milliseconds even for a
+    multi-gigabyte file. A full decode is available as an opt-in background
+    job in ``app.verification``. ``capture_timing`` (from the capture
+    timestamps) replaces the wall-clock estimate of missing frames with the
+    gaps the camera actually left.
+    """
     try:
-        payload = _run_ffprobe(path)
-        streams = payload.get("streams") or []
-        stream = streams[0] if streams else {}
-        frame_value = stream.get("nb_frames")
-        if not str(frame_value or "").isdigit():
-            payload = _run_ffprobe(path, count_frames=True)
+        try:
+            info = mp4_info.read_video_info(path)
+            frame_count = info["frames"]
+            duration = info["duration_seconds"]
+            avg_fps = frame_count / duration if duration > 0 else 0.0
+            resolution = (
+                f"{info['width']}x{info['height']}"
+                if info["width"] and info["height"]
+                else ""
+            )
+            method = "sample_table"
+        except (OSError, ValueError, IndexError, struct.error):
+            payload = _run_ffprobe(path)
             streams = payload.get("streams") or []
             stream = streams[0] if streams else {}
-            frame_value = stream.get("nb_read_frames")
-        frame_count = int(frame_value or 0)
-        duration = float((payload.get("format") or {}).get("duration") or 0.0)
-        avg_fps = _parse_rate(stream.get("avg_frame_rate", "0/1"))
+            frame_value = stream.get("nb_frames")
+            method = "ffprobe_header"
+            if not str(frame_value or "").isdigit():
+                # Never fall back to ffprobe -count_frames here: it reads the
+                # whole file back from microSD right after the remux did.
+                if captured_frames is not None:
+                    frame_value = captured_frames
+                    method = "frame_index"
+                else:
+                    frame_value = round(
+                        float(stream.get("duration") or 0.0) * expected_fps
+                    )
+            frame_count = int(frame_value or 0)
+            duration = float((payload.get("format") or {}).get("duration") or 0.0)
+            avg_fps = _parse_rate(stream.get("avg_frame_rate", "0/1"))
+            resolution = (
+                f"{stream.get('width')}x{stream.get('height')}"
+                if stream.get("width") and stream.get("height")
+                else ""
+            )
         expected_frames = max(0, round(elapsed_seconds * expected_fps))
+        if expected_frames == 0 and captured_frames:
+            expected_frames = captured_frames
         if expected_frames == 0 and duration > 0:
             # After a backend restart monotonic time is unavailable. The file
             # duration still lets us validate that the recovered stream is
             # decodable and maintains the configured frame rate.
             expected_frames = max(1, round(duration * expected_fps))
         missing_frames = max(0, expected_frames - frame_count)
+        if capture_timing is not None:
+            missing_frames = capture_timing["missing_frames"]
+            expected_frames = frame_count + missing_frames
         delivery_ratio = (
             min(1.0, frame_count / expected_frames) if expected_frames else 0.0
         )
@@ -754,11 +1096,10 @@ def _probe_recording(path: str, elapsed_seconds: float, expected_fps: float):
             "missing_frames": missing_frames,
             "frame_delivery_ratio": round(delivery_ratio, 6),
             "avg_fps": round(avg_fps, 3),
-            "resolution": (
-                f"{stream.get('width')}x{stream.get('height')}"
-                if stream.get("width") and stream.get("height")
-                else ""
-            ),
+            "resolution": resolution,
+            "captured_frames": captured_frames,
+            "method": method,
+            **({"capture_timing": capture_timing} if capture_timing else {}),
             "healthy": (
                 frame_count > 0
                 and duration > 0
@@ -780,93 +1121,31 @@ def _probe_recording(path: str, elapsed_seconds: float, expected_fps: float):
         }
 
 
-def _mark_interrupted_locked(code: str, message: str):
-    global recording_phase
-    if recording_phase != "recording":
-        return
-    recording_phase = "interrupted"
-    _set_last_error_locked(code, message, recoverable=True)
-    _persist_recording_state_locked()
-
-
-def _refresh_recording_state_locked():
-    if recording_phase != "recording":
-        return
-    video_process = ffmpeg_process or capture_process
-    if video_process is None:
-        _mark_interrupted_locked(
-            "video_capture_missing",
-            "Video capture process disappeared unexpectedly",
-        )
-        _stop_capture_process(audio_process)
-        return
-    video_return_code = video_process.poll()
-    if video_return_code is not None:
-        _mark_interrupted_locked(
-            "video_capture_exited",
-            f"Video capture exited unexpectedly with code {video_return_code}",
-        )
-        _stop_capture_process(audio_process)
-        return
-    try:
-        disk_free = shutil.disk_usage(utils.VIDEOS_DIR).free
-    except OSError:
-        disk_free = MIN_RECORDING_FREE_BYTES
-    finalization_reserve = (
-        _safe_file_size(recording_raw_file) + MIN_RECORDING_FREE_BYTES
+def _standby_key(
+    video_size,
+    fps,
+    audio_enabled,
+    audio_device_setting,
+    camera_device_setting="auto",
+):
+    return (
+        video_size,
+        str(fps),
+        bool(audio_enabled),
+        audio_device_setting,
+        camera_device_setting,
     )
-    if disk_free < finalization_reserve:
-        _mark_interrupted_locked(
-            "storage_reserve_reached",
-            "Recording stopped before the disk space required for MP4 finalization was exhausted",
-        )
-        _stop_capture_process(video_process)
-        _stop_capture_process(audio_process)
-        return
-    if recording_audio_file is not None:
-        if audio_process is None:
-            _mark_interrupted_locked(
-                "audio_capture_missing",
-                "Audio capture process disappeared unexpectedly",
-            )
-            _stop_capture_process(video_process)
-            return
-        audio_return_code = audio_process.poll()
-        if audio_return_code is not None:
-            _mark_interrupted_locked(
-                "audio_capture_exited",
-                f"Audio capture exited unexpectedly with code {audio_return_code}",
-            )
-            _stop_capture_process(video_process)
-
-
-def _watch_recording(generation: int):
-    while True:
-        time.sleep(WATCHDOG_INTERVAL_SECONDS)
-        processes_to_stop = []
-        with recording_lock:
-            if generation != recording_generation or recording_phase != "recording":
-                return
-            previous_phase = recording_phase
-            _refresh_recording_state_locked()
-            if previous_phase == "recording" and recording_phase == "interrupted":
-                processes_to_stop = [capture_process, audio_process, ffmpeg_process]
-        if processes_to_stop:
-            for process in processes_to_stop:
-                _stop_capture_process(process)
-            _preview_call("recording_stopped")
-            _preview_call("recording_finished")
-            return
 
 
-def _start_watchdog_locked():
-    thread = threading.Thread(
-        target=_watch_recording,
-        args=(recording_generation,),
-        name=f"medicam-recording-watchdog-{recording_generation}",
-        daemon=True,
+def _standby_supported():
+    # Preview shares the camera through its own branch and segmented mode
+    # needs FFmpeg's segment muxer, so both keep the cold start.
+    return (
+        standby.STANDBY_ENABLED
+        and not preview.PREVIEW_ENABLED
+        and platform.system() == "Linux"
+        and _recording_mode() != "segmented"
     )
-    thread.start()
 
 
 if os.path.exists(SETTINGS_FILE):
@@ -877,499 +1156,1734 @@ if os.path.exists(SETTINGS_FILE):
         pass
 
 
-def start_recording():
-    global capture_process, audio_process, ffmpeg_process, ffmpeg_log_file
-    global recording_output_file, recording_raw_file, recording_audio_file
-    global recording_audio_device, recording_audio_lead_seconds
-    global recording_remux_command, recording_phase
-    global recording_started_at_monotonic, recording_started_at_utc
-    global recording_camera_device, recording_video_size, recording_fps
-    global recording_capture_format, recording_generation
-    global last_recording_error
-
-    with recording_lock:
-        _restore_recording_state_locked()
-        _refresh_recording_state_locked()
-        processes = [
-            process
-            for process in (ffmpeg_process, capture_process, audio_process)
-            if process is not None
-        ]
-        if recording_phase == "finalizing":
-            return {
-                "status": "already_finalizing",
-                "file": recording_output_file,
-            }
-        if recording_phase == "interrupted" or (
-            recording_raw_file and os.path.isfile(recording_raw_file)
-        ):
-            return {
-                "status": "recovery_required",
-                "file": recording_output_file,
-                "details": "Finalize the interrupted recording with /stop before starting a new one",
-            }
-        if processes and any(process.poll() is None for process in processes):
-            return {
-                "status": "already_recording",
-                "file": recording_output_file,
-            }
-        if processes:
-            _clear_recording_state()
-
-        resolution_key = camera_settings.get("resolution", "FHD")
-        video_size = SUPPORTED_RESOLUTIONS.get(resolution_key)
-        fps = str(camera_settings.get("fps", "30"))
-        audio_enabled = bool(camera_settings.get("audio_enabled", True))
-        if not video_size or fps not in SUPPORTED_FPS:
-            normalized = _normalize_settings(camera_settings)
-            camera_settings.update(normalized)
-            resolution_key = normalized["resolution"]
-            video_size = SUPPORTED_RESOLUTIONS[resolution_key]
-            fps = normalized["fps"]
+def _recover_raw_capture(raw_file: str, fps: float, recording: dict):
+    """Repair an interrupted raw capture and account for what it lost.
+
+    Works from the frame index, so the cost follows the index size and the
+    unindexed tail rather than the size of the capture.
+    """
+    started = time.monotonic()
+    indexer, rebuilt, truncated = frame_index.recover(raw_file)
+    frame_seconds = 1.0 / fps if fps > 0 else 0.0
+    recovered_seconds = indexer.count * frame_seconds
+    lost_in_gaps = 0.0
+    lost_after_last_frame = 0.0
+    if indexer.first is not None:
+        span = indexer.last.wall_time - indexer.first.wall_time + frame_seconds
+        lost_in_gaps = max(0.0, span - recovered_seconds)
+        # Until the interruption was noticed the recorder was meant to run.
+        interrupted_at = (recording.get("previous_error") or {}).get("at")
+        try:
+            interrupted_at = datetime.fromisoformat(interrupted_at).timestamp()
+        except (TypeError, ValueError):
+            interrupted_at = None
+        if interrupted_at is not None:
+            lost_after_last_frame = max(
+                0.0, interrupted_at - indexer.last.wall_time - frame_seconds
+            )
+    return indexer, {
+        "frames": indexer.count,
+        "recovered_seconds": round(recovered_seconds, 3),
+        "lost_seconds": round(lost_in_gaps + lost_after_last_frame, 3),
+        "lost_in_gaps_seconds": round(lost_in_gaps, 3),
+        "lost_after_last_frame_seconds": round(lost_after_last_frame, 3),
+        "truncated_bytes": truncated,
+        "index_rebuilt": rebuilt,
+        "repair_seconds": round(time.monotonic() - started, 3),
+    }
 
-        storage_cleanup = storage_manager.apply_policy(trigger="recording_start")
-        system = platform.system()
-        output_file = utils.get_output_filename()
-        free_bytes = shutil.disk_usage(utils.VIDEOS_DIR).free
-        if free_bytes < MIN_RECORDING_FREE_BYTES:
-            _set_last_error_locked(
-                "insufficient_storage",
-                f"Only {free_bytes} bytes are free; at least "
-                f"{MIN_RECORDING_FREE_BYTES} bytes are required",
-            )
-            _persist_recording_state_locked()
-            return {
-                "status": "error",
-                "error_code": "insufficient_storage",
-                "details": last_recording_error["message"],
-                "free_space_bytes": free_bytes,
-                "required_free_bytes": MIN_RECORDING_FREE_BYTES,
-            }
-        selected_audio_device = None
-        audio_file = None
-        audio_command = None
 
-        if system == "Linux":
-            camera_device = _find_linux_camera_device()
-            if camera_device is None:
-                _remove_file(output_file)
-                _set_last_error_locked(
-                    "camera_unavailable",
-                    "Camera capture device is not available",
-                )
-                _persist_recording_state_locked()
-                return {
-                    "status": "error",
-                    "error_code": "camera_unavailable",
-                    "details": last_recording_error["message"],
-                }
-            raw_file = f"{output_file}.mjpeg"
-            if audio_enabled:
-                selected_audio_device = audio.resolve_capture_device(
-                    camera_settings.get("audio_device", "auto")
-                )
-                if selected_audio_device is None:
-                    _remove_file(output_file)
-                    _set_last_error_locked(
-                        "audio_device_unavailable",
-                        "Configured audio capture device is not available",
-                    )
-                    _persist_recording_state_locked()
-                    return {
-                        "status": "error",
-                        "error_code": "audio_device_unavailable",
-                        "details": last_recording_error["message"],
-                    }
-                audio_file = _build_audio_temp_file(output_file)
-                audio_command = audio.build_arecord_command(
-                    selected_audio_device["id"],
-                )
-            capture_command = _build_linux_capture_command(
-                video_size,
-                fps,
-                raw_file,
-                camera_device,
-            )
-            command = _build_linux_command(
+def _remux_raw_recording(
+    raw_file: str,
+    output_file: str,
+    fps: float,
+    audio_file: str | None,
+    audio_lead_seconds: float,
+    remux_command=None,
+    job=None,
+    log_output=None,
+    timeline=None,
+    log_path: str | None = None,
+):
+    """Build the MP4 from the complete raw capture after capture stopped."""
+    if timeline is None:
+        timeline = timing.Timeline("remux")
+    warning_parts = []
+    audio_recovered = bool(audio_file)
+    remux_timeout = _file_processing_timeout(
+        raw_file,
+        FFMPEG_REMUX_TIMEOUT,
+        REMUX_MIN_THROUGHPUT_BYTES_PER_SECOND,
+    )
+    owned_log = None
+    chapters_file = None
+    try:
+        if log_output is None or log_output.closed:
+            owned_log = open(log_path or FFMPEG_LOG_FILE, "a", encoding="utf-8")
+            log_output = owned_log
+        if not raw_file or not os.path.isfile(raw_file) or _safe_file_size(raw_file) == 0:
+            raise OSError("Raw MJPEG recovery file is missing or empty")
+        if NATIVE_MUX_ENABLED:
+            try:
+                with timeline.span("native_mux"):
+                    return _native_mux_recording(
+                        raw_file,
+                        output_file,
+                        fps,
+                        audio_file,
+                        audio_lead_seconds,
+                        log_output,
+                        remux_timeout,
+                        job,
+                    )
+            except (OSError, ValueError, struct.error, mp4_mux.Mp4MuxError) as error:
+                # The FFmpeg remux below remains the authoritative fallback.
+                log_output.write(f"[WARN] Native MP4 mux failed: {error}\n")
+                log_output.flush()
+                _remove_file(output_file)
+        if markers.read_markers(raw_file) or markers.read_sections(raw_file):
+            frames = frame_index.count_frames(raw_file)
+            chapter_list = markers.chapters(raw_file, fps, frames)
+            if chapter_list:
+                chapters_file = f"{raw_file}.chapters"
+                markers.write_ffmetadata(chapters_file, chapter_list, frames / fps)
+        if remux_command is None or chapters_file:
+            # The command prepared at start predates the markers.
+            remux_command = _build_linux_command(
                 raw_file,
-                fps,
+                str(int(fps)),
                 output_file,
-                audio_file=audio_file,
+                audio_file=audio_file if os.path.isfile(audio_file or "") else None,
+                audio_lead_seconds=audio_lead_seconds,
+                chapters_file=chapters_file,
             )
-            capture_format = "ffmpeg_v4l2_mjpeg_raw"
-        elif system == "Windows":
-            camera_device = "video=AT025"
-            raw_file = None
-            capture_command = None
-            command = _build_windows_command(video_size, fps, output_file)
-            capture_format = "h264"
-        else:
-            _remove_file(output_file)
-            _set_last_error_locked(
-                "unsupported_os",
-                f"Unsupported OS: {system}",
+        with timeline.span("remux"):
+            return_code = _run_ffmpeg(
+                remux_command,
+                log_output,
+                remux_timeout,
+                job,
+                phase="remuxing",
+                expected_bytes=_safe_file_size(raw_file),
             )
-            _persist_recording_state_locked()
-            return {
-                "status": "error",
-                "error_code": "unsupported_os",
-                "details": last_recording_error["message"],
-            }
 
-        recording_output_file = output_file
-        recording_raw_file = raw_file
-        recording_audio_file = audio_file
-        recording_audio_device = selected_audio_device
-        recording_audio_lead_seconds = 0.0
-        recording_camera_device = camera_device
-        recording_video_size = video_size
-        recording_fps = fps
-        recording_capture_format = capture_format
-        recording_started_at_monotonic = None
-        recording_started_at_utc = _utc_now_iso()
-        recording_phase = "starting"
-        recording_generation += 1
-        last_recording_error = None
-        _persist_recording_state_locked()
-        if capture_command:
-            # Release the idle SD camera owner before ALSA/UVC startup. The
-            # preview branch remains stopped until the first FullHD byte proves
-            # that the primary recorder is healthy.
-            _preview_call(
-                "prepare_for_recording",
-                camera_device,
+        # A damaged/missing audio tail must not make an otherwise intact
+        # video unrecoverable. Retry once with the raw MJPEG stream alone.
+        if return_code != 0 and audio_file:
+            warning_parts.append(
+                "Audio could not be finalized; recovered video without audio"
+            )
+            audio_recovered = False
+            video_only_command = _build_linux_command(
                 raw_file,
-                float(fps),
+                str(int(fps)),
+                output_file,
+                chapters_file=chapters_file,
             )
+            with timeline.span("remux_video_only"):
+                return_code = _run_ffmpeg(
+                    video_only_command,
+                    log_output,
+                    remux_timeout,
+                    job,
+                    phase="remuxing_video_only",
+                    expected_bytes=_safe_file_size(raw_file),
+                )
+    except subprocess.TimeoutExpired:
+        warning_parts.append("FFmpeg remux timed out")
+        return_code = 124
+    except (OSError, subprocess.SubprocessError) as error:
+        warning_parts.append(f"FFmpeg remux failed: {error}")
+        return_code = 1
+    finally:
+        if owned_log is not None:
+            owned_log.close()
+        _remove_file(chapters_file)
+    return return_code, audio_recovered, warning_parts
+
+
+class Recorder:
+    """One camera's recording slot.
+
+    Holds the capture processes, the persisted state file, the watchdog and
+    the finalization queue of a single device, all guarded by
+    ``recording_lock``. The default recorder (``key`` None) follows the
+    ``camera_device`` setting and owns the microphone, the preview and the
+    warm standby; every other camera is keyed by its ``/dev/v4l/by-id`` path
+    and records video only.
+    """
+
+    def __init__(self, key: str | None = None):
+        self.key = key
+        self.capture_process = None
+        self.audio_process = None
+        self.ffmpeg_process = None
+        self.ffmpeg_log_file = None
+        self.recording_output_file = None
+        self.recording_raw_file = None
+        self.recording_audio_file = None
+        self.recording_audio_device = None
+        self.recording_audio_lead_seconds = 0.0
+        self.recording_remux_command = None
+        self.recording_mode = "raw"
+        self.recording_live_file = None
+        self.live_mux_process = None
+        self.segment_assembler = None
+        self.frame_indexer = None
+        self.capture_file_writer = None
+        self.timelapse_writer = None
+        # Telemetry of the latest capture; kept after /stop for diagnosis.
+        self.capture_metrics = None
+        self.finalization_job = None
+        self.recording_phase = "idle"
+        self.recording_started_at_monotonic = None
+        self.recording_started_at_utc = None
+        # Monotonic start of the running pause, and the seconds of ended pauses.
+        self.recording_paused_at = None
+        self.recording_paused_seconds = 0.0
+        self.recording_camera_device = None
+        self.recording_video_size = None
+        self.recording_fps = None
+        self.recording_capture_format = None
+        self.recording_generation = 0
+        self.last_recording_error = None
+        self.recovery_state_loaded = False
+        self.recording_lock = threading.RLock()
+        # Lock order: recording_lock before _standby_lock. Preparing a standby
+        # holds only _standby_lock, so /start waits for an in-flight
+        # preparation to finish.
+        self.capture_standby = None
+        self._standby_lock = threading.Lock()
+        self._standby_generation = 0
+        # Status readers load this reference without recording_lock. Every
+        # persisted state change and the status refresher replace the dict;
+        # nobody mutates it.
+        self.recording_status_snapshot = None
+        self._capture_pressure = {
+            "indexer": None,
+            "at": 0.0,
+            "count": 0,
+            "pressured": False,
+        }
+
+    @property
+    def state_file(self):
+        return _camera_path(RECORDING_STATE_FILE, self.key)
+
+    @property
+    def queue_file(self):
+        return _camera_path(FINALIZATION_QUEUE_FILE, self.key)
+
+    @property
+    def log_path(self):
+        return _camera_path(FFMPEG_LOG_FILE, self.key)
+
+    @property
+    def queue_name(self):
+        return self.key or finalization.DEFAULT_QUEUE
+
+    def _preview_call(self, method: str, *args) -> None:
+        # The preview follows the default camera only.
+        if self.key is None:
+            _preview_call(method, *args)
+
+    def _standby_supported(self):
+        # The warm standby holds the microphone, which the default camera owns.
+        return self.key is None and _standby_supported()
+
+    def _find_camera_device(self, timeout: float = CAMERA_DISCOVERY_TIMEOUT):
+        if self.key is not None:
+            return _find_linux_camera_device(timeout, candidates=[self.key])
+        # The default camera never picks a device another recorder holds.
+        return _find_linux_camera_device(
+            timeout, exclude=_claimed_camera_devices(self)
+        )
+
+    def _output_filename(self):
+        output_file = utils.get_output_filename()
+        if self.key is None:
+            return output_file
+        # Cameras started together get the same timestamp; the label keeps
+        # their files apart.
+        return (
+            f"{output_file[:-len('.mp4')]}{CAMERA_FILE_SEPARATOR}"
+            f"{_camera_label(self.key)}.mp4"
+        )
+
+    def _owns_capture(self, path: str):
+        """Whether an orphaned raw capture was written by this camera."""
+        name = os.path.basename(path)
+        if self.key is None:
+            return CAMERA_FILE_SEPARATOR not in name
+        return name.endswith(
+            f"{CAMERA_FILE_SEPARATOR}{_camera_label(self.key)}.mp4.mjpeg"
+        )
+
+    def _create_segment_assembler(
+        self,
+        output_file: str,
+        fps: str,
+        audio_file: str | None,
+        audio_lead_seconds: float,
+        log_file=None,
+        generation: int | None = None,
+    ):
+        def segment_opened(path: str):
+            with self.recording_lock:
+                if generation is not None and generation != self.recording_generation:
+                    return
+                self.recording_raw_file = path
+                previous_indexer = self.frame_indexer
+                if previous_indexer is not None and previous_indexer.raw_file == path:
+                    # start_recording already tails the first segment; a
+                    # second indexer would append its frames twice.
+                    return
+                self.frame_indexer = frame_index.FrameIndexer(
+                    path,
+                    observer=(
+                        self.capture_metrics.record_frames
+                        if self.capture_metrics
+                        else None
+                    ),
+                ).start()
+            if previous_indexer is not None:
+                # The previous segment is closed; this drains its last frames.
+                previous_indexer.stop()
+            self._preview_call("recording_source_changed", path)
+
+        return segments.SegmentAssembler(
+            output_file,
+            float(fps),
+            _segment_remux_builder(fps, audio_file, audio_lead_seconds),
+            _count_mjpeg_frames,
+            log_file=log_file,
+            has_audio=bool(audio_file and os.path.isfile(audio_file)),
+            on_segment_opened=segment_opened if generation is not None else None,
+        )
+
+    def _finalization_reserve_bytes_locked(self):
+        # Segmented recordings only ever remux one closed segment at a time.
+        if self.recording_mode == "segmented" and self.recording_output_file:
+            sizes = [
+                _safe_file_size(path)
+                for path in segments.list_segments(self.recording_output_file)
+            ]
+            return max(sizes, default=0) + self._queued_finalization_bytes_locked()
+        return (
+            _safe_file_size(self.recording_raw_file)
+            + self._queued_finalization_bytes_locked()
+        )
+
+    def finalization_reserve_bytes(self):
+        with self.recording_lock:
+            return self._finalization_reserve_bytes_locked()
+
+    def _recording_source_size_locked(self):
+        if self.recording_mode == "segmented" and self.recording_output_file:
+            return sum(
+                _safe_file_size(path)
+                for path in segments.list_segments(self.recording_output_file)
+            ) + _safe_file_size(segments.assembly_file(self.recording_output_file))
+        return _safe_file_size(self.recording_raw_file)
+
+    def _close_process_resources(self, process):
+        if process is not None and process.stdin is not None:
+            try:
+                process.stdin.close()
+            except (BrokenPipeError, OSError):
+                pass
 
+        if self.ffmpeg_log_file is not None:
+            try:
+                self.ffmpeg_log_file.close()
+            finally:
+                self.ffmpeg_log_file = None
+
+    def _clear_recording_state(self):
+        if self.capture_file_writer is not None:
+            self.capture_file_writer.close()
+        if self.frame_indexer is not None:
+            self.frame_indexer.stop()
+        if self.timelapse_writer is not None:
+            self.timelapse_writer.stop()
+        self.capture_process = None
+        self.audio_process = None
+        self.ffmpeg_process = None
+        self.recording_output_file = None
+        self.recording_raw_file = None
+        self.recording_audio_file = None
+        self.recording_audio_device = None
+        self.recording_audio_lead_seconds = 0.0
+        self.recording_remux_command = None
+        self.recording_mode = "raw"
+        self.recording_live_file = None
+        self.live_mux_process = None
+        self.segment_assembler = None
+        self.frame_indexer = None
+        self.capture_file_writer = None
+        self.timelapse_writer = None
+        self.recording_phase = "idle"
+        self.recording_started_at_monotonic = None
+        self.recording_started_at_utc = None
+        self.recording_paused_at = None
+        self.recording_paused_seconds = 0.0
+        self.recording_camera_device = None
+        self.recording_video_size = None
+        self.recording_fps = None
+        self.recording_capture_format = None
+        self.recording_generation += 1
+
+    def _capture_write_pressure(self):
+        """Return whether the active capture gets fewer frames to disk than its fps.
+
+        Sampled from the frame-index sidecar once per window; called by the
+        finalization worker without the recorder lock.
+        """
+        indexer = self.frame_indexer
+        if (
+            indexer is None
+            or self.capture_process is None
+            or self.recording_phase != "recording"
+            or self.recording_paused_at is not None
+        ):
+            # A paused capture persists no frames on purpose; the window starts
+            # afresh once frames flow again.
+            self._capture_pressure.update(indexer=None, pressured=False)
+            return False
+        now = time.monotonic()
+        count = indexer.count
+        window = self._capture_pressure
+        if window["indexer"] is not indexer or count < window["count"]:
+            # A new capture or segment: start a fresh window.
+            window.update(indexer=indexer, at=now, count=count, pressured=False)
+            return False
+        elapsed = now - self._capture_pressure["at"]
+        if elapsed >= FINALIZATION_PRESSURE_WINDOW_SECONDS:
+            fps = float(self.recording_fps or camera_settings.get("fps", "30"))
+            rate = (count - self._capture_pressure["count"]) / elapsed
+            self._capture_pressure.update(
+                at=now,
+                count=count,
+                pressured=rate < fps * FINALIZATION_THROTTLE_FPS_RATIO,
+            )
+        return self._capture_pressure["pressured"]
+
+    def _recording_paused_seconds(self):
+        if self.recording_paused_at is None:
+            return self.recording_paused_seconds
+        return self.recording_paused_seconds + time.monotonic() - self.recording_paused_at
+
+    def _recording_duration_seconds(self):
+        if self.recording_started_at_monotonic is not None:
+            return max(
+                0.0,
+                time.monotonic()
+                - self.recording_started_at_monotonic
+                - self._recording_paused_seconds(),
+            )
+        if self.recording_started_at_utc:
+            try:
+                started = datetime.fromisoformat(self.recording_started_at_utc)
+                if started.tzinfo is None:
+                    started = started.replace(tzinfo=timezone.utc)
+                return max(
+                    0.0,
+                    (datetime.now(timezone.utc) - started).total_seconds(),
+                )
+            except (TypeError, ValueError):
+                pass
+        return 0.0
+
+    def _set_last_error_locked(self, code: str, message: str, recoverable: bool = False):
+        self.last_recording_error = {
+            "code": code,
+            "message": str(message),
+            "at": _utc_now_iso(),
+            "recoverable": bool(recoverable),
+        }
+
+    def _persist_recording_state_locked(self):
+        self._publish_recording_status_locked()
+        os.makedirs(os.path.dirname(self.state_file) or ".", exist_ok=True)
+        if self.recording_phase == "idle" and self.last_recording_error is None:
+            _remove_file(self.state_file)
+            _remove_file(f"{self.state_file}.tmp")
+            return
+
+        payload = {
+            "version": 1,
+            "phase": self.recording_phase,
+            "output_file": self.recording_output_file,
+            "raw_file": self.recording_raw_file,
+            "audio_file": self.recording_audio_file,
+            "audio_device": self.recording_audio_device,
+            "audio_lead_seconds": self.recording_audio_lead_seconds,
+            "started_at": self.recording_started_at_utc,
+            "camera_device": self.recording_camera_device,
+            "video_size": self.recording_video_size,
+            "fps": self.recording_fps,
+            "capture_format": self.recording_capture_format,
+            "mode": self.recording_mode,
+            "live_file": self.recording_live_file,
+            "last_error": self.last_recording_error,
+            "updated_at": _utc_now_iso(),
+        }
+        temporary = f"{self.state_file}.tmp"
+        with open(temporary, "w", encoding="utf-8") as state_file:
+            json.dump(payload, state_file, ensure_ascii=False)
+            state_file.flush()
+            os.fsync(state_file.fileno())
+        os.replace(temporary, self.state_file)
+
+    def _restore_recording_state_locked(self):
+        if self.recovery_state_loaded:
+            return
+        self.recovery_state_loaded = True
+        self._restore_slot_state_locked()
+        self._resume_finalization_queue_locked()
+
+    def _restore_slot_state_locked(self):
+        saved = {}
         try:
-            ffmpeg_log_file = open(FFMPEG_LOG_FILE, "w", encoding="utf-8")
-            ffmpeg_log_file.write(
-                f"[INFO] Camera device: {camera_device}\n"
-                f"[INFO] Capture: {video_size} @ {fps} fps, format={capture_format}\n"
-                f"[INFO] Capture command: "
-                f"{shlex.join(capture_command) if capture_command else 'none'}\n"
-                f"[INFO] Audio enabled: {bool(audio_command)}\n"
-                f"[INFO] Audio device: "
-                f"{selected_audio_device['id'] if selected_audio_device else 'none'}\n"
-                f"[INFO] Audio command: "
-                f"{shlex.join(audio_command) if audio_command else 'none'}\n"
-            )
-            ffmpeg_log_file.flush()
-            if capture_command:
-                if audio_command:
-                    audio_process, audio_started_at = _start_audio_capture(
-                        audio_command,
-                        ffmpeg_log_file,
-                        audio_file,
-                    )
-                capture_process = subprocess.Popen(
-                    capture_command,
-                    stdin=subprocess.DEVNULL,
-                    stdout=subprocess.DEVNULL,
-                    stderr=ffmpeg_log_file,
+            with open(self.state_file, "r", encoding="utf-8") as state_file:
+                loaded = json.load(state_file)
+                if isinstance(loaded, dict):
+                    saved = loaded
+        except (OSError, json.JSONDecodeError, TypeError):
+            saved = {}
+
+        saved_error = saved.get("last_error")
+        if isinstance(saved_error, dict):
+            self.last_recording_error = dict(saved_error)
+
+        output_file = saved.get("output_file")
+        if not _path_is_within(output_file, utils.VIDEOS_DIR):
+            output_file = None
+        if output_file and not output_file.lower().endswith(".mp4"):
+            output_file = None
+
+        saved_mode = saved.get("mode") if saved.get("mode") in RECORDING_MODES else "raw"
+        if saved_mode == "segmented" and _recovery_source_exists(
+            saved_mode, None, output_file
+        ):
+            # Already assembled segments live in the .part output; the newest
+            # raw segment (if any) is the one that was open during the crash.
+            pending = segments.list_segments(output_file)
+            raw_file = pending[-1] if pending else None
+        else:
+            saved_mode = "raw"
+            raw_file = f"{output_file}.mjpeg" if output_file else None
+            if not raw_file or not os.path.isfile(raw_file):
+                # Recordings waiting in the finalization queue are not orphans.
+                queued = self._queued_finalization_files_locked()
+                orphaned = sorted(
+                    (
+                        path
+                        for path in glob.glob(
+                            os.path.join(utils.VIDEOS_DIR, "*.mp4.mjpeg")
+                        )
+                        if path not in queued and self._owns_capture(path)
+                    ),
+                    key=lambda path: os.path.getmtime(path),
                 )
-                capture_launched_at = time.monotonic()
-                video_started_at = _wait_for_first_capture_byte(
+                raw_file = orphaned[-1] if orphaned else None
+                output_file = raw_file[:-len(".mjpeg")] if raw_file else None
+
+        if output_file and (raw_file or saved_mode == "segmented"):
+            audio_file = saved.get("audio_file")
+            valid_audio_location = (
+                _path_is_within(audio_file, AUDIO_TEMP_DIR)
+                or _path_is_within(audio_file, utils.VIDEOS_DIR)
+            )
+            if not valid_audio_location or not os.path.isfile(audio_file):
+                audio_file = None
+
+            self.recording_output_file = output_file
+            self.recording_raw_file = raw_file
+            self.recording_audio_file = audio_file
+            self.recording_audio_device = saved.get("audio_device")
+            self.recording_audio_lead_seconds = float(
+                saved.get("audio_lead_seconds") or 0.0
+            )
+            self.recording_started_at_utc = saved.get("started_at")
+            if not self.recording_started_at_utc:
+                # The first indexed frame is when capture really began; the raw
+                # mtime is only the time of the last write.
+                indexed = frame_index.summary(raw_file) if raw_file else None
+                self.recording_started_at_utc = datetime.fromtimestamp(
+                    indexed["first"].wall_time
+                    if indexed
+                    else os.path.getmtime(
+                        raw_file or segments.assembly_file(output_file)
+                    ),
+                    timezone.utc,
+                ).isoformat()
+            self.recording_camera_device = saved.get("camera_device")
+            self.recording_video_size = saved.get("video_size") or "1920x1080"
+            self.recording_fps = str(saved.get("fps") or "30")
+            self.recording_capture_format = (
+                saved.get("capture_format") or "ffmpeg_v4l2_mjpeg_raw"
+            )
+            self.recording_mode = saved_mode
+            # No live muxer survives a backend restart. A stale fragment file is
+            # only tracked so that finalization from the raw capture removes it.
+            live_file = _build_live_mux_file(output_file)
+            self.recording_live_file = (
+                live_file
+                if saved_mode != "segmented" and os.path.isfile(live_file)
+                else None
+            )
+            self.recording_remux_command = (
+                _build_linux_command(
                     raw_file,
-                    capture_process,
-                    capture_launched_at,
-                    float(fps),
+                    self.recording_fps,
+                    output_file,
+                    audio_file=audio_file,
+                    audio_lead_seconds=self.recording_audio_lead_seconds,
                 )
-                if audio_command:
-                    recording_audio_lead_seconds = max(
-                        0.0,
-                        video_started_at - audio_started_at,
-                    )
-                    command = _build_linux_command(
-                        raw_file,
-                        fps,
-                        output_file,
-                        audio_file=audio_file,
-                        audio_lead_seconds=recording_audio_lead_seconds,
-                    )
-                ffmpeg_log_file.write(
-                    f"[INFO] Audio lead before video: "
-                    f"{recording_audio_lead_seconds:.6f} seconds\n"
-                    f"[INFO] Remux command: {shlex.join(command)}\n"
+                if saved_mode != "segmented"
+                else None
+            )
+            self.recording_phase = "interrupted"
+            if self.last_recording_error is None:
+                self._set_last_error_locked(
+                    "backend_restarted",
+                    "Backend restarted before the recording was finalized",
+                    recoverable=True,
                 )
-                ffmpeg_log_file.flush()
-                ffmpeg_process = None
-                recording_raw_file = raw_file
-                recording_audio_file = audio_file
-                recording_audio_device = selected_audio_device
-                recording_remux_command = command
-            else:
-                ffmpeg_process = subprocess.Popen(
-                    command,
-                    stdin=subprocess.PIPE,
-                    stdout=ffmpeg_log_file,
-                    stderr=ffmpeg_log_file,
+            self._persist_recording_state_locked()
+            return
+
+        if saved.get("phase") in {"starting", "recording", "finalizing", "interrupted"}:
+            self.recording_phase = "idle"
+            self._set_last_error_locked(
+                "recovery_source_missing",
+                "Interrupted recording source file is no longer available",
+                recoverable=False,
+            )
+            self._persist_recording_state_locked()
+
+    def _mark_interrupted_locked(self, code: str, message: str):
+        if self.recording_phase != "recording":
+            return
+        self.recording_phase = "interrupted"
+        self._set_last_error_locked(code, message, recoverable=True)
+        self._persist_recording_state_locked()
+
+    def _refresh_process_state_locked(self):
+        if self.recording_phase != "recording":
+            return
+        video_process = self.ffmpeg_process or self.capture_process
+        if video_process is None:
+            self._mark_interrupted_locked(
+                "video_capture_missing",
+                "Video capture process disappeared unexpectedly",
+            )
+            _stop_capture_process(self.audio_process)
+            return
+        video_return_code = video_process.poll()
+        if video_return_code is not None:
+            self._mark_interrupted_locked(
+                "video_capture_exited",
+                f"Video capture exited unexpectedly with code {video_return_code}",
+            )
+            _stop_capture_process(self.audio_process)
+            return
+        if self.recording_audio_file is not None:
+            if self.audio_process is None:
+                self._mark_interrupted_locked(
+                    "audio_capture_missing",
+                    "Audio capture process disappeared unexpectedly",
                 )
-                video_started_at = time.monotonic()
-        except audio.AudioError as error:
-            _stop_capture_process(capture_process)
-            _stop_capture_process(audio_process)
-            _close_process_resources(ffmpeg_process)
-            details = _log_tail()
-            _clear_recording_state()
-            _remove_file(output_file)
-            _remove_file(raw_file)
-            _remove_file(audio_file)
-            _set_last_error_locked(
-                error.code,
-                details or error.details or str(error),
+                _stop_capture_process(video_process)
+                return
+            audio_return_code = self.audio_process.poll()
+            if audio_return_code is not None:
+                self._mark_interrupted_locked(
+                    "audio_capture_exited",
+                    f"Audio capture exited unexpectedly with code {audio_return_code}",
+                )
+                _stop_capture_process(video_process)
+
+    def _refresh_storage_state_locked(self, other_reserve_bytes):
+        """Stop at the finalization reserve; return the bytes left before it.
+
+        ``other_reserve_bytes`` is what the other cameras' recordings need; the
+        caller reads it before taking ``recording_lock``.
+        """
+        if self.recording_phase != "recording":
+            return None
+        try:
+            disk_free = shutil.disk_usage(utils.VIDEOS_DIR).free
+        except OSError:
+            disk_free = MIN_RECORDING_FREE_BYTES
+        # Every camera's recording is finalized on the same card.
+        finalization_reserve = (
+            self._finalization_reserve_bytes_locked()
+            + other_reserve_bytes
+            + MIN_RECORDING_FREE_BYTES
+        )
+        if disk_free < finalization_reserve:
+            self._mark_interrupted_locked(
+                "storage_reserve_reached",
+                "Recording stopped before the disk space required for MP4 finalization was exhausted",
             )
-            _persist_recording_state_locked()
-            _preview_call("recording_finished")
+            _stop_capture_process(self.ffmpeg_process or self.capture_process)
+            _stop_capture_process(self.audio_process)
+            return None
+        return disk_free - finalization_reserve
+
+    def _refresh_recording_state_locked(self, other_reserve_bytes):
+        self._refresh_process_state_locked()
+        self._refresh_storage_state_locked(other_reserve_bytes)
+
+    def _watch_recording(self, generation: int, processes):
+        forecast = watchdog.FillForecast()
+        next_storage_check = time.monotonic()
+        with watchdog.ProcessWatch(processes) as watch:
+            while True:
+                check_processes = watch.wait(next_storage_check - time.monotonic())
+                processes_to_stop = []
+                other_reserve_bytes = _reserve_bytes_of_other_recorders(self)
+                with self.recording_lock:
+                    if (
+                        generation != self.recording_generation
+                        or self.recording_phase != "recording"
+                    ):
+                        return
+                    if check_processes:
+                        self._refresh_process_state_locked()
+                    now = time.monotonic()
+                    if self.recording_phase == "recording" and now >= next_storage_check:
+                        headroom = self._refresh_storage_state_locked(
+                            other_reserve_bytes
+                        )
+                        if headroom is not None:
+                            next_storage_check = now + forecast.next_check_in(headroom, now)
+                    if self.recording_phase == "interrupted":
+                        processes_to_stop = [
+                            self.capture_process,
+                            self.audio_process,
+                            self.ffmpeg_process,
+                        ]
+                if processes_to_stop:
+                    for process in processes_to_stop:
+                        _stop_capture_process(process)
+                    self._preview_call("recording_stopped")
+                    self._preview_call("recording_finished")
+                    return
+
+    def _start_watchdog_locked(self):
+        thread = threading.Thread(
+            target=self._watch_recording,
+            args=(
+                self.recording_generation,
+                [self.ffmpeg_process or self.capture_process, self.audio_process],
+            ),
+            name=f"medicam-recording-watchdog-{self.recording_generation}",
+            daemon=True,
+        )
+        thread.start()
+
+    def schedule_standby(self):
+        """Open the capture devices in the background while the recorder is idle."""
+        if not self._standby_supported():
+            return None
+        with self.recording_lock:
+            if not self._slot_is_idle_locked():
+                return None
+            settings = _normalize_settings(camera_settings)
+        with self._standby_lock:
+            self._standby_generation += 1
+            generation = self._standby_generation
+        thread = threading.Thread(
+            target=self._prepare_standby,
+            args=(generation, settings),
+            name="medicam-capture-standby",
+            daemon=True,
+        )
+        thread.start()
+        return thread
+
+    def _prepare_standby(self, generation, settings):
+        # Callers of schedule_standby hold recording_lock; this thread does not.
+        protected = _protected_filenames()
+        video_size = SUPPORTED_RESOLUTIONS[settings["resolution"]]
+        key = _standby_key(
+            video_size,
+            settings["fps"],
+            settings["audio_enabled"],
+            settings["audio_device"],
+            settings["camera_device"],
+        )
+        with self._standby_lock:
+            if generation != self._standby_generation:
+                return
+            current = self.capture_standby
+            if current is not None and current.key == key and current.healthy():
+                return
+            self.capture_standby = None
+            if current is not None:
+                current.stop()
+
+            try:
+                storage_cleanup = storage_manager.apply_policy(
+                    trigger="recording_start",
+                    protected_filenames=protected,
+                )
+            except OSError:
+                storage_cleanup = None
+            camera_device = self._find_camera_device()
+            selected_audio_device = None
+            if settings["audio_enabled"]:
+                selected_audio_device = audio.resolve_capture_device(
+                    settings["audio_device"]
+                )
+            if camera_device is None or (
+                settings["audio_enabled"] and selected_audio_device is None
+            ):
+                # /start reports the missing device with its usual error.
+                return
+            candidate = standby.CaptureStandby(
+                key,
+                camera_device,
+                _build_linux_capture_command(
+                    video_size,
+                    settings["fps"],
+                    os.devnull,
+                    camera_device,
+                    output_args=_capture_writer_output_args(),
+                ),
+                selected_audio_device,
+                audio.build_arecord_command(selected_audio_device["id"])
+                if selected_audio_device is not None
+                else None,
+            )
+            try:
+                candidate.start(self.log_path)
+            except (OSError, subprocess.SubprocessError, standby.StandbyError):
+                return
+            candidate.storage_cleanup = storage_cleanup
+            self.capture_standby = candidate
+
+    def release_standby(self):
+        """Give the camera and microphone back, e.g. for the audio test."""
+        with self._standby_lock:
+            self._standby_generation += 1
+            current, self.capture_standby = self.capture_standby, None
+        if current is not None:
+            current.stop()
+
+    def _claim_standby_locked(self, key):
+        with self._standby_lock:
+            self._standby_generation += 1
+            current, self.capture_standby = self.capture_standby, None
+        if current is None:
+            return None
+        if current.key == key and current.healthy():
+            return current
+        current.stop()
+        return None
+
+    def _start_blocked_locked(self):
+        """The response that keeps ``/start`` from starting, or ``None``."""
+        processes = [
+            process
+            for process in (
+                self.ffmpeg_process, self.capture_process, self.audio_process
+            )
+            if process is not None
+        ]
+        if self.recording_phase == "finalizing":
             return {
-                "status": "error",
-                "error_code": error.code,
-                "details": last_recording_error["message"],
+                "status": "already_finalizing",
+                "file": self.recording_output_file,
             }
-        except (OSError, subprocess.SubprocessError) as error:
-            _stop_capture_process(capture_process)
-            _stop_capture_process(audio_process)
-            _close_process_resources(ffmpeg_process)
-            _clear_recording_state()
-            _remove_file(output_file)
-            _remove_file(raw_file)
-            _remove_file(audio_file)
-            _set_last_error_locked("capture_start_failed", str(error))
-            _persist_recording_state_locked()
-            _preview_call("recording_finished")
+        if self.recording_phase == "interrupted" or _recovery_source_exists(
+            self.recording_mode, self.recording_raw_file, self.recording_output_file
+        ):
             return {
-                "status": "error",
-                "error_code": "capture_start_failed",
-                "details": str(error),
+                "status": "recovery_required",
+                "file": self.recording_output_file,
+                "details": "Finalize the interrupted recording with /stop before starting a new one",
+            }
+        if processes and any(process.poll() is None for process in processes):
+            return {
+                "status": "already_recording",
+                "file": self.recording_output_file,
             }
+        if processes:
+            self._clear_recording_state()
+        return None
 
-        # _wait_for_first_capture_byte already covers the startup observation
-        # window on Linux. Windows still needs the original stability delay.
-        if not capture_command:
-            time.sleep(FFMPEG_STARTUP_DELAY)
-        capture_return_code = (
-            capture_process.poll()
-            if capture_process is not None
-            else None
+    def _start_settings_locked(self):
+        """Return the video size, fps and audio switch of the next recording."""
+        video_size = SUPPORTED_RESOLUTIONS.get(camera_settings.get("resolution", "FHD"))
+        fps = str(camera_settings.get("fps", "30"))
+        # The microphone belongs to the default camera.
+        audio_enabled = self.key is None and bool(
+            camera_settings.get("audio_enabled", True)
         )
-        ffmpeg_return_code = (
-            ffmpeg_process.poll()
-            if ffmpeg_process is not None
-            else None
+        if not video_size or fps not in SUPPORTED_FPS:
+            normalized = _normalize_settings(camera_settings)
+            camera_settings.update(normalized)
+            video_size = SUPPORTED_RESOLUTIONS[normalized["resolution"]]
+            fps = normalized["fps"]
+        return video_size, fps, audio_enabled
+
+    def _claim_start_standby_locked(self, timeline, video_size, fps, audio_enabled):
+        if not self._standby_supported():
+            return None
+        with timeline.span("standby_claim") as span:
+            current_settings = _normalize_settings(camera_settings)
+            warm = self._claim_standby_locked(
+                _standby_key(
+                    video_size,
+                    fps,
+                    audio_enabled,
+                    current_settings["audio_device"],
+                    current_settings["camera_device"],
+                )
+            )
+            span["claimed"] = warm is not None
+        return warm
+
+    def _start_failed_locked(self, **details):
+        """Persist the error ``/start`` just recorded and build its response."""
+        self._persist_recording_state_locked()
+        return {
+            "status": "error",
+            "error_code": self.last_recording_error["code"],
+            "details": self.last_recording_error["message"],
+            **details,
+        }
+
+    def _plan_capture_locked(
+        self, timeline, output_file, mode, video_size, fps, audio_enabled, warm
+    ):
+        """Pick the devices and build the commands of a new recording.
+
+        Returns ``None`` after recording the error when a device is missing.
+        """
+        plan = {
+            "camera_device": None,
+            "raw_file": None,
+            "audio_device": None,
+            "audio_file": None,
+            "audio_command": None,
+            "capture_command": None,
+        }
+        system = platform.system()
+        if system == "Windows":
+            plan["camera_device"] = "video=AT025"
+            plan["command"] = _build_windows_command(video_size, fps, output_file)
+            plan["capture_format"] = "h264"
+            return plan
+        if system != "Linux":
+            self._set_last_error_locked("unsupported_os", f"Unsupported OS: {system}")
+            return None
+
+        with timeline.span("camera_discovery"):
+            camera_device = (
+                warm.camera_device if warm is not None else self._find_camera_device()
+            )
+        if camera_device is None:
+            self._set_last_error_locked(
+                "camera_unavailable",
+                "Camera capture device is not available",
+            )
+            return None
+        if mode == "segmented":
+            raw_file = segments.segment_path(output_file, 0)
+            capture_output_args = segments.build_capture_output_args(output_file)
+        else:
+            raw_file = f"{output_file}.mjpeg"
+            capture_output_args = (
+                _capture_writer_output_args()
+                if capture_writer.CAPTURE_WRITER_ENABLED or warm is not None
+                else None
+            )
+        if audio_enabled:
+            with timeline.span("audio_discovery"):
+                plan["audio_device"] = (
+                    warm.audio_device
+                    if warm is not None
+                    else audio.resolve_capture_device(
+                        camera_settings.get("audio_device", "auto")
+                    )
+                )
+            if plan["audio_device"] is None:
+                self._set_last_error_locked(
+                    "audio_device_unavailable",
+                    "Configured audio capture device is not available",
+                )
+                return None
+            plan["audio_file"] = _build_audio_temp_file(output_file)
+            plan["audio_command"] = audio.build_arecord_command(
+                plan["audio_device"]["id"],
+            )
+        plan["camera_device"] = camera_device
+        plan["raw_file"] = raw_file
+        plan["capture_command"] = _build_linux_capture_command(
+            video_size,
+            fps,
+            raw_file,
+            camera_device,
+            output_args=capture_output_args,
+            # A claimed standby was started before the file was named;
+            # segments switch files the sidecar could not follow.
+            record_timestamps=(
+                frame_timestamps.TIMESTAMPS_ENABLED
+                and mode != "segmented"
+                and warm is None
+            ),
         )
-        audio_return_code = (
-            audio_process.poll()
-            if audio_process is not None
-            else None
+        plan["command"] = _build_linux_command(
+            raw_file,
+            fps,
+            output_file,
+            audio_file=plan["audio_file"],
         )
-        if (
-            capture_return_code is not None
-            or ffmpeg_return_code is not None
-            or audio_return_code is not None
-        ):
-            _stop_capture_process(capture_process)
-            _stop_capture_process(audio_process)
-            _close_process_resources(ffmpeg_process)
-            details = _log_tail()
-            _clear_recording_state()
-            _remove_file(output_file)
-            _remove_file(raw_file)
-            _remove_file(audio_file)
-            if ffmpeg_return_code is not None:
-                return_code = ffmpeg_return_code
-            elif audio_return_code is not None:
-                return_code = audio_return_code
+        plan["capture_format"] = "ffmpeg_v4l2_mjpeg_raw"
+        return plan
+
+    def _begin_recording_locked(self, plan, output_file, mode, video_size, fps):
+        """Fill the recorder slot for a recording about to start."""
+        self.recording_output_file = output_file
+        self.recording_raw_file = plan["raw_file"]
+        self.recording_audio_file = plan["audio_file"]
+        self.recording_audio_device = plan["audio_device"]
+        self.recording_audio_lead_seconds = 0.0
+        self.recording_camera_device = plan["camera_device"]
+        self.recording_video_size = video_size
+        self.recording_fps = fps
+        self.recording_capture_format = plan["capture_format"]
+        self.recording_mode = mode
+        self.recording_live_file = None
+        self.live_mux_process = None
+        self.recording_started_at_monotonic = None
+        self.recording_started_at_utc = _utc_now_iso()
+        self.recording_paused_at = None
+        self.recording_paused_seconds = 0.0
+        self.recording_phase = "starting"
+        self.recording_generation += 1
+        self.last_recording_error = None
+        self.capture_metrics = telemetry.CaptureMetrics(
+            output_file,
+            sampler=_capture_metrics_sampler(plan["audio_file"]),
+        )
+        self._persist_recording_state_locked()
+
+    def _open_start_log_locked(self, plan, video_size, fps):
+        capture_command = plan["capture_command"]
+        audio_command = plan["audio_command"]
+        audio_device = plan["audio_device"]
+        self.ffmpeg_log_file = open(self.log_path, "w", encoding="utf-8")
+        self.ffmpeg_log_file.write(
+            f"[INFO] Camera device: {plan['camera_device']}\n"
+            f"[INFO] Capture: {video_size} @ {fps} fps, "
+            f"format={plan['capture_format']}\n"
+            f"[INFO] Capture command: "
+            f"{shlex.join(capture_command) if capture_command else 'none'}\n"
+            f"[INFO] Audio enabled: {bool(audio_command)}\n"
+            f"[INFO] Audio device: "
+            f"{audio_device['id'] if audio_device else 'none'}\n"
+            f"[INFO] Audio command: "
+            f"{shlex.join(audio_command) if audio_command else 'none'}\n"
+        )
+        self.ffmpeg_log_file.flush()
+
+    def _arm_standby_capture_locked(self, timeline, plan, warm):
+        """Point the streaming standby devices at the new recording's files.
+
+        Returns when audio capture began and how much buffered video the
+        writer put in front of the first frame.
+        """
+        audio_file = plan["audio_file"]
+        audio_started_at = None
+        self.ffmpeg_log_file.write("[INFO] Capture standby: claimed\n")
+        self.ffmpeg_log_file.flush()
+        if plan["audio_command"]:
+            self.audio_process = warm.audio_capture
+            with timeline.span("audio_arm"):
+                audio_started_at = self.audio_process.arm(
+                    audio_file,
+                    audio.build_aac_stream_command(audio_file)
+                    if _audio_is_encoded(audio_file)
+                    else None,
+                    self.ffmpeg_log_file,
+                )
+        self.capture_process = warm.video_process
+        self.capture_file_writer = warm.writer
+        with timeline.span("capture_arm") as span:
+            preroll_seconds = self.capture_file_writer.arm(plan["raw_file"])
+            span["prerecord_seconds"] = round(preroll_seconds, 3)
+        return audio_started_at, preroll_seconds
+
+    def _spawn_capture_locked(self, timeline, plan, mode):
+        """Open the devices for the new recording; return when audio began."""
+        raw_file = plan["raw_file"]
+        audio_started_at = None
+        if plan["audio_command"]:
+            self.audio_process, audio_started_at = _start_audio_capture(
+                plan["audio_command"],
+                self.ffmpeg_log_file,
+                plan["audio_file"],
+                timeline=timeline,
+            )
+        with timeline.span("capture_spawn"):
+            if mode != "segmented" and capture_writer.CAPTURE_WRITER_ENABLED:
+                self.capture_file_writer = capture_writer.CaptureWriter(raw_file)
+            self.capture_process = subprocess.Popen(
+                plan["capture_command"],
+                stdin=subprocess.DEVNULL,
+                stdout=(
+                    self.capture_file_writer.pipe_fd
+                    if self.capture_file_writer is not None
+                    else subprocess.DEVNULL
+                ),
+                stderr=self.ffmpeg_log_file,
+            )
+            if self.capture_file_writer is not None:
+                self.capture_file_writer.start()
+        return audio_started_at
+
+    def _start_live_mux_locked(self, plan, output_file, fps):
+        """Start the streaming MP4 muxer of a fragmented recording."""
+        live_file = _build_live_mux_file(output_file)
+        live_command = _build_linux_command(
+            plan["raw_file"],
+            fps,
+            live_file,
+            audio_file=plan["audio_file"],
+            audio_lead_seconds=self.recording_audio_lead_seconds,
+            live=True,
+        )
+        self.ffmpeg_log_file.write(
+            f"[INFO] Streaming MP4 command: {shlex.join(live_command)}\n"
+        )
+        self.ffmpeg_log_file.flush()
+        self.live_mux_process = _start_live_mux(live_command, self.ffmpeg_log_file)
+        self.recording_live_file = live_file if self.live_mux_process else None
+
+    def _follow_capture_locked(
+        self, timeline, plan, output_file, mode, fps, audio_started_at, preroll_seconds
+    ):
+        """Wait for the first frame and start what consumes the raw capture.
+
+        Returns the monotonic time of the first frame.
+        """
+        raw_file = plan["raw_file"]
+        audio_file = plan["audio_file"]
+        command = plan["command"]
+        capture_launched_at = time.monotonic()
+        self.frame_indexer = frame_index.FrameIndexer(
+            raw_file,
+            observer=self.capture_metrics.record_frames,
+        ).start()
+        with timeline.span("first_byte"):
+            video_started_at = _wait_for_first_capture_byte(
+                raw_file,
+                self.capture_process,
+                capture_launched_at,
+                float(fps),
+                indexer=self.frame_indexer,
+                preroll_seconds=preroll_seconds,
+            )
+        if plan["audio_command"]:
+            self.recording_audio_lead_seconds = max(
+                0.0,
+                video_started_at - audio_started_at,
+            )
+            command = _build_linux_command(
+                raw_file,
+                fps,
+                output_file,
+                audio_file=audio_file,
+                audio_lead_seconds=self.recording_audio_lead_seconds,
+            )
+        self.ffmpeg_log_file.write(
+            f"[INFO] Audio lead before video: "
+            f"{self.recording_audio_lead_seconds:.6f} seconds\n"
+            f"[INFO] Remux command: {shlex.join(command)}\n"
+        )
+        self.ffmpeg_log_file.flush()
+        if mode == "fragmented":
+            self._start_live_mux_locked(plan, output_file, fps)
+        elif mode == "segmented":
+            self.segment_assembler = self._create_segment_assembler(
+                output_file,
+                fps,
+                audio_file,
+                self.recording_audio_lead_seconds,
+                log_file=self.ffmpeg_log_file,
+                generation=self.recording_generation,
+            )
+        if timelapse.enabled() and mode != "segmented":
+            self.timelapse_writer = timelapse.TimelapseWriter(
+                raw_file, output_file
+            ).start()
+        self.ffmpeg_process = None
+        self.recording_raw_file = raw_file
+        self.recording_audio_file = audio_file
+        self.recording_audio_device = plan["audio_device"]
+        self.recording_remux_command = command
+        return video_started_at
+
+    def _start_direct_ffmpeg_locked(self, timeline, plan):
+        """Start the single FFmpeg process that records straight to the MP4."""
+        with timeline.span("capture_spawn"):
+            self.ffmpeg_process = subprocess.Popen(
+                plan["command"],
+                stdin=subprocess.PIPE,
+                stdout=self.ffmpeg_log_file,
+                stderr=self.ffmpeg_log_file,
+            )
+        return time.monotonic()
+
+    def _start_exit_code_locked(self):
+        """The exit code of a process that died while starting, or ``None``."""
+        for process in (self.ffmpeg_process, self.audio_process, self.capture_process):
+            return_code = process.poll() if process is not None else None
+            if return_code is not None:
+                return return_code
+        return None
+
+    def _abort_start_locked(
+        self, timeline, plan, output_file, mode, code, details, from_log=True
+    ):
+        """Undo a start that failed after launching processes.
+
+        The error message prefers the FFmpeg log tail unless ``from_log`` is
+        false; ``details`` is the fallback.
+        """
+        _stop_capture_process(self.capture_process)
+        _stop_capture_process(self.audio_process)
+        _stop_capture_process(self.live_mux_process)
+        self._close_process_resources(self.ffmpeg_process)
+        if from_log:
+            details = _log_tail(self.log_path) or details
+        live_file = self.recording_live_file
+        self._clear_recording_state()
+        raw_file = plan["raw_file"]
+        _remove_file(output_file)
+        _remove_file(raw_file)
+        frame_index.remove_index(raw_file)
+        frame_timestamps.remove_timestamps(raw_file)
+        timelapse.remove_capture(output_file)
+        _remove_file(plan["audio_file"])
+        _remove_file(live_file)
+        if mode == "segmented":
+            for segment in segments.list_segments(output_file):
+                _remove_file(segment)
+        self._set_last_error_locked(code, details)
+        response = self._start_failed_locked(timings=timeline.finish())
+        self._preview_call("recording_finished")
+        self.schedule_standby()
+        return response
+
+    def start_recording(self):
+        timeline = timing.Timeline("start")
+        requested_at = timeline.started_at
+        # Read before taking recording_lock; see _reserve_bytes_of_other_recorders.
+        other_reserve_bytes = _reserve_bytes_of_other_recorders(self)
+        protected = _protected_filenames()
+        with self.recording_lock:
+            self._restore_recording_state_locked()
+            self._refresh_recording_state_locked(other_reserve_bytes)
+            blocked = self._start_blocked_locked()
+            if blocked is not None:
+                return blocked
+
+            video_size, fps, audio_enabled = self._start_settings_locked()
+            warm = self._claim_start_standby_locked(
+                timeline, video_size, fps, audio_enabled
+            )
+            preroll_seconds = 0.0
+            if warm is not None:
+                # The policy already ran when the standby was prepared.
+                storage_cleanup = warm.storage_cleanup
             else:
-                return_code = capture_return_code
-            _set_last_error_locked(
-                "capture_start_failed",
-                details or f"Capture exited with code {return_code}",
+                with timeline.span("storage_policy"):
+                    storage_cleanup = storage_manager.apply_policy(
+                        trigger="recording_start",
+                        protected_filenames=protected,
+                    )
+            mode = _recording_mode()
+            output_file = self._output_filename()
+            free_bytes = shutil.disk_usage(utils.VIDEOS_DIR).free
+            # Recordings still waiting in a finalization queue, and the other
+            # cameras' captures, need room for their MP4s before the new
+            # capture may use the card.
+            required_free_bytes = (
+                MIN_RECORDING_FREE_BYTES
+                + self._queued_finalization_bytes_locked()
+                + other_reserve_bytes
             )
-            _persist_recording_state_locked()
-            _preview_call("recording_finished")
-            return {
-                "status": "error",
-                "error_code": "capture_start_failed",
-                "details": last_recording_error["message"],
-            }
+            if free_bytes < required_free_bytes:
+                if warm is not None:
+                    warm.stop()
+                self._set_last_error_locked(
+                    "insufficient_storage",
+                    f"Only {free_bytes} bytes are free; at least "
+                    f"{required_free_bytes} bytes are required",
+                )
+                return self._start_failed_locked(
+                    free_space_bytes=free_bytes,
+                    required_free_bytes=required_free_bytes,
+                )
 
-        recording_started_at_monotonic = video_started_at
-        recording_started_at_utc = _utc_now_iso()
-        recording_phase = "recording"
-        _persist_recording_state_locked()
-        _start_watchdog_locked()
-        _preview_call("recording_started")
+            plan = self._plan_capture_locked(
+                timeline, output_file, mode, video_size, fps, audio_enabled, warm
+            )
+            if plan is None:
+                _remove_file(output_file)
+                return self._start_failed_locked()
+            capture_command = plan["capture_command"]
+            camera_device = plan["camera_device"]
+            self._begin_recording_locked(plan, output_file, mode, video_size, fps)
+            if capture_command:
+                # Release the idle SD camera owner before ALSA/UVC startup. The
+                # preview branch remains stopped until the first FullHD byte proves
+                # that the primary recorder is healthy.
+                self._preview_call(
+                    "prepare_for_recording",
+                    camera_device,
+                    plan["raw_file"],
+                    float(fps),
+                )
 
-        return {
-            "status": "recording_started",
-            "file": output_file,
-            "format": capture_format,
-            "device": camera_device,
-            "resolution": video_size,
-            "fps": fps,
-            "audio": {
-                "enabled": bool(audio_command),
-                "device": selected_audio_device,
-                "codec": "aac" if audio_command else None,
-                "sample_rate": audio.AUDIO_SAMPLE_RATE if audio_command else None,
-                "channels": audio.AUDIO_CHANNELS if audio_command else None,
-            },
-            "storage_cleanup": storage_cleanup,
-        }
+            try:
+                self._open_start_log_locked(plan, video_size, fps)
+                if capture_command:
+                    if warm is not None:
+                        # The devices are already streaming; only arm the writers.
+                        audio_started_at, preroll_seconds = (
+                            self._arm_standby_capture_locked(timeline, plan, warm)
+                        )
+                    else:
+                        audio_started_at = self._spawn_capture_locked(
+                            timeline, plan, mode
+                        )
+                    video_started_at = self._follow_capture_locked(
+                        timeline,
+                        plan,
+                        output_file,
+                        mode,
+                        fps,
+                        audio_started_at,
+                        preroll_seconds,
+                    )
+                else:
+                    video_started_at = self._start_direct_ffmpeg_locked(timeline, plan)
+            except audio.AudioError as error:
+                return self._abort_start_locked(
+                    timeline,
+                    plan,
+                    output_file,
+                    mode,
+                    error.code,
+                    error.details or str(error),
+                )
+            except (OSError, subprocess.SubprocessError) as error:
+                return self._abort_start_locked(
+                    timeline,
+                    plan,
+                    output_file,
+                    mode,
+                    "capture_start_failed",
+                    str(error),
+                    from_log=False,
+                )
 
+            # _wait_for_first_capture_byte already covers the startup observation
+            # window on Linux. Windows still needs the original stability delay.
+            if not capture_command:
+                time.sleep(FFMPEG_STARTUP_DELAY)
+            return_code = self._start_exit_code_locked()
+            if return_code is not None:
+                return self._abort_start_locked(
+                    timeline,
+                    plan,
+                    output_file,
+                    mode,
+                    "capture_start_failed",
+                    f"Capture exited with code {return_code}",
+                )
 
-def stop_recording():
-    global recording_phase, recording_generation, last_recording_error
+            self.recording_started_at_monotonic = video_started_at
+            self.recording_started_at_utc = _utc_now_iso()
+            self.recording_phase = "recording"
+            self._persist_recording_state_locked()
+            self._start_watchdog_locked()
+            if self.segment_assembler is not None:
+                self.segment_assembler.start()
+            self._preview_call("recording_started")
 
-    with recording_lock:
-        _restore_recording_state_locked()
-        _refresh_recording_state_locked()
-        if recording_phase == "finalizing":
+            audio_command = plan["audio_command"]
             return {
-                "status": "already_finalizing",
-                "file": recording_output_file,
+                "status": "recording_started",
+                "file": output_file,
+                "format": plan["capture_format"],
+                "mode": mode,
+                "streaming_mp4": self.live_mux_process is not None,
+                "device": camera_device,
+                "resolution": video_size,
+                "fps": fps,
+                "audio": {
+                    "enabled": bool(audio_command),
+                    "device": plan["audio_device"],
+                    "codec": "aac" if audio_command else None,
+                    "sample_rate": audio.AUDIO_SAMPLE_RATE if audio_command else None,
+                    "channels": audio.AUDIO_CHANNELS if audio_command else None,
+                },
+                "storage_cleanup": storage_cleanup,
+                "standby": warm is not None,
+                "prerecord_seconds": round(preroll_seconds, 3),
+                "start_latency_seconds": round(
+                    video_started_at + preroll_seconds - requested_at, 3
+                ),
+                "timings": timeline.finish(),
             }
 
-        has_process = any(
-            process is not None
-            for process in (capture_process, ffmpeg_process, audio_process)
-        )
-        has_recovery_source = bool(
-            recording_raw_file and os.path.isfile(recording_raw_file)
-        )
-        if not has_process and not has_recovery_source:
-            return {"status": "no_recording_running"}
-
-        process = ffmpeg_process
-        capture = capture_process
-        audio_capture = audio_process
-        output_file = recording_output_file
-        raw_file = recording_raw_file
-        audio_file = recording_audio_file
-        remux_command = recording_remux_command
-        fps = float(recording_fps or camera_settings.get("fps", "30"))
-        elapsed_seconds = (
-            _recording_duration_seconds()
-            if recording_started_at_monotonic is not None
-            else 0.0
-        )
-        was_interrupted = recording_phase == "interrupted"
-        previous_error = dict(last_recording_error) if last_recording_error else None
-        recording_phase = "finalizing"
-        recording_generation += 1
-        _persist_recording_state_locked()
-
-    capture_return_code = None
-    audio_return_code = None
-    return_code = None
-    warning_parts = []
-    quality = None
-    audio_recovered = bool(audio_file)
-    remux_timeout = _file_processing_timeout(
-        raw_file,
-        FFMPEG_REMUX_TIMEOUT,
-        REMUX_MIN_THROUGHPUT_BYTES_PER_SECOND,
-    )
-    # Stop the disk-tail/scaler before stopping the primary capture. Idle SD
-    # preview is restarted only after potentially expensive MP4 finalization.
-    _preview_call("recording_stopped")
+    def _load_finalization_queue_locked(self):
+        try:
+            with open(self.queue_file, "r", encoding="utf-8") as queue_file:
+                loaded = json.load(queue_file)
+        except (OSError, json.JSONDecodeError, TypeError):
+            return []
+        if not isinstance(loaded, list):
+            return []
+        return [
+            entry
+            for entry in loaded
+            if isinstance(entry, dict)
+            and _path_is_within(entry.get("output_file"), utils.VIDEOS_DIR)
+        ]
 
-    if raw_file:
-        capture_was_running = capture is not None and capture.poll() is None
-        audio_was_running = (
-            audio_capture is not None and audio_capture.poll() is None
-        )
-        capture_return_code = _stop_capture_process(capture)
-        audio_return_code = _stop_capture_process(audio_capture)
-        if capture is not None and not capture_was_running:
-            warning_parts.append(
-                f"Video capture ended before stop (code {capture_return_code})"
+    def _save_finalization_queue_locked(self, entries):
+        if not entries:
+            _remove_file(self.queue_file)
+            return
+        os.makedirs(os.path.dirname(self.queue_file) or ".", exist_ok=True)
+        temporary = f"{self.queue_file}.tmp"
+        with open(temporary, "w", encoding="utf-8") as queue_file:
+            json.dump(entries, queue_file, ensure_ascii=False)
+            queue_file.flush()
+            os.fsync(queue_file.fileno())
+        os.replace(temporary, self.queue_file)
+
+    def _update_finalization_entry_locked(self, output_file, state=None):
+        """Set the state of a queued recording, or drop it when ``state`` is None."""
+        entries = [
+            entry
+            for entry in self._load_finalization_queue_locked()
+            if entry.get("output_file") != output_file or state is not None
+        ]
+        for entry in entries:
+            if entry.get("output_file") == output_file:
+                entry["state"] = state
+                entry["updated_at"] = _utc_now_iso()
+        self._save_finalization_queue_locked(entries)
+
+    def _queued_finalization_files_locked(self):
+        return {
+            entry.get(key)
+            for entry in self._load_finalization_queue_locked()
+            for key in ("output_file", "raw_file")
+            if entry.get(key)
+        }
+
+    def queued_finalization_files(self):
+        with self.recording_lock:
+            return self._queued_finalization_files_locked()
+
+    def _queued_finalization_bytes_locked(self):
+        """Output space still needed by recordings waiting in the queue."""
+        return sum(
+            max(
+                0,
+                _safe_file_size(entry.get("raw_file"))
+                - _safe_file_size(entry.get("output_file")),
             )
-            was_interrupted = True
-        elif capture_return_code not in (None, 0, 255, -signal.SIGINT):
-            warning_parts.append(
-                f"Video capture exited with code {capture_return_code}"
+            if entry.get("mode") != "segmented"
+            else sum(
+                _safe_file_size(path)
+                for path in segments.list_segments(entry.get("output_file"))
             )
-            was_interrupted = True
-
-        audio_stopped_normally = (
-            audio_return_code in (None, 0, -signal.SIGINT)
-            or (audio_return_code == 1 and audio_was_running)
+            for entry in self._load_finalization_queue_locked()
+            if entry.get("state") in {"queued", "running"}
         )
-        if audio_capture is not None and not audio_stopped_normally:
-            warning_parts.append(
-                f"Audio capture exited with code {audio_return_code}"
+
+    def _slot_is_idle_locked(self):
+        return self.recording_phase == "idle" and not any(
+            process is not None
+            for process in (
+                self.capture_process, self.ffmpeg_process, self.audio_process
             )
-            was_interrupted = True
+        )
 
-        owned_log = None
-        log_output = ffmpeg_log_file
-        try:
-            if log_output is None or log_output.closed:
-                owned_log = open(FFMPEG_LOG_FILE, "a", encoding="utf-8")
-                log_output = owned_log
-            if not raw_file or not os.path.isfile(raw_file) or _safe_file_size(raw_file) == 0:
-                raise OSError("Raw MJPEG recovery file is missing or empty")
-            if remux_command is None:
-                remux_command = _build_linux_command(
-                    raw_file,
-                    str(int(fps)),
-                    output_file,
-                    audio_file=audio_file if os.path.isfile(audio_file or "") else None,
-                    audio_lead_seconds=recording_audio_lead_seconds,
+    def _attach_failed_finalization_locked(self):
+        """Move the oldest failed queued recording into the idle recorder slot.
+
+        ``/stop`` then retries it like any interrupted recording.
+        """
+        if not self._slot_is_idle_locked():
+            return False
+        entries = self._load_finalization_queue_locked()
+        failed = next(
+            (entry for entry in entries if entry.get("state") == "failed"),
+            None,
+        )
+        if failed is None:
+            return False
+        entries.remove(failed)
+        mode = failed.get("mode") if failed.get("mode") in RECORDING_MODES else "raw"
+        if _recovery_source_exists(mode, failed.get("raw_file"), failed["output_file"]):
+            self.recording_output_file = failed["output_file"]
+            self.recording_raw_file = failed.get("raw_file")
+            self.recording_audio_file = failed.get("audio_file")
+            if self.recording_audio_file and not os.path.isfile(self.recording_audio_file):
+                self.recording_audio_file = None
+            self.recording_audio_device = failed.get("audio_device")
+            self.recording_audio_lead_seconds = float(
+                failed.get("audio_lead_seconds") or 0.0
+            )
+            self.recording_started_at_utc = failed.get("started_at")
+            self.recording_camera_device = failed.get("camera_device")
+            self.recording_video_size = failed.get("video_size") or "1920x1080"
+            self.recording_fps = str(failed.get("fps") or "30")
+            self.recording_capture_format = failed.get("capture_format")
+            self.recording_mode = mode
+            live_file = failed.get("live_file")
+            self.recording_live_file = (
+                live_file if live_file and os.path.isfile(live_file) else None
+            )
+            self.recording_remux_command = None
+            self.recording_phase = "interrupted"
+        self._save_finalization_queue_locked(entries)
+        self._persist_recording_state_locked()
+        return self.recording_phase == "interrupted"
+
+    def _enqueue_finalization_locked(self, recording, runtime=None):
+        """Queue ``recording`` (a detached slot snapshot) for MP4 finalization."""
+        if recording["mode"] == "segmented" and recording["output_file"]:
+            source_bytes = sum(
+                _safe_file_size(path)
+                for path in segments.list_segments(recording["output_file"])
+            ) + _safe_file_size(segments.assembly_file(recording["output_file"]))
+        else:
+            source_bytes = _safe_file_size(recording["raw_file"])
+        job = finalization.create_job(
+            recording["output_file"], bytes_total=source_bytes
+        )
+        self.finalization_job = job
+        finalization.enqueue(
+            job,
+            lambda running_job: self._finalize_recording(
+                running_job, recording, runtime or {}
+            ),
+            queue=self.queue_name,
+        )
+        return job
+
+    def _resume_finalization_queue_locked(self):
+        """Requeue recordings whose finalization was cut short by a restart."""
+        entries = self._load_finalization_queue_locked()
+        kept = []
+        for entry in entries:
+            mode = entry.get("mode") if entry.get("mode") in RECORDING_MODES else "raw"
+            if (
+                entry.get("output_file") == self.recording_output_file
+                or not _recovery_source_exists(
+                    mode, entry.get("raw_file"), entry.get("output_file")
                 )
-            remux = subprocess.run(
-                remux_command,
-                stdout=log_output,
-                stderr=log_output,
-                timeout=remux_timeout,
-                check=False,
+            ):
+                continue
+            kept.append(entry)
+        self._save_finalization_queue_locked(kept)
+        for entry in kept:
+            if entry.get("state") == "failed":
+                continue
+            mode = entry.get("mode") if entry.get("mode") in RECORDING_MODES else "raw"
+            audio_file = entry.get("audio_file")
+            self._enqueue_finalization_locked(
+                {
+                    "output_file": entry["output_file"],
+                    "raw_file": entry.get("raw_file"),
+                    "audio_file": (
+                        audio_file
+                        if audio_file and os.path.isfile(audio_file)
+                        else None
+                    ),
+                    "live_file": entry.get("live_file"),
+                    "mode": mode,
+                    "fps": str(entry.get("fps") or "30"),
+                    "audio_lead_seconds": float(entry.get("audio_lead_seconds") or 0.0),
+                    "remux_command": None,
+                    "elapsed_seconds": 0.0,
+                    "captured_frames": None,
+                    "was_interrupted": True,
+                    "previous_error": None,
+                    "warnings": [],
+                    "capture_returncode": None,
+                    "audio_capture_returncode": None,
+                    "live_was_running": False,
+                }
             )
-            return_code = remux.returncode
-
-            # A damaged/missing audio tail must not make an otherwise intact
-            # video unrecoverable. Retry once with the raw MJPEG stream alone.
-            if return_code != 0 and audio_file:
-                warning_parts.append(
-                    "Audio could not be finalized; recovered video without audio"
+        self._attach_failed_finalization_locked()
+
+    def _assemble_segments(self, job, recording, assembler, outcome, timeline):
+        output_file = recording["output_file"]
+        audio_file = recording["audio_file"]
+        if assembler is None:
+            # Recovery after a service restart resumes from the progress file
+            # written after every appended segment.
+            assembler = self._create_segment_assembler(
+                output_file,
+                recording["fps"],
+                audio_file,
+                recording["audio_lead_seconds"],
+            )
+        with timeline.span("segment_assembly"):
+            return_code, segment_warnings = assembler.finish(
+                progress=job.progress_callback(
+                    "assembling_segments",
+                    assembler.pending_bytes(),
                 )
-                audio_recovered = False
-                video_only_command = _build_linux_command(
-                    raw_file,
-                    str(int(fps)),
-                    output_file,
+            )
+        outcome["warnings"].extend(segment_warnings)
+        outcome["captured_frames"] = assembler.frames
+        outcome["audio_recovered"] = bool(audio_file) and assembler.has_audio
+        if return_code == 0:
+            try:
+                os.replace(segments.assembly_file(output_file), output_file)
+                segments.remove_artifacts(output_file)
+                outcome["streamed"] = True
+            except OSError as error:
+                outcome["warnings"].append(
+                    f"Segmented MP4 could not be published: {error}"
                 )
-                retry = subprocess.run(
-                    video_only_command,
-                    stdout=log_output,
-                    stderr=log_output,
-                    timeout=remux_timeout,
-                    check=False,
+                return_code = 1
+        outcome["returncode"] = return_code
+
+    def _publish_live_mux(self, job, recording, live_process, outcome, timeline):
+        live_file = recording["live_file"]
+        job.update(phase="draining_live_mux")
+        with timeline.span("live_mux_drain"):
+            live_return_code = _finish_live_mux(live_process)
+        if (
+            recording["live_was_running"]
+            and live_return_code == 0
+            and _safe_file_size(live_file) > 0
+        ):
+            try:
+                os.replace(live_file, recording["output_file"])
+                outcome["streamed"] = True
+                outcome["returncode"] = 0
+            except OSError as error:
+                outcome["warnings"].append(
+                    f"Streaming MP4 could not be published: {error}"
                 )
-                return_code = retry.returncode
-        except subprocess.TimeoutExpired:
-            warning_parts.append("FFmpeg remux timed out")
-            return_code = 124
-        except (OSError, subprocess.SubprocessError) as error:
-            warning_parts.append(f"FFmpeg remux failed: {error}")
-            return_code = 1
-        finally:
-            if owned_log is not None:
-                owned_log.close()
+        else:
+            outcome["warnings"].append(
+                "Streaming MP4 was incomplete "
+                f"(code {live_return_code}); remuxed the raw capture"
+            )
 
-        if return_code == 0:
-            quality = _probe_recording(output_file, elapsed_seconds, fps)
-            if not quality.get("valid"):
-                warning_parts.append(
-                    f"Output validation failed: {quality.get('error', 'invalid video')}"
+    def _remux_capture(self, job, recording, log_file, outcome, timeline):
+        raw_file = recording["raw_file"]
+        fps = float(recording["fps"])
+        _remove_file(recording["live_file"])
+        if recording["was_interrupted"] and raw_file:
+            job.update(phase="repairing_capture")
+            with timeline.span("capture_repair"):
+                indexer, outcome["recovery"] = _recover_raw_capture(
+                    raw_file, fps, recording
                 )
-                return_code = 2
-            elif not quality.get("healthy"):
-                warning_parts.append(
-                    "Frame delivery was below the FullHD 30 fps health threshold"
+            if outcome["captured_frames"] is None:
+                outcome["captured_frames"] = indexer.count
+            if not outcome["elapsed_seconds"] and indexer.first is not None:
+                outcome["elapsed_seconds"] = (
+                    indexer.last.wall_time - indexer.first.wall_time + 1.0 / fps
+                )
+        return_code, audio_recovered, remux_warnings = _remux_raw_recording(
+            raw_file,
+            recording["output_file"],
+            fps,
+            recording["audio_file"],
+            recording["audio_lead_seconds"],
+            recording["remux_command"],
+            job=job,
+            log_output=log_file,
+            timeline=timeline,
+            log_path=self.log_path,
+        )
+        outcome["returncode"] = return_code
+        outcome["audio_recovered"] = audio_recovered
+        outcome["warnings"].extend(remux_warnings)
+
+    def _check_finalized_output(self, job, recording, outcome, timeline):
+        raw_file = recording["raw_file"]
+        mode = recording["mode"]
+        fps = float(recording["fps"])
+        captured_frames = outcome["captured_frames"]
+        job.update(phase="probing", bytes_done=0, bytes_total=0)
+        with timeline.span("probe"):
+            timestamps = (
+                frame_timestamps.for_frames(raw_file, captured_frames)
+                if raw_file and captured_frames and mode != "segmented"
+                else None
+            )
+            quality = _probe_recording(
+                recording["output_file"],
+                outcome["elapsed_seconds"],
+                fps,
+                captured_frames=captured_frames,
+                capture_timing=(
+                    frame_timestamps.timing_report(timestamps, fps)
+                    if timestamps
+                    else None
+                ),
+            )
+        outcome["quality"] = quality
+        if not quality.get("valid"):
+            outcome["warnings"].append(
+                f"Output validation failed: {quality.get('error', 'invalid video')}"
+            )
+            outcome["returncode"] = 2
+        elif not quality.get("healthy"):
+            outcome["warnings"].append(
+                "Frame delivery was below the FullHD 30 fps health threshold"
+            )
+        if outcome["returncode"] == 0 and raw_file and mode != "segmented":
+            # Read from the frame index before cleanup removes it.
+            with timeline.span("activity"):
+                outcome["activity"] = activity.compute(
+                    raw_file, fps, captured_frames, timestamps
                 )
-    elif process is not None:
+
+    def _build_mp4(self, job, recording, runtime, outcome, timeline):
+        """Turn the raw capture (or its segments) into the published MP4."""
+        mode = recording["mode"]
+        if mode == "segmented":
+            self._assemble_segments(
+                job, recording, runtime.get("assembler"), outcome, timeline
+            )
+        elif runtime.get("live_process") is not None:
+            self._publish_live_mux(
+                job, recording, runtime["live_process"], outcome, timeline
+            )
+        if not outcome["streamed"] and mode != "segmented":
+            self._remux_capture(
+                job, recording, runtime.get("log_file"), outcome, timeline
+            )
+        if outcome["returncode"] == 0:
+            self._check_finalized_output(job, recording, outcome, timeline)
+
+    def _stop_direct_ffmpeg(self, process, outcome, timeline):
+        """Ask the FFmpeg that records straight to the MP4 to finish it."""
+        ffmpeg_stop_started = time.monotonic()
         return_code = process.poll()
         if return_code is None:
             try:
@@ -1377,7 +2891,7 @@ def stop_recording():
                 process.stdin.flush()
                 return_code = process.wait(timeout=FFMPEG_STOP_TIMEOUT)
             except (BrokenPipeError, OSError, subprocess.TimeoutExpired):
-                warning_parts.append(
+                outcome["warnings"].append(
                     "FFmpeg did not stop cleanly and was terminated"
                 )
                 try:
@@ -1392,183 +2906,1011 @@ def stop_recording():
                 process.kill()
                 return_code = process.wait(timeout=3)
         else:
-            warning_parts.append(
+            outcome["warnings"].append(
                 f"FFmpeg had already exited with code {return_code}"
             )
-
-    with recording_lock:
-        _close_process_resources(process)
+        timeline.add("ffmpeg_stop", ffmpeg_stop_started, time.monotonic())
+        outcome["returncode"] = return_code
+
+    def _settle_finalization_locked(self, recording, outcome):
+        """Remove what a finished recording no longer needs and record errors."""
+        output_file = recording["output_file"]
+        raw_file = recording["raw_file"]
+        return_code = outcome["returncode"]
+        quality = outcome["quality"]
+        warning_parts = outcome["warnings"]
+        slot_idle = self._slot_is_idle_locked()
         if return_code == 0:
             _remove_file(raw_file)
-            _remove_file(audio_file)
-            _clear_recording_state()
+            frame_index.remove_index(raw_file)
+            frame_timestamps.remove_timestamps(raw_file)
+            markers.remove_markers(raw_file)
+            _remove_file(recording["audio_file"])
+            self._update_finalization_entry_locked(output_file, None)
             if warning_parts:
                 code = (
                     "recording_quality_degraded"
                     if quality and not quality.get("healthy")
                     else "recording_recovered_with_warning"
                 )
-                _set_last_error_locked(
+                self._set_last_error_locked(
                     code,
                     "; ".join(warning_parts),
                     recoverable=False,
                 )
-            elif not was_interrupted:
+            elif slot_idle and not recording["was_interrupted"]:
                 # A fully healthy new recording clears errors from earlier runs.
-                last_recording_error = None
-            elif previous_error:
-                last_recording_error = previous_error
-                last_recording_error["recoverable"] = False
-            _persist_recording_state_locked()
-        elif raw_file and os.path.isfile(raw_file):
-            recording_phase = "interrupted"
-            _set_last_error_locked(
-                "recording_finalization_failed",
+                self.last_recording_error = None
+            elif slot_idle and recording["previous_error"]:
+                self.last_recording_error = recording["previous_error"]
+                self.last_recording_error["recoverable"] = False
+        elif _recovery_source_exists(recording["mode"], raw_file, output_file):
+            # The streaming output was discarded above; a retry always
+            # finalizes from the raw capture.
+            self._update_finalization_entry_locked(output_file, "failed")
+            self._set_last_error_locked(
+                "recording_finalization_cancelled"
+                if outcome["cancelled"]
+                else "recording_finalization_failed",
                 "; ".join(warning_parts) or f"FFmpeg exited with code {return_code}",
                 recoverable=True,
             )
-            _persist_recording_state_locked()
         else:
-            _clear_recording_state()
-            _set_last_error_locked(
+            self._update_finalization_entry_locked(output_file, None)
+            timelapse.remove_capture(output_file)
+            self._set_last_error_locked(
                 "recording_finalization_failed",
                 "; ".join(warning_parts) or f"FFmpeg exited with code {return_code}",
                 recoverable=False,
             )
-            _persist_recording_state_locked()
-
-    storage_cleanup = None
-    if return_code == 0:
+        self._attach_failed_finalization_locked()
+        self._persist_recording_state_locked()
+
+    def _publish_finalized_recording(self, recording, outcome, timeline):
+        """Announce a new MP4, write its time-lapse and apply the storage policy."""
+        output_file = recording["output_file"]
+        warning_parts = outcome["warnings"]
+        # Takes every recorder's lock, so not under recording_lock.
+        protected = _protected_filenames()
+        if output_file and outcome["activity"]:
+            try:
+                utils.store_video_activity(
+                    os.path.basename(output_file), outcome["activity"]
+                )
+            except (OSError, ValueError) as error:
+                warning_parts.append(f"Activity timeline was not saved: {error}")
+        if output_file:
+            utils.notify_library_changed(os.path.basename(output_file), "added")
+            try:
+                if os.path.exists(timelapse.capture_path(output_file)):
+                    with timeline.span("timelapse"):
+                        outcome["timelapse"] = timelapse.finalize(
+                            output_file, float(recording["fps"])
+                        )
+            except (OSError, struct.error, mp4_mux.Mp4MuxError) as error:
+                timelapse.remove_capture(output_file)
+                warning_parts.append(f"Time-lapse could not be written: {error}")
+            if outcome["timelapse"]:
+                utils.notify_library_changed(
+                    os.path.basename(outcome["timelapse"]["file"]), "added"
+                )
         try:
-            protected = {os.path.basename(output_file)} if output_file else set()
-            storage_cleanup = storage_manager.apply_policy(
-                trigger="recording_stopped",
-                protected_filenames=protected,
-            )
+            if output_file:
+                protected.add(os.path.basename(output_file))
+            if outcome["timelapse"]:
+                protected.add(os.path.basename(outcome["timelapse"]["file"]))
+            with timeline.span("storage_policy"):
+                outcome["storage_cleanup"] = storage_manager.apply_policy(
+                    trigger="recording_stopped",
+                    protected_filenames=protected,
+                )
         except OSError as error:
             warning_parts.append(f"Storage cleanup failed: {error}")
 
-    response = {
-        "status": "recording_stopped",
-        "file": output_file,
-        "returncode": return_code,
-        "recovered": was_interrupted,
-        "recoverable": return_code != 0 and bool(raw_file and os.path.isfile(raw_file)),
-        "audio_recovered": audio_recovered,
-    }
-    if capture_return_code is not None:
-        response["capture_returncode"] = capture_return_code
-    if audio_return_code is not None:
-        response["audio_capture_returncode"] = audio_return_code
-    if quality is not None:
-        response["quality"] = quality
-    if warning_parts:
-        response["warning"] = "; ".join(warning_parts)
-    if storage_cleanup is not None:
-        response["storage_cleanup"] = storage_cleanup
-    _preview_call("recording_finished")
-    return response
+    def _finalize_recording(self, job, recording, runtime):
+        """Build, validate and publish the MP4 of a stopped recording.
+
+        Runs on the finalization worker. The recorder slot was already released,
+        so this only touches it to report errors while it is idle.
+        """
+        output_file = recording["output_file"]
+        process = runtime.get("process")
+        log_file = runtime.get("log_file")
+        # Recordings resumed from the queue after a restart have no stop timeline.
+        timeline = recording.get("timeline") or timing.Timeline("stop")
+        outcome = {
+            "returncode": None,
+            "quality": None,
+            "recovery": None,
+            "activity": None,
+            "timelapse": None,
+            "storage_cleanup": None,
+            "audio_recovered": bool(recording["audio_file"]),
+            "streamed": False,
+            "cancelled": False,
+            "captured_frames": recording["captured_frames"],
+            "elapsed_seconds": recording["elapsed_seconds"],
+            "warnings": list(recording["warnings"]),
+        }
+        with self.recording_lock:
+            self._update_finalization_entry_locked(output_file, "running")
+        try:
+            job.check_cancelled()
+            if recording["raw_file"] or recording["mode"] == "segmented":
+                self._build_mp4(job, recording, runtime, outcome, timeline)
+            elif process is not None:
+                self._stop_direct_ffmpeg(process, outcome, timeline)
+        except finalization.FinalizationCancelled:
+            # The raw capture (or the segment progress file) is kept, so a
+            # later /stop finalizes the recording from scratch.
+            outcome["cancelled"] = True
+            outcome["returncode"] = 130
+            outcome["quality"] = None
+            outcome["warnings"].append("Finalization was cancelled")
+            if not outcome["streamed"]:
+                _remove_file(output_file)
+        finally:
+            if process is not None and process.stdin is not None:
+                try:
+                    process.stdin.close()
+                except (BrokenPipeError, OSError):
+                    pass
+            if log_file is not None:
+                log_file.close()
+
+        job.update(phase="cleanup")
+        with self.recording_lock:
+            self._settle_finalization_locked(recording, outcome)
+        if outcome["returncode"] == 0:
+            self._publish_finalized_recording(recording, outcome, timeline)
+
+        return_code = outcome["returncode"]
+        response = {
+            "status": "recording_stopped",
+            "file": output_file,
+            "returncode": return_code,
+            "recovered": recording["was_interrupted"],
+            "recoverable": return_code != 0
+            and _recovery_source_exists(
+                recording["mode"], recording["raw_file"], output_file
+            ),
+            "audio_recovered": outcome["audio_recovered"],
+            "finalization_job": job.id,
+        }
+        if outcome["cancelled"]:
+            response["cancelled"] = True
+        if recording["capture_returncode"] is not None:
+            response["capture_returncode"] = recording["capture_returncode"]
+        if recording["audio_capture_returncode"] is not None:
+            response["audio_capture_returncode"] = recording["audio_capture_returncode"]
+        for key in ("quality", "recovery", "timelapse", "storage_cleanup"):
+            if outcome[key] is not None:
+                response[key] = outcome[key]
+        if outcome["warnings"]:
+            response["warning"] = "; ".join(outcome["warnings"])
+        response["timings"] = timeline.finish()
+        with self.recording_lock:
+            if self._slot_is_idle_locked():
+                self._preview_call("recording_finished")
+        return response
+
+    def _detach_recording_locked(self, timeline):
+        """Snapshot the recording in the slot for its finalization job."""
+        return {
+            "output_file": self.recording_output_file,
+            "raw_file": self.recording_raw_file,
+            "audio_file": self.recording_audio_file,
+            "audio_device": self.recording_audio_device,
+            "live_file": self.recording_live_file,
+            "mode": self.recording_mode,
+            "fps": str(self.recording_fps or camera_settings.get("fps", "30")),
+            "audio_lead_seconds": self.recording_audio_lead_seconds,
+            "remux_command": self.recording_remux_command,
+            "started_at": self.recording_started_at_utc,
+            "camera_device": self.recording_camera_device,
+            "video_size": self.recording_video_size,
+            "capture_format": self.recording_capture_format,
+            "elapsed_seconds": (
+                self._recording_duration_seconds()
+                if self.recording_started_at_monotonic is not None
+                else 0.0
+            ),
+            "captured_frames": None,
+            "was_interrupted": self.recording_phase == "interrupted",
+            "previous_error": (
+                dict(self.last_recording_error)
+                if self.last_recording_error
+                else None
+            ),
+            "warnings": [],
+            "capture_returncode": None,
+            "audio_capture_returncode": None,
+            "live_was_running": False,
+            "timeline": timeline,
+        }
+
+    def _stop_capture(self, recording, handles, timeline):
+        """Stop the capture processes and note in ``recording`` how they ended."""
+        capture = handles["capture"]
+        audio_capture = handles["audio_capture"]
+        live_process = handles["live_process"]
+        writer = handles["writer"]
+        indexer = handles["indexer"]
+        timelapse_capture = handles["timelapse"]
+        fps = float(recording["fps"])
+        warning_parts = recording["warnings"]
+        capture_was_running = capture is not None and capture.poll() is None
+        audio_was_running = audio_capture is not None and audio_capture.poll() is None
+        # A muxer that already saw EOF stopped following the capture early,
+        # for example after a long USB stall; its output is incomplete.
+        recording["live_was_running"] = (
+            live_process is not None and live_process.poll() is None
+        )
+        stop_started = time.monotonic()
+        capture_return_code = _stop_capture_process(capture)
+        if capture is not None:
+            timeline.add("capture_stop", stop_started, time.monotonic())
+        stop_started = time.monotonic()
+        audio_return_code = _stop_capture_process(audio_capture)
+        if audio_capture is not None:
+            timeline.add("audio_stop", stop_started, time.monotonic())
+        if writer is not None:
+            # Index and finalize only after the last piped bytes hit the file.
+            with timeline.span("writer_drain"):
+                writer.close()
+            if writer.error:
+                warning_parts.append(f"Capture writer failed: {writer.error}")
+                recording["was_interrupted"] = True
+        recording["capture_returncode"] = capture_return_code
+        recording["audio_capture_returncode"] = audio_return_code
+        if indexer is not None:
+            indexer.stop()
+            if timelapse_capture is not None:
+                # Copies the last selected frames the indexer found.
+                timelapse_capture.stop()
+                if timelapse_capture.error:
+                    warning_parts.append(
+                        f"Time-lapse capture failed: {timelapse_capture.error}"
+                    )
+            if recording["mode"] != "segmented":
+                recording["captured_frames"] = indexer.count
+                if not recording["elapsed_seconds"] and indexer.first is not None:
+                    recording["elapsed_seconds"] = (
+                        indexer.last.wall_time - indexer.first.wall_time + 1.0 / fps
+                    )
+        if capture is not None and not capture_was_running:
+            warning_parts.append(
+                f"Video capture ended before stop (code {capture_return_code})"
+            )
+            recording["was_interrupted"] = True
+        elif capture_return_code not in (None, 0, 255, -signal.SIGINT):
+            warning_parts.append(
+                f"Video capture exited with code {capture_return_code}"
+            )
+            recording["was_interrupted"] = True
 
+        audio_stopped_normally = (
+            audio_return_code in (None, 0, -signal.SIGINT)
+            or (audio_return_code == 1 and audio_was_running)
+        )
+        if audio_capture is not None and not audio_stopped_normally:
+            warning_parts.append(f"Audio capture exited with code {audio_return_code}")
+            recording["was_interrupted"] = True
+
+    def _queue_finalization_locked(self, recording, handles):
+        """Persist ``recording`` in the queue file, free the slot and enqueue it."""
+        # The queue entry is written before the slot is released, so a crash
+        # in between leaves the recording recoverable from one of the two.
+        entries = [
+            entry
+            for entry in self._load_finalization_queue_locked()
+            if entry.get("output_file") != recording["output_file"]
+        ]
+        entries.append({
+            **{
+                key: recording[key]
+                for key in (
+                    "output_file",
+                    "raw_file",
+                    "audio_file",
+                    "audio_device",
+                    "live_file",
+                    "mode",
+                    "fps",
+                    "audio_lead_seconds",
+                    "started_at",
+                    "camera_device",
+                    "video_size",
+                    "capture_format",
+                )
+            },
+            "state": "queued",
+            "updated_at": _utc_now_iso(),
+        })
+        self._save_finalization_queue_locked(entries)
+        log_file = self.ffmpeg_log_file
+        self.ffmpeg_log_file = None
+        self._clear_recording_state()
+        self._persist_recording_state_locked()
+        job = self._enqueue_finalization_locked(
+            recording,
+            {
+                "process": handles["process"],
+                "live_process": handles["live_process"],
+                "assembler": handles["assembler"],
+                "log_file": log_file,
+            },
+        )
+        self.schedule_standby()
+        return job
+
+    def stop_recording(self, wait: bool = True, timeout: float | None = None):
+        """Stop capture and hand the recording to the finalization queue.
+
+        The recorder slot is free as soon as capture stopped. With ``wait=False``
+        the queued job is returned immediately for the client to poll; so is a
+        job that did not finish within ``timeout`` seconds.
+        """
+        timeline = timing.Timeline("stop")
+        other_reserve_bytes = _reserve_bytes_of_other_recorders(self)
+        with self.recording_lock:
+            self._restore_recording_state_locked()
+            self._refresh_recording_state_locked(other_reserve_bytes)
+            if self.recording_phase == "finalizing":
+                return {
+                    "status": "already_finalizing",
+                    "file": self.recording_output_file,
+                }
 
-def get_settings():
-    return dict(camera_settings)
+            has_process = any(
+                process is not None
+                for process in (
+                    self.capture_process, self.ffmpeg_process, self.audio_process
+                )
+            )
+            has_recovery_source = _recovery_source_exists(
+                self.recording_mode, self.recording_raw_file, self.recording_output_file
+            )
+            if not has_process and not has_recovery_source:
+                active = finalization.active_jobs(self.queue_name)
+                if active:
+                    return {
+                        "status": "already_finalizing",
+                        "file": active[-1].output_file,
+                        "job": active[-1].snapshot(),
+                    }
+                return {"status": "no_recording_running"}
+
+            handles = {
+                "process": self.ffmpeg_process,
+                "capture": self.capture_process,
+                "audio_capture": self.audio_process,
+                "live_process": self.live_mux_process,
+                "assembler": self.segment_assembler,
+                "indexer": self.frame_indexer,
+                "writer": self.capture_file_writer,
+                "timelapse": self.timelapse_writer,
+            }
+            recording = self._detach_recording_locked(timeline)
+            self.recording_phase = "finalizing"
+            self.recording_generation += 1
+            self._persist_recording_state_locked()
+
+        # Stop the disk-tail/scaler before stopping the primary capture. Idle SD
+        # preview is restarted only after potentially expensive MP4 finalization.
+        self._preview_call("recording_stopped")
+        if recording["raw_file"] or recording["mode"] == "segmented":
+            self._stop_capture(recording, handles, timeline)
+
+        with self.recording_lock:
+            job = self._queue_finalization_locked(recording, handles)
+
+        # Queued jobs run one at a time, so the wait includes earlier recordings.
+        if not wait or not job.wait(timeout):
+            return {
+                "status": "finalizing",
+                "file": recording["output_file"],
+                "job": job.snapshot(),
+            }
+        with self.recording_lock:
+            # The job just left the active queue; do not report it until the
+            # next refresh.
+            self._publish_recording_status_locked()
+        if job.exception is not None:
+            raise job.exception
+        return job.result
+
+    def add_recording_marker(self, label: str | None = None):
+        """Mark the newest captured frame of the running recording."""
+        with self.recording_lock:
+            if self.recording_phase != "recording" or self.frame_indexer is None:
+                raise HTTPException(
+                    status_code=409,
+                    detail={"code": "no_recording_running"},
+                )
+            if self.recording_mode != "raw":
+                # Streamed modes publish an MP4 that already exists at /stop.
+                raise HTTPException(
+                    status_code=409,
+                    detail={
+                        "code": "markers_unsupported_mode",
+                        "mode": self.recording_mode,
+                    },
+                )
+            frame = max(0, self.frame_indexer.count - 1)
+            try:
+                marker = markers.append_marker(self.recording_raw_file, frame, label)
+            except markers.MarkerLimitError as error:
+                raise HTTPException(
+                    status_code=409,
+                    detail={"code": "marker_limit_reached", "message": str(error)},
+                )
+            marker["time_seconds"] = round(frame / float(self.recording_fps or 30), 3)
+            marker["file"] = os.path.basename(self.recording_output_file)
+        events.publish("recording.marker", marker)
+        return {"status": "marker_added", "marker": marker}
+
+    def _pause_unsupported_reason_locked(self):
+        if self.recording_mode != "raw":
+            # Streamed modes publish an MP4 that already exists at /stop.
+            return "mode"
+        if self.capture_file_writer is None:
+            # FFmpeg writes the raw file itself; only the writer can cut it.
+            return "capture_writer"
+        if self.audio_process is not None and not isinstance(
+            self.audio_process, audio.StandbyAudioCapture
+        ):
+            # arecord writes the PCM file or the encoder pipe directly.
+            return "audio_capture"
+        return None
+
+    def pause_recording(self):
+        """Stop persisting frames and PCM; the camera and microphone stay open."""
+        with self.recording_lock:
+            if self.recording_phase != "recording":
+                raise HTTPException(
+                    status_code=409,
+                    detail={"code": "no_recording_running"},
+                )
+            reason = self._pause_unsupported_reason_locked()
+            if reason is not None:
+                raise HTTPException(
+                    status_code=409,
+                    detail={
+                        "code": "pause_unsupported",
+                        "reason": reason,
+                        "mode": self.recording_mode,
+                    },
+                )
+            file_name = os.path.basename(self.recording_output_file)
+            if self.recording_paused_at is not None:
+                return {"status": "already_paused", "file": file_name}
+            self.capture_file_writer.pause()
+            if self.audio_process is not None:
+                self.audio_process.pause()
+            self.recording_paused_at = time.monotonic()
+            # Its lines are the captured frames, not the persisted ones.
+            frame_timestamps.remove_timestamps(self.recording_raw_file)
+            paused = {
+                "file": file_name,
+                "duration_seconds": round(self._recording_duration_seconds(), 3),
+            }
+            self._publish_recording_status_locked()
+        events.publish("recording.paused", paused)
+        return {"status": "paused", **paused}
+
+    def resume_recording(self):
+        """Persist the paused recording again as a new section of the same file."""
+        with self.recording_lock:
+            if self.recording_phase != "recording" or self.capture_file_writer is None:
+                raise HTTPException(
+                    status_code=409,
+                    detail={"code": "no_recording_running"},
+                )
+            file_name = os.path.basename(self.recording_output_file)
+            if self.recording_paused_at is None:
+                return {"status": "not_paused", "file": file_name}
+            if self.audio_process is not None:
+                self.audio_process.resume()
+            offset = self.capture_file_writer.resume()
+            self.recording_paused_seconds += time.monotonic() - self.recording_paused_at
+            self.recording_paused_at = None
+            self._capture_pressure.update(indexer=None, pressured=False)
+            warning = None
+            if offset is not None:
+                try:
+                    markers.append_section(self.recording_raw_file, offset)
+                except OSError as error:
+                    # The recording goes on; only the chapter is lost.
+                    warning = f"Section chapter was not saved: {error}"
+            resumed = {
+                "file": file_name,
+                "section": len(markers.read_sections(self.recording_raw_file)) + 1,
+                "paused_seconds": round(self.recording_paused_seconds, 3),
+            }
+            self._publish_recording_status_locked()
+        events.publish("recording.resumed", resumed)
+        response = {"status": "resumed", **resumed}
+        if warning:
+            response["warning"] = warning
+        return response
+
+    def get_preview_source(self, ) -> dict:
+        """Return internal source data used by the authenticated preview route."""
+        with self.recording_lock:
+            self._restore_recording_state_locked()
+            active = self.recording_phase == "recording" and bool(self.recording_raw_file)
+            device = self.recording_camera_device if active else None
+            raw_file = self.recording_raw_file if active else None
+            fps = float(self.recording_fps or camera_settings.get("fps", "30"))
+        if not device:
+            device = find_camera_device(timeout=0.0)
+        return {
+            "camera_device": device,
+            "recording_raw_file": raw_file,
+            "recording_fps": fps,
+        }
+
+    def get_live_source(self):
+        """Return the running recording for the live HLS view, or None.
+
+        Segmented recordings switch raw files and indexes every segment, so
+        only the raw and fragmented modes can be followed.
+        """
+        with self.recording_lock:
+            if (
+                self.recording_phase != "recording"
+                or self.frame_indexer is None
+                or self.recording_mode == "segmented"
+                or not self.recording_raw_file
+            ):
+                return None
+            return {
+                "name": os.path.basename(self.recording_output_file),
+                "raw_file": self.recording_raw_file,
+                "fps": float(self.recording_fps or camera_settings.get("fps", "30")),
+                "frames": self.frame_indexer.count,
+            }
 
+    def get_recording_source(self):
+        """Return the raw file the running recording writes now, or None.
 
-def get_preview_source() -> dict:
-    """Return internal source data used by the authenticated preview route."""
-    with recording_lock:
-        _restore_recording_state_locked()
-        active = recording_phase == "recording" and bool(recording_raw_file)
-        device = recording_camera_device if active else None
-        raw_file = recording_raw_file if active else None
-        fps = float(recording_fps or camera_settings.get("fps", "30"))
-    if not device:
-        device = find_camera_device(timeout=0.0)
-    return {
-        "camera_device": device,
-        "recording_raw_file": raw_file,
-        "recording_fps": fps,
-    }
+        Unlike ``get_live_source`` this includes segmented recordings, whose raw
+        file changes with every segment.
+        """
+        with self.recording_lock:
+            if self.recording_phase != "recording" or not self.recording_raw_file:
+                return None
+            return {
+                "name": os.path.basename(self.recording_output_file),
+                "raw_file": self.recording_raw_file,
+                "fps": float(self.recording_fps or camera_settings.get("fps", "30")),
+            }
+
+    def get_recording_metrics(self, seconds: int | None = None):
+        with self.recording_lock:
+            metrics = self.capture_metrics
+            active = (
+                metrics is not None
+                and self.recording_phase == "recording"
+                and metrics.output_file == self.recording_output_file
+            )
+        if metrics is None:
+            return None
+        return {"active": active, **metrics.snapshot(seconds)}
 
+    def _publish_recording_status_locked(self):
+        global _status_environment
 
-def get_recording_status():
-    with recording_lock:
-        _restore_recording_state_locked()
-        _refresh_recording_state_locked()
-        video_process = ffmpeg_process or capture_process
+        if _status_environment is None or _status_refresher is None:
+            _status_environment = _sample_status_environment()
+        free_bytes, available_camera = _status_environment
+        if self.key is not None:
+            available_camera = (
+                self.key if _is_character_device(self.key) else None
+            )
+        previous = self.recording_status_snapshot
+        snapshot = self._build_recording_status_locked(free_bytes, available_camera)
+        self.recording_status_snapshot = snapshot
+        if previous is not None:
+            _publish_status_events(previous, snapshot)
+        return snapshot
+
+    def get_recording_status(self):
+        """Return the latest recording status snapshot; treat it as read-only.
+
+        With the status refresher running this is a reference load and never
+        waits for ``recording_lock``, which ``/start`` holds through the device
+        open. Without it (tools, tests) the status is built on demand.
+        """
+        snapshot = self.recording_status_snapshot
+        refresher = _status_refresher
+        if snapshot is not None and refresher is not None and refresher.is_alive():
+            return snapshot
+        other_reserve_bytes = _reserve_bytes_of_other_recorders(self)
+        with self.recording_lock:
+            self._restore_recording_state_locked()
+            self._refresh_recording_state_locked(other_reserve_bytes)
+            return self._publish_recording_status_locked()
+
+    def _build_recording_status_locked(self, free_bytes, available_camera):
+        video_process = self.ffmpeg_process or self.capture_process
         capture_active = (
             video_process is not None and video_process.poll() is None
         )
         audio_recording = (
-            audio_process is not None and audio_process.poll() is None
+            self.audio_process is not None and self.audio_process.poll() is None
         )
-        recoverable = bool(
-            recording_raw_file and os.path.isfile(recording_raw_file)
+        recoverable = _recovery_source_exists(
+            self.recording_mode, self.recording_raw_file, self.recording_output_file
         )
-        active_state = recording_phase in {
+        active_state = self.recording_phase in {
             "starting",
             "recording",
             "interrupted",
             "finalizing",
         }
-        duration_seconds = _recording_duration_seconds() if active_state else 0.0
-        raw_size = _safe_file_size(recording_raw_file)
-        output_size = _safe_file_size(recording_output_file)
-        audio_size = _safe_file_size(recording_audio_file)
-        phase = recording_phase
-        output_file = recording_output_file
-        camera_device = recording_camera_device
-        video_size = recording_video_size
-        fps = recording_fps
-        capture_format = recording_capture_format
-        error = dict(last_recording_error) if last_recording_error else None
-        audio_device = recording_audio_device
-        audio_lead = recording_audio_lead_seconds
-        audio_enabled_for_recording = recording_audio_file is not None
+        duration_seconds = self._recording_duration_seconds() if active_state else 0.0
+        paused = self.recording_paused_at is not None
+        pause_supported = (
+            self.recording_phase == "recording"
+            and self._pause_unsupported_reason_locked() is None
+        )
+        paused_seconds = self._recording_paused_seconds() if active_state else 0.0
+        raw_size = self._recording_source_size_locked()
+        finalization_reserve = self._finalization_reserve_bytes_locked()
+        output_size = _safe_file_size(self.recording_output_file)
+        audio_size = _safe_file_size(self.recording_audio_file)
+        phase = self.recording_phase
+        output_file = self.recording_output_file
+        camera_device = self.recording_camera_device
+        video_size = self.recording_video_size
+        fps = self.recording_fps
+        capture_format = self.recording_capture_format
+        error = dict(self.last_recording_error) if self.last_recording_error else None
+        audio_device = self.recording_audio_device
+        audio_lead = self.recording_audio_lead_seconds
+        audio_enabled_for_recording = self.recording_audio_file is not None
+        mode = self.recording_mode
+        streaming_mp4 = (
+            self.live_mux_process is not None and self.live_mux_process.poll() is None
+        )
+        segment_status = (
+            self.segment_assembler.status()
+            if self.segment_assembler is not None
+            else None
+        )
+        job = self.finalization_job
+        queued_jobs = finalization.active_jobs(self.queue_name)
+
+        return {
+            "status": "ok",
+            "state": phase,
+            "recording": active_state,
+            "capture_active": capture_active,
+            "interrupted": phase == "interrupted",
+            "finalizing": phase == "finalizing" or bool(queued_jobs),
+            "recoverable": recoverable,
+            "file": output_file if active_state else None,
+            "pause_supported": pause_supported,
+            "paused": paused,
+            "paused_seconds": round(paused_seconds, 3),
+            "duration_seconds": round(duration_seconds, 3),
+            "current_size_bytes": raw_size or output_size,
+            "current_size_mb": round((raw_size or output_size) / (1024 * 1024), 2),
+            "source_size_bytes": raw_size,
+            "audio_size_bytes": audio_size,
+            "free_space_bytes": free_bytes,
+            "free_space_gb": round(free_bytes / (1024 ** 3), 2),
+            "minimum_free_space_bytes": MIN_RECORDING_FREE_BYTES,
+            "required_finalization_space_bytes": (
+                finalization_reserve + MIN_RECORDING_FREE_BYTES if active_state else 0
+            ),
+            "resolution": video_size,
+            "fps": fps,
+            "format": capture_format,
+            "mode": mode,
+            "streaming_mp4": streaming_mp4,
+            "segments": segment_status,
+            "finalization": job.snapshot() if job is not None else None,
+            "finalization_queue": [queued.snapshot() for queued in queued_jobs],
+            "camera": {
+                "id": self.key,
+                "available": available_camera is not None,
+                "device": camera_device or available_camera,
+            },
+            "last_error": error,
+            "audio": {
+                "enabled": audio_enabled_for_recording or audio_size > 0,
+                "recording": audio_recording,
+                "device": audio_device,
+                "lead_seconds": round(audio_lead, 6),
+            },
+        }
+
+
+_default_recorder = Recorder()
+# Recorders of the other cameras, keyed by their /dev/v4l/by-id path.
+_recorders: dict[str, Recorder] = {}
+_recorders_lock = threading.Lock()
+
+
+def _all_recorders():
+    with _recorders_lock:
+        return [_default_recorder, *_recorders.values()]
+
+
+def _pinned_camera_device():
+    configured_device = os.environ.get("MEDICAM_CAMERA_DEVICE")
+    if configured_device:
+        return configured_device
+    selected_device = camera_settings.get("camera_device", "auto")
+    return selected_device if selected_device != "auto" else None
+
+
+def get_recorder(camera_id: str | None = None) -> Recorder:
+    """Return the recorder of ``camera_id``, a ``/dev/v4l/by-id`` path.
+
+    Without an id, and for the camera the settings pin or the default
+    recorder is capturing from, this is the default recorder. Another
+    connected camera gets its own recorder on first use.
+    """
+    if not camera_id or camera_id == "auto" or camera_id == _pinned_camera_device():
+        return _default_recorder
+    active_device = _default_recorder.recording_camera_device
+    if active_device and os.path.realpath(active_device) == os.path.realpath(camera_id):
+        return _default_recorder
+    with _recorders_lock:
+        recorder = _recorders.get(camera_id)
+    if recorder is not None:
+        return recorder
+    if camera_id not in {item["id"] for item in list_camera_devices()}:
+        raise HTTPException(
+            status_code=404,
+            detail={"code": "camera_not_found", "camera": camera_id},
+        )
+    with _recorders_lock:
+        return _recorders.setdefault(camera_id, Recorder(camera_id))
+
+
+def _restore_recorders():
+    """Recreate the recorders whose cameras left a state or queue file."""
+    found = set()
+    for base in (RECORDING_STATE_FILE, FINALIZATION_QUEUE_FILE):
+        root, extension = os.path.splitext(base)
+        pattern = f"{glob.escape(root)}{CAMERA_FILE_SEPARATOR}*{extension}"
+        for path in glob.glob(pattern):
+            try:
+                with open(path, "r", encoding="utf-8") as saved_file:
+                    saved = json.load(saved_file)
+            except (OSError, json.JSONDecodeError):
+                continue
+            entries = saved if isinstance(saved, list) else [saved]
+            for entry in entries:
+                key = entry.get("camera_device") if isinstance(entry, dict) else None
+                # Only a file named after its own camera identifies it.
+                if isinstance(key, str) and _camera_path(base, key) == path:
+                    found.add(key)
+    with _recorders_lock:
+        for key in found:
+            _recorders.setdefault(key, Recorder(key))
+
+
+def _claimed_camera_devices(recorder):
+    """Devices that recorders other than ``recorder`` are capturing from."""
+    return {
+        os.path.realpath(other.recording_camera_device)
+        for other in _all_recorders()
+        if other is not recorder
+        and other.recording_camera_device
+        and other.recording_phase in {"starting", "recording"}
+    }
+
+
+# Both take every recorder's lock in turn, so callers must not hold their own:
+# two recorders doing so at once would wait on each other.
+def _reserve_bytes_of_other_recorders(recorder):
+    """MP4 space the other cameras' recordings need."""
+    return sum(
+        other.finalization_reserve_bytes()
+        for other in _all_recorders()
+        if other is not recorder
+    )
+
+
+def _protected_filenames():
+    """Recordings of every camera that storage cleanup must keep."""
+    return {
+        os.path.basename(path)
+        for recorder in _all_recorders()
+        for path in recorder.queued_finalization_files()
+    }
+
+
+def _capture_write_pressure():
+    """Return whether any active capture gets fewer frames to disk than its fps."""
+    # Every window is sampled, so none of them goes stale.
+    return any([
+        recorder._capture_write_pressure() for recorder in _all_recorders()
+    ])
+
+
+finalization.set_pressure_probe(_capture_write_pressure)
+
+
+def start_recording(camera_id: str | None = None):
+    return get_recorder(camera_id).start_recording()
 
+
+def stop_recording(
+    wait: bool = True,
+    timeout: float | None = None,
+    camera_id: str | None = None,
+):
+    return get_recorder(camera_id).stop_recording(wait=wait, timeout=timeout)
+
+
+def add_recording_marker(label: str | None = None, camera_id: str | None = None):
+    return get_recorder(camera_id).add_recording_marker(label)
+
+
+def pause_recording(camera_id: str | None = None):
+    return get_recorder(camera_id).pause_recording()
+
+
+def resume_recording(camera_id: str | None = None):
+    return get_recorder(camera_id).resume_recording()
+
+
+def get_recording_status(camera_id: str | None = None):
+    return get_recorder(camera_id).get_recording_status()
+
+
+def get_other_recording_statuses() -> list[dict]:
+    """Status snapshots of the cameras recorded beside the default one."""
+    with _recorders_lock:
+        recorders = list(_recorders.values())
+    return [recorder.get_recording_status() for recorder in recorders]
+
+
+def get_recording_metrics(seconds: int | None = None, camera_id: str | None = None):
+    return get_recorder(camera_id).get_recording_metrics(seconds)
+
+
+def get_preview_source() -> dict:
+    return _default_recorder.get_preview_source()
+
+
+def get_live_source():
+    return _default_recorder.get_live_source()
+
+
+def get_recording_source():
+    return _default_recorder.get_recording_source()
+
+
+def schedule_standby():
+    return _default_recorder.schedule_standby()
+
+
+def release_standby():
+    return _default_recorder.release_standby()
+
+
+def get_settings():
+    return dict(camera_settings)
+
+
+def start_motion_trigger(start=start_recording):
+    """Let motion in the idle preview or standby stream start recordings.
+
+    ``start`` is called instead of ``start_recording`` so the caller can
+    reserve the hardware against the self-test the way ``/start`` does.
+    """
+    if not motion.MOTION_TRIGGER_ENABLED:
+        return
+    ensure_idle_source = None
+    if preview.PREVIEW_ENABLED:
+        _preview_call("set_frame_observer", motion.observe_frame)
+        ensure_idle_source = lambda: _preview_call(
+            "ensure_running", find_camera_device(timeout=0.0)
+        )
+    motion.start(
+        start,
+        lambda: stop_recording(wait=False),
+        get_recording_source,
+        ensure_idle_source,
+    )
+
+
+def get_recording_timings():
+    """Percentiles of start/stop phase durations over recent operations."""
+    return timing.history.summary()
+
+
+def _sample_status_environment():
+    """Disk and camera presence, sampled without recording_lock."""
     os.makedirs(utils.VIDEOS_DIR, exist_ok=True)
-    disk = shutil.disk_usage(utils.VIDEOS_DIR)
+    free_bytes = shutil.disk_usage(utils.VIDEOS_DIR).free
+    storage_manager.report_free_space(free_bytes)
     available_camera = None
     if platform.system() == "Linux":
         available_camera = _find_linux_camera_device(timeout=0.0)
     elif platform.system() == "Windows":
         available_camera = "video=AT025"
+    return free_bytes, available_camera
+
+
+def _publish_status_events(previous, snapshot):
+    if (
+        previous["state"] != snapshot["state"]
+        or previous["finalizing"] != snapshot["finalizing"]
+    ):
+        events.publish(
+            "recording.phase",
+            {
+                "state": snapshot["state"],
+                "previous_state": previous["state"],
+                "file": snapshot["file"] or previous["file"],
+                "recording": snapshot["recording"],
+                "finalizing": snapshot["finalizing"],
+                "recoverable": snapshot["recoverable"],
+                "camera": snapshot["camera"]["id"],
+            },
+        )
+    if previous["last_error"] != snapshot["last_error"]:
+        events.publish(
+            "recording.error",
+            {
+                "last_error": snapshot["last_error"],
+                "camera": snapshot["camera"]["id"],
+            },
+        )
 
-    return {
-        "status": "ok",
-        "state": phase,
-        "recording": active_state,
-        "capture_active": capture_active,
-        "interrupted": phase == "interrupted",
-        "finalizing": phase == "finalizing",
-        "recoverable": recoverable,
-        "file": output_file if active_state else None,
-        "duration_seconds": round(duration_seconds, 3),
-        "current_size_bytes": raw_size or output_size,
-        "current_size_mb": round((raw_size or output_size) / (1024 * 1024), 2),
-        "source_size_bytes": raw_size,
-        "audio_size_bytes": audio_size,
-        "free_space_bytes": disk.free,
-        "free_space_gb": round(disk.free / (1024 ** 3), 2),
-        "minimum_free_space_bytes": MIN_RECORDING_FREE_BYTES,
-        "required_finalization_space_bytes": (
-            raw_size + MIN_RECORDING_FREE_BYTES if active_state else 0
-        ),
-        "resolution": video_size,
-        "fps": fps,
-        "format": capture_format,
-        "camera": {
-            "available": available_camera is not None,
-            "device": camera_device or available_camera,
-        },
-        "last_error": error,
-        "audio": {
-            "enabled": audio_enabled_for_recording or audio_size > 0,
-            "recording": audio_recording,
-            "device": audio_device,
-            "lead_seconds": round(audio_lead, 6),
-        },
-    }
+
+def _refresh_recorder_status(recorder):
+    # Waits while a control operation holds the lock; readers keep getting
+    # the snapshot that operation last published.
+    other_reserve_bytes = _reserve_bytes_of_other_recorders(recorder)
+    with recorder.recording_lock:
+        recorder._restore_recording_state_locked()
+        recorder._refresh_recording_state_locked(other_reserve_bytes)
+        recorder._publish_recording_status_locked()
+
+
+def _refresh_status_loop():
+    global _status_environment
+
+    while True:
+        time.sleep(STATUS_REFRESH_SECONDS)
+        try:
+            _status_environment = _sample_status_environment()
+            for recorder in _all_recorders():
+                _refresh_recorder_status(recorder)
+        except OSError:
+            continue
+
+
+def start_status_refresher():
+    """Keep the status snapshots current so polls never wait for a recorder.
+
+    Also restores the recorders of other cameras that were recording or
+    finalizing when the backend stopped.
+    """
+    global _status_refresher
+
+    with _status_refresher_lock:
+        if _status_refresher is not None:
+            return
+        _restore_recorders()
+        for recorder in _all_recorders():
+            _refresh_recorder_status(recorder)
+        _status_refresher = threading.Thread(
+            target=_refresh_status_loop,
+            name="medicam-recording-status",
+            daemon=True,
+        )
+        _status_refresher.start()
 
 
 def update_settings(
@@ -1576,6 +3918,7 @@ def update_settings(
     fps: str = None,
     audio_enabled: bool = None,
     audio_device: str = None,
+    camera_device: str = None,
 ):
     if resolution:
         resolution = LEGACY_RESOLUTION_MAP.get(resolution, resolution)
@@ -1609,7 +3952,19 @@ def update_settings(
             )
         camera_settings["audio_device"] = audio_device
 
+    if camera_device is not None:
+        camera_device = camera_device.strip() or "auto"
+        available_ids = {item["id"] for item in list_camera_devices()}
+        if camera_device != "auto" and camera_device not in available_ids:
+            raise HTTPException(
+                status_code=400,
+                detail="Unsupported camera device",
+            )
+        camera_settings["camera_device"] = camera_device
+
     with open(SETTINGS_FILE, "w", encoding="utf-8") as settings_file:
         json.dump(camera_settings, settings_file)
 
+    # A standby opened with the old settings is replaced in the background.
+    schedule_standby()
     return dict(camera_settings)
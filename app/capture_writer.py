@@ -0,0 +1,458 @@
+"""Managed writer between the FFmpeg v4l2 reader and the raw capture file.
+
+With ``-flush_packets 1`` FFmpeg appends every JPEG to the raw file with its
+own small writes for hours. That fragments the microSD filesystem and slows
+the later remux, and it fills the page cache with data nobody reads again.
+In writer mode FFmpeg writes to a pipe instead, and this thread:
+
+* preallocates the file in large extents sized from the measured bitrate
+  (``fallocate`` with ``FALLOC_FL_KEEP_SIZE``, so readers never see padding);
+* coalesces the stream into writes aligned to ``WRITE_ALIGNMENT`` and no
+  older than ``MAX_LATENCY_SECONDS``, so the frame indexer and preview still
+  see frames promptly;
+* starts writeback of each finished window with ``sync_file_range`` and
+  drops windows well behind the head from the page cache with
+  ``posix_fadvise(DONTNEED)``.
+
+Every step is best effort. Without the syscalls it is a plain buffered
+writer. A write error closes the pipe, so FFmpeg exits and the watchdog
+reports the interruption as usual.
+
+A writer created without a file discards the stream until ``arm`` names
+one, and then persists from the next JPEG start. The warm capture standby
+uses this to keep FFmpeg streaming while the recorder is idle. With a
+pre-record window it keeps the last complete JPEGs of the discarded stream
+in memory instead, and ``arm`` writes them ahead of the live stream. A
+frame observer sees every complete JPEG of the discarded stream, which the
+motion trigger uses to watch the scene without a second camera reader.
+
+``pause`` cuts a persisting stream after the JPEG in progress and drops it,
+with FFmpeg and the camera still running, until ``resume`` persists again
+from the next JPEG start. The file stays one valid MJPEG stream.
+"""
+
+from __future__ import annotations
+
+import ctypes
+import fcntl
+import os
+import platform
+import selectors
+import threading
+import time
+from collections import deque
+from typing import Callable
+
+
+CAPTURE_WRITER_ENABLED = os.environ.get(
+    "MEDICAM_CAPTURE_WRITER", "0"
+).strip().lower() in {"1", "true", "yes", "on"}
+WRITE_ALIGNMENT = 64 * 1024
+# Longest standby JPEG handed to a frame observer before the data is dropped.
+MAX_OBSERVED_FRAME_BYTES = 8 * 1024 * 1024
+COALESCE_BYTES = 1024 * 1024
+MAX_LATENCY_SECONDS = 0.05
+READ_SIZE = 1024 * 1024
+# A megabyte of pipe absorbs ~150 ms of FullHD MJPEG while this thread waits
+# for the GIL or the card, instead of blocking FFmpeg's v4l2 reader.
+PIPE_BYTES = 1024 * 1024
+EXTENT_SECONDS = 10.0
+MIN_EXTENT_BYTES = 16 * 1024 * 1024
+MAX_EXTENT_BYTES = 256 * 1024 * 1024
+WRITEBACK_WINDOW_BYTES = 8 * 1024 * 1024
+# Windows this close to the head stay cached for the indexer and preview.
+CACHE_KEEP_WINDOWS = 2
+
+_FALLOC_FL_KEEP_SIZE = 0x01
+_SYNC_FILE_RANGE_WAIT_BEFORE = 1
+_SYNC_FILE_RANGE_WRITE = 2
+_SYNC_FILE_RANGE_WAIT_AFTER = 4
+_F_SETPIPE_SZ = getattr(fcntl, "F_SETPIPE_SZ", 1031)
+
+
+def _load_libc():
+    if platform.system() != "Linux":
+        return None
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+    except OSError:
+        return None
+    fallocate = getattr(libc, "fallocate64", None) or getattr(libc, "fallocate", None)
+    sync_file_range = getattr(libc, "sync_file_range", None)
+    if fallocate is not None:
+        fallocate.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.c_int64, ctypes.c_int64]
+        fallocate.restype = ctypes.c_int
+    if sync_file_range is not None:
+        sync_file_range.argtypes = [
+            ctypes.c_int, ctypes.c_int64, ctypes.c_int64, ctypes.c_uint,
+        ]
+        sync_file_range.restype = ctypes.c_int
+    return fallocate, sync_file_range
+
+
+_LIBC = _load_libc()
+
+
+def preallocate(fd: int, offset: int, length: int) -> bool:
+    """Reserve blocks past EOF without changing the file size."""
+    if _LIBC is None or _LIBC[0] is None:
+        return False
+    return _LIBC[0](fd, _FALLOC_FL_KEEP_SIZE, offset, length) == 0
+
+
+def start_writeback(fd: int, offset: int, length: int, wait: bool = False) -> bool:
+    if _LIBC is None or _LIBC[1] is None:
+        return False
+    flags = _SYNC_FILE_RANGE_WRITE
+    if wait:
+        flags |= _SYNC_FILE_RANGE_WAIT_BEFORE | _SYNC_FILE_RANGE_WAIT_AFTER
+    return _LIBC[1](fd, offset, length, flags) == 0
+
+
+def drop_cache(fd: int, offset: int, length: int) -> bool:
+    try:
+        os.posix_fadvise(fd, offset, length, os.POSIX_FADV_DONTNEED)
+    except (AttributeError, OSError):
+        return False
+    return True
+
+
+def _open_raw_file(raw_file: str) -> int:
+    return os.open(raw_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+
+
+class CaptureWriter:
+    """Copy a pipe into ``raw_file`` with the write pattern described above.
+
+    Pass ``pipe_fd`` as the capture process's stdout, then call ``start``.
+    """
+
+    def __init__(
+        self,
+        raw_file: str | None,
+        preroll_seconds: float = 0.0,
+        preroll_max_bytes: int = 0,
+        frame_observer: Callable[[bytes], None] | None = None,
+    ):
+        self.raw_file = raw_file
+        self._read_fd, self.pipe_fd = os.pipe()
+        try:
+            fcntl.fcntl(self.pipe_fd, _F_SETPIPE_SZ, PIPE_BYTES)
+        except OSError:
+            pass
+        self._fd = _open_raw_file(raw_file) if raw_file else None
+        self._armed_fd: int | None = None
+        self._arm_lock = threading.Lock()
+        self._standby_tail = b""
+        self._preroll_seconds = preroll_seconds if preroll_max_bytes > 0 else 0.0
+        self._preroll_max_bytes = preroll_max_bytes
+        # (arrival time, JPEG) of the newest complete frames; guarded by
+        # _arm_lock because ``arm`` takes them from the request thread.
+        self._preroll: deque = deque()
+        self._preroll_bytes = 0
+        self._armed_preroll: list[bytes] = []
+        # Sees every complete JPEG of the discarded standby stream.
+        self._frame_observer = frame_observer
+        self.bytes_seen = 0
+        # Pause state; the request thread changes it under _arm_lock.
+        self._paused = False
+        self._dropping = False
+        self._pause_offset = 0
+        self._pause_tail = b""
+        self._last_byte = b""
+        self._thread: threading.Thread | None = None
+        self._buffer = bytearray()
+        self._buffered_since: float | None = None
+        self._started_at = time.monotonic()
+        self._allocated_to = 0
+        self._preallocate = True
+        self._writeback_from = 0
+        self._dropped_to = 0
+        self.bytes_written = 0
+        self.writes = 0
+        self.max_write_seconds = 0.0
+        self.error: str | None = None
+
+    def start(self) -> "CaptureWriter":
+        # Only the capture process may hold the write end, or EOF never comes.
+        os.close(self.pipe_fd)
+        self._thread = threading.Thread(
+            target=self._run,
+            name=f"medicam-capture-writer-{os.path.basename(self.raw_file or 'standby')}",
+            daemon=True,
+        )
+        self._thread.start()
+        return self
+
+    def arm(self, raw_file: str) -> float:
+        """Start persisting a standby stream to ``raw_file``.
+
+        Returns the seconds of pre-recorded video that precede the live
+        stream in the file.
+        """
+        fd = _open_raw_file(raw_file)
+        now = time.monotonic()
+        with self._arm_lock:
+            self.raw_file = raw_file
+            self._armed_fd = fd
+            self._armed_preroll = [frame for _arrival, frame in self._preroll]
+            preroll_seconds = now - self._preroll[0][0] if self._preroll else 0.0
+            self._preroll.clear()
+            self._preroll_bytes = 0
+        return preroll_seconds
+
+    def pause(self) -> None:
+        """Stop persisting after the JPEG in progress; the pipe keeps draining."""
+        with self._arm_lock:
+            self._paused = True
+
+    def resume(self) -> int | None:
+        """Persist again from the next JPEG start.
+
+        Returns the file offset where the resumed stream begins, or None when
+        the stream was not cut since ``pause``.
+        """
+        with self._arm_lock:
+            self._paused = False
+            return self._pause_offset if self._dropping else None
+
+    def _split_frames(self, data: bytes) -> tuple[bytes, list[bytes]]:
+        """Return the unfinished rest of ``data`` and its complete JPEGs."""
+        position = 0
+        frames = []
+        while True:
+            start = data.find(b"\xff\xd8", position)
+            if start < 0:
+                # Keep a trailing 0xFF that may start the next marker.
+                return data[max(position, len(data) - 1):], frames
+            end = data.find(b"\xff\xd9", start + 2)
+            if end < 0:
+                rest = data[start:]
+                if len(rest) > max(self._preroll_max_bytes, MAX_OBSERVED_FRAME_BYTES):
+                    # No end marker within the whole window: not a JPEG stream.
+                    rest = rest[-1:]
+                return rest, frames
+            frames.append(data[start:end + 2])
+            position = end + 2
+
+    def _standby_data(self, chunk: bytes) -> bytes:
+        """Drop standby data; once armed, return the stream from the next JPEG."""
+        data = self._standby_tail + chunk
+        if self._preroll_seconds > 0:
+            return self._preroll_data(data)
+        with self._arm_lock:
+            fd = self._armed_fd
+        if fd is None and self._frame_observer is not None:
+            self._standby_tail, frames = self._split_frames(data)
+            self._observe(frames)
+            return b""
+        start = data.find(b"\xff\xd8") if fd is not None else -1
+        if start < 0:
+            # Keep a trailing 0xFF that may start the next marker.
+            self._standby_tail = data[-1:]
+            return b""
+        with self._arm_lock:
+            self._fd, self._armed_fd = fd, None
+        self._standby_tail = b""
+        self._started_at = time.monotonic()
+        return data[start:]
+
+    def _preroll_data(self, data: bytes) -> bytes:
+        """Ring complete JPEGs; once armed, return them and the live stream."""
+        rest, frames = self._split_frames(data)
+        self._standby_tail = rest
+        now = time.monotonic()
+        with self._arm_lock:
+            fd = self._armed_fd
+        if fd is None:
+            self._observe(frames)
+        with self._arm_lock:
+            fd = self._armed_fd
+            if fd is None:
+                for frame in frames:
+                    self._preroll.append((now, frame))
+                    self._preroll_bytes += len(frame)
+                while self._preroll and (
+                    self._preroll_bytes > self._preroll_max_bytes
+                    or now - self._preroll[0][0] > self._preroll_seconds
+                ):
+                    self._preroll_bytes -= len(self._preroll.popleft()[1])
+                return b""
+            # Frames completed after ``arm`` follow the ones it took.
+            frames = self._armed_preroll + frames
+            if not frames and not rest.startswith(b"\xff\xd8"):
+                return b""
+            self._fd, self._armed_fd, self._armed_preroll = fd, None, []
+        self._standby_tail = b""
+        self._started_at = now
+        return b"".join(frames) + rest
+
+    def _paused_data(self, chunk: bytes) -> bytes:
+        """Cut the stream at JPEG boundaries while paused."""
+        with self._arm_lock:
+            if not self._dropping:
+                if not self._paused:
+                    return chunk
+                # The end marker may straddle the previous chunk.
+                end = (self._last_byte + chunk).find(b"\xff\xd9")
+                if end < 0:
+                    return chunk
+                cut = end + 2 - len(self._last_byte)
+                self._dropping = True
+                self._pause_offset = self.bytes_written + len(self._buffer) + cut
+                self._pause_tail = chunk[cut:]
+                return chunk[:cut]
+            data = self._pause_tail + chunk
+            start = -1 if self._paused else data.find(b"\xff\xd8")
+            if start < 0:
+                # Keep a trailing 0xFF that may start the next marker.
+                self._pause_tail = data[-1:]
+                return b""
+            self._dropping = False
+            self._pause_tail = b""
+            return data[start:]
+
+    def _observe(self, frames: list[bytes]) -> None:
+        if self._frame_observer is None:
+            return
+        for frame in frames:
+            try:
+                self._frame_observer(frame)
+            except Exception:  # An observer must never stop the capture.
+                pass
+
+    def _extent_bytes(self) -> int:
+        elapsed = time.monotonic() - self._started_at
+        rate = self.bytes_written / elapsed if elapsed > 0 else 0.0
+        extent = max(MIN_EXTENT_BYTES, min(MAX_EXTENT_BYTES, int(rate * EXTENT_SECONDS)))
+        return extent - extent % WRITE_ALIGNMENT
+
+    def _write(self, data) -> None:
+        low_water = self._allocated_to - MIN_EXTENT_BYTES // 2
+        if self._preallocate and self.bytes_written + len(data) > low_water:
+            extent = self._extent_bytes()
+            start = max(self._allocated_to, self.bytes_written)
+            if preallocate(self._fd, start, extent):
+                self._allocated_to = start + extent
+            else:
+                # Unsupported here (vfat, old kernels); do not retry per write.
+                self._preallocate = False
+        started = time.monotonic()
+        view = memoryview(data)
+        while view:
+            written = os.write(self._fd, view)
+            view = view[written:]
+        self.max_write_seconds = max(self.max_write_seconds, time.monotonic() - started)
+        self.bytes_written += len(data)
+        self.writes += 1
+        self._manage_cache()
+
+    def _manage_cache(self) -> None:
+        if self.bytes_written - self._writeback_from < WRITEBACK_WINDOW_BYTES:
+            return
+        window_end = self.bytes_written - self.bytes_written % WRITEBACK_WINDOW_BYTES
+        start_writeback(self._fd, self._writeback_from, window_end - self._writeback_from)
+        self._writeback_from = window_end
+        drop_to = window_end - CACHE_KEEP_WINDOWS * WRITEBACK_WINDOW_BYTES
+        if drop_to > self._dropped_to:
+            # Writeback of these windows began at least one window ago, so
+            # waiting for it is normally free; only clean pages can be dropped.
+            start_writeback(self._fd, self._dropped_to, drop_to - self._dropped_to, wait=True)
+            drop_cache(self._fd, self._dropped_to, drop_to - self._dropped_to)
+            self._dropped_to = drop_to
+
+    def _flush(self, everything: bool = False) -> None:
+        if not self._buffer:
+            return
+        end = self.bytes_written + len(self._buffer)
+        cut = len(self._buffer)
+        if not everything:
+            aligned = end - end % WRITE_ALIGNMENT - self.bytes_written
+            if aligned > 0:
+                cut = aligned
+        self._write(self._buffer[:cut])
+        del self._buffer[:cut]
+        self._buffered_since = time.monotonic() if self._buffer else None
+
+    def _run(self) -> None:
+        selector = selectors.DefaultSelector()
+        selector.register(self._read_fd, selectors.EVENT_READ)
+        try:
+            while True:
+                timeout = None
+                if self._buffered_since is not None:
+                    timeout = max(
+                        0.0,
+                        self._buffered_since + MAX_LATENCY_SECONDS - time.monotonic(),
+                    )
+                if selector.select(timeout):
+                    chunk = os.read(self._read_fd, READ_SIZE)
+                    if not chunk:
+                        self._flush(everything=True)
+                        return
+                    self.bytes_seen += len(chunk)
+                    if self._fd is None:
+                        chunk = self._standby_data(chunk)
+                        if not chunk:
+                            continue
+                    if self._paused or self._dropping:
+                        chunk = self._paused_data(chunk)
+                        if not chunk:
+                            continue
+                    self._last_byte = chunk[-1:]
+                    if self._buffered_since is None:
+                        self._buffered_since = time.monotonic()
+                    self._buffer.extend(chunk)
+                    if len(self._buffer) >= COALESCE_BYTES:
+                        self._flush()
+                elif self._buffered_since is not None:
+                    self._flush()
+        except OSError as error:
+            self.error = f"{type(error).__name__}: {error}"
+        finally:
+            selector.close()
+            self._close_files()
+
+    def _close_files(self) -> None:
+        # Closing the read end makes a still running FFmpeg fail with EPIPE.
+        try:
+            os.close(self._read_fd)
+        except OSError:
+            pass
+        with self._arm_lock:
+            armed_fd, self._armed_fd = self._armed_fd, None
+        if armed_fd is not None:
+            os.close(armed_fd)
+        if self._fd is None:
+            return
+        try:
+            if self._allocated_to > self.bytes_written:
+                # Give the unused tail of the last extent back to the card.
+                os.ftruncate(self._fd, self.bytes_written)
+        except OSError:
+            pass
+        try:
+            os.close(self._fd)
+        except OSError:
+            pass
+
+    def close(self, timeout: float = 10.0) -> None:
+        """Wait for the stopped capture's last bytes to reach the file."""
+        if self._thread is None:
+            # Never started, e.g. the capture process failed to launch.
+            try:
+                os.close(self.pipe_fd)
+            except OSError:
+                pass
+            self._close_files()
+            return
+        self._thread.join(timeout)
+
+    def stats(self) -> dict:
+        return {
+            "bytes_written": self.bytes_written,
+            "writes": self.writes,
+            "max_write_seconds": round(self.max_write_seconds, 4),
+            "preallocated": self._preallocate and self._allocated_to > 0,
+            "error": self.error,
+        }
@@ -349,6 +349,16 @@ def end_recording_start() -> None:
         _HARDWARE_OPERATION_LOCK.release()
 
 
+def start_recording_when_free() -> dict:
+    """Start a recording like ``POST /start`` for callers without a request."""
+    if not begin_recording_start():
+        return {"status": "error", "error_code": "hardware_busy"}
+    try:
+        return camera.start_recording()
+    finally:
+        end_recording_start()
+
+
 def _test_result(name: str, outcome: str, started: float, **fields) -> dict:
     return {
         "name": name,
@@ -520,6 +530,7 @@ def run_self_test() -> dict:
         # preview so the diagnostic capture can exercise that node itself.
         preview.pause()
         preview_paused = True
+        camera.release_standby()
         checks = [
             _camera_capture_test(),
             _audio_test(),
@@ -540,6 +551,7 @@ def run_self_test() -> dict:
     finally:
         if preview_paused:
             preview.resume()
+        camera.schedule_standby()
         _SELF_TEST_ACTIVE.clear()
         _HARDWARE_OPERATION_LOCK.release()
 
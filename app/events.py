@@ -0,0 +1,123 @@
+"""In-process publish/subscribe for state changes pushed over ``GET /events``.
+
+The recorder, the finalization worker, the storage manager and the media
+library publish small JSON events from whatever thread they run on. Every
+SSE connection owns a ``Subscription`` bound to the server's event loop;
+``publish`` hands each event to that loop with ``call_soon_threadsafe``, so
+a client learns about a change within one loop iteration instead of at its
+next poll.
+
+Events carry a monotonically increasing id. The last ``HISTORY_SIZE`` are
+kept so a client reconnecting with ``Last-Event-ID`` after a Wi-Fi drop gets
+what it missed. A subscriber that falls ``SUBSCRIBER_QUEUE_SIZE`` events
+behind loses the oldest ones rather than growing memory.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+from collections import deque
+from datetime import datetime, timezone
+
+
+SUBSCRIBER_QUEUE_SIZE = 256
+HISTORY_SIZE = 256
+KEEPALIVE_SECONDS = 15.0
+
+
+class Subscription:
+    def __init__(self, loop: asyncio.AbstractEventLoop, maxsize: int = SUBSCRIBER_QUEUE_SIZE):
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self.dropped = 0
+        # Id of the newest event published before the subscription began.
+        self.start_id = 0
+
+    def _deliver(self, event: dict) -> None:
+        # Runs on the subscriber's loop.
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout: float | None = None) -> dict | None:
+        """Return the next event, or None after ``timeout`` seconds."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class EventBus:
+    def __init__(self, history_size: int = HISTORY_SIZE):
+        self._lock = threading.Lock()
+        self._subscribers: set[Subscription] = set()
+        self._history: deque = deque(maxlen=history_size)
+        self._last_id = 0
+
+    def publish(self, event_type: str, data: dict | None = None) -> dict:
+        with self._lock:
+            self._last_id += 1
+            event = {
+                "id": self._last_id,
+                "type": event_type,
+                "time": datetime.now(timezone.utc).isoformat(),
+                "data": data or {},
+            }
+            self._history.append(event)
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription._deliver, event)
+            except RuntimeError:
+                # The loop closed without unsubscribing (server shutdown).
+                self.unsubscribe(subscription)
+        return event
+
+    def subscribe(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        last_event_id: int | None = None,
+    ) -> Subscription:
+        subscription = Subscription(loop)
+        with self._lock:
+            subscription.start_id = self._last_id
+            if last_event_id is not None:
+                for event in self._history:
+                    if event["id"] > last_event_id:
+                        subscription._deliver(event)
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len(self._subscribers)
+
+
+bus = EventBus()
+
+
+def publish(event_type: str, data: dict | None = None) -> dict:
+    return bus.publish(event_type, data)
+
+
+def subscribe(loop: asyncio.AbstractEventLoop, last_event_id: int | None = None) -> Subscription:
+    return bus.subscribe(loop, last_event_id)
+
+
+def unsubscribe(subscription: Subscription) -> None:
+    bus.unsubscribe(subscription)
+
+
+def format_event(event: dict) -> bytes:
+    """Encode one event in the ``text/event-stream`` wire format."""
+    data = json.dumps(event["data"], ensure_ascii=False, separators=(",", ":"))
+    return (
+        f"id: {event['id']}\nevent: {event['type']}\ndata: {data}\n\n"
+    ).encode("utf-8")
@@ -0,0 +1,378 @@
+"""Finalization jobs: progress, ETA and cancellation for MP4 assembly.
+
+``/stop`` stops capture immediately; building the MP4 can then run as a job
+the app polls instead of a multi-minute HTTP request kept alive over Wi-Fi.
+Jobs of one queue run one at a time on a worker thread at idle CPU and IO
+priority, so a new capture can start while the previous recording is still
+being remuxed. Every camera has its own queue, so concurrent recordings
+finalize side by side. Whenever an active capture falls behind, jobs pause.
+"""
+
+from __future__ import annotations
+
+import ctypes
+import os
+import platform
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Callable
+
+from app import events
+
+
+MAX_FINISHED_JOBS = 16
+THROTTLE_POLL_SECONDS = 0.25
+THROTTLE_MAX_PAUSE_SECONDS = float(
+    os.environ.get("MEDICAM_FINALIZATION_MAX_PAUSE_SECONDS", "30")
+)
+# After a pause hits its limit the job runs at least this long before the
+# next pause, so a capture that never recovers cannot starve it forever.
+THROTTLE_MIN_RUN_SECONDS = 5.0
+# Byte progress is pushed to event subscribers at most this often; phase and
+# state changes always are.
+PROGRESS_EVENT_INTERVAL_SECONDS = 0.25
+WORKER_NICE = 19
+IOPRIO_CLASS_IDLE = 3
+_IOPRIO_CLASS_SHIFT = 13
+_IOPRIO_WHO_PROCESS = 1
+_IOPRIO_SET_SYSCALLS = {
+    "x86_64": 251,
+    "i686": 289,
+    "aarch64": 30,
+    "armv7l": 314,
+    "armv6l": 314,
+}
+
+_LOCK = threading.Lock()
+_JOBS: "OrderedDict[str, FinalizationJob]" = OrderedDict()
+DEFAULT_QUEUE = "default"
+_QUEUES: dict[str, list[tuple["FinalizationJob", Callable[["FinalizationJob"], dict]]]] = {}
+_WORKERS: dict[str, threading.Thread] = {}
+_PRESSURE_PROBE: Callable[[], bool] | None = None
+
+
+class FinalizationCancelled(Exception):
+    """Raised inside a job once cancellation was requested."""
+
+
+def _utc_now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class FinalizationJob:
+    def __init__(self, output_file: str | None, bytes_total: int = 0):
+        self.id = secrets.token_hex(8)
+        self.output_file = output_file
+        self.queue = DEFAULT_QUEUE
+        self.state = "queued"
+        self.phase = "stopping_capture"
+        self.bytes_total = max(0, int(bytes_total))
+        self.bytes_done = 0
+        self.created_at = _utc_now()
+        self.finished_at: str | None = None
+        self.result: dict | None = None
+        self.error: str | None = None
+        self._started_monotonic: float | None = None
+        self._finished_monotonic: float | None = None
+        self.exception: BaseException | None = None
+        self.throttle_pauses = 0
+        self._paused_since: float | None = None
+        self._resume_until = 0.0
+        self._cancel = threading.Event()
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+        self._progress_published_at = 0.0
+        self._done_callbacks: list[Callable[["FinalizationJob"], None]] = []
+
+    @property
+    def cancel_requested(self) -> bool:
+        return self._cancel.is_set()
+
+    def check_cancelled(self) -> None:
+        if self._cancel.is_set():
+            raise FinalizationCancelled(self.id)
+
+    def update(
+        self,
+        bytes_done: int | None = None,
+        bytes_total: int | None = None,
+        phase: str | None = None,
+    ) -> None:
+        with self._lock:
+            phase_changed = phase is not None and phase != self.phase
+            if phase_changed:
+                # Each phase reports its own byte progress.
+                self.phase = phase
+                self.bytes_done = 0
+                self._started_monotonic = time.monotonic()
+            if bytes_total is not None:
+                self.bytes_total = max(0, int(bytes_total))
+            if bytes_done is not None:
+                self.bytes_done = max(0, int(bytes_done))
+        self._publish_progress(force=phase_changed)
+
+    def _publish_progress(self, force: bool = False) -> None:
+        now = time.monotonic()
+        with self._lock:
+            if not force and now - self._progress_published_at < PROGRESS_EVENT_INTERVAL_SECONDS:
+                return
+            self._progress_published_at = now
+        events.publish("finalization.progress", self.snapshot())
+
+    def progress_callback(self, phase: str, bytes_total: int) -> Callable[[int], None]:
+        """Return a callback that records bytes and aborts on cancellation."""
+        self.update(bytes_done=0, bytes_total=bytes_total, phase=phase)
+
+        def report(bytes_done: int) -> None:
+            self.update(bytes_done=bytes_done)
+            self.throttle()
+
+        return report
+
+    def should_pause(self) -> bool:
+        """Return whether work should pause for the active capture right now."""
+        pressured = capture_under_pressure()
+        now = time.monotonic()
+        with self._lock:
+            if self._paused_since is not None:
+                if pressured and now - self._paused_since < THROTTLE_MAX_PAUSE_SECONDS:
+                    return True
+                if pressured:
+                    self._resume_until = now + THROTTLE_MIN_RUN_SECONDS
+                self._paused_since = None
+                return False
+            if pressured and now >= self._resume_until:
+                self._paused_since = now
+                self.throttle_pauses += 1
+                return True
+            return False
+
+    def throttle(self) -> None:
+        """Block in-process work while the capture is starved, then check cancel."""
+        while self.should_pause():
+            if self._cancel.wait(THROTTLE_POLL_SECONDS):
+                break
+        with self._lock:
+            self._paused_since = None
+        self.check_cancelled()
+
+    def run(self, work: Callable[["FinalizationJob"], dict]) -> dict:
+        with self._lock:
+            self.state = "running"
+            self._started_monotonic = time.monotonic()
+        self._publish_progress(force=True)
+        try:
+            result = work(self)
+        except BaseException as error:
+            with self._lock:
+                self.state = "failed"
+                self.error = f"{type(error).__name__}: {error}"
+                self.exception = error
+                self._finish_locked()
+            self._publish_progress(force=True)
+            self._run_done_callbacks()
+            raise
+        with self._lock:
+            self.result = result
+            if self._cancel.is_set() and result.get("returncode") != 0:
+                self.state = "cancelled"
+            elif result.get("returncode") == 0:
+                self.state = "completed"
+            else:
+                self.state = "failed"
+            self._finish_locked()
+        self._publish_progress(force=True)
+        self._run_done_callbacks()
+        return result
+
+    def _finish_locked(self) -> None:
+        self.finished_at = _utc_now()
+        self._finished_monotonic = time.monotonic()
+        self._done.set()
+
+    def add_done_callback(self, callback: Callable[["FinalizationJob"], None]) -> None:
+        """Call ``callback`` with the job once it has finished, or now if it has."""
+        with self._lock:
+            if not self._done.is_set():
+                self._done_callbacks.append(callback)
+                return
+        callback(self)
+
+    def _run_done_callbacks(self) -> None:
+        with self._lock:
+            callbacks, self._done_callbacks = self._done_callbacks, []
+        for callback in callbacks:
+            try:
+                callback(self)
+            except Exception:
+                # A follow-up must not fail the finished job or its worker.
+                pass
+
+    def wait(self, timeout: float | None = None) -> bool:
+        return self._done.wait(timeout)
+
+    def cancel(self) -> bool:
+        with self._lock:
+            if self.state in {"completed", "failed", "cancelled"}:
+                return False
+            self._cancel.set()
+            return True
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            now = self._finished_monotonic or time.monotonic()
+            elapsed = (
+                max(0.0, now - self._started_monotonic)
+                if self._started_monotonic is not None
+                else 0.0
+            )
+            throughput = self.bytes_done / elapsed if elapsed > 0 else 0.0
+            remaining = max(0, self.bytes_total - self.bytes_done)
+            eta = (
+                round(remaining / throughput, 1)
+                if throughput > 0 and self.state == "running"
+                else None
+            )
+            return {
+                "id": self.id,
+                "file": self.output_file,
+                "queue": self.queue,
+                "state": self.state,
+                "phase": self.phase,
+                "bytes_total": self.bytes_total,
+                "bytes_done": self.bytes_done,
+                "progress": (
+                    round(min(1.0, self.bytes_done / self.bytes_total), 4)
+                    if self.bytes_total
+                    else None
+                ),
+                "throughput_bytes_per_second": round(throughput),
+                "eta_seconds": eta,
+                "cancel_requested": self._cancel.is_set(),
+                "throttled": self._paused_since is not None,
+                "throttle_pauses": self.throttle_pauses,
+                "created_at": self.created_at,
+                "finished_at": self.finished_at,
+                "result": self.result,
+                "error": self.error,
+            }
+
+
+def create_job(output_file: str | None, bytes_total: int = 0) -> FinalizationJob:
+    job = FinalizationJob(output_file, bytes_total)
+    with _LOCK:
+        _JOBS[job.id] = job
+        finished = [
+            job_id
+            for job_id, existing in _JOBS.items()
+            if existing.state in {"completed", "failed", "cancelled"}
+        ]
+        for job_id in finished[:-MAX_FINISHED_JOBS]:
+            del _JOBS[job_id]
+    return job
+
+
+def get_job(job_id: str) -> FinalizationJob | None:
+    with _LOCK:
+        return _JOBS.get(job_id)
+
+
+def active_jobs(queue: str | None = None) -> list[FinalizationJob]:
+    """Queued and running jobs, of every queue unless ``queue`` is given."""
+    with _LOCK:
+        return [
+            job
+            for job in _JOBS.values()
+            if job.state in {"queued", "running"}
+            and (queue is None or job.queue == queue)
+        ]
+
+
+def set_pressure_probe(probe: Callable[[], bool] | None) -> None:
+    """Register the check that reports whether the active capture is starved."""
+    global _PRESSURE_PROBE
+    _PRESSURE_PROBE = probe
+
+
+def capture_under_pressure() -> bool:
+    probe = _PRESSURE_PROBE
+    if probe is None:
+        return False
+    try:
+        return bool(probe())
+    except Exception:
+        # Throttling is advisory; a broken probe must not stall finalization.
+        return False
+
+
+def _lower_thread_priority() -> None:
+    """Move the calling thread to nice 19 and the idle IO class.
+
+    On Linux both are per-thread attributes inherited by child processes, so
+    FFmpeg and ffprobe started from the worker run at the same priority.
+    """
+    if platform.system() != "Linux":
+        return
+    thread_id = threading.get_native_id()
+    try:
+        os.setpriority(os.PRIO_PROCESS, thread_id, WORKER_NICE)
+    except OSError:
+        pass
+    syscall_number = _IOPRIO_SET_SYSCALLS.get(platform.machine())
+    if syscall_number is None:
+        return
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+        libc.syscall(
+            syscall_number,
+            _IOPRIO_WHO_PROCESS,
+            thread_id,
+            IOPRIO_CLASS_IDLE << _IOPRIO_CLASS_SHIFT,
+        )
+    except (OSError, AttributeError):
+        pass
+
+
+def _run_queue(queue: str) -> None:
+    _lower_thread_priority()
+    while True:
+        with _LOCK:
+            if not _QUEUES.get(queue):
+                _QUEUES.pop(queue, None)
+                del _WORKERS[queue]
+                return
+            job, work = _QUEUES[queue].pop(0)
+        try:
+            job.run(work)
+        except BaseException:
+            # The failure is recorded on the job for pollers and waiters; the
+            # worker must outlive it, or later jobs would never start.
+            pass
+
+
+def enqueue(
+    job: FinalizationJob,
+    work: Callable[[FinalizationJob], dict],
+    queue: str = DEFAULT_QUEUE,
+) -> None:
+    """Run ``work`` for ``job`` after every job queued before it on ``queue``.
+
+    Each queue has its own worker thread, so the kernel may run the workers
+    of different cameras on different cores.
+    """
+    with _LOCK:
+        job.queue = queue
+        _QUEUES.setdefault(queue, []).append((job, work))
+        if queue not in _WORKERS:
+            worker = threading.Thread(
+                target=_run_queue,
+                args=(queue,),
+                name="medicam-finalization",
+                daemon=True,
+            )
+            _WORKERS[queue] = worker
+            worker.start()
+
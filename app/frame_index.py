@@ -0,0 +1,350 @@
+"""Compact frame-offset index maintained next to a growing raw MJPEG file.
+
+The sidecar is a flat array of little-endian ``<QId`` records (byte offset,
+JPEG size, wall-clock time the frame was observed on disk). It turns frame
+counting, startup timing, preview seeking and crash-recovery bookkeeping into
+reads of a few bytes instead of full scans of a multi-gigabyte recording. The
+raw file stays the source of truth: a missing or stale index only costs a scan
+of the unindexed tail.
+"""
+
+from __future__ import annotations
+
+import itertools
+import os
+import struct
+import threading
+import time
+from typing import Callable, Iterator, NamedTuple
+
+
+RECORD = struct.Struct("<QId")
+INDEX_SUFFIX = ".idx"
+INDEX_POLL_SECONDS = 0.02
+INDEX_READ_SIZE = 1024 * 1024
+MAX_FRAME_BYTES = 8 * 1024 * 1024
+
+_SOI = b"\xff\xd8"
+_EOI = b"\xff\xd9"
+
+
+class FrameRecord(NamedTuple):
+    offset: int
+    size: int
+    wall_time: float
+
+    @property
+    def end(self) -> int:
+        return self.offset + self.size
+
+
+def index_path(raw_file: str) -> str:
+    return f"{raw_file}{INDEX_SUFFIX}"
+
+
+def remove_index(raw_file: str | None) -> None:
+    if not raw_file:
+        return
+    try:
+        os.remove(index_path(raw_file))
+    except FileNotFoundError:
+        pass
+
+
+def _record_count(path: str) -> int:
+    try:
+        return os.path.getsize(path) // RECORD.size
+    except OSError:
+        return 0
+
+
+def read_record(raw_file: str, number: int) -> FrameRecord | None:
+    """Return record ``number`` (0-based, negative counts from the end)."""
+    path = index_path(raw_file)
+    count = _record_count(path)
+    if number < 0:
+        number += count
+    if number < 0 or number >= count:
+        return None
+    try:
+        with open(path, "rb") as index:
+            index.seek(number * RECORD.size)
+            return FrameRecord(*RECORD.unpack(index.read(RECORD.size)))
+    except (OSError, struct.error):
+        return None
+
+
+def iter_records(raw_file: str, start: int = 0) -> Iterator[FrameRecord]:
+    path = index_path(raw_file)
+    try:
+        with open(path, "rb") as index:
+            index.seek(start * RECORD.size)
+            while chunk := index.read(RECORD.size * 4096):
+                usable = len(chunk) - len(chunk) % RECORD.size
+                for values in RECORD.iter_unpack(chunk[:usable]):
+                    yield FrameRecord(*values)
+    except OSError:
+        return
+
+
+class IndexedFrames:
+    """``(offset, size)`` of the indexed frames, read from the sidecar per pass.
+
+    Sized and re-iterable like a list, so the muxer can walk a multi-hour
+    capture without holding a tuple per frame in memory. The count is fixed
+    when the view is created; later records are not included.
+    """
+
+    def __init__(self, raw_file: str):
+        self.raw_file = raw_file
+        self._count = _record_count(index_path(raw_file))
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __iter__(self) -> Iterator[tuple[int, int]]:
+        for record in itertools.islice(iter_records(self.raw_file), self._count):
+            yield record.offset, record.size
+
+
+def summary(raw_file: str) -> dict | None:
+    """Return frame count and first/last record without touching the raw file."""
+    count = _record_count(index_path(raw_file))
+    if count == 0:
+        return None
+    first = read_record(raw_file, 0)
+    last = read_record(raw_file, count - 1)
+    if first is None or last is None:
+        return None
+    try:
+        raw_size = os.path.getsize(raw_file)
+    except OSError:
+        return None
+    if last.end > raw_size:
+        # The raw file was replaced or truncated; the index no longer applies.
+        return None
+    return {
+        "frames": count,
+        "first": first,
+        "last": last,
+        "indexed_bytes": last.end,
+        "raw_bytes": raw_size,
+    }
+
+
+def _count_markers(path: str, start: int = 0) -> int:
+    count = 0
+    previous = b""
+    try:
+        with open(path, "rb") as raw:
+            raw.seek(start)
+            while chunk := raw.read(INDEX_READ_SIZE):
+                data = previous + chunk
+                count += data.count(_SOI)
+                previous = data[-1:]
+    except OSError:
+        return 0
+    return count
+
+
+def count_frames(raw_file: str) -> int:
+    """Count JPEG start markers, scanning only what the index has not seen."""
+    indexed = summary(raw_file)
+    if indexed is None:
+        return _count_markers(raw_file)
+    return indexed["frames"] + _count_markers(raw_file, indexed["indexed_bytes"])
+
+
+def _scan_frames(
+    buffer: bytearray,
+    base_offset: int,
+) -> tuple[list[tuple[int, int]], int]:
+    """Return complete ``(offset, size)`` frames and bytes consumed from buffer."""
+    frames = []
+    position = 0
+    while True:
+        start = buffer.find(_SOI, position)
+        if start < 0:
+            # Keep a trailing 0xFF that may start the next marker.
+            return frames, max(position, len(buffer) - 1)
+        end = buffer.find(_EOI, start + 2)
+        if end < 0:
+            if len(buffer) - start > MAX_FRAME_BYTES:
+                return frames, len(buffer) - 1
+            return frames, start
+        frames.append((base_offset + start, end + 2 - start))
+        position = end + 2
+
+
+class FrameIndexer:
+    """Tail ``raw_file`` in a thread and append one record per complete JPEG.
+
+    An existing sidecar is resumed from its last complete record, so a second
+    indexer (for example after a backend restart) only scans the tail.
+    ``observer`` receives the JPEG sizes and wall time of every batch found,
+    and an empty batch after each pass that found nothing.
+    """
+
+    def __init__(
+        self,
+        raw_file: str,
+        clock: Callable[[], float] = time.time,
+        poll_interval: float = INDEX_POLL_SECONDS,
+        observer: Callable[[list[int], float], None] | None = None,
+    ):
+        self.raw_file = raw_file
+        self.clock = clock
+        self.poll_interval = poll_interval
+        self.observer = observer
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+        self._count = 0
+        self._scan_offset = 0
+        self._first: FrameRecord | None = None
+        self._last: FrameRecord | None = None
+        self._resume()
+
+    def _resume(self) -> None:
+        path = index_path(self.raw_file)
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return
+        usable = size - size % RECORD.size
+        if usable != size:
+            # A crash between buffered writes can leave half a record.
+            os.truncate(path, usable)
+        self._count = usable // RECORD.size
+        if self._count:
+            self._first = read_record(self.raw_file, 0)
+            self._last = read_record(self.raw_file, self._count - 1)
+            self._scan_offset = self._last.end if self._last else 0
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    @property
+    def first(self) -> FrameRecord | None:
+        return self._first
+
+    @property
+    def last(self) -> FrameRecord | None:
+        return self._last
+
+    def start(self) -> "FrameIndexer":
+        self._thread = threading.Thread(
+            target=self._run,
+            name=f"medicam-frame-index-{os.path.basename(self.raw_file)}",
+            daemon=True,
+        )
+        self._thread.start()
+        return self
+
+    def _run(self) -> None:
+        try:
+            with open(index_path(self.raw_file), "ab") as index:
+                while True:
+                    stopping = self._stop.is_set()
+                    if not self.catch_up(index) and self.observer is not None:
+                        self.observer([], self.clock())
+                    if stopping:
+                        return
+                    self._stop.wait(self.poll_interval)
+        except OSError:
+            # The index is an optimization; readers fall back to scanning.
+            return
+
+    def catch_up(self, index) -> int:
+        """Index every complete frame currently on disk and return how many."""
+        try:
+            raw = open(self.raw_file, "rb", buffering=0)
+        except OSError:
+            return 0
+        added = 0
+        buffer = bytearray()
+        base_offset = self._scan_offset
+        with raw:
+            raw.seek(base_offset)
+            while chunk := raw.read(INDEX_READ_SIZE):
+                buffer.extend(chunk)
+                frames, consumed = _scan_frames(buffer, base_offset)
+                if frames:
+                    wall_time = self.clock()
+                    index.write(
+                        b"".join(
+                            RECORD.pack(offset, size, wall_time)
+                            for offset, size in frames
+                        )
+                    )
+                    with self._lock:
+                        if self._first is None:
+                            self._first = FrameRecord(*frames[0], wall_time)
+                        self._last = FrameRecord(*frames[-1], wall_time)
+                        self._count += len(frames)
+                    added += len(frames)
+                    if self.observer is not None:
+                        self.observer([size for _offset, size in frames], wall_time)
+                del buffer[:consumed]
+                base_offset += consumed
+        # Rescan the incomplete frame next time, not the whole buffer.
+        self._scan_offset = base_offset
+        if added:
+            index.flush()
+        return added
+
+    def stop(self) -> None:
+        """Index the remaining frames and stop the tailer."""
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+
+
+def catch_up(raw_file: str, wall_time: float | None = None) -> FrameIndexer:
+    """Synchronously bring the sidecar of a closed raw file up to date.
+
+    Frames found here were not observed live, so they carry ``wall_time``
+    (by default the raw file's modification time).
+    """
+    if wall_time is None:
+        try:
+            wall_time = os.path.getmtime(raw_file)
+        except OSError:
+            wall_time = time.time()
+    indexer = FrameIndexer(raw_file, clock=lambda: wall_time)
+    try:
+        with open(index_path(raw_file), "ab") as index:
+            indexer.catch_up(index)
+    except OSError:
+        pass
+    return indexer
+
+
+def recover(raw_file: str) -> tuple[FrameIndexer, bool, int]:
+    """Prepare an interrupted raw capture for finalization.
+
+    Trusts a sidecar that matches the raw file and only scans the tail it has
+    not seen; a sidecar that does not match is rebuilt. A torn JPEG after the
+    last complete frame is cut off the raw file. Returns the indexer, whether
+    the index was rebuilt and how many trailing bytes were removed.
+    """
+    rebuilt = False
+    if _record_count(index_path(raw_file)) and summary(raw_file) is None:
+        remove_index(raw_file)
+        rebuilt = True
+    indexer = catch_up(raw_file)
+    last = indexer.last
+    truncated = 0
+    try:
+        raw_size = os.path.getsize(raw_file)
+    except OSError:
+        return indexer, rebuilt, truncated
+    # Longer tails are not a torn frame; leave them for the FFmpeg fallback.
+    if last is not None and 0 < raw_size - last.end <= MAX_FRAME_BYTES:
+        try:
+            os.truncate(raw_file, last.end)
+            truncated = raw_size - last.end
+        except OSError:
+            pass
+    return indexer, rebuilt, truncated
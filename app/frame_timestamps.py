@@ -0,0 +1,98 @@
+"""Per-frame V4L2 timestamps kept next to the raw MJPEG capture.
+
+The raw ``-f mjpeg`` stream carries no timing, so the remux has to assume a
+constant frame rate and dropped frames can only be estimated from wall-clock
+time. With ``MEDICAM_CAPTURE_TIMESTAMPS`` the capture FFmpeg also writes the
+packet timestamps of the same stream through the ``mkvtimestamp_v2`` muxer:
+one line of milliseconds per frame, in capture order, without touching the
+JPEG data. Line ``n`` belongs to frame ``n`` of the raw file, so the native
+muxer can write the real frame durations and the quality report can count
+the gaps the camera actually left.
+"""
+
+from __future__ import annotations
+
+import os
+
+
+TIMESTAMPS_ENABLED = os.environ.get(
+    "MEDICAM_CAPTURE_TIMESTAMPS", "0"
+).strip().lower() in {"1", "true", "yes", "on"}
+TIMESTAMPS_SUFFIX = ".pts"
+# An interval this many nominal frame periods long counts as a gap.
+GAP_FRAME_PERIODS = 1.5
+
+
+def timestamps_path(raw_file: str) -> str:
+    return f"{raw_file}{TIMESTAMPS_SUFFIX}"
+
+
+def remove_timestamps(raw_file: str | None) -> None:
+    if not raw_file:
+        return
+    try:
+        os.remove(timestamps_path(raw_file))
+    except FileNotFoundError:
+        pass
+
+
+def capture_output_args(raw_file: str) -> list[str]:
+    """FFmpeg output that records the timestamps of the captured stream."""
+    return [
+        "-map", "0:v:0",
+        "-c:v", "copy",
+        "-f", "mkvtimestamp_v2",
+        timestamps_path(raw_file),
+    ]
+
+
+def read_timestamps(raw_file: str | None) -> list[int]:
+    """Return the frame timestamps in milliseconds, oldest first."""
+    if not raw_file:
+        return []
+    try:
+        with open(timestamps_path(raw_file), "r", encoding="ascii") as sidecar:
+            data = sidecar.read()
+    except (OSError, UnicodeDecodeError):
+        return []
+    # The last line is torn if the capture was killed while writing it.
+    lines = data.split("\n")[:-1]
+    timestamps = []
+    for line in lines:
+        if line.startswith("#"):
+            continue
+        try:
+            timestamps.append(int(line.strip()))
+        except ValueError:
+            return timestamps
+    return timestamps
+
+
+def for_frames(raw_file: str | None, frames: int) -> list[int] | None:
+    """Return the timestamps of the first ``frames`` frames, if all known.
+
+    A sidecar that is shorter than the raw file or does not increase does not
+    describe it and is ignored.
+    """
+    timestamps = read_timestamps(raw_file)[:frames]
+    if frames <= 0 or len(timestamps) < frames:
+        return None
+    if any(later < earlier for earlier, later in zip(timestamps, timestamps[1:])):
+        return None
+    return timestamps
+
+
+def timing_report(timestamps: list[int], fps: float) -> dict:
+    """Summarize the measured frame intervals of a capture."""
+    period_ms = 1000.0 / fps
+    intervals = [later - earlier for earlier, later in zip(timestamps, timestamps[1:])]
+    gaps = [interval for interval in intervals if interval > GAP_FRAME_PERIODS * period_ms]
+    return {
+        "frames": len(timestamps),
+        "duration_seconds": round(
+            (timestamps[-1] - timestamps[0] + period_ms) / 1000.0, 3
+        ),
+        "gaps": len(gaps),
+        "missing_frames": sum(max(0, round(gap / period_ms) - 1) for gap in gaps),
+        "max_interval_ms": max(intervals, default=0),
+    }
@@ -0,0 +1,115 @@
+"""Follow a running recording over HTTP as live HLS with fMP4 segments.
+
+A second device can watch the full-resolution capture while it is still
+being written. Segments are cut from the raw MJPEG capture at frame
+boundaries taken from the frame index: each one is a ``moof`` built from the
+indexed JPEG sizes followed by the JPEGs themselves, so nothing is decoded or
+re-encoded. The playlist is a sliding window over the newest complete
+segments only. The capture writer keeps the last windows behind the write
+head in the page cache, so following the stream does not read the card;
+segments that fell out of the window are refused rather than read back.
+"""
+
+from __future__ import annotations
+
+import itertools
+import math
+import os
+from typing import Iterator
+
+from app import frame_index, mp4_mux
+
+
+SEGMENT_SECONDS = max(
+    0.5, float(os.environ.get("MEDICAM_LIVE_SEGMENT_SECONDS", "1.0"))
+)
+WINDOW_SEGMENTS = 3
+READ_CHUNK_BYTES = 1024 * 1024
+
+
+class LiveViewError(Exception):
+    def __init__(self, code: str):
+        super().__init__(code)
+        self.code = code
+
+
+def frames_per_segment(fps: float) -> int:
+    return max(1, int(round(fps * SEGMENT_SECONDS)))
+
+
+def _window(frames: int, fps: float) -> range:
+    complete = frames // frames_per_segment(fps)
+    return range(max(0, complete - WINDOW_SEGMENTS), complete)
+
+
+def playlist(name: str, frames: int, fps: float) -> str:
+    """Return the media playlist for the ``frames`` indexed so far."""
+    per_segment = frames_per_segment(fps)
+    duration = per_segment / fps
+    window = _window(frames, fps)
+    lines = [
+        "#EXTM3U",
+        "#EXT-X-VERSION:7",
+        f"#EXT-X-TARGETDURATION:{math.ceil(duration)}",
+        f"#EXT-X-MEDIA-SEQUENCE:{window.start}",
+        "#EXT-X-INDEPENDENT-SEGMENTS",
+        f'#EXT-X-MAP:URI="live/{name}/init.mp4"',
+    ]
+    for number in window:
+        lines.extend([f"#EXTINF:{duration:.3f},", f"live/{name}/{number}.m4s"])
+    return "\n".join(lines) + "\n"
+
+
+def init_segment(raw_file: str, fps: float) -> bytes:
+    first = frame_index.read_record(raw_file, 0)
+    if first is None:
+        raise LiveViewError("live_segment_not_ready")
+    with open(raw_file, "rb") as raw:
+        raw.seek(first.offset)
+        width, height = mp4_mux.jpeg_dimensions(raw.read(min(first.size, 64 * 1024)))
+    return mp4_mux.fragmented_init(width, height, fps)
+
+
+def segment(raw_file: str, number: int, frames: int, fps: float) -> tuple[int, Iterator[bytes]]:
+    """Return the byte length and the chunks of segment ``number``."""
+    window = _window(frames, fps)
+    if number >= window.stop:
+        raise LiveViewError("live_segment_not_ready")
+    # One segment of slack for a player that fetched the previous playlist.
+    if number < window.start - 1:
+        raise LiveViewError("live_segment_expired")
+    per_segment = frames_per_segment(fps)
+    first_frame = number * per_segment
+    records = list(
+        itertools.islice(frame_index.iter_records(raw_file, first_frame), per_segment)
+    )
+    if len(records) < per_segment:
+        raise LiveViewError("live_segment_not_ready")
+    header = mp4_mux.fragment_header(
+        number + 1, first_frame, [record.size for record in records], fps
+    )
+    length = len(header) + sum(record.size for record in records)
+    return length, _segment_chunks(raw_file, header, records)
+
+
+def _segment_chunks(raw_file: str, header: bytes, records) -> Iterator[bytes]:
+    yield header
+    descriptor = os.open(raw_file, os.O_RDONLY)
+    try:
+        # Frames are normally back to back, so runs are read as one range.
+        runs = []
+        for record in records:
+            if runs and runs[-1][0] + runs[-1][1] == record.offset:
+                runs[-1][1] += record.size
+            else:
+                runs.append([record.offset, record.size])
+        for offset, size in runs:
+            end = offset + size
+            while offset < end:
+                chunk = os.pread(descriptor, min(READ_CHUNK_BYTES, end - offset), offset)
+                if not chunk:
+                    raise LiveViewError("live_segment_truncated")
+                yield chunk
+                offset += len(chunk)
+    finally:
+        os.close(descriptor)
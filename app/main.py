@@ -1,10 +1,17 @@
 from fastapi import FastAPI
+from app import camera, diagnostics
 from app.routes import router as api_router
 
 app = FastAPI(title="Raspberry Camera API")
 
 app.include_router(api_router)
 
+@app.on_event("startup")
+async def start_recorder_background_tasks():
+    camera.start_status_refresher()
+    camera.schedule_standby()
+    camera.start_motion_trigger(diagnostics.start_recording_when_free)
+
 @app.get("/")
 async def root():
     return {"message": "Camera API is running"}
@@ -0,0 +1,177 @@
+"""Frame markers of a running recording and the chapters built from them.
+
+``POST /recording/marker`` appends the number of the newest indexed frame to
+a JSON-lines sidecar next to the raw capture, like the frame index. Every
+MJPEG frame is a keyframe, so a marker is exact to the frame without any
+decoding. Finalization turns the markers into MP4 chapters; the sidecar
+follows the raw capture through restarts and retries and is removed with it.
+
+A paused recording stores where each resumed section begins as a byte
+offset into the raw capture, because the frame at that offset is indexed
+only later. Each section then gets its own chapter.
+"""
+
+from __future__ import annotations
+
+import bisect
+import json
+import os
+from datetime import datetime, timezone
+
+from app import frame_index
+
+
+MARKERS_SUFFIX = ".markers"
+# The MP4 chapter list (``chpl``) stores the chapter count in one byte.
+MAX_MARKERS = 255
+MAX_LABEL_CHARS = 64
+
+
+class MarkerLimitError(ValueError):
+    pass
+
+
+def markers_path(raw_file: str) -> str:
+    return f"{raw_file}{MARKERS_SUFFIX}"
+
+
+def remove_markers(raw_file: str | None) -> None:
+    if not raw_file:
+        return
+    try:
+        os.remove(markers_path(raw_file))
+    except FileNotFoundError:
+        pass
+
+
+def normalize_label(label: str | None) -> str | None:
+    label = " ".join((label or "").split())[:MAX_LABEL_CHARS]
+    return label or None
+
+
+def _read_entries(raw_file: str | None, key: str) -> list[dict]:
+    if not raw_file:
+        return []
+    found = []
+    try:
+        with open(markers_path(raw_file), "r", encoding="utf-8") as sidecar:
+            for line in sidecar:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # A crash can leave half a line at the end.
+                    continue
+                if isinstance(entry, dict) and isinstance(entry.get(key), int):
+                    found.append(entry)
+    except OSError:
+        return []
+    return sorted(found, key=lambda entry: entry[key])
+
+
+def read_markers(raw_file: str | None) -> list[dict]:
+    """Return the markers of ``raw_file`` ordered by frame."""
+    return _read_entries(raw_file, "frame")
+
+
+def read_sections(raw_file: str | None) -> list[dict]:
+    """Return the resumed sections of ``raw_file`` ordered by offset."""
+    return _read_entries(raw_file, "section_offset")
+
+
+def _append_entry(raw_file: str, entry: dict) -> dict:
+    with open(markers_path(raw_file), "a", encoding="utf-8") as sidecar:
+        sidecar.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        sidecar.flush()
+        os.fsync(sidecar.fileno())
+    return entry
+
+
+def append_marker(raw_file: str, frame: int, label: str | None = None) -> dict:
+    if len(read_markers(raw_file)) >= MAX_MARKERS:
+        raise MarkerLimitError(f"A recording holds at most {MAX_MARKERS} markers")
+    return _append_entry(raw_file, {
+        "frame": frame,
+        "label": normalize_label(label),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+    })
+
+
+def append_section(raw_file: str, offset: int) -> dict:
+    """Record that a resumed section of the capture begins at byte ``offset``."""
+    return _append_entry(raw_file, {
+        "section_offset": offset,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+    })
+
+
+def _section_frames(raw_file: str, frames: int) -> list[int]:
+    """Return the first frame of every section, starting with frame 0."""
+    offsets = [entry["section_offset"] for entry in read_sections(raw_file)]
+    if not offsets:
+        return []
+    frame_offsets = [record.offset for record in frame_index.iter_records(raw_file)]
+    starts = [0]
+    for offset in offsets:
+        frame = bisect.bisect_left(frame_offsets, offset)
+        if starts[-1] < frame < frames:
+            starts.append(frame)
+    return starts if len(starts) > 1 else []
+
+
+def chapters(
+    raw_file: str | None,
+    fps: float,
+    frames: int,
+    timestamps_ms: list[int] | None = None,
+) -> list[tuple[float, str]]:
+    """Return ``(start_seconds, title)`` of the markers inside ``frames``.
+
+    Markers on the same frame become one chapter; unlabeled markers are
+    numbered. A paused recording adds a "Part N" chapter where each section
+    begins, unless a marker is on that frame. With capture ``timestamps_ms``
+    a chapter starts at its frame's measured time rather than at
+    ``frame / fps``.
+    """
+    titles = {}
+    for number, marker in enumerate(read_markers(raw_file), start=1):
+        frame = marker["frame"]
+        if frame < frames and frame not in titles:
+            titles[frame] = marker.get("label") or f"Marker {number}"
+    if raw_file:
+        for number, frame in enumerate(_section_frames(raw_file, frames), start=1):
+            titles.setdefault(frame, f"Part {number}")
+    result = []
+    for frame in sorted(titles)[:MAX_MARKERS]:
+        start = (
+            (timestamps_ms[frame] - timestamps_ms[0]) / 1000.0
+            if timestamps_ms
+            else frame / fps
+        )
+        result.append((start, titles[frame]))
+    return result
+
+
+def _escape_ffmetadata(value: str) -> str:
+    for character in ("\\", "=", ";", "#", "\n"):
+        value = value.replace(character, f"\\{character}")
+    return value
+
+
+def write_ffmetadata(path: str, chapter_list: list[tuple[float, str]], duration: float) -> None:
+    """Write ``chapter_list`` as an FFmetadata file for ``-map_chapters``."""
+    lines = [";FFMETADATA1"]
+    for position, (start, title) in enumerate(chapter_list):
+        end = (
+            chapter_list[position + 1][0]
+            if position + 1 < len(chapter_list)
+            else duration
+        )
+        lines.extend([
+            "[CHAPTER]",
+            "TIMEBASE=1/1000",
+            f"START={int(round(start * 1000))}",
+            f"END={int(round(max(start, end) * 1000))}",
+            f"title={_escape_ffmetadata(title)}",
+        ])
+    with open(path, "w", encoding="utf-8") as metadata:
+        metadata.write("\n".join(lines) + "\n")
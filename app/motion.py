@@ -0,0 +1,303 @@
+"""Start and stop recordings on motion seen in the idle camera stream.
+
+With ``MEDICAM_MOTION_TRIGGER`` every idle JPEG the board already receives
+(the idle preview capture or the warm standby stream) is reduced to its
+compressed size and the byte lengths of its restart intervals. Both move
+when the scene changes: the size with overall detail, the intervals with
+detail moving between image regions, which a constant total size hides. No
+frame is decoded, so sampling ten frames a second costs a regex scan per
+frame next to the preview.
+
+The smoothed change level has hysteresis: it must stay above
+``START_LEVEL`` for ``START_SECONDS`` to start a recording and below
+``STOP_LEVEL`` for ``STOP_SECONDS`` to stop it. While a recording the
+trigger started runs, the level follows the JPEG sizes in its frame index;
+recordings started by hand are never stopped. With the warm standby and
+``MEDICAM_PRERECORD_SECONDS`` the recording keeps the seconds before the
+trigger as its pre-roll.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import threading
+import time
+from typing import Callable
+
+from app import events, frame_index
+
+
+MOTION_TRIGGER_ENABLED = os.environ.get(
+    "MEDICAM_MOTION_TRIGGER", "0"
+).strip().lower() in {"1", "true", "yes", "on"}
+START_SECONDS = max(0.0, float(os.environ.get("MEDICAM_MOTION_START_SECONDS", "1.0")))
+STOP_SECONDS = max(1.0, float(os.environ.get("MEDICAM_MOTION_STOP_SECONDS", "60")))
+# Relative frame-to-frame change of the JPEG size or restart intervals.
+START_LEVEL = 0.05
+STOP_LEVEL = 0.02
+SMOOTHING = 0.3
+SAMPLE_INTERVAL_SECONDS = 0.1
+MONITOR_POLL_SECONDS = 0.5
+IDLE_SOURCE_CHECK_SECONDS = 5.0
+
+_START_OF_SCAN = b"\xff\xda"
+_RESTART_MARKER = re.compile(rb"\xff[\xd0-\xd7]")
+
+
+def frame_signature(frame: bytes) -> tuple[int, list[int]]:
+    """Return the JPEG size and the byte lengths of its restart intervals."""
+    scan = frame.find(_START_OF_SCAN)
+    if scan < 0:
+        return len(frame), []
+    edges = [scan]
+    edges.extend(match.start() for match in _RESTART_MARKER.finditer(frame, scan))
+    if len(edges) == 1:
+        return len(frame), []
+    edges.append(len(frame))
+    return len(frame), [end - start for start, end in zip(edges, edges[1:])]
+
+
+def frame_change(previous: tuple[int, list[int]], current: tuple[int, list[int]]) -> float:
+    previous_size, previous_intervals = previous
+    size, intervals = current
+    if previous_intervals and len(previous_intervals) == len(intervals):
+        changed = sum(abs(a - b) for a, b in zip(previous_intervals, intervals))
+        return changed / max(1, sum(max(a, b) for a, b in zip(previous_intervals, intervals)))
+    return abs(size - previous_size) / max(1, size, previous_size)
+
+
+class MotionDetector:
+    """Turn frame signatures into ``"start"`` and ``"stop"`` decisions."""
+
+    def __init__(self):
+        self.level = 0.0
+        self.active = False
+        self._previous: tuple[int, list[int]] | None = None
+        self._above_since: float | None = None
+        self._quiet_since: float | None = None
+
+    def reset(self) -> None:
+        self.__init__()
+
+    def switch_source(self) -> None:
+        """Compare the next frame only with frames of the same stream."""
+        self._previous = None
+
+    def observe(self, signature: tuple[int, list[int]], now: float) -> str | None:
+        previous, self._previous = self._previous, signature
+        if previous is None:
+            return None
+        self.level += SMOOTHING * (frame_change(previous, signature) - self.level)
+        if not self.active:
+            if self.level < START_LEVEL:
+                self._above_since = None
+                return None
+            if self._above_since is None:
+                self._above_since = now
+            if now - self._above_since < START_SECONDS:
+                return None
+            self.active = True
+            self._quiet_since = None
+            return "start"
+        if self.level >= STOP_LEVEL:
+            self._quiet_since = None
+            return None
+        if self._quiet_since is None:
+            self._quiet_since = now
+        if now - self._quiet_since < STOP_SECONDS:
+            return None
+        self.active = False
+        self._above_since = None
+        return "stop"
+
+
+class MotionTrigger:
+    def __init__(self, enabled: bool = MOTION_TRIGGER_ENABLED):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._detector = MotionDetector()
+        self._last_sample = 0.0
+        self._start_recording: Callable[[], dict] | None = None
+        self._stop_recording: Callable[[], dict] | None = None
+        self._recording_source: Callable[[], dict | None] | None = None
+        self._ensure_idle_source: Callable[[], None] | None = None
+        self._starting = False
+        # Output file of the recording this trigger started, if running.
+        self._recording_file: str | None = None
+        self._raw_file: str | None = None
+        self._next_frame = 0
+        self._thread: threading.Thread | None = None
+        self.recordings_started = 0
+        self.recordings_stopped = 0
+        self.last_error: str | None = None
+
+    def start(
+        self,
+        start_recording: Callable[[], dict],
+        stop_recording: Callable[[], dict],
+        recording_source: Callable[[], dict | None],
+        ensure_idle_source: Callable[[], None] | None = None,
+    ) -> None:
+        with self._lock:
+            self._start_recording = start_recording
+            self._stop_recording = stop_recording
+            self._recording_source = recording_source
+            self._ensure_idle_source = ensure_idle_source
+            if not self.enabled or self._thread is not None:
+                return
+            self._thread = threading.Thread(
+                target=self._monitor,
+                name="medicam-motion-trigger",
+                daemon=True,
+            )
+            self._thread.start()
+
+    def observe_frame(self, frame: bytes) -> None:
+        """Sample one idle JPEG; called from the preview or standby thread."""
+        now = time.monotonic()
+        with self._lock:
+            if (
+                not self.enabled
+                or self._start_recording is None
+                or self._starting
+                or self._recording_file is not None
+                or now - self._last_sample < SAMPLE_INTERVAL_SECONDS
+            ):
+                return
+            self._last_sample = now
+            if self._detector.observe(frame_signature(frame), now) != "start":
+                return
+            self._starting = True
+            level = self._detector.level
+        # /start stops the idle preview, which joins the thread calling this.
+        threading.Thread(
+            target=self._start,
+            args=(level,),
+            name="medicam-motion-start",
+            daemon=True,
+        ).start()
+
+    def _start(self, level: float) -> None:
+        error = None
+        response = {}
+        try:
+            response = self._start_recording()
+        except Exception as caught:  # An HTTPException from a busy recorder.
+            error = f"{type(caught).__name__}: {getattr(caught, 'detail', caught)}"
+        with self._lock:
+            self._starting = False
+            if response.get("status") == "recording_started":
+                self._recording_file = os.path.basename(response["file"])
+                self._raw_file = None
+                self.recordings_started += 1
+                self.last_error = None
+            else:
+                self._detector.reset()
+                self.last_error = error or response.get("error_code") or response.get("status")
+            recording_file = self._recording_file
+        if recording_file:
+            events.publish(
+                "motion.recording_started",
+                {"file": recording_file, "level": round(level, 4)},
+            )
+
+    def _follow_recording(self) -> None:
+        source = self._recording_source()
+        with self._lock:
+            recording_file = self._recording_file
+        if not source or source["name"] != recording_file:
+            # Stopped by hand or by the watchdog; look for motion again.
+            with self._lock:
+                self._recording_file = None
+                self._detector.reset()
+            return
+        if source["raw_file"] != self._raw_file:
+            # Segmented recordings move to a new raw file and index.
+            self._raw_file = source["raw_file"]
+            self._next_frame = 0
+            with self._lock:
+                self._detector.switch_source()
+        step = max(1, int(round(source["fps"] * SAMPLE_INTERVAL_SECONDS)))
+        now = time.monotonic()
+        decision = None
+        for number, record in enumerate(
+            frame_index.iter_records(source["raw_file"], self._next_frame),
+            start=self._next_frame,
+        ):
+            self._next_frame = number + 1
+            if number % step:
+                continue
+            with self._lock:
+                decision = self._detector.observe((record.size, []), now) or decision
+        if decision != "stop":
+            return
+        try:
+            self._stop_recording()
+        except Exception as caught:
+            with self._lock:
+                self.last_error = f"{type(caught).__name__}: {getattr(caught, 'detail', caught)}"
+            return
+        with self._lock:
+            self._recording_file = None
+            self._detector.reset()
+            self.recordings_stopped += 1
+        events.publish("motion.recording_stopped", {"file": recording_file})
+
+    def _monitor(self) -> None:
+        last_idle_check = 0.0
+        while True:
+            time.sleep(MONITOR_POLL_SECONDS)
+            try:
+                if self._recording_file is not None:
+                    self._follow_recording()
+                elif (
+                    self._ensure_idle_source is not None
+                    and time.monotonic() - last_idle_check >= IDLE_SOURCE_CHECK_SECONDS
+                ):
+                    last_idle_check = time.monotonic()
+                    # A camera connected after startup becomes the source.
+                    self._ensure_idle_source()
+            except Exception as caught:  # Keep watching after a failed poll.
+                with self._lock:
+                    self.last_error = f"{type(caught).__name__}: {caught}"
+
+    def status(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "state": (
+                    "recording" if self._recording_file
+                    else "starting" if self._starting
+                    else "watching"
+                ) if self.enabled else "disabled",
+                "level": round(self._detector.level, 4),
+                "start_level": START_LEVEL,
+                "stop_level": STOP_LEVEL,
+                "start_seconds": START_SECONDS,
+                "stop_seconds": STOP_SECONDS,
+                "file": self._recording_file,
+                "recordings_started": self.recordings_started,
+                "recordings_stopped": self.recordings_stopped,
+                "last_error": self.last_error,
+            }
+
+
+trigger = MotionTrigger()
+
+
+def start(
+    start_recording: Callable[[], dict],
+    stop_recording: Callable[[], dict],
+    recording_source: Callable[[], dict | None],
+    ensure_idle_source: Callable[[], None] | None = None,
+) -> None:
+    trigger.start(start_recording, stop_recording, recording_source, ensure_idle_source)
+
+
+def observe_frame(frame: bytes) -> None:
+    trigger.observe_frame(frame)
+
+
+def get_status() -> dict:
+    return trigger.status()
@@ -0,0 +1,194 @@
+"""Read video track facts from MP4 box headers without decoding media.
+
+Our muxers write either a classic ``moov`` sample table or fragmented MP4
+(``moov`` + ``moof``/``mdat`` pairs). Both describe every video sample in a
+few kilobytes of metadata, so the post-stop quality check can read frame count,
+duration and resolution in milliseconds instead of decoding gigabytes.
+"""
+
+from __future__ import annotations
+
+import os
+import struct
+from typing import BinaryIO, Iterator
+
+
+_HEADER = struct.Struct(">I4s")
+_CONTAINERS = {b"moov", b"trak", b"mdia", b"minf", b"stbl", b"mvex", b"moof", b"traf"}
+MAX_METADATA_BOX_BYTES = 64 * 1024 * 1024
+
+
+class Mp4InfoError(ValueError):
+    """Raised when the file has no readable video sample metadata."""
+
+
+def _iter_boxes(source: BinaryIO, start: int, end: int) -> Iterator[tuple[bytes, int, int]]:
+    """Yield ``(type, payload_offset, payload_end)`` for boxes in a range."""
+    offset = start
+    while offset + _HEADER.size <= end:
+        source.seek(offset)
+        size, kind = _HEADER.unpack(source.read(_HEADER.size))
+        header = _HEADER.size
+        if size == 1:
+            size = struct.unpack(">Q", source.read(8))[0]
+            header += 8
+        elif size == 0:
+            size = end - offset
+        if size < header or offset + size > end:
+            # A torn tail after a crash; everything before it is still valid.
+            return
+        yield kind, offset + header, offset + size
+        offset += size
+
+
+def _read(source: BinaryIO, offset: int, end: int) -> bytes:
+    if end - offset > MAX_METADATA_BOX_BYTES:
+        raise Mp4InfoError("metadata_box_too_large")
+    source.seek(offset)
+    return source.read(end - offset)
+
+
+def _full_box_version(payload: bytes) -> tuple[int, int]:
+    return payload[0], int.from_bytes(payload[1:4], "big")
+
+
+def _parse_tkhd(payload: bytes) -> tuple[int, int, int]:
+    version, _flags = _full_box_version(payload)
+    track_id = struct.unpack_from(">I", payload, 20 if version == 1 else 12)[0]
+    width, height = struct.unpack_from(">II", payload, len(payload) - 8)
+    return track_id, width >> 16, height >> 16
+
+
+def _parse_mdhd(payload: bytes) -> tuple[int, int]:
+    version, _flags = _full_box_version(payload)
+    if version == 1:
+        timescale, duration = struct.unpack_from(">IQ", payload, 20)
+    else:
+        timescale, duration = struct.unpack_from(">II", payload, 12)
+    return timescale, duration
+
+
+def _read_track(source: BinaryIO, start: int, end: int) -> dict:
+    track = {}
+    for kind, payload_start, payload_end in _iter_boxes(source, start, end):
+        if kind == b"tkhd":
+            (
+                track["track_id"],
+                track["width"],
+                track["height"],
+            ) = _parse_tkhd(_read(source, payload_start, payload_end))
+        elif kind == b"hdlr":
+            track["handler"] = _read(source, payload_start, payload_end)[8:12]
+        elif kind == b"mdhd":
+            track["timescale"], track["duration"] = _parse_mdhd(
+                _read(source, payload_start, payload_end)
+            )
+        elif kind == b"stsz":
+            payload = _read(source, payload_start, payload_start + 12)
+            track["samples"] = struct.unpack_from(">I", payload, 8)[0]
+        elif kind in _CONTAINERS:
+            nested = _read_track(source, payload_start, payload_end)
+            track.update({key: value for key, value in nested.items() if key not in track})
+    return track
+
+
+def _read_trex_defaults(source: BinaryIO, start: int, end: int) -> dict[int, int]:
+    defaults = {}
+    for kind, payload_start, payload_end in _iter_boxes(source, start, end):
+        if kind == b"trex":
+            payload = _read(source, payload_start, payload_end)
+            track_id, _description, duration = struct.unpack_from(">III", payload, 4)
+            defaults[track_id] = duration
+    return defaults
+
+
+def _read_fragment(
+    source: BinaryIO,
+    start: int,
+    end: int,
+    track_id: int,
+    default_duration: int,
+) -> tuple[int, int]:
+    """Return video ``(samples, duration)`` described by one ``moof``."""
+    samples = 0
+    duration = 0
+    for kind, traf_start, traf_end in _iter_boxes(source, start, end):
+        if kind != b"traf":
+            continue
+        fragment_track = None
+        fragment_default = default_duration
+        for child, payload_start, payload_end in _iter_boxes(source, traf_start, traf_end):
+            payload = _read(source, payload_start, payload_end)
+            if child == b"tfhd":
+                _version, flags = _full_box_version(payload)
+                fragment_track = struct.unpack_from(">I", payload, 4)[0]
+                position = 8
+                if flags & 0x01:
+                    position += 8
+                if flags & 0x02:
+                    position += 4
+                if flags & 0x08:
+                    fragment_default = struct.unpack_from(">I", payload, position)[0]
+            elif child == b"trun" and fragment_track == track_id:
+                _version, flags = _full_box_version(payload)
+                count = struct.unpack_from(">I", payload, 4)[0]
+                samples += count
+                if not flags & 0x100:
+                    duration += count * fragment_default
+                    continue
+                position = 8
+                if flags & 0x01:
+                    position += 4
+                if flags & 0x04:
+                    position += 4
+                stride = 4 * sum(
+                    1 for bit in (0x100, 0x200, 0x400, 0x800) if flags & bit
+                )
+                for _sample in range(count):
+                    duration += struct.unpack_from(">I", payload, position)[0]
+                    position += stride
+    return samples, duration
+
+
+def read_video_info(path: str) -> dict:
+    """Return ``frames``, ``duration_seconds``, ``width``, ``height`` of track one."""
+    size = os.path.getsize(path)
+    with open(path, "rb") as source:
+        video = None
+        trex_defaults = {}
+        fragment_samples = 0
+        fragment_duration = 0
+        fragmented = False
+        for kind, payload_start, payload_end in _iter_boxes(source, 0, size):
+            if kind == b"moov":
+                for child, child_start, child_end in _iter_boxes(
+                    source, payload_start, payload_end
+                ):
+                    if child == b"trak" and video is None:
+                        track = _read_track(source, child_start, child_end)
+                        if track.get("handler") == b"vide":
+                            video = track
+                    elif child == b"mvex":
+                        trex_defaults = _read_trex_defaults(source, child_start, child_end)
+            elif kind == b"moof" and video is not None:
+                fragmented = True
+                samples, duration = _read_fragment(
+                    source,
+                    payload_start,
+                    payload_end,
+                    video.get("track_id", 1),
+                    trex_defaults.get(video.get("track_id", 1), 0),
+                )
+                fragment_samples += samples
+                fragment_duration += duration
+    if video is None or not video.get("timescale"):
+        raise Mp4InfoError("video_track_not_found")
+    frames = video.get("samples", 0) + fragment_samples
+    duration = video.get("duration", 0) if not fragmented else fragment_duration
+    return {
+        "frames": frames,
+        "duration_seconds": duration / video["timescale"],
+        "width": video.get("width", 0),
+        "height": video.get("height", 0),
+        "fragmented": fragmented,
+    }
@@ -0,0 +1,671 @@
+"""In-process MJPEG-to-MP4 muxer with zero-copy payload transfer.
+
+The camera already delivers compressed JPEGs, so building the MP4 only needs a
+sample table. The frame-index sidecar provides every JPEG offset and size, and
+AAC audio arrives as an ADTS stream. The whole ``moov`` is therefore computed
+up front and written before ``mdat`` (instant playback on the phone), after
+which JPEG payloads are moved with ``copy_file_range``/``sendfile`` so the
+FullHD video never passes through user space.
+"""
+
+from __future__ import annotations
+
+import itertools
+import math
+import os
+import struct
+import sys
+from array import array
+from typing import Callable, Iterable, NamedTuple
+
+
+VIDEO_TIMESCALE_MULTIPLIER = 512
+AAC_SAMPLES_PER_FRAME = 1024
+# FFmpeg's native AAC encoder emits one frame of priming samples.
+AAC_PRIMING_SAMPLES = 1024
+CHUNK_SECONDS = 1.0
+COPY_CHUNK_BYTES = 8 * 1024 * 1024
+MP4V_MJPEG_OBJECT_TYPE = 0x6C
+MP4A_AAC_OBJECT_TYPE = 0x40
+
+_ADTS_SAMPLE_RATES = (
+    96000, 88200, 64000, 48000, 44100, 32000,
+    24000, 22050, 16000, 12000, 11025, 8000, 7350,
+)
+_UNITY_MATRIX = struct.pack(
+    ">9I", 0x00010000, 0, 0, 0, 0x00010000, 0, 0, 0, 0x40000000
+)
+
+
+class Mp4MuxError(RuntimeError):
+    """Raised when the raw capture cannot be wrapped into an MP4."""
+
+
+class AacTrack(NamedTuple):
+    path: str
+    frames: list[tuple[int, int]]
+    sample_rate: int
+    channels: int
+    audio_specific_config: bytes
+
+
+def _box(kind: bytes, *payload: bytes) -> bytes:
+    body = b"".join(payload)
+    return struct.pack(">I4s", 8 + len(body), kind) + body
+
+
+def _full_box(kind: bytes, version: int, flags: int, *payload: bytes) -> bytes:
+    return _box(kind, struct.pack(">I", (version << 24) | flags), *payload)
+
+
+def _descriptor(tag: int, payload: bytes) -> bytes:
+    # Four-byte length form, as written by FFmpeg, avoids re-sizing parents.
+    length = len(payload)
+    encoded = bytes(
+        [
+            ((length >> 21) & 0x7F) | 0x80,
+            ((length >> 14) & 0x7F) | 0x80,
+            ((length >> 7) & 0x7F) | 0x80,
+            length & 0x7F,
+        ]
+    )
+    return bytes([tag]) + encoded + payload
+
+
+def _esds(object_type: int, stream_type: int, bitrate: int, config: bytes = b"") -> bytes:
+    decoder_config = (
+        struct.pack(">BB", object_type, (stream_type << 2) | 1)
+        + (0).to_bytes(3, "big")
+        + struct.pack(">II", bitrate, bitrate)
+    )
+    if config:
+        decoder_config += _descriptor(0x05, config)
+    es = (
+        struct.pack(">HB", 0, 0)
+        + _descriptor(0x04, decoder_config)
+        + _descriptor(0x06, b"\x02")
+    )
+    return _full_box(b"esds", 0, 0, _descriptor(0x03, es))
+
+
+def jpeg_dimensions(data: bytes) -> tuple[int, int]:
+    """Return ``(width, height)`` from the SOF marker of one JPEG."""
+    position = 2
+    while position + 4 <= len(data):
+        if data[position] != 0xFF:
+            position += 1
+            continue
+        marker = data[position + 1]
+        if marker in {0xD8, 0x01} or 0xD0 <= marker <= 0xD7 or marker == 0xFF:
+            position += 1 if marker == 0xFF else 2
+            continue
+        length = struct.unpack_from(">H", data, position + 2)[0]
+        if marker in {0xC0, 0xC1, 0xC2, 0xC3} and position + 9 <= len(data):
+            height, width = struct.unpack_from(">HH", data, position + 5)
+            return width, height
+        position += 2 + length
+    raise Mp4MuxError("jpeg_dimensions_not_found")
+
+
+def read_adts(path: str) -> AacTrack:
+    """Locate raw AAC payloads in an ADTS file without decoding them."""
+    frames = []
+    sample_rate = channels = None
+    config = b""
+    size = os.path.getsize(path)
+    position = 0
+    with open(path, "rb") as source:
+        # Header by header: two hours of AAC would not fit comfortably in RAM.
+        while position + 7 <= size:
+            source.seek(position)
+            header = source.read(9)
+            if header[0] != 0xFF or header[1] & 0xF6 != 0xF0:
+                raise Mp4MuxError("adts_sync_lost")
+            protection_absent = header[1] & 0x01
+            header_size = 7 if protection_absent else 9
+            frame_length = (
+                ((header[3] & 0x03) << 11) | (header[4] << 3) | (header[5] >> 5)
+            )
+            if frame_length <= header_size or position + frame_length > size:
+                # A torn final frame after a crash is dropped.
+                break
+            if sample_rate is None:
+                object_type = ((header[2] >> 6) & 0x03) + 1
+                rate_index = (header[2] >> 2) & 0x0F
+                channels = ((header[2] & 0x01) << 2) | (header[3] >> 6)
+                if rate_index >= len(_ADTS_SAMPLE_RATES):
+                    raise Mp4MuxError("adts_sample_rate_invalid")
+                sample_rate = _ADTS_SAMPLE_RATES[rate_index]
+                config = struct.pack(
+                    ">H", (object_type << 11) | (rate_index << 7) | (channels << 3)
+                )
+            frames.append((position + header_size, frame_length - header_size))
+            position += frame_length
+    if not frames:
+        raise Mp4MuxError("adts_stream_empty")
+    return AacTrack(path, frames, sample_rate, channels, config)
+
+
+def trim_aac(track: AacTrack, lead_samples: int, max_samples: int) -> tuple[AacTrack, int]:
+    """Cut ``lead_samples`` from the front and the tail beyond ``max_samples``.
+
+    Returns the kept frames and the samples an edit list must still skip.
+    Whole frames are dropped; one frame before the first presented sample is
+    kept because AAC frames overlap and the decoder needs it to warm up.
+    """
+    skip = AAC_PRIMING_SAMPLES + max(0, int(lead_samples))
+    first = max(0, skip // AAC_SAMPLES_PER_FRAME - 1)
+    skip -= first * AAC_SAMPLES_PER_FRAME
+    last = first - (-(skip + max(0, int(max_samples))) // AAC_SAMPLES_PER_FRAME)
+    return track._replace(frames=track.frames[first:last]), skip
+
+
+def _stts(deltas: Iterable[int]) -> bytes:
+    entries = []
+    for delta in deltas:
+        if entries and entries[-1][1] == delta:
+            entries[-1][0] += 1
+        else:
+            entries.append([1, delta])
+    return _full_box(
+        b"stts", 0, 0, struct.pack(">I", len(entries)),
+        *(struct.pack(">II", count, delta) for count, delta in entries),
+    )
+
+
+def _stsc(samples_per_chunk: list[int]) -> bytes:
+    entries = []
+    previous = None
+    for chunk_number, count in enumerate(samples_per_chunk, start=1):
+        if count != previous:
+            entries.append(struct.pack(">III", chunk_number, count, 1))
+            previous = count
+    return _full_box(b"stsc", 0, 0, struct.pack(">I", len(entries)), *entries)
+
+
+def _stsz(sizes: Iterable[int]) -> bytes:
+    table = array("I", sizes)
+    if sys.byteorder == "little":
+        table.byteswap()
+    return _full_box(
+        b"stsz",
+        0,
+        0,
+        struct.pack(">II", 0, len(table)),
+        table.tobytes(),
+    )
+
+
+def _chunk_offsets(offsets: list[int]) -> bytes:
+    if offsets and offsets[-1] > 0xFFFFFFFF:
+        return _full_box(
+            b"co64", 0, 0, struct.pack(">I", len(offsets)),
+            struct.pack(f">{len(offsets)}Q", *offsets),
+        )
+    return _full_box(
+        b"stco", 0, 0, struct.pack(">I", len(offsets)),
+        struct.pack(f">{len(offsets)}I", *offsets),
+    )
+
+
+def _trak(
+    track_id: int,
+    handler: bytes,
+    media_header: bytes,
+    sample_entry: bytes,
+    timescale: int,
+    media_duration: int,
+    movie_duration: int,
+    width: int,
+    height: int,
+    stts: bytes,
+    stsc: bytes,
+    stsz: bytes,
+    chunk_offsets: bytes,
+    edit_media_time: int = 0,
+) -> bytes:
+    tkhd = _full_box(
+        b"tkhd",
+        0,
+        0x3,
+        struct.pack(">IIIII", 0, 0, track_id, 0, movie_duration),
+        bytes(8),
+        struct.pack(">hhhH", 0, 0, 0x0100 if handler == b"soun" else 0, 0),
+        _UNITY_MATRIX,
+        struct.pack(">II", width << 16, height << 16),
+    )
+    edts = b""
+    if edit_media_time:
+        edts = _box(
+            b"edts",
+            _full_box(
+                b"elst", 0, 0,
+                struct.pack(">IIiI", 1, movie_duration, edit_media_time, 0x00010000),
+            ),
+        )
+    mdhd = _full_box(
+        b"mdhd", 0, 0,
+        struct.pack(">IIIIHH", 0, 0, timescale, media_duration, 0x55C4, 0),
+    )
+    name = b"VideoHandler\x00" if handler == b"vide" else b"SoundHandler\x00"
+    hdlr = _full_box(b"hdlr", 0, 0, bytes(4), handler, bytes(12), name)
+    dinf = _box(
+        b"dinf",
+        _full_box(b"dref", 0, 0, struct.pack(">I", 1), _full_box(b"url ", 0, 1)),
+    )
+    stbl = _box(
+        b"stbl",
+        _full_box(b"stsd", 0, 0, struct.pack(">I", 1), sample_entry),
+        stts,
+        stsc,
+        stsz,
+        chunk_offsets,
+    )
+    return _box(
+        b"trak",
+        tkhd,
+        edts,
+        _box(b"mdia", mdhd, hdlr, _box(b"minf", media_header, dinf, stbl)),
+    )
+
+
+def _chpl(chapters: list[tuple[float, str]]) -> bytes:
+    """Nero chapter list, read by FFmpeg, VLC and most MP4 players."""
+    entries = []
+    for start, title in chapters[:255]:
+        # One length byte; do not cut a multi-byte character in half.
+        encoded = title.encode("utf-8")[:255].decode("utf-8", "ignore").encode("utf-8")
+        entries.append(
+            struct.pack(">QB", int(round(start * 10_000_000)), len(encoded)) + encoded
+        )
+    return _full_box(b"chpl", 1, 0, bytes(4), struct.pack(">B", len(entries)), *entries)
+
+
+def _video_timing(fps: float) -> tuple[int, int]:
+    """Return the video timescale and the duration of one frame in it."""
+    video_timescale = int(round(fps)) * VIDEO_TIMESCALE_MULTIPLIER
+    return video_timescale, int(round(video_timescale / fps))
+
+
+def _mjpeg_sample_entry(width: int, height: int, bitrate: int) -> bytes:
+    return _box(
+        b"mp4v",
+        bytes(6),
+        struct.pack(">H", 1),
+        bytes(16),
+        struct.pack(">HH", width, height),
+        struct.pack(">II", 0x00480000, 0x00480000),
+        bytes(4),
+        struct.pack(">H", 1),
+        bytes(32),
+        struct.pack(">Hh", 0x0018, -1),
+        _esds(MP4V_MJPEG_OBJECT_TYPE, 0x04, bitrate),
+    )
+
+
+def _mvhd(timescale: int, duration: int, next_track_id: int) -> bytes:
+    return _full_box(
+        b"mvhd", 0, 0,
+        struct.pack(">IIII", 0, 0, timescale, duration),
+        struct.pack(">IH", 0x00010000, 0x0100),
+        bytes(10),
+        _UNITY_MATRIX,
+        bytes(24),
+        struct.pack(">I", next_track_id),
+    )
+
+
+def _plan_chunks(
+    video_count: int,
+    fps: float,
+    audio: AacTrack | None,
+    audio_skip_samples: int = AAC_PRIMING_SAMPLES,
+) -> list[tuple[int, int]]:
+    """Return per-chunk ``(video_samples, audio_samples)`` for ~1 s interleave."""
+    per_chunk = max(1, int(round(fps * CHUNK_SECONDS)))
+    audio_count = len(audio.frames) if audio else 0
+    chunks = []
+    video_done = audio_done = 0
+    while video_done < video_count or audio_done < audio_count:
+        video_samples = min(per_chunk, video_count - video_done)
+        video_done += video_samples
+        if audio:
+            if video_done >= video_count:
+                audio_target = audio_count
+            else:
+                seconds = video_done / fps
+                audio_target = min(
+                    audio_count,
+                    math.ceil(
+                        (seconds * audio.sample_rate + audio_skip_samples)
+                        / AAC_SAMPLES_PER_FRAME
+                    ),
+                )
+            audio_samples = max(0, audio_target - audio_done)
+            audio_done += audio_samples
+        else:
+            audio_samples = 0
+        chunks.append((video_samples, audio_samples))
+    return chunks
+
+
+def _write_all(descriptor: int, data: bytes) -> None:
+    view = memoryview(data)
+    while view:
+        written = os.write(descriptor, view)
+        view = view[written:]
+
+
+def copy_range(source_fd: int, destination_fd: int, offset: int, length: int) -> None:
+    """Append ``length`` bytes of ``source_fd`` at ``offset`` to the destination.
+
+    ``copy_file_range`` keeps the payload inside the kernel (and lets some
+    filesystems share extents); ``sendfile`` is the in-kernel fallback and a
+    plain read/write covers platforms that have neither.
+    """
+    position = offset
+    remaining = length
+    while remaining > 0:
+        count = min(remaining, COPY_CHUNK_BYTES)
+        try:
+            copied = os.copy_file_range(source_fd, destination_fd, count, position)
+        except (AttributeError, OSError):
+            copied = 0
+        if copied <= 0:
+            try:
+                copied = os.sendfile(destination_fd, source_fd, position, count)
+            except (AttributeError, OSError):
+                copied = 0
+        if copied <= 0:
+            chunk = os.pread(source_fd, count, position)
+            if not chunk:
+                raise Mp4MuxError("short_payload_copy")
+            _write_all(destination_fd, chunk)
+            copied = len(chunk)
+        position += copied
+        remaining -= copied
+
+
+def write_mp4(
+    raw_file: str,
+    output_file: str,
+    frames: Iterable[tuple[int, int]],
+    fps: float,
+    audio: AacTrack | None = None,
+    audio_bitrate: int = 128000,
+    progress: Callable[[int], None] | None = None,
+    audio_skip_samples: int = AAC_PRIMING_SAMPLES,
+    chapters: list[tuple[float, str]] | None = None,
+    timestamps_ms: list[int] | None = None,
+) -> dict:
+    """Write a faststart MP4 from indexed JPEG ``frames`` of ``raw_file``.
+
+    ``frames`` is any sized, re-iterable collection of ``(offset, size)``,
+    such as ``frame_index.IndexedFrames``; it is walked twice and never
+    copied, so only the packed sample table is held in memory.
+    ``audio_skip_samples`` is the audio edit-list start (encoder priming plus
+    any trimmed lead); audio never plays past the end of the video.
+    ``chapters`` are ``(start_seconds, title)`` pairs. With capture
+    ``timestamps_ms`` (one per frame) the frames keep their measured
+    durations instead of a constant frame rate.
+    ``progress`` receives the number of bytes written after every chunk; an
+    exception raised by it aborts the mux.
+    """
+    frame_count = len(frames)
+    if not frame_count:
+        raise Mp4MuxError("no_video_frames")
+    first_offset, first_size = next(iter(frames))
+    with open(raw_file, "rb") as source:
+        source.seek(first_offset)
+        width, height = jpeg_dimensions(source.read(min(first_size, 64 * 1024)))
+
+    fps_value = max(1.0, float(fps))
+    video_timescale, frame_delta = _video_timing(fps_value)
+    if timestamps_ms is not None and len(timestamps_ms) == frame_count:
+        # Rounded from the start, so the timeline does not drift.
+        ticks = [
+            round((timestamp - timestamps_ms[0]) * video_timescale / 1000)
+            for timestamp in timestamps_ms
+        ]
+        deltas = [max(1, later - earlier) for earlier, later in zip(ticks, ticks[1:])]
+        deltas.append(frame_delta)
+        video_duration = sum(deltas)
+        video_stts = _stts(deltas)
+    else:
+        video_duration = frame_delta * frame_count
+        video_stts = _stts(itertools.repeat(frame_delta, frame_count))
+    movie_timescale = 1000
+    movie_duration = int(round(video_duration * movie_timescale / video_timescale))
+    chunks = _plan_chunks(frame_count, fps_value, audio, audio_skip_samples)
+    # One pass over the frames packs the sample sizes and sums every chunk.
+    sizes = array("I")
+    chunk_video_bytes = []
+    pending = iter(frames)
+    for video_samples, _audio_samples in chunks:
+        chunk_start = len(sizes)
+        sizes.extend(size for _offset, size in itertools.islice(pending, video_samples))
+        chunk_video_bytes.append(sum(sizes[chunk_start:]))
+    if len(sizes) != frame_count:
+        raise Mp4MuxError("frame_index_changed")
+    video_stsz = _stsz(sizes)
+    del sizes
+    video_bytes = sum(chunk_video_bytes)
+    video_bitrate = int(video_bytes * 8 / max(1e-6, video_duration / video_timescale))
+    audio_bytes = sum(size for _offset, size in audio.frames) if audio else 0
+
+    ftyp = _box(b"ftyp", b"isom", struct.pack(">I", 0x200), b"isomiso2mp41")
+    mdat_payload = video_bytes + audio_bytes
+    mdat_header = (
+        struct.pack(">I4sQ", 1, b"mdat", mdat_payload + 16)
+        if mdat_payload + 8 > 0xFFFFFFFF
+        else struct.pack(">I4s", mdat_payload + 8, b"mdat")
+    )
+
+    def build_moov(data_start: int) -> bytes:
+        video_offsets = []
+        audio_offsets = []
+        position = data_start
+        audio_index = 0
+        for (video_samples, audio_samples), video_chunk_bytes in zip(
+            chunks, chunk_video_bytes
+        ):
+            if video_samples:
+                video_offsets.append(position)
+                position += video_chunk_bytes
+            if audio_samples:
+                audio_offsets.append(position)
+                position += sum(
+                    size
+                    for _offset, size in audio.frames[audio_index:audio_index + audio_samples]
+                )
+                audio_index += audio_samples
+
+        visual_entry = _mjpeg_sample_entry(width, height, video_bitrate)
+        traks = [
+            _trak(
+                1,
+                b"vide",
+                _full_box(b"vmhd", 0, 1, bytes(8)),
+                visual_entry,
+                video_timescale,
+                video_duration,
+                movie_duration,
+                width,
+                height,
+                video_stts,
+                _stsc([video for video, _audio in chunks if video]),
+                video_stsz,
+                _chunk_offsets(video_offsets),
+            )
+        ]
+        if audio:
+            audio_duration = len(audio.frames) * AAC_SAMPLES_PER_FRAME
+            audio_entry = _box(
+                b"mp4a",
+                bytes(6),
+                struct.pack(">H", 1),
+                bytes(8),
+                struct.pack(">HHHH", audio.channels, 16, 0, 0),
+                struct.pack(">I", audio.sample_rate << 16),
+                _esds(
+                    MP4A_AAC_OBJECT_TYPE,
+                    0x05,
+                    audio_bitrate,
+                    audio.audio_specific_config,
+                ),
+            )
+            audio_movie_duration = min(
+                movie_duration,
+                int(
+                    round(
+                        max(0, audio_duration - audio_skip_samples)
+                        * movie_timescale
+                        / audio.sample_rate
+                    )
+                ),
+            )
+            traks.append(
+                _trak(
+                    2,
+                    b"soun",
+                    _full_box(b"smhd", 0, 0, bytes(4)),
+                    audio_entry,
+                    audio.sample_rate,
+                    audio_duration,
+                    audio_movie_duration,
+                    0,
+                    0,
+                    _full_box(
+                        b"stts", 0, 0,
+                        struct.pack(">III", 1, len(audio.frames), AAC_SAMPLES_PER_FRAME),
+                    ),
+                    _stsc([samples for _video, samples in chunks if samples]),
+                    _stsz([size for _offset, size in audio.frames]),
+                    _chunk_offsets(audio_offsets),
+                    edit_media_time=audio_skip_samples,
+                )
+            )
+        mvhd = _mvhd(movie_timescale, movie_duration, len(traks) + 1)
+        udta = _box(b"udta", _chpl(chapters)) if chapters else b""
+        return _box(b"moov", mvhd, *traks, udta)
+
+    # Chunk offsets depend on the moov size, and stco/co64 is chosen from
+    # the final offsets; re-layout until the size is stable.
+    moov = b""
+    while True:
+        candidate = build_moov(len(ftyp) + len(moov) + len(mdat_header))
+        if len(candidate) == len(moov):
+            moov = candidate
+            break
+        moov = candidate
+
+    descriptor = os.open(output_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        _write_all(descriptor, ftyp + moov + mdat_header)
+        raw_fd = os.open(raw_file, os.O_RDONLY)
+        audio_fd = os.open(audio.path, os.O_RDONLY) if audio else None
+        try:
+            audio_index = 0
+            pending = iter(frames)
+            for video_samples, audio_samples in chunks:
+                run_start = run_length = 0
+                for offset, size in itertools.islice(pending, video_samples):
+                    if run_length and run_start + run_length == offset:
+                        run_length += size
+                        continue
+                    if run_length:
+                        copy_range(raw_fd, descriptor, run_start, run_length)
+                    run_start, run_length = offset, size
+                if run_length:
+                    copy_range(raw_fd, descriptor, run_start, run_length)
+                if audio_samples:
+                    payload = b"".join(
+                        os.pread(audio_fd, size, offset)
+                        for offset, size in audio.frames[audio_index:audio_index + audio_samples]
+                    )
+                    _write_all(descriptor, payload)
+                    audio_index += audio_samples
+                if progress is not None:
+                    progress(os.lseek(descriptor, 0, os.SEEK_CUR))
+        finally:
+            os.close(raw_fd)
+            if audio_fd is not None:
+                os.close(audio_fd)
+        # The raw capture is deleted right after this returns.
+        os.fsync(descriptor)
+    finally:
+        os.close(descriptor)
+    expected_size = len(ftyp) + len(moov) + len(mdat_header) + mdat_payload
+    if os.path.getsize(output_file) != expected_size:
+        raise Mp4MuxError("output_size_mismatch")
+    return {
+        "frames": frame_count,
+        "audio_frames": len(audio.frames) if audio else 0,
+        "width": width,
+        "height": height,
+        "chapters": len(chapters or ()),
+        "duration_seconds": video_duration / video_timescale,
+        "bytes": expected_size,
+    }
+
+
+def fragmented_init(width: int, height: int, fps: float) -> bytes:
+    """Return ``ftyp`` and an empty ``moov`` for video-only MJPEG fragments."""
+    fps_value = max(1.0, float(fps))
+    video_timescale, frame_delta = _video_timing(fps_value)
+    trak = _trak(
+        1,
+        b"vide",
+        _full_box(b"vmhd", 0, 1, bytes(8)),
+        _mjpeg_sample_entry(width, height, 0),
+        video_timescale,
+        0,
+        0,
+        width,
+        height,
+        _full_box(b"stts", 0, 0, struct.pack(">I", 0)),
+        _stsc([]),
+        _stsz([]),
+        _chunk_offsets([]),
+    )
+    # Every JPEG is a sync sample, so the default sample flags stay zero.
+    mvex = _box(
+        b"mvex",
+        _full_box(b"trex", 0, 0, struct.pack(">IIIII", 1, 1, frame_delta, 0, 0)),
+    )
+    return (
+        _box(b"ftyp", b"iso6", struct.pack(">I", 0), b"iso6isommp41")
+        + _box(b"moov", _mvhd(1000, 0, 2), trak, mvex)
+    )
+
+
+def fragment_header(sequence: int, first_frame: int, sizes: list[int], fps: float) -> bytes:
+    """Return ``moof`` and the ``mdat`` header of one fragment of JPEGs.
+
+    ``first_frame`` places the fragment on the recording's timeline; the
+    JPEG payloads follow the returned bytes in order.
+    """
+    fps_value = max(1.0, float(fps))
+    _video_timescale, frame_delta = _video_timing(fps_value)
+    payload = sum(sizes)
+
+    def moof(data_offset: int) -> bytes:
+        return _box(
+            b"moof",
+            _full_box(b"mfhd", 0, 0, struct.pack(">I", sequence)),
+            _box(
+                b"traf",
+                # default-base-is-moof, default sample duration.
+                _full_box(b"tfhd", 0, 0x020008, struct.pack(">II", 1, frame_delta)),
+                _full_box(b"tfdt", 1, 0, struct.pack(">Q", first_frame * frame_delta)),
+                # Data offset and per-sample sizes.
+                _full_box(
+                    b"trun", 0, 0x000201,
+                    struct.pack(">Ii", len(sizes), data_offset),
+                    struct.pack(f">{len(sizes)}I", *sizes),
+                ),
+            ),
+        )
+
+    size = len(moof(0))
+    return moof(size + 8) + struct.pack(">I4s", payload + 8, b"mdat")
@@ -15,6 +15,8 @@ import threading
 import time
 from typing import BinaryIO, Callable
 
+from app import frame_index
+
 
 PREVIEW_WIDTH = 640
 PREVIEW_HEIGHT = 360
@@ -86,16 +88,70 @@ def _extract_mjpeg_frames(
             yield frame
 
 
-def _should_publish_frame(frame_index: int, source_fps: float) -> bool:
-    """Evenly select at most PREVIEW_OUTPUT_FPS frames, including frame one."""
-    source_rate = max(1, int(round(source_fps)))
-    if source_rate <= PREVIEW_OUTPUT_FPS:
+def select_frame(frame_index: int, source_rate: int, output_rate: int) -> bool:
+    """Evenly select ``output_rate`` of every ``source_rate`` frames.
+
+    ``frame_index`` is 1-based and frame one is always selected.
+    """
+    if source_rate <= output_rate:
         return True
-    current_slot = ((frame_index - 1) * PREVIEW_OUTPUT_FPS) // source_rate
-    previous_slot = ((frame_index - 2) * PREVIEW_OUTPUT_FPS) // source_rate
+    current_slot = ((frame_index - 1) * output_rate) // source_rate
+    previous_slot = ((frame_index - 2) * output_rate) // source_rate
     return current_slot != previous_slot
 
 
+def _should_publish_frame(frame_index: int, source_fps: float) -> bool:
+    """Evenly select at most PREVIEW_OUTPUT_FPS frames, including frame one."""
+    return select_frame(frame_index, max(1, int(round(source_fps))), PREVIEW_OUTPUT_FPS)
+
+
+def follow_indexed_frames(
+    raw_file: str,
+    stop_event: threading.Event,
+    select: Callable[[int], bool],
+    on_frame: Callable[[bytes], None],
+    from_start: bool = False,
+    drain: bool = False,
+    poll_seconds: float = PREVIEW_TAIL_POLL_SECONDS,
+) -> None:
+    """Read only the selected JPEGs at the offsets the recorder indexed.
+
+    ``select`` receives the 1-based number of every indexed frame. Following
+    starts at the current end of the index unless ``from_start``; with
+    ``drain`` the records indexed before ``stop_event`` are still read.
+    """
+    record_size = frame_index.RECORD.size
+    frame_number = 0
+    pending = b""
+    with open(raw_file, "rb", buffering=0) as source, open(
+        frame_index.index_path(raw_file), "rb", buffering=0
+    ) as index:
+        if not from_start:
+            size = os.fstat(index.fileno()).st_size
+            index.seek(size - size % record_size)
+        while True:
+            stopping = stop_event.is_set()
+            if stopping and not drain:
+                return
+            chunk = index.read(record_size * 64)
+            if not chunk:
+                if stopping:
+                    return
+                time.sleep(poll_seconds)
+                continue
+            pending += chunk
+            usable = len(pending) - len(pending) % record_size
+            records = frame_index.RECORD.iter_unpack(pending[:usable])
+            pending = pending[usable:]
+            for offset, length, _wall_time in records:
+                frame_number += 1
+                if length > PREVIEW_MAX_JPEG_BYTES or not select(frame_number):
+                    continue
+                frame = os.pread(source.fileno(), length, offset)
+                if len(frame) == length:
+                    on_frame(frame)
+
+
 def _read_mjpeg_stream(
     stream: BinaryIO,
     stop_event: threading.Event,
@@ -153,6 +209,7 @@ class PreviewManager:
         self._recording_prepared = False
         self._recording_ready = False
         self._last_error: str | None = None
+        self._frame_observer: Callable[[bytes], None] | None = None
 
     def _invalidate_frames_locked(self) -> None:
         with self._frame_condition:
@@ -178,6 +235,15 @@ class PreviewManager:
                 self._last_error = f"{type(error).__name__}: {error}"
             self._frame_condition.notify_all()
 
+    def _idle_frame(self, serial: int, frame: bytes) -> None:
+        self._publish(serial, frame)
+        observer = self._frame_observer
+        if observer is not None:
+            try:
+                observer(frame)
+            except Exception as caught:  # Observers must never stop preview.
+                self._last_error = f"{type(caught).__name__}: {caught}"
+
     def _run_idle(self, serial: int, stop_event: threading.Event) -> None:
         process = None
         error = None
@@ -203,7 +269,7 @@ class PreviewManager:
             _read_mjpeg_stream(
                 process.stdout,
                 stop_event,
-                lambda frame: self._publish(serial, frame),
+                lambda frame: self._idle_frame(serial, frame),
             )
             if not stop_event.is_set() and process.poll() not in (0, None):
                 raise RuntimeError(f"idle_preview_exited_{process.poll()}")
@@ -213,14 +279,32 @@ class PreviewManager:
             _stop_process(process)
             self._producer_finished(serial, error)
 
+    def _tail_indexed_recording(
+        self,
+        serial: int,
+        stop_event: threading.Event,
+        raw_file: str,
+    ) -> None:
+        follow_indexed_frames(
+            raw_file,
+            stop_event,
+            lambda number: _should_publish_frame(number, self._recording_fps),
+            lambda frame: self._publish(serial, frame),
+        )
+
     def _run_recording(self, serial: int, stop_event: threading.Event) -> None:
         error = None
         input_buffer = bytearray()
-        frame_index = 0
+        frame_index_number = 0
         try:
             raw_file = self._recording_raw_file
             if not raw_file:
                 raise RuntimeError("recording_preview_source_unavailable")
+            if os.path.exists(frame_index.index_path(raw_file)):
+                # The recorder already located every frame boundary, so the
+                # FullHD stream does not have to be scanned a second time.
+                self._tail_indexed_recording(serial, stop_event, raw_file)
+                return
             # Start at the current end so a client joining mid-recording does
             # not cause a burst of old FullHD frames to be transmitted. Frames
             # stay compressed: the iPhone performs the display downscale.
@@ -234,10 +318,10 @@ class PreviewManager:
                     input_buffer.extend(chunk)
 
                     def select_frame() -> bool:
-                        nonlocal frame_index
-                        frame_index += 1
+                        nonlocal frame_index_number
+                        frame_index_number += 1
                         return _should_publish_frame(
-                            frame_index,
+                            frame_index_number,
                             self._recording_fps,
                         )
 
@@ -270,7 +354,7 @@ class PreviewManager:
     def _ensure_running_locked(self) -> None:
         if (
             not self.enabled
-            or self._subscribers <= 0
+            or self._subscribers <= 0 and self._frame_observer is None
             or self._pause_depth > 0
             or self._recording_prepared and not self._recording_ready
         ):
@@ -279,7 +363,10 @@ class PreviewManager:
             return
 
         kind = "recording" if self._recording_ready else "idle"
-        if kind == "recording" and not self._recording_raw_file:
+        if kind == "recording" and (
+            not self._recording_raw_file or self._subscribers <= 0
+        ):
+            # The frame observer only watches the idle stream.
             return
         if kind == "idle" and not self._camera_device:
             return
@@ -322,8 +409,17 @@ class PreviewManager:
     def unsubscribe(self) -> None:
         with self._control_lock:
             self._subscribers = max(0, self._subscribers - 1)
-            if self._subscribers == 0:
+            if self._subscribers == 0 and self._frame_observer is None:
+                self._stop_producer_locked()
+
+    def set_frame_observer(self, observer: Callable[[bytes], None] | None) -> None:
+        """Also hand every idle JPEG to ``observer``, with or without clients."""
+        with self._control_lock:
+            self._frame_observer = observer
+            if observer is None and self._subscribers == 0:
                 self._stop_producer_locked()
+            else:
+                self._ensure_running_locked()
 
     def ensure_running(self, camera_device: str | None = None) -> None:
         with self._control_lock:
@@ -351,6 +447,16 @@ class PreviewManager:
             self._recording_ready = True
             self._ensure_running_locked()
 
+    def recording_source_changed(self, raw_file: str) -> None:
+        """Follow the capture into the next rolling segment file."""
+        with self._control_lock:
+            if raw_file == self._recording_raw_file:
+                return
+            self._recording_raw_file = raw_file
+            if self._producer_kind == "recording":
+                self._stop_producer_locked()
+                self._ensure_running_locked()
+
     def recording_stopped(self) -> None:
         """Stop disk-tail work but defer idle capture until finalization ends."""
         with self._control_lock:
@@ -425,6 +531,10 @@ def ensure_running(camera_device: str | None = None) -> None:
     manager.ensure_running(camera_device)
 
 
+def set_frame_observer(observer: Callable[[bytes], None] | None) -> None:
+    manager.set_frame_observer(observer)
+
+
 def wait_for_frame(after_generation: int, timeout: float = 2.0):
     return manager.wait_for_frame(after_generation, timeout)
 
@@ -437,6 +547,10 @@ def recording_started() -> None:
     manager.recording_started()
 
 
+def recording_source_changed(raw_file: str) -> None:
+    manager.recording_source_changed(raw_file)
+
+
 def recording_stopped() -> None:
     manager.recording_stopped()
 
@@ -8,16 +8,21 @@ from fastapi import (
     Query,
     Request,
 )
-from fastapi.responses import FileResponse, StreamingResponse
+from fastapi.responses import FileResponse, Response, StreamingResponse
 from pydantic import BaseModel, Field
 from app import (
     audio,
     camera,
     diagnostics,
+    events,
+    finalization,
+    live_view,
+    motion,
     preview,
     storage_manager,
     updater,
     utils,
+    verification,
     version_info,
 )
 import asyncio
@@ -104,7 +109,10 @@ async def version(_ok: bool = Depends(require_api_auth)):
 # 📼 Запись
 # -------------------
 @router.post("/start")
-def start_recording(_ok: bool = Depends(require_api_auth)):
+def start_recording(
+    camera_id: str | None = None,
+    _ok: bool = Depends(require_api_auth),
+):
     if not diagnostics.begin_recording_start():
         code = (
             "self_test_in_progress"
@@ -113,18 +121,226 @@ def start_recording(_ok: bool = Depends(require_api_auth)):
         )
         raise HTTPException(status_code=409, detail={"code": code})
     try:
-        return camera.start_recording()
+        return camera.start_recording(camera_id)
     finally:
         diagnostics.end_recording_start()
 
 @router.post("/stop")
-def stop_recording(_ok: bool = Depends(require_api_auth)):
-    return camera.stop_recording()
+def stop_recording(
+    verify: bool = False,
+    wait: bool = False,
+    camera_id: str | None = None,
+    _ok: bool = Depends(require_api_auth),
+):
+    response = camera.stop_recording(
+        wait=wait,
+        timeout=camera.STOP_WAIT_TIMEOUT_SECONDS,
+        camera_id=camera_id,
+    )
+    if verify and response.get("returncode") == 0 and response.get("file"):
+        # The quality block is metadata-only; a full decode is opt-in and
+        # runs after the response in a low-priority background job.
+        response["verification"] = verification.request_verification(
+            os.path.basename(response["file"])
+        )
+    elif verify and response.get("job"):
+        job = finalization.get_job(response["job"]["id"])
+        if job is not None:
+            # The MP4 does not exist yet; queue the decode once it does.
+            job.add_done_callback(_verify_finalized_recording)
+            response["verification"] = {
+                "file": os.path.basename(response["file"]),
+                "state": "waiting_for_finalization",
+            }
+    return response
+
+
+def _verify_finalized_recording(job: finalization.FinalizationJob):
+    result = job.result or {}
+    if result.get("returncode") == 0 and result.get("file"):
+        verification.request_verification(os.path.basename(result["file"]))
 
 
 @router.get("/recording/status")
-def recording_status(_ok: bool = Depends(require_api_auth)):
-    return camera.get_recording_status()
+def recording_status(
+    camera_id: str | None = None,
+    _ok: bool = Depends(require_api_auth),
+):
+    return camera.get_recording_status(camera_id)
+
+
+@router.get("/events")
+async def event_stream(request: Request, _ok: bool = Depends(require_api_auth)):
+    try:
+        last_event_id = int(request.headers.get("last-event-id", ""))
+    except ValueError:
+        last_event_id = None
+    subscription = events.subscribe(asyncio.get_running_loop(), last_event_id)
+
+    async def stream():
+        try:
+            if last_event_id is None:
+                # A fresh client starts from the full state, then applies changes.
+                status = await asyncio.to_thread(camera.get_recording_status)
+                yield events.format_event(
+                    {
+                        "id": subscription.start_id,
+                        "type": "recording.status",
+                        "data": status,
+                    }
+                )
+            while True:
+                event = await subscription.get(events.KEEPALIVE_SECONDS)
+                if event is None:
+                    # Keeps Wi-Fi NAT and proxies from closing an idle stream.
+                    yield b": keepalive\n\n"
+                    continue
+                yield events.format_event(event)
+        finally:
+            events.unsubscribe(subscription)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-store",
+            "X-Accel-Buffering": "no",
+        },
+    )
+
+
+@router.get("/recording/metrics")
+def recording_metrics(
+    seconds: int | None = None,
+    camera_id: str | None = None,
+    _ok: bool = Depends(require_api_auth),
+):
+    metrics = camera.get_recording_metrics(seconds, camera_id)
+    if metrics is None:
+        raise HTTPException(
+            status_code=404,
+            detail={"code": "recording_metrics_not_found"},
+        )
+    return metrics
+
+
+@router.post("/recording/marker")
+def recording_marker(
+    label: str = Form(None),
+    camera_id: str | None = None,
+    _ok: bool = Depends(require_api_auth),
+):
+    return camera.add_recording_marker(label, camera_id)
+
+
+@router.post("/recording/pause")
+def recording_pause(
+    camera_id: str | None = None,
+    _ok: bool = Depends(require_api_auth),
+):
+    return camera.pause_recording(camera_id)
+
+
+@router.post("/recording/resume")
+def recording_resume(
+    camera_id: str | None = None,
+    _ok: bool = Depends(require_api_auth),
+):
+    return camera.resume_recording(camera_id)
+
+
+@router.get("/recording/timings")
+def recording_timings(_ok: bool = Depends(require_api_auth)):
+    return camera.get_recording_timings()
+
+
+@router.get("/recording/motion")
+def recording_motion(_ok: bool = Depends(require_api_auth)):
+    return motion.get_status()
+
+
+def _live_source_or_404(name: str | None = None):
+    source = camera.get_live_source()
+    if source is None:
+        raise HTTPException(status_code=409, detail={"code": "no_live_recording"})
+    if name is not None and name != source["name"]:
+        # The playlist of a previous recording must not serve the new one.
+        raise HTTPException(status_code=404, detail={"code": "live_recording_not_found"})
+    return source
+
+
+def _live_view_error(error: live_view.LiveViewError):
+    status_code = 410 if error.code == "live_segment_expired" else 404
+    return HTTPException(status_code=status_code, detail={"code": error.code})
+
+
+@router.get("/recording/live.m3u8")
+def recording_live_playlist(_ok: bool = Depends(require_api_auth)):
+    source = _live_source_or_404()
+    return Response(
+        live_view.playlist(source["name"], source["frames"], source["fps"]),
+        media_type="application/vnd.apple.mpegurl",
+        headers={"Cache-Control": "no-cache"},
+    )
+
+
+@router.get("/recording/live/{name}/init.mp4")
+def recording_live_init(name: str, _ok: bool = Depends(require_api_auth)):
+    source = _live_source_or_404(name)
+    try:
+        data = live_view.init_segment(source["raw_file"], source["fps"])
+    except live_view.LiveViewError as error:
+        raise _live_view_error(error)
+    return Response(data, media_type="video/mp4")
+
+
+@router.get("/recording/live/{name}/{number}.m4s")
+def recording_live_segment(
+    name: str,
+    number: int,
+    _ok: bool = Depends(require_api_auth),
+):
+    source = _live_source_or_404(name)
+    try:
+        length, chunks = live_view.segment(
+            source["raw_file"], number, source["frames"], source["fps"]
+        )
+    except live_view.LiveViewError as error:
+        raise _live_view_error(error)
+    return StreamingResponse(
+        chunks,
+        media_type="video/iso.segment",
+        headers={"Content-Length": str(length)},
+    )
+
+
+def _finalization_job_or_404(job_id: str):
+    job = finalization.get_job(job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=404,
+            detail={"code": "finalization_job_not_found"},
+        )
+    return job
+
+
+@router.get("/recording/finalization/{job_id}")
+def recording_finalization(job_id: str, _ok: bool = Depends(require_api_auth)):
+    return _finalization_job_or_404(job_id).snapshot()
+
+
+@router.post("/recording/finalization/{job_id}/cancel")
+def cancel_recording_finalization(
+    job_id: str,
+    _ok: bool = Depends(require_api_auth),
+):
+    job = _finalization_job_or_404(job_id)
+    if not job.cancel():
+        raise HTTPException(
+            status_code=409,
+            detail={"code": "finalization_job_finished"},
+        )
+    return job.snapshot()
 
 
 # -------------------
@@ -252,9 +468,25 @@ def _public_video_entry(video: dict) -> dict:
     return {key: value for key, value in video.items() if key in public_fields}
 
 
+def _busy_recording_state(states: set[str]):
+    """The state of the first camera that is capturing, finalizing or in ``states``.
+
+    The remux runs on the finalization queue after the recorder slot is back
+    to ``idle``, so a camera with queued jobs counts as ``finalizing`` too.
+    """
+    for status in (
+        camera.get_recording_status(),
+        *camera.get_other_recording_statuses(),
+    ):
+        if status.get("capture_active") or status.get("state") in states:
+            return status.get("state")
+        if status.get("finalizing"):
+            return "finalizing"
+    return None
+
+
 def _ensure_library_mutation_allowed():
-    status = camera.get_recording_status()
-    if status.get("recording") or status.get("state") == "finalizing":
+    if _busy_recording_state({"starting", "recording", "interrupted", "finalizing"}):
         raise HTTPException(
             status_code=409,
             detail={"code": "recording_in_progress"},
@@ -321,6 +553,41 @@ def get_video_thumbnail(filename: str, _ok: bool = Depends(require_api_auth)):
     )
 
 
+@router.get("/videos/{filename}/activity")
+def get_video_activity(filename: str, _ok: bool = Depends(require_api_auth)):
+    try:
+        filepath = utils.get_video_path(filename)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="invalid_video_filename")
+    if not os.path.exists(filepath):
+        raise HTTPException(status_code=404, detail="File not found")
+    timeline = utils.get_video_activity(filename)
+    if not timeline:
+        raise HTTPException(status_code=404, detail="activity_not_available")
+    return {"filename": filename, **timeline}
+
+
+@router.post("/videos/{filename}/verify")
+def verify_video(filename: str, _ok: bool = Depends(require_api_auth)):
+    try:
+        return verification.request_verification(filename)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="invalid_video_filename")
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="File not found")
+
+
+@router.get("/videos/{filename}/verify")
+def get_video_verification(filename: str, _ok: bool = Depends(require_api_auth)):
+    try:
+        job = verification.get_verification(filename)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="invalid_video_filename")
+    if job is None:
+        raise HTTPException(status_code=404, detail="verification_not_requested")
+    return job
+
+
 def _parse_byte_range(range_header: str, file_size: int) -> tuple[int, int]:
     value = (range_header or "").strip().lower()
     if not value.startswith("bytes=") or "," in value:
@@ -506,15 +773,31 @@ async def update_settings(
     fps: str = Form(None),
     audio_enabled: bool = Form(None),
     audio_device: str = Form(None),
+    camera_device: str = Form(None),
     _ok: bool = Depends(require_api_auth)):
     return camera.update_settings(
         resolution,
         fps,
         audio_enabled,
         audio_device,
+        camera_device,
     )
 
 
+@router.get("/cameras")
+async def camera_devices(_ok: bool = Depends(require_api_auth)):
+    settings = camera.get_settings()
+    status = camera.get_recording_status()
+    return {
+        "configured_device": settings.get("camera_device", "auto"),
+        "environment_device": os.environ.get("MEDICAM_CAMERA_DEVICE") or None,
+        "recording_device": (
+            status["camera"]["device"] if status["recording"] else None
+        ),
+        "devices": await asyncio.to_thread(camera.list_camera_devices),
+    }
+
+
 # -------------------
 # 🎙️ Звук
 # -------------------
@@ -546,6 +829,8 @@ async def audio_test(
     if camera.get_recording_status()["recording"]:
         raise HTTPException(status_code=409, detail="recording_in_progress")
     configured = device or camera.get_settings().get("audio_device", "auto")
+    # A warm capture standby holds the microphone open.
+    camera.release_standby()
     try:
         return audio.measure_audio_level(configured, duration_seconds)
     except audio.AudioError as error:
@@ -554,6 +839,8 @@ async def audio_test(
             status_code=status_code,
             detail=error.code,
         ) from error
+    finally:
+        camera.schedule_standby()
 
 
 # -------------------
@@ -724,18 +1011,15 @@ async def provision_reset(request: Request):
 
 @router.post("/system/poweroff")
 async def system_poweroff(_ok: bool = Depends(require_api_auth)):
-    recording = camera.get_recording_status()
-    if recording.get("capture_active") or recording.get("state") in {
-        "starting",
-        "recording",
-        "interrupted",
-        "finalizing",
-    }:
+    state = _busy_recording_state(
+        {"starting", "recording", "interrupted", "finalizing"}
+    )
+    if state:
         raise HTTPException(
             status_code=409,
             detail={
                 "code": "recording_in_progress",
-                "state": recording.get("state"),
+                "state": state,
                 "message": "Stop or recover the current recording before power off",
             },
         )
@@ -770,17 +1054,13 @@ async def update_status(_ok: bool = Depends(require_update_auth)):
 
 @router.post("/update/apply")
 async def update_apply(_ok: bool = Depends(require_update_auth)):
-    recording = camera.get_recording_status()
-    if recording.get("capture_active") or recording.get("state") in {
-        "starting",
-        "recording",
-        "finalizing",
-    }:
+    state = _busy_recording_state({"starting", "recording", "finalizing"})
+    if state:
         raise HTTPException(
             status_code=409,
             detail={
                 "code": "recording_in_progress",
-                "state": recording["state"],
+                "state": state,
                 "message": "Stop or recover the current recording before updating",
             },
         )
@@ -0,0 +1,416 @@
+"""Rolling segmented capture with background per-segment MP4 assembly.
+
+In segmented mode FFmpeg rotates the raw MJPEG capture into fixed-duration
+files. Every closed segment is remuxed at idle CPU/IO priority into a small
+fragmented MP4 whose fragments are appended to one growing output file. A
+crash, USB disconnect or storage interruption therefore loses at most the
+segment that was still open, the finalization reserve only has to cover one
+segment, and ``/stop`` only has to assemble the last one.
+"""
+
+from __future__ import annotations
+
+import glob
+import json
+import os
+import re
+import struct
+import subprocess
+import threading
+from typing import Callable
+
+from app import frame_index, mp4_mux
+
+
+SEGMENT_SECONDS = max(
+    10,
+    int(os.environ.get("MEDICAM_SEGMENT_SECONDS", 5 * 60)),
+)
+SEGMENT_POLL_SECONDS = 1.0
+SEGMENT_REMUX_TIMEOUT = 30 * 60
+LOW_PRIORITY_PREFIX = ["ionice", "-c", "3", "nice", "-n", "19"]
+
+_SEGMENT_RE = re.compile(r"\.seg(\d{5})\.mjpeg$")
+_BOX_HEADER = struct.Struct(">I4s")
+
+
+class SegmentError(RuntimeError):
+    """Raised when a closed segment cannot be appended to the recording."""
+
+
+def segment_pattern(output_file: str) -> str:
+    return f"{output_file}.seg%05d.mjpeg"
+
+
+def segment_path(output_file: str, index: int) -> str:
+    return segment_pattern(output_file) % index
+
+
+def segment_index(path: str) -> int | None:
+    match = _SEGMENT_RE.search(path or "")
+    return int(match.group(1)) if match else None
+
+
+def list_segments(output_file: str) -> list[str]:
+    """Return raw segments of one recording in capture order."""
+    paths = glob.glob(f"{glob.escape(output_file)}.seg[0-9][0-9][0-9][0-9][0-9].mjpeg")
+    return sorted(paths, key=lambda path: segment_index(path) or 0)
+
+
+def assembly_file(output_file: str) -> str:
+    # Matches the streaming muxer suffix: the media library only lists .mp4.
+    return f"{output_file}.part"
+
+
+def progress_file(output_file: str) -> str:
+    return f"{output_file}.segments.json"
+
+
+def build_capture_output_args(output_file: str) -> list[str]:
+    return [
+        "-f", "segment",
+        "-segment_format", "mjpeg",
+        "-segment_time", str(SEGMENT_SECONDS),
+        # MJPEG is all-intra, so every frame is a valid cut point.
+        "-reset_timestamps", "1",
+        "-segment_format_options", "flush_packets=1",
+        "-flush_packets", "1",
+        segment_pattern(output_file),
+    ]
+
+
+def read_progress(output_file: str) -> dict:
+    try:
+        with open(progress_file(output_file), "r", encoding="utf-8") as source:
+            payload = json.load(source)
+    except (OSError, json.JSONDecodeError, TypeError):
+        payload = {}
+    if not isinstance(payload, dict):
+        payload = {}
+    return {
+        "next_segment": int(payload.get("next_segment") or 0),
+        "frames": int(payload.get("frames") or 0),
+        "assembled_bytes": int(payload.get("assembled_bytes") or 0),
+        "has_audio": payload.get("has_audio"),
+        "sequence": int(payload.get("sequence") or 0),
+    }
+
+
+def _write_progress(output_file: str, payload: dict) -> None:
+    path = progress_file(output_file)
+    temporary = f"{path}.tmp"
+    with open(temporary, "w", encoding="utf-8") as output:
+        json.dump(payload, output)
+        output.flush()
+        os.fsync(output.fileno())
+    os.replace(temporary, path)
+
+
+def remove_artifacts(output_file: str) -> None:
+    for path in (
+        progress_file(output_file),
+        f"{progress_file(output_file)}.tmp",
+        *glob.glob(f"{glob.escape(output_file)}.seg[0-9]*.mp4"),
+    ):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def _iter_boxes(source, size: int):
+    offset = 0
+    while offset + _BOX_HEADER.size <= size:
+        source.seek(offset)
+        box_size, box_type = _BOX_HEADER.unpack(source.read(_BOX_HEADER.size))
+        header_size = _BOX_HEADER.size
+        if box_size == 1:
+            box_size = struct.unpack(">Q", source.read(8))[0]
+            header_size += 8
+        elif box_size == 0:
+            box_size = size - offset
+        if box_size < header_size or offset + box_size > size:
+            raise SegmentError("truncated_fragment_box")
+        yield offset, box_size, box_type
+        offset += box_size
+
+
+def _copy_range(source, destination, offset: int, length: int) -> None:
+    mp4_mux.copy_range(source.fileno(), destination.fileno(), offset, length)
+
+
+def append_fragments(
+    fragment_file: str,
+    assembly: str,
+    include_init: bool,
+    sequence: int,
+) -> int:
+    """Append moof/mdat pairs to ``assembly`` and return the next sequence.
+
+    Each per-segment FFmpeg run numbers its fragments from one. Renumbering
+    ``mfhd`` keeps the concatenated file a single valid fragmented MP4.
+    """
+    size = os.path.getsize(fragment_file)
+    # copy_file_range rejects O_APPEND descriptors, so position explicitly.
+    descriptor = os.open(assembly, os.O_WRONLY | os.O_CREAT, 0o644)
+    with open(fragment_file, "rb") as source, open(
+        descriptor, "wb", buffering=0
+    ) as destination:
+        destination.seek(0, os.SEEK_END)
+        for offset, box_size, box_type in list(_iter_boxes(source, size)):
+            if box_type in {b"ftyp", b"moov"}:
+                if include_init:
+                    _copy_range(source, destination, offset, box_size)
+            elif box_type == b"moof":
+                source.seek(offset)
+                moof = bytearray(source.read(box_size))
+                child_size, child_type = _BOX_HEADER.unpack_from(moof, 8)
+                if child_type == b"mfhd" and child_size >= 16:
+                    sequence += 1
+                    struct.pack_into(">I", moof, 8 + 12, sequence)
+                destination.write(moof)
+            elif box_type == b"mdat":
+                _copy_range(source, destination, offset, box_size)
+            # mfra/sidx describe one segment only and are rebuilt by readers.
+        os.fsync(destination.fileno())
+    return sequence
+
+
+class SegmentAssembler:
+    """Append closed raw segments to the output while capture continues.
+
+    ``build_command(raw_segment, fragment_file, audio_offset, duration,
+    timestamp_offset, with_audio)`` returns the FFmpeg remux command and
+    ``count_frames(raw_segment)`` the number of complete JPEGs in it.
+    """
+
+    def __init__(
+        self,
+        output_file: str,
+        fps: float,
+        build_command: Callable[..., list[str]],
+        count_frames: Callable[[str], int],
+        log_file=None,
+        has_audio: bool = False,
+        on_segment_opened: Callable[[str], None] | None = None,
+    ):
+        self.output_file = output_file
+        self.fps = max(1.0, float(fps))
+        self.build_command = build_command
+        self.count_frames = count_frames
+        self.log_file = log_file
+        self.on_segment_opened = on_segment_opened
+        self._lock = threading.RLock()
+        # Guards spawning the remux against stop(); _lock is held for a
+        # whole remux and cannot serve stop().
+        self._process_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._process = None
+        self._newest_segment: str | None = None
+        self._warnings: list[str] = []
+        progress = read_progress(output_file)
+        self.next_segment = progress["next_segment"]
+        self.frames = progress["frames"]
+        self.assembled_bytes = progress["assembled_bytes"]
+        self.sequence = progress["sequence"]
+        self.has_audio = (
+            has_audio if progress["has_audio"] is None else bool(progress["has_audio"])
+        )
+
+    @property
+    def assembly(self) -> str:
+        return assembly_file(self.output_file)
+
+    def _log(self, message: str) -> None:
+        if self.log_file is None or self.log_file.closed:
+            return
+        try:
+            self.log_file.write(f"{message}\n")
+            self.log_file.flush()
+        except (OSError, ValueError):
+            pass
+
+    def pending_segments(self) -> list[str]:
+        return [
+            path
+            for path in list_segments(self.output_file)
+            if (segment_index(path) or 0) >= self.next_segment
+        ]
+
+    def pending_bytes(self) -> int:
+        total = 0
+        for path in self.pending_segments():
+            try:
+                total += os.path.getsize(path)
+            except OSError:
+                pass
+        return total
+
+    def status(self) -> dict:
+        # Lock-free on purpose: _assemble holds the lock for a whole remux and
+        # status is polled while the recorder lock is held.
+        return {
+            "segment_seconds": SEGMENT_SECONDS,
+            "assembled_segments": self.next_segment,
+            "assembled_frames": self.frames,
+            "assembled_bytes": self.assembled_bytes,
+            "pending_segments": len(self.pending_segments()),
+        }
+
+    def start(self) -> None:
+        self._thread = threading.Thread(
+            target=self._run,
+            name=f"medicam-segments-{os.path.basename(self.output_file)}",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.wait(SEGMENT_POLL_SECONDS):
+            segments = self.pending_segments()
+            if segments and segments[-1] != self._newest_segment:
+                self._newest_segment = segments[-1]
+                if self.on_segment_opened is not None:
+                    self.on_segment_opened(segments[-1])
+            # FFmpeg opens the next segment only after closing the previous
+            # one, so every segment except the newest is complete.
+            for path in segments[:-1]:
+                if self._stop.is_set():
+                    return
+                try:
+                    self._assemble(path, low_priority=True)
+                except (OSError, SegmentError, subprocess.SubprocessError) as error:
+                    # Leave the raw segment in place; /stop retries it.
+                    self._log(f"[WARN] Segment {path} was not assembled: {error}")
+                    break
+
+    def _truncate_to_progress(self) -> None:
+        assembly = self.assembly
+        if not os.path.exists(assembly):
+            self.assembled_bytes = 0
+            return
+        if os.path.getsize(assembly) != self.assembled_bytes:
+            # A crash during an append leaves a partial fragment behind.
+            os.truncate(assembly, self.assembled_bytes)
+
+    def _remux(self, path: str, fragment_file: str, frames: int, with_audio: bool, low_priority: bool):
+        offset = self.frames / self.fps
+        command = self.build_command(
+            path,
+            fragment_file,
+            offset,
+            frames / self.fps,
+            offset,
+            with_audio,
+        )
+        if low_priority:
+            command = [*LOW_PRIORITY_PREFIX, *command]
+        with self._process_lock:
+            if low_priority and self._stop.is_set():
+                # finish() redoes this segment at normal priority.
+                raise SegmentError("segment_remux_interrupted")
+            process = subprocess.Popen(
+                command,
+                stdin=subprocess.DEVNULL,
+                stdout=self.log_file or subprocess.DEVNULL,
+                stderr=self.log_file or subprocess.DEVNULL,
+            )
+            self._process = process
+        try:
+            return process.wait(timeout=SEGMENT_REMUX_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+            return 124
+        finally:
+            with self._process_lock:
+                self._process = None
+
+    def _assemble(self, path: str, low_priority: bool) -> None:
+        with self._lock:
+            index = segment_index(path)
+            if index is None or index < self.next_segment:
+                return
+            frames = self.count_frames(path)
+            fragment_file = f"{path[:-len('.mjpeg')]}.mp4"
+            if frames > 0:
+                return_code = self._remux(
+                    path, fragment_file, frames, self.has_audio, low_priority
+                )
+                if return_code != 0 and self._stop.is_set() and low_priority:
+                    # stop() terminated the background remux; finish() redoes
+                    # this segment at normal priority.
+                    raise SegmentError("segment_remux_interrupted")
+                if return_code != 0 and self.has_audio:
+                    self._warnings.append(
+                        f"Audio of segment {index} could not be finalized"
+                    )
+                    # The rest of the recording is assembled without audio, so
+                    # every later segment matches the video-only fallback.
+                    self.has_audio = False
+                    return_code = self._remux(
+                        path, fragment_file, frames, False, low_priority
+                    )
+                if return_code != 0:
+                    raise SegmentError(f"segment_remux_exited_{return_code}")
+                self._truncate_to_progress()
+                self.sequence = append_fragments(
+                    fragment_file,
+                    self.assembly,
+                    include_init=self.assembled_bytes == 0,
+                    sequence=self.sequence,
+                )
+                self.assembled_bytes = os.path.getsize(self.assembly)
+                self.frames += frames
+            self.next_segment = index + 1
+            _write_progress(
+                self.output_file,
+                {
+                    "next_segment": self.next_segment,
+                    "frames": self.frames,
+                    "assembled_bytes": self.assembled_bytes,
+                    "has_audio": self.has_audio,
+                    "sequence": self.sequence,
+                },
+            )
+            for leftover in (fragment_file, path, frame_index.index_path(path)):
+                try:
+                    os.remove(leftover)
+                except FileNotFoundError:
+                    pass
+
+    def stop(self) -> None:
+        # Under the spawn lock, a background remux is either seen here and
+        # terminated or never started.
+        with self._process_lock:
+            self._stop.set()
+            process = self._process
+        if process is not None and process.poll() is None:
+            # The interrupted segment is simply remuxed again by finish().
+            process.terminate()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+
+    def finish(
+        self,
+        progress: Callable[[int], None] | None = None,
+    ) -> tuple[int, list[str]]:
+        """Assemble every remaining segment after capture has stopped.
+
+        ``progress`` receives the raw bytes consumed after every segment.
+        """
+        self.stop()
+        done = 0
+        try:
+            for path in self.pending_segments():
+                size = os.path.getsize(path)
+                self._assemble(path, low_priority=False)
+                done += size
+                if progress is not None:
+                    progress(done)
+        except (OSError, SegmentError, subprocess.SubprocessError) as error:
+            return 1, [*self._warnings, f"Segment assembly failed: {error}"]
+        if self.assembled_bytes <= 0:
+            return 1, [*self._warnings, "No complete segment was recorded"]
+        return 0, list(self._warnings)
@@ -0,0 +1,168 @@
+"""Warm capture standby: keep UVC and ALSA streaming while the recorder is idle.
+
+A cold ``/start`` discovers the camera, applies the storage policy, opens
+ALSA (with retries) and then waits for FFmpeg to negotiate the UVC format
+before the first byte arrives. In standby all of that already happened:
+arecord and the FFmpeg v4l2 reader run in the required audio-first order and
+their output is dropped. ``/start`` only arms the writers, so audio persists
+from the next ALSA period and video from the next JPEG.
+
+The camera and microphone stay busy while in standby, so it is an opt-in
+deployment switch and is released for the audio test and the self-test.
+
+With ``MEDICAM_PRERECORD_SECONDS`` the dropped stream is kept instead: the
+newest JPEGs and PCM of that window stay in memory and ``/start`` writes
+them ahead of the live stream, so a recording begins a few seconds before
+the button was pressed. The JPEG ring is bounded by
+``MEDICAM_PRERECORD_MAX_BYTES`` as well (a FullHD MJPEG second is several
+megabytes), and never exceeds ``PRERECORD_HARD_CAP_BYTES``. The PCM ring
+covers one second more than the video one so audio never starts after the
+first frame.
+
+With ``MEDICAM_MOTION_TRIGGER`` the dropped JPEGs also feed the motion
+detector, which can then start a recording with that pre-roll.
+"""
+
+from __future__ import annotations
+
+import os
+import signal
+import subprocess
+import time
+
+from app import audio, capture_writer, motion
+
+
+STANDBY_ENABLED = os.environ.get(
+    "MEDICAM_CAPTURE_STANDBY", "0"
+).strip().lower() in {"1", "true", "yes", "on"}
+PRERECORD_SECONDS = max(
+    0.0, float(os.environ.get("MEDICAM_PRERECORD_SECONDS", "0"))
+)
+PRERECORD_HARD_CAP_BYTES = 128 * 1024 * 1024
+PRERECORD_MAX_BYTES = min(
+    PRERECORD_HARD_CAP_BYTES,
+    max(0, int(os.environ.get("MEDICAM_PRERECORD_MAX_BYTES", str(48 * 1024 * 1024)))),
+)
+PRERECORD_AUDIO_MARGIN_SECONDS = 1.0
+STANDBY_START_TIMEOUT = 5.0
+STANDBY_POLL_SECONDS = 0.02
+STANDBY_STOP_TIMEOUT = 3.0
+
+
+class StandbyError(RuntimeError):
+    pass
+
+
+def _stop_process(process) -> None:
+    if process is None or process.poll() is not None:
+        return
+    try:
+        process.send_signal(signal.SIGINT)
+        process.wait(timeout=STANDBY_STOP_TIMEOUT)
+        return
+    except (OSError, subprocess.TimeoutExpired):
+        pass
+    try:
+        process.kill()
+        process.wait(timeout=STANDBY_STOP_TIMEOUT)
+    except (OSError, subprocess.TimeoutExpired):
+        pass
+
+
+def _wait_for_data(received, process, what: str) -> None:
+    deadline = time.monotonic() + STANDBY_START_TIMEOUT
+    while received() == 0:
+        if process.poll() is not None:
+            raise StandbyError(f"{what} exited with code {process.poll()}")
+        if time.monotonic() >= deadline:
+            raise StandbyError(f"{what} produced no data within {STANDBY_START_TIMEOUT:.0f}s")
+        time.sleep(STANDBY_POLL_SECONDS)
+
+
+class CaptureStandby:
+    """A negotiated capture pipeline waiting to be claimed by ``/start``.
+
+    ``key`` identifies the settings it was opened with; a standby whose key
+    no longer matches the current settings must not be claimed.
+    """
+
+    def __init__(
+        self,
+        key: tuple,
+        camera_device: str,
+        capture_command: list[str],
+        audio_device: dict | None = None,
+        arecord_command: list[str] | None = None,
+    ):
+        self.key = key
+        self.camera_device = camera_device
+        self.capture_command = capture_command
+        self.audio_device = audio_device
+        self.arecord_command = arecord_command
+        self.video_process = None
+        self.writer: capture_writer.CaptureWriter | None = None
+        self.audio_capture: audio.StandbyAudioCapture | None = None
+        self.storage_cleanup: dict | None = None
+        self.ready_at: float | None = None
+
+    def start(self, log_path: str) -> "CaptureStandby":
+        # Children keep their own copy of the log descriptor.
+        with open(log_path, "a", encoding="utf-8") as log_file:
+            try:
+                if self.arecord_command:
+                    self.audio_capture = audio.StandbyAudioCapture(
+                        self.arecord_command,
+                        log_file,
+                        preroll_seconds=(
+                            PRERECORD_SECONDS + PRERECORD_AUDIO_MARGIN_SECONDS
+                            if PRERECORD_SECONDS > 0
+                            else 0.0
+                        ),
+                    )
+                    _wait_for_data(
+                        lambda: self.audio_capture.bytes_received,
+                        self.audio_capture,
+                        "Standby audio capture",
+                    )
+                self.writer = capture_writer.CaptureWriter(
+                    None,
+                    PRERECORD_SECONDS,
+                    PRERECORD_MAX_BYTES,
+                    frame_observer=(
+                        motion.observe_frame if motion.MOTION_TRIGGER_ENABLED else None
+                    ),
+                )
+                self.video_process = subprocess.Popen(
+                    self.capture_command,
+                    stdin=subprocess.DEVNULL,
+                    stdout=self.writer.pipe_fd,
+                    stderr=log_file,
+                )
+                self.writer.start()
+                _wait_for_data(
+                    lambda: self.writer.bytes_seen,
+                    self.video_process,
+                    "Standby video capture",
+                )
+            except (OSError, subprocess.SubprocessError, StandbyError):
+                self.stop()
+                raise
+        self.ready_at = time.monotonic()
+        return self
+
+    def healthy(self) -> bool:
+        processes = [self.video_process, self.audio_capture]
+        return self.ready_at is not None and all(
+            process is None or process.poll() is None for process in processes
+        ) and self.video_process is not None
+
+    def stop(self) -> None:
+        _stop_process(self.audio_capture)
+        _stop_process(self.video_process)
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+        self.video_process = None
+        self.audio_capture = None
+        self.ready_at = None
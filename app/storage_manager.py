@@ -9,7 +9,7 @@ import threading
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
 
-from app import utils
+from app import events, utils
 
 
 GIB = 1024 ** 3
@@ -32,6 +32,8 @@ DEFAULT_POLICY = {"mode": "off", "value": None}
 
 _POLICY_LOCK = threading.RLock()
 _CLEANUP_LOCK = threading.RLock()
+_SPACE_LEVEL_LOCK = threading.Lock()
+_space_level = "ok"
 
 
 class StoragePolicyError(ValueError):
@@ -133,8 +135,37 @@ def _estimated_minutes(free_bytes: int, bytes_per_second: float) -> float:
     return round(seconds / 60, 1)
 
 
+def _space_level_for(free_bytes: int) -> str:
+    if free_bytes < CRITICAL_FREE_BYTES:
+        return "critical"
+    if free_bytes < WARNING_FREE_BYTES:
+        return "low"
+    return "ok"
+
+
+def report_free_space(free_bytes: int) -> None:
+    """Publish a ``storage.warning`` event when free space crosses a threshold."""
+    global _space_level
+
+    level = _space_level_for(free_bytes)
+    with _SPACE_LEVEL_LOCK:
+        previous, _space_level = _space_level, level
+    if level != previous:
+        events.publish(
+            "storage.warning",
+            {
+                "level": level,
+                "previous_level": previous,
+                "free_bytes": free_bytes,
+                "warning_free_bytes": WARNING_FREE_BYTES,
+                "critical_free_bytes": CRITICAL_FREE_BYTES,
+            },
+        )
+
+
 def get_storage_info() -> dict:
     disk = _disk_usage()
+    report_free_space(disk.free)
     videos = _library_snapshot()
     library_bytes = sum(int(item.get("size_bytes") or 0) for item in videos)
     rate, rate_source, rate_samples = _recording_rate(videos)
@@ -211,7 +242,7 @@ def _cleanup_result(
     errors: list[dict],
 ) -> dict:
     after = _disk_usage()
-    return {
+    result = {
         "status": "cleaned" if deleted else "unchanged",
         "trigger": trigger,
         "policy": policy,
@@ -222,6 +253,10 @@ def _cleanup_result(
         "free_after_bytes": after.free,
         "errors": errors,
     }
+    if deleted or errors:
+        events.publish("storage.cleanup", result)
+    report_free_space(after.free)
+    return result
 
 
 def apply_policy(
@@ -0,0 +1,164 @@
+"""Per-second capture telemetry for the active recording.
+
+The frame-index tailer reports every batch of JPEGs it finds on disk, so the
+series shows frame drops while they happen instead of only in the quality
+report after ``/stop``. Each metric is a fixed-size ``array`` used as a ring
+of one slot per wall-clock second, so recording a batch is a few integer
+updates and a long recording never grows the buffer.
+
+Frames are timestamped when the tailer sees them, i.e. with the tailer's
+poll resolution. Frames found in one pass share the time since the previous
+pass, so the gap histogram shows how evenly frames reach the disk.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from array import array
+from typing import Callable
+
+
+METRICS_SECONDS = max(10, int(os.environ.get("MEDICAM_METRICS_SECONDS", "600")))
+# Upper bounds of the inter-frame gap buckets; the last bucket is open-ended.
+GAP_BUCKET_EDGES_MS = (40, 50, 67, 100, 200, 500)
+UNKNOWN = -1
+
+# ``sampler`` returns (audio bytes written so far, disk free bytes); either
+# may be None when unknown.
+Sampler = Callable[[], "tuple[int | None, int | None]"]
+
+
+class CaptureMetrics:
+    def __init__(
+        self,
+        output_file: str | None = None,
+        capacity: int = METRICS_SECONDS,
+        sampler: Sampler | None = None,
+    ):
+        self.output_file = output_file
+        self.capacity = capacity
+        self.sampler = sampler
+        self.frames = array("I", bytes(4 * capacity))
+        self.bytes = array("Q", bytes(8 * capacity))
+        self.audio_bytes = array("q", bytes(8 * capacity))
+        self.jpeg_min = array("I", bytes(4 * capacity))
+        self.jpeg_max = array("I", bytes(4 * capacity))
+        self.disk_free = array("q", bytes(8 * capacity))
+        self.gaps = array("I", bytes(4 * capacity * (len(GAP_BUCKET_EDGES_MS) + 1)))
+        self._lock = threading.Lock()
+        self._first_second: int | None = None
+        self._second: int | None = None
+        self._last_frame_time: float | None = None
+        self._audio_total: int | None = None
+
+    def _clear_slot(self, slot: int) -> None:
+        self.frames[slot] = 0
+        self.bytes[slot] = 0
+        self.audio_bytes[slot] = UNKNOWN
+        self.jpeg_min[slot] = 0
+        self.jpeg_max[slot] = 0
+        self.disk_free[slot] = UNKNOWN
+        buckets = len(GAP_BUCKET_EDGES_MS) + 1
+        for bucket in range(slot * buckets, (slot + 1) * buckets):
+            self.gaps[bucket] = 0
+
+    def _advance(self, second: int) -> int:
+        """Make ``second`` the current slot and return its index."""
+        if self._second is None:
+            self._first_second = second
+            self._second = second - 1
+        if second > self._second:
+            # Close the finished second with the sampled audio and disk state.
+            audio_total, disk_free = self._sample()
+            previous = self._second % self.capacity
+            if audio_total is not None and self._audio_total is not None:
+                self.audio_bytes[previous] = max(0, audio_total - self._audio_total)
+            if audio_total is not None:
+                self._audio_total = audio_total
+            for skipped in range(max(self._second + 1, second - self.capacity + 1), second + 1):
+                self._clear_slot(skipped % self.capacity)
+            self._second = second
+            if disk_free is not None:
+                self.disk_free[second % self.capacity] = disk_free
+        return second % self.capacity
+
+    def _sample(self) -> tuple[int | None, int | None]:
+        if self.sampler is None:
+            return None, None
+        try:
+            return self.sampler()
+        except OSError:
+            return None, None
+
+    def record_frames(self, sizes: list[int], wall_time: float) -> None:
+        """Count a batch of frames the tailer found on disk at ``wall_time``.
+
+        An empty batch only moves the clock, so seconds without any frame
+        still appear in the series.
+        """
+        with self._lock:
+            second = int(wall_time)
+            if self._second is not None and second < self._second:
+                # The wall clock stepped back; keep filling the newest slot.
+                second = self._second
+            slot = self._advance(second)
+            if not sizes:
+                return
+            gap_ms = None
+            if self._last_frame_time is not None:
+                gap_ms = max(0.0, wall_time - self._last_frame_time) * 1000 / len(sizes)
+            self._last_frame_time = wall_time
+            count = self.frames[slot]
+            low = self.jpeg_min[slot] if count else min(sizes)
+            self.frames[slot] = count + len(sizes)
+            self.bytes[slot] += sum(sizes)
+            self.jpeg_min[slot] = min(low, min(sizes))
+            self.jpeg_max[slot] = max(self.jpeg_max[slot], max(sizes))
+            if gap_ms is not None:
+                bucket = len(GAP_BUCKET_EDGES_MS)
+                for position, edge in enumerate(GAP_BUCKET_EDGES_MS):
+                    if gap_ms <= edge:
+                        bucket = position
+                        break
+                self.gaps[slot * (len(GAP_BUCKET_EDGES_MS) + 1) + bucket] += len(sizes)
+
+    def snapshot(self, seconds: int | None = None) -> dict:
+        """Return the last ``seconds`` seconds as parallel per-second lists."""
+        with self._lock:
+            if self._second is None:
+                length = 0
+                start = None
+            else:
+                length = min(self.capacity, self._second - self._first_second + 1)
+                if seconds is not None:
+                    length = min(length, max(0, seconds))
+                start = self._second - length + 1
+            slots = [(start + offset) % self.capacity for offset in range(length)]
+            buckets = len(GAP_BUCKET_EDGES_MS) + 1
+            frames = [self.frames[slot] for slot in slots]
+            byte_counts = [self.bytes[slot] for slot in slots]
+
+            def known(values):
+                return [None if values[slot] == UNKNOWN else values[slot] for slot in slots]
+
+            return {
+                "file": self.output_file,
+                "start": start,
+                "interval_seconds": 1,
+                "frames": frames,
+                "bytes": byte_counts,
+                "audio_bytes": known(self.audio_bytes),
+                "jpeg_min_bytes": [self.jpeg_min[slot] for slot in slots],
+                "jpeg_avg_bytes": [
+                    round(total / count) if count else 0
+                    for total, count in zip(byte_counts, frames)
+                ],
+                "jpeg_max_bytes": [self.jpeg_max[slot] for slot in slots],
+                "gap_bucket_edges_ms": list(GAP_BUCKET_EDGES_MS),
+                "gap_histogram": [
+                    list(self.gaps[slot * buckets:(slot + 1) * buckets])
+                    for slot in slots
+                ],
+                "disk_free_bytes": known(self.disk_free),
+            }
@@ -0,0 +1,127 @@
+"""Time-lapse companion of a recording, cut from the live capture stream.
+
+With ``MEDICAM_TIMELAPSE_FACTOR=N`` a thread follows the frame index of the
+running recording and appends every Nth JPEG to a small MJPEG file next to
+it. Frames are selected from index records like the preview does and read
+at their offsets while they are still in the page cache; nothing is decoded
+or re-encoded. Finalization wraps them into ``<name>-timelapse.mp4`` at the
+recording's frame rate, so an hour at N=60 plays in one minute and the file
+is N times smaller.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+
+from app import frame_index, mp4_mux, preview
+
+
+TIMELAPSE_FACTOR = max(0, int(os.environ.get("MEDICAM_TIMELAPSE_FACTOR", "0")))
+CAPTURE_SUFFIX = ".timelapse.mjpeg"
+OUTPUT_SUFFIX = "-timelapse.mp4"
+POLL_SECONDS = 0.25
+
+
+def enabled() -> bool:
+    return TIMELAPSE_FACTOR > 1
+
+
+def capture_path(output_file: str) -> str:
+    return f"{output_file}{CAPTURE_SUFFIX}"
+
+
+def output_path(output_file: str) -> str:
+    return f"{os.path.splitext(output_file)[0]}{OUTPUT_SUFFIX}"
+
+
+def remove_capture(output_file: str | None) -> None:
+    if not output_file:
+        return
+    path = capture_path(output_file)
+    for leftover in (path, frame_index.index_path(path)):
+        try:
+            os.remove(leftover)
+        except FileNotFoundError:
+            pass
+
+
+class TimelapseWriter:
+    """Append every ``factor``-th JPEG of ``raw_file`` to the time-lapse capture."""
+
+    def __init__(self, raw_file: str, output_file: str, factor: int = TIMELAPSE_FACTOR):
+        self.raw_file = raw_file
+        self.path = capture_path(output_file)
+        self.factor = factor
+        self.frames = 0
+        self.error: str | None = None
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> "TimelapseWriter":
+        self._thread = threading.Thread(
+            target=self._run,
+            name=f"medicam-timelapse-{os.path.basename(self.raw_file)}",
+            daemon=True,
+        )
+        self._thread.start()
+        return self
+
+    def _run(self) -> None:
+        try:
+            with open(self.path, "ab") as output:
+                def write(frame: bytes) -> None:
+                    output.write(frame)
+                    self.frames += 1
+
+                preview.follow_indexed_frames(
+                    self.raw_file,
+                    self._stop,
+                    lambda number: preview.select_frame(number, self.factor, 1),
+                    write,
+                    from_start=True,
+                    drain=True,
+                    poll_seconds=POLL_SECONDS,
+                )
+        except OSError as error:
+            # The time-lapse is a convenience; the recording goes on without it.
+            self.error = f"{type(error).__name__}: {error}"
+
+    def stop(self) -> None:
+        """Copy the frames indexed so far and stop; call after the indexer stopped."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+
+def finalize(output_file: str, fps: float) -> dict | None:
+    """Wrap the time-lapse capture of ``output_file`` into its MP4.
+
+    Returns None when the recording has no time-lapse capture. The capture
+    is removed once the MP4 is published.
+    """
+    path = capture_path(output_file)
+    if not os.path.exists(path):
+        return None
+    frame_index.catch_up(path)
+    frames = frame_index.IndexedFrames(path)
+    if not frames:
+        remove_capture(output_file)
+        return None
+    target = output_path(output_file)
+    partial = f"{target}.part"
+    try:
+        mp4_mux.write_mp4(path, partial, frames, fps)
+        os.replace(partial, target)
+    except BaseException:
+        try:
+            os.remove(partial)
+        except FileNotFoundError:
+            pass
+        raise
+    remove_capture(output_file)
+    return {
+        "file": target,
+        "frames": len(frames),
+        "duration_seconds": round(len(frames) / fps, 3),
+    }
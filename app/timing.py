@@ -0,0 +1,125 @@
+"""Phase timings of the recorder's start and stop operations.
+
+A slow ``/start`` may come from the storage policy deleting files, from ALSA
+open retries or from UVC negotiation; a slow ``/stop`` from the capture
+ignoring SIGINT, the remux or the probe. ``Timeline`` records one span per
+phase of an operation and the response carries them. ``history`` keeps the
+last ``TIMING_HISTORY`` durations of every span so percentiles show which
+phase is usually slow rather than only in the last run.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+TIMING_HISTORY = max(10, int(os.environ.get("MEDICAM_TIMING_HISTORY", "200")))
+PERCENTILES = (50, 90, 99)
+
+
+class Timeline:
+    def __init__(self, operation: str, clock=time.monotonic):
+        self.operation = operation
+        self._clock = clock
+        self.started_at = clock()
+        self.spans: list[dict] = []
+        self._lock = threading.Lock()
+
+    def add(self, name: str, started: float, ended: float, **details) -> None:
+        """Record a phase measured by the caller with the same clock."""
+        span = {
+            "name": name,
+            "start_ms": round((started - self.started_at) * 1000, 1),
+            "duration_ms": round(max(0.0, ended - started) * 1000, 1),
+            **details,
+        }
+        with self._lock:
+            self.spans.append(span)
+
+    @contextmanager
+    def span(self, name: str, **details):
+        started = self._clock()
+        try:
+            yield details
+        finally:
+            self.add(name, started, self._clock(), **details)
+
+    def result(self) -> dict:
+        with self._lock:
+            spans = [dict(span) for span in self.spans]
+        return {
+            "total_ms": round((self._clock() - self.started_at) * 1000, 1),
+            "spans": spans,
+        }
+
+    def finish(self) -> dict:
+        """Return the result and add it to the rolling history."""
+        result = self.result()
+        history.record(self.operation, result)
+        return result
+
+
+def _percentile(ordered: list[float], percent: int) -> float:
+    # Nearest rank, so every value reported was actually observed.
+    rank = max(1, -(-len(ordered) * percent // 100))
+    return ordered[rank - 1]
+
+
+def _stats(values) -> dict:
+    ordered = sorted(values)
+    stats = {"count": len(ordered)}
+    for percent in PERCENTILES:
+        stats[f"p{percent}_ms"] = _percentile(ordered, percent)
+    stats["max_ms"] = ordered[-1]
+    return stats
+
+
+class TimingHistory:
+    def __init__(self, capacity: int = TIMING_HISTORY):
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        self._totals: dict[str, deque] = {}
+        self._spans: dict[str, dict[str, deque]] = {}
+
+    def record(self, operation: str, result: dict) -> None:
+        with self._lock:
+            self._totals.setdefault(
+                operation, deque(maxlen=self.capacity)
+            ).append(result["total_ms"])
+            spans = self._spans.setdefault(operation, {})
+            # A phase that ran several times (audio open retries) counts once
+            # per operation with its summed duration.
+            durations: dict[str, float] = {}
+            for span in result["spans"]:
+                durations[span["name"]] = (
+                    durations.get(span["name"], 0.0) + span["duration_ms"]
+                )
+            for name, duration in durations.items():
+                spans.setdefault(name, deque(maxlen=self.capacity)).append(
+                    round(duration, 1)
+                )
+
+    def summary(self) -> dict:
+        with self._lock:
+            return {
+                operation: {
+                    "total": _stats(totals),
+                    "spans": {
+                        name: _stats(values)
+                        for name, values in self._spans[operation].items()
+                    },
+                }
+                for operation, totals in self._totals.items()
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._totals.clear()
+            self._spans.clear()
+
+
+history = TimingHistory()
@@ -15,6 +15,8 @@ from datetime import datetime, timedelta, timezone
 import json
 from pathlib import Path
 
+from app import events
+
 PROVISION_FILENAME = "provision.json"
 VIDEOS_DIR = "videos"
 API_TOKEN_BYTES = 32
@@ -420,6 +422,43 @@ def get_video_thumbnail_path(filename: str) -> str | None:
     return None
 
 
+def store_video_activity(filename: str, activity: dict) -> None:
+    """Attach the capture activity timeline to the media index entry.
+
+    The recording has just been published, so the entry may not exist yet;
+    it is created from the final file so the next scan keeps it.
+    """
+    filename = _safe_video_filename(filename)
+    path = get_video_path(filename)
+    with _VIDEO_INDEX_LOCK:
+        index = _load_video_index_locked()
+        entries = index["entries"]
+        mtime_ns, size_bytes = _video_fingerprint(path)
+        entry = entries.get(filename)
+        if (
+            not isinstance(entry, dict)
+            or entry.get("mtime_ns") != mtime_ns
+            or entry.get("size_bytes") != size_bytes
+        ):
+            entry = _basic_video_entry(filename, path)
+            entries[filename] = entry
+        entry["activity"] = activity
+        _save_video_index_locked(index)
+
+
+def get_video_activity(filename: str) -> dict | None:
+    filename = _safe_video_filename(filename)
+    for entry in scan_video_library():
+        if entry["filename"] == filename:
+            return entry.get("activity")
+    return None
+
+
+def notify_library_changed(filename: str, action: str) -> None:
+    """Tell ``GET /events`` subscribers that a recording was added or removed."""
+    events.publish("library.changed", {"filename": filename, "action": action})
+
+
 def invalidate_video_cache(filename: str) -> None:
     filename = _safe_video_filename(filename)
     filepath = get_video_path(filename)
@@ -439,6 +478,9 @@ def invalidate_video_cache(filename: str) -> None:
         stale_keys = [key for key in _VIDEO_METADATA_CACHE if key[0] == filepath]
         for key in stale_keys:
             _VIDEO_METADATA_CACHE.pop(key, None)
+    notify_library_changed(
+        filename, "updated" if os.path.exists(filepath) else "removed"
+    )
 
 def get_video_metadata(filepath: str):
     try:
@@ -462,6 +504,7 @@ def get_video_metadata(filepath: str):
             "-show_entries",
             "stream=codec_type,codec_name,width,height,r_frame_rate,channels,sample_rate",
             "-show_entries", "format=duration",
+            "-show_chapters",
             "-of", "json",
             filepath
         ]
@@ -498,6 +541,15 @@ def get_video_metadata(filepath: str):
             "audio_sample_rate": int(audio_stream.get("sample_rate", 0))
             if audio_stream and str(audio_stream.get("sample_rate", "")).isdigit()
             else 0,
+            # Recording markers, written as MP4 chapters at finalization.
+            "chapters": [
+                {
+                    "start": round(float(chapter.get("start_time", 0.0)), 3),
+                    "end": round(float(chapter.get("end_time", 0.0)), 3),
+                    "title": chapter.get("tags", {}).get("title", ""),
+                }
+                for chapter in data.get("chapters", [])
+            ],
         }
         if len(_VIDEO_METADATA_CACHE) >= VIDEO_METADATA_CACHE_LIMIT:
             _VIDEO_METADATA_CACHE.clear()
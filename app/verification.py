@@ -0,0 +1,134 @@
+"""Opt-in full-decode verification of finished recordings.
+
+``/stop`` reports quality from MP4 metadata only. Decoding every frame of a
+long FullHD file takes minutes on the device and competes with the next
+recording for microSD bandwidth, so it runs only on request, one file at a
+time, at idle CPU and IO priority.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import subprocess
+import threading
+from datetime import datetime, timezone
+
+from app import utils
+
+
+VERIFY_MIN_THROUGHPUT_BYTES_PER_SECOND = 2 * 1024 * 1024
+VERIFY_TIMEOUT_MARGIN = 120.0
+LOW_PRIORITY_PREFIX = ["ionice", "-c", "3", "nice", "-n", "19"]
+MAX_RESULTS = 64
+
+_LOCK = threading.Lock()
+_RESULTS: dict[str, dict] = {}
+_QUEUE: list[str] = []
+_WORKER: threading.Thread | None = None
+
+
+def _utc_now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _verify_command(path: str) -> list[str]:
+    return [
+        *LOW_PRIORITY_PREFIX,
+        "ffprobe",
+        "-v", "error",
+        "-count_frames",
+        "-select_streams", "v:0",
+        "-show_entries", "stream=nb_read_frames:format=duration",
+        "-of", "json",
+        path,
+    ]
+
+
+def _verify(filename: str) -> dict:
+    path = utils.get_video_path(filename)
+    size = os.path.getsize(path)
+    result = subprocess.run(
+        _verify_command(path),
+        text=True,
+        capture_output=True,
+        timeout=size / VERIFY_MIN_THROUGHPUT_BYTES_PER_SECOND + VERIFY_TIMEOUT_MARGIN,
+        check=False,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip() or "ffprobe failed")
+    payload = json.loads(result.stdout)
+    streams = payload.get("streams") or []
+    frames = int((streams[0] if streams else {}).get("nb_read_frames") or 0)
+    return {
+        "decoded_frames": frames,
+        "duration_seconds": round(
+            float((payload.get("format") or {}).get("duration") or 0.0), 3
+        ),
+        "decode_errors": result.stderr.strip() or None,
+        "passed": frames > 0 and not result.stderr.strip(),
+    }
+
+
+def _run_queue() -> None:
+    global _WORKER
+    while True:
+        with _LOCK:
+            if not _QUEUE:
+                _WORKER = None
+                return
+            filename = _QUEUE.pop(0)
+            _RESULTS[filename].update({"state": "running", "started_at": _utc_now()})
+        try:
+            outcome = {"state": "completed", **_verify(filename)}
+        except (
+            OSError,
+            ValueError,
+            json.JSONDecodeError,
+            RuntimeError,
+            subprocess.SubprocessError,
+        ) as error:
+            outcome = {"state": "failed", "passed": False, "error": str(error)}
+        with _LOCK:
+            _RESULTS[filename].update({**outcome, "finished_at": _utc_now()})
+
+
+def request_verification(filename: str) -> dict:
+    """Queue a full decode of ``filename`` and return its current job state."""
+    global _WORKER
+    path = utils.get_video_path(filename)
+    if not os.path.isfile(path):
+        raise FileNotFoundError(filename)
+    with _LOCK:
+        current = _RESULTS.get(filename)
+        if current and current["state"] in {"queued", "running"}:
+            return dict(current)
+        while len(_RESULTS) >= MAX_RESULTS:
+            oldest = next(
+                (name for name, job in _RESULTS.items() if name not in _QUEUE),
+                None,
+            )
+            if oldest is None:
+                break
+            del _RESULTS[oldest]
+        _RESULTS[filename] = {
+            "file": filename,
+            "state": "queued",
+            "requested_at": _utc_now(),
+        }
+        _QUEUE.append(filename)
+        if _WORKER is None:
+            _WORKER = threading.Thread(
+                target=_run_queue,
+                name="medicam-verification",
+                daemon=True,
+            )
+            _WORKER.start()
+        return dict(_RESULTS[filename])
+
+
+def get_verification(filename: str) -> dict | None:
+    utils.get_video_path(filename)
+    with _LOCK:
+        job = _RESULTS.get(filename)
+        return dict(job) if job else None
@@ -0,0 +1,130 @@
+"""Event-driven supervision of the capture processes.
+
+The recording watchdog sleeps until a capture process exits or the next disk
+check is due. Process exits arrive through pidfds in a selector, so an
+interruption is seen at once instead of on the next poll. Disk checks are
+spaced by the predicted time until the storage reserve is reached, which
+keeps an idle board from waking up twice a second.
+"""
+
+from __future__ import annotations
+
+import os
+import selectors
+import time
+
+
+# Used where pidfds are unavailable (non-Linux, kernels before 5.3, Python
+# before 3.9). ``os.waitpid`` is no alternative: it would reap the children
+# and take their exit codes away from ``subprocess.Popen``.
+POLL_FALLBACK_SECONDS = 0.5
+STORAGE_CHECK_MIN_SECONDS = 0.5
+STORAGE_CHECK_MAX_SECONDS = 30.0
+# Check again after this share of the predicted time to the reserve, so a
+# burst of writes between two checks cannot overrun it.
+STORAGE_CHECK_SAFETY = 0.5
+
+
+def _process_ids(process) -> list[int]:
+    pids = getattr(process, "pids", None)
+    if pids is None:
+        pids = [getattr(process, "pid", None)]
+    return [pid for pid in pids if isinstance(pid, int) and pid > 0]
+
+
+def _open_pidfd(pid: int) -> int | None:
+    pidfd_open = getattr(os, "pidfd_open", None)
+    if pidfd_open is None:
+        return None
+    try:
+        return pidfd_open(pid)
+    except OSError:
+        return None
+
+
+class ProcessWatch:
+    """Wait for any of the given processes to exit.
+
+    Each process may be a ``Popen`` or an object with a ``pids`` sequence.
+    """
+
+    def __init__(self, processes):
+        self._selector = selectors.DefaultSelector()
+        self._fds: list[int] = []
+        self.event_driven = True
+        for process in processes:
+            if process is None:
+                continue
+            pids = _process_ids(process)
+            if not pids:
+                self.event_driven = False
+            for pid in pids:
+                fd = _open_pidfd(pid)
+                if fd is None:
+                    self.event_driven = False
+                    continue
+                self._fds.append(fd)
+                self._selector.register(fd, selectors.EVENT_READ)
+
+    def wait(self, timeout: float) -> bool:
+        """Block up to ``timeout`` seconds.
+
+        Returns True when the processes should be polled: a watched process
+        exited, or pidfds are unavailable and the fallback interval passed.
+        """
+        timeout = max(0.0, timeout)
+        if not self.event_driven:
+            time.sleep(min(timeout, POLL_FALLBACK_SECONDS))
+            return True
+        if not self._fds:
+            time.sleep(timeout)
+            return False
+        ready = self._selector.select(timeout)
+        for key, _events in ready:
+            # A pidfd stays readable after the exit; report each exit once.
+            self._selector.unregister(key.fd)
+        return bool(ready)
+
+    def close(self) -> None:
+        self._selector.close()
+        for fd in self._fds:
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+        self._fds = []
+
+    def __enter__(self) -> "ProcessWatch":
+        return self
+
+    def __exit__(self, *_exc) -> None:
+        self.close()
+
+
+class FillForecast:
+    """Schedule disk checks from the measured rate the headroom shrinks.
+
+    The prediction uses the fastest rate seen so far, so a pause in writing
+    does not stretch the interval past what a resumed capture could fill.
+    """
+
+    def __init__(self):
+        self._last: tuple[float, int] | None = None
+        self.peak_rate = 0.0
+
+    def next_check_in(self, headroom_bytes: int, now: float | None = None) -> float:
+        now = time.monotonic() if now is None else now
+        if self._last is not None:
+            then, previous = self._last
+            elapsed = now - then
+            if elapsed > 0:
+                rate = (previous - headroom_bytes) / elapsed
+                self.peak_rate = max(self.peak_rate, rate)
+        first_check = self._last is None
+        self._last = (now, headroom_bytes)
+        if first_check or headroom_bytes <= 0:
+            return STORAGE_CHECK_MIN_SECONDS
+        if self.peak_rate <= 0:
+            return STORAGE_CHECK_MAX_SECONDS
+        delay = headroom_bytes / self.peak_rate * STORAGE_CHECK_SAFETY
+        return min(STORAGE_CHECK_MAX_SECONDS, max(STORAGE_CHECK_MIN_SECONDS, delay))
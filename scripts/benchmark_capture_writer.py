@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""Compare sustained write latency of direct raw output and the capture writer.
+
+A producer process emits an MJPEG-sized stream at the capture frame rate the
+way FFmpeg does with ``-flush_packets 1``: one flushed write per frame. In
+``direct`` mode it writes to the raw file itself; in ``writer`` mode it
+writes to the pipe of ``app.capture_writer.CaptureWriter``. The latency of
+each producer write is the time FFmpeg's v4l2 reader would be blocked, so
+its tail decides whether frames are dropped. Run it on the target card:
+
+    python3 scripts/benchmark_capture_writer.py --directory /path/on/microsd
+"""
+
+import argparse
+import json
+import os
+from pathlib import Path
+import subprocess
+import sys
+import tempfile
+import time
+
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+FPS = 30.0
+FRAME_BYTES = 200 * 1024
+
+
+def _produce(output, seconds, fps, frame_bytes):
+    frame = b"\xff\xd8" + os.urandom(max(0, frame_bytes - 4)) + b"\xff\xd9"
+    latencies = []
+    interval = 1.0 / fps
+    next_frame = time.monotonic()
+    deadline = next_frame + seconds
+    while next_frame < deadline:
+        delay = next_frame - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        started = time.monotonic()
+        output.write(frame)
+        output.flush()
+        latencies.append(time.monotonic() - started)
+        next_frame += interval
+    return latencies
+
+
+def _summary(latencies):
+    ordered = sorted(latencies)
+
+    def percentile(share):
+        return ordered[min(len(ordered) - 1, int(share * len(ordered)))]
+
+    late = sum(1 for value in ordered if value > 1.0 / FPS)
+    return {
+        "frames": len(ordered),
+        "p50_ms": round(percentile(0.50) * 1000, 3),
+        "p99_ms": round(percentile(0.99) * 1000, 3),
+        "p999_ms": round(percentile(0.999) * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3),
+        "writes_over_frame_interval": late,
+    }
+
+
+def _run_producer(args, stdout):
+    return subprocess.Popen(
+        [
+            sys.executable,
+            __file__,
+            "--produce",
+            "--seconds", str(args.seconds),
+            "--fps", str(args.fps),
+            "--frame-bytes", str(args.frame_bytes),
+        ],
+        stdout=stdout,
+        stderr=subprocess.PIPE,
+    )
+
+
+def _measure(args, mode, raw_file):
+    from app import capture_writer
+
+    writer = None
+    if mode == "writer":
+        writer = capture_writer.CaptureWriter(raw_file)
+        producer = _run_producer(args, writer.pipe_fd)
+        writer.start()
+    else:
+        with open(raw_file, "wb") as raw:
+            producer = _run_producer(args, raw)
+    _stdout, stderr = producer.communicate()
+    if writer is not None:
+        writer.close()
+    if producer.returncode != 0:
+        raise RuntimeError(stderr.decode("utf-8", errors="replace"))
+    result = _summary(json.loads(stderr))
+    if writer is not None:
+        result["writer"] = writer.stats()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--directory", default=None)
+    parser.add_argument("--seconds", type=float, default=120.0)
+    parser.add_argument("--fps", type=float, default=FPS)
+    parser.add_argument("--frame-bytes", type=int, default=FRAME_BYTES)
+    parser.add_argument("--produce", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.produce:
+        latencies = _produce(sys.stdout.buffer, args.seconds, args.fps, args.frame_bytes)
+        sys.stderr.write(json.dumps(latencies))
+        return 0
+
+    results = {}
+    with tempfile.TemporaryDirectory(dir=args.directory) as directory:
+        for mode in ("direct", "writer"):
+            raw_file = os.path.join(directory, f"{mode}.mjpeg")
+            results[mode] = _measure(args, mode, raw_file)
+            os.remove(raw_file)
+    print(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
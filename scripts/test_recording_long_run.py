@@ -49,6 +49,20 @@ def _api(base_url, token, method, path, timeout=15, form=None):
         raise RuntimeError(f"{method} {path}: HTTP {exc.code}: {body}") from exc
 
 
+def _finalized(base_url, token, stopped, timeout=3 * 60 * 60, poll_interval=5.0):
+    """Follow the job ``/stop`` returned until it has the final response."""
+    job = stopped.get("job")
+    if stopped.get("status") != "finalizing" or not job:
+        return stopped
+    deadline = time.monotonic() + timeout
+    while job["state"] not in {"completed", "failed", "cancelled"}:
+        if time.monotonic() >= deadline:
+            raise RuntimeError(f"finalization did not finish: {job}")
+        time.sleep(poll_interval)
+        job = _api(base_url, token, "GET", f"/recording/finalization/{job['id']}")
+    return job.get("result") or {"status": job["state"], "error": job.get("error")}
+
+
 def _rate(value):
     numerator, denominator = str(value).split("/", maxsplit=1)
     return float(numerator) / float(denominator) if float(denominator) else 0.0
@@ -147,7 +161,7 @@ def _run_one(base_url, token, duration, poll_interval):
     except Exception as exc:
         capture_error = str(exc)
     finally:
-        stopped = _api(base_url, token, "POST", "/stop", timeout=3 * 60 * 60)
+        stopped = _finalized(base_url, token, _api(base_url, token, "POST", "/stop"))
 
     if stopped.get("status") != "recording_stopped" or stopped.get("returncode") != 0:
         raise RuntimeError(f"recording did not finalize: {stopped}")
@@ -0,0 +1,9 @@
+"""JPEG samples shared by the tests that parse frame headers."""
+
+import struct
+
+
+def jpeg(payload: bytes, width: int = 1920, height: int = 1080) -> bytes:
+    """A baseline JPEG whose SOF0 segment carries ``width`` x ``height``."""
+    sof = struct.pack(">HBHHB", 17, 8, height, width, 3) + bytes(9)
+    return b"\xff\xd8\xff\xc0" + sof + payload + b"\xff\xd9"
@@ -0,0 +1,75 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from app import activity, frame_index
+
+
+def jpeg(payload_size: int) -> bytes:
+    return b"\xff\xd8" + b"\x00" * payload_size + b"\xff\xd9"
+
+
+class ActivityTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.raw_file = os.path.join(self.tmp.name, "test.mp4.mjpeg")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _capture(self, sizes):
+        with open(self.raw_file, "wb") as raw:
+            raw.write(b"".join(jpeg(size) for size in sizes))
+        frame_index.catch_up(self.raw_file)
+
+    def test_changing_frame_sizes_mark_the_active_seconds(self):
+        still = [1000] * 10
+        busy = [1000, 1400] * 5
+        self._capture(still + busy + still)
+
+        timeline = activity.compute(self.raw_file, 10.0)
+
+        self.assertEqual(timeline["bucket_seconds"], 1)
+        self.assertEqual(timeline["frames"], 30)
+        self.assertEqual(timeline["levels"][0], 0)
+        self.assertEqual(timeline["levels"][1], 100)
+        self.assertLess(timeline["levels"][2], activity.ACTIVE_LEVEL)
+        self.assertEqual(timeline["mean_frame_bytes"][0], 1004)
+        self.assertEqual(timeline["active_segments"], [{"start": 1, "end": 2}])
+
+    def test_sensor_noise_stays_below_the_active_level(self):
+        self._capture([1000, 1002] * 20)
+
+        timeline = activity.compute(self.raw_file, 10.0)
+
+        self.assertTrue(all(level < activity.ACTIVE_LEVEL for level in timeline["levels"]))
+        self.assertEqual(timeline["active_segments"], [])
+
+    def test_only_muxed_frames_count_and_timestamps_place_them(self):
+        self._capture([1000] * 10 + [5000])
+
+        timeline = activity.compute(
+            self.raw_file, 10.0, 10, timestamps_ms=[0, 100, 200, 300, 400, 1500, 1600, 1700, 1800, 1900]
+        )
+
+        self.assertEqual(timeline["frames"], 10)
+        self.assertEqual(timeline["duration_seconds"], 2.0)
+        self.assertEqual(timeline["mean_frame_bytes"], [1004, 1004])
+
+    def test_long_recordings_use_wider_buckets(self):
+        self._capture([1000] * 40)
+
+        with patch.object(activity, "MAX_BUCKETS", 2):
+            timeline = activity.compute(self.raw_file, 10.0)
+
+        self.assertEqual(timeline["bucket_seconds"], 2)
+        self.assertEqual(len(timeline["levels"]), 2)
+
+    def test_missing_index_has_no_timeline(self):
+        self.assertIsNone(activity.compute(self.raw_file, 30.0))
+        self.assertIsNone(activity.compute(None, 30.0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -107,5 +107,38 @@ class AudioLevelTests(unittest.TestCase):
         sleep_mock.assert_called_once_with(audio.LEVEL_BUSY_RETRY_DELAY)
 
 
+
+class EncodedAudioCaptureTests(unittest.TestCase):
+    @patch("app.audio.subprocess.Popen")
+    def test_stop_signals_arecord_and_waits_for_encoder_drain(self, popen_mock):
+        encoder = Mock()
+        recorder = Mock()
+        popen_mock.side_effect = [encoder, recorder]
+
+        capture = audio.EncodedAudioCapture(["arecord"], ["ffmpeg"], None)
+
+        self.assertIs(popen_mock.call_args_list[1].kwargs["stdout"], encoder.stdin)
+        encoder.stdin.close.assert_called_once()
+        recorder.poll.return_value = 1
+        encoder.poll.return_value = None
+        self.assertIsNone(capture.poll())
+        encoder.poll.return_value = 0
+        self.assertEqual(capture.poll(), 1)
+
+        recorder.wait.return_value = 1
+        capture.send_signal(2)
+        self.assertEqual(capture.wait(timeout=3), 1)
+        recorder.send_signal.assert_called_once_with(2)
+        encoder.send_signal.assert_not_called()
+        encoder.wait.assert_called_once()
+
+    def test_stream_encoder_writes_flushed_adts(self):
+        command = audio.build_aac_stream_command("/run/medicam/a.aac")
+
+        self.assertEqual(command[command.index("-i") + 1], "pipe:0")
+        self.assertEqual(command[command.index("-flush_packets") + 1], "1")
+        self.assertEqual(command[-3:], ["-f", "adts", "/run/medicam/a.aac"])
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -2,11 +2,15 @@ import io
 import json
 import os
 import tempfile
+import threading
 import time
 import unittest
+from datetime import datetime, timezone
+from pathlib import Path
 from unittest.mock import Mock, mock_open, patch
 
-from app import camera
+from app import camera, utils
+from jpeg_samples import jpeg
 
 
 class CameraSettingsTests(unittest.TestCase):
@@ -28,6 +32,7 @@ class CameraSettingsTests(unittest.TestCase):
                 "fps": "30",
                 "audio_enabled": True,
                 "audio_device": "auto",
+                "camera_device": "auto",
             },
         )
 
@@ -39,6 +44,7 @@ class CameraSettingsTests(unittest.TestCase):
                 "fps": "30",
                 "audio_enabled": True,
                 "audio_device": "auto",
+                "camera_device": "auto",
             },
         )
 
@@ -52,6 +58,7 @@ class CameraSettingsTests(unittest.TestCase):
                         "fps": "30",
                         "audio_enabled": True,
                         "audio_device": "auto",
+                        "camera_device": "auto",
                     },
                 )
 
@@ -70,6 +77,7 @@ class CameraSettingsTests(unittest.TestCase):
                 "fps": "30",
                 "audio_enabled": False,
                 "audio_device": "plughw:CARD=Mic,DEV=0",
+                "camera_device": "auto",
             },
         )
 
@@ -120,17 +128,20 @@ class CameraCommandTests(unittest.TestCase):
             self.assertEqual(camera._count_mjpeg_frames(raw.name), 2)
 
     def test_audio_temp_file_uses_memory_backed_storage(self):
-        with patch.object(camera, "AUDIO_TEMP_DIR", "/run/medicam"):
-            with patch("app.camera.os.path.isdir", return_value=True):
-                with patch("app.camera.os.access", return_value=True):
+        for streaming, suffix in ((True, ".aac"), (False, ".pcm")):
+            with self.subTest(streaming=streaming):
+                with patch.object(camera, "AUDIO_TEMP_DIR", "/run/medicam"), \
+                        patch.object(camera, "AUDIO_STREAM_ENCODE_ENABLED", streaming), \
+                        patch("app.camera.os.path.isdir", return_value=True), \
+                        patch("app.camera.os.access", return_value=True):
                     path = camera._build_audio_temp_file(
                         "videos/12-00-00_01.01.2026.mp4"
                     )
 
-        self.assertEqual(
-            path,
-            "/run/medicam/medicam-12-00-00_01.01.2026.mp4.pcm",
-        )
+                self.assertEqual(
+                    path,
+                    f"/run/medicam/medicam-12-00-00_01.01.2026.mp4{suffix}",
+                )
 
     def test_linux_capture_command_streams_camera_mjpeg_with_ffmpeg(self):
         command = camera._build_linux_capture_command(
@@ -152,6 +163,68 @@ class CameraCommandTests(unittest.TestCase):
         self.assertIn("videos/test.mp4.mjpeg", command)
         self.assertIn("copy", command)
 
+    def test_segmented_capture_rotates_raw_mjpeg_files(self):
+        command = camera._build_linux_capture_command(
+            "1920x1080",
+            "30",
+            camera.segments.segment_path("videos/test.mp4", 0),
+            "/dev/v4l/by-id/camera-video-index0",
+            output_args=camera.segments.build_capture_output_args("videos/test.mp4"),
+        )
+
+        self.assertEqual(command[command.index("-f", 1 + command.index("-i")) + 1], "segment")
+        self.assertEqual(
+            command[command.index("-segment_time") + 1],
+            str(camera.segments.SEGMENT_SECONDS),
+        )
+        self.assertEqual(command[-1], "videos/test.mp4.seg%05d.mjpeg")
+
+    def test_capture_writer_mode_pipes_flushed_packets(self):
+        command = camera._build_linux_capture_command(
+            "1920x1080",
+            "30",
+            "videos/test.mp4.mjpeg",
+            "/dev/v4l/by-id/camera-video-index0",
+            output_args=camera._capture_writer_output_args(),
+        )
+
+        self.assertEqual(command[-1], "pipe:1")
+        self.assertNotIn("videos/test.mp4.mjpeg", command)
+        self.assertEqual(command[command.index("-flush_packets") + 1], "1")
+
+    def test_capture_timestamps_are_a_second_output_of_the_same_stream(self):
+        command = camera._build_linux_capture_command(
+            "1920x1080",
+            "30",
+            "videos/test.mp4.mjpeg",
+            "/dev/v4l/by-id/camera-video-index0",
+            output_args=camera._capture_writer_output_args(),
+            record_timestamps=True,
+        )
+
+        self.assertLess(command.index("pipe:1"), command.index("mkvtimestamp_v2"))
+        self.assertEqual(command[-1], "videos/test.mp4.mjpeg.pts")
+        self.assertEqual(command.count("-c:v"), 2)
+
+    @patch("app.camera.mp4_info.read_video_info")
+    def test_probe_counts_missing_frames_from_capture_timestamps(self, info_mock):
+        info_mock.return_value = {
+            "frames": 1797,
+            "duration_seconds": 60.0,
+            "width": 1920,
+            "height": 1080,
+        }
+        timing = {"frames": 1797, "gaps": 1, "missing_frames": 3}
+
+        quality = camera._probe_recording(
+            "videos/test.mp4", 62.0, 30.0, captured_frames=1797, capture_timing=timing
+        )
+
+        self.assertEqual(quality["missing_frames"], 3)
+        self.assertEqual(quality["expected_frames"], 1800)
+        self.assertEqual(quality["capture_timing"], timing)
+        self.assertTrue(quality["healthy"])
+
     def test_linux_ffmpeg_command_remuxes_mjpeg_file_without_reencoding(self):
         command = camera._build_linux_command(
             "videos/test.mp4.mjpeg",
@@ -193,6 +266,107 @@ class CameraCommandTests(unittest.TestCase):
         self.assertNotIn("-an", command)
         self.assertNotIn("libx264", command)
 
+    def test_streamed_aac_is_copied_without_reencoding(self):
+        command = camera._build_linux_command(
+            "videos/test.mp4.mjpeg",
+            "30",
+            "videos/test.mp4",
+            audio_file="/run/medicam/videos-test.mp4.aac",
+            audio_lead_seconds=0.125,
+        )
+
+        self.assertEqual(command[command.index("-f", 10) + 1], "aac")
+        self.assertEqual(command[command.index("-c:a") + 1], "copy")
+        self.assertEqual(command[command.index("-ss") + 1], "0.125000")
+        self.assertNotIn("s16le", command)
+        self.assertNotIn("-af", command)
+        self.assertNotIn("-shortest", command)
+
+    def test_remux_command_maps_chapters_from_ffmetadata(self):
+        command = camera._build_linux_command(
+            "videos/test.mp4.mjpeg",
+            "30",
+            "videos/test.mp4",
+            audio_file="/run/medicam/videos-test.mp4.aac",
+            chapters_file="videos/test.mp4.mjpeg.chapters",
+        )
+
+        self.assertEqual(command[command.index("-i", 16) - 1], "ffmetadata")
+        self.assertEqual(command[command.index("-map_chapters") + 1], "2")
+        self.assertEqual(command[-1], "videos/test.mp4")
+
+    def test_live_mux_command_follows_growing_capture_into_fragmented_mp4(self):
+        command = camera._build_linux_command(
+            "videos/test.mp4.mjpeg",
+            "30",
+            "videos/test.mp4.part",
+            audio_file="/run/medicam/videos-test.mp4.pcm",
+            audio_lead_seconds=0.125,
+            live=True,
+        )
+
+        self.assertEqual(command.count("-follow"), 2)
+        self.assertEqual(command.count("-rw_timeout"), 2)
+        self.assertLess(command.index("-follow"), command.index("-i"))
+        self.assertEqual(command[command.index("-c:v") + 1], "copy")
+        self.assertEqual(
+            command[command.index("-movflags") + 1],
+            "+empty_moov+default_base_moof",
+        )
+        self.assertIn("-frag_duration", command)
+        self.assertEqual(command[-1], "videos/test.mp4.part")
+
+    @patch("app.camera.subprocess.run")
+    def test_fragmented_probe_derives_frames_without_full_scan(self, run_mock):
+        run_mock.return_value = Mock(
+            returncode=0,
+            stdout=json.dumps(
+                {
+                    "streams": [
+                        {
+                            "avg_frame_rate": "30/1",
+                            "width": 1920,
+                            "height": 1080,
+                            "duration": "60.000000",
+                        }
+                    ],
+                    "format": {"duration": "60.02"},
+                }
+            ),
+            stderr="",
+        )
+
+        quality = camera._probe_recording("videos/test.mp4", 60.0, 30.0)
+
+        self.assertEqual(quality["frame_count"], 1800)
+        self.assertTrue(quality["healthy"])
+        self.assertEqual(run_mock.call_count, 1)
+
+    @patch("app.camera.subprocess.run")
+    def test_probe_uses_frame_index_instead_of_decoding_the_mp4(self, run_mock):
+        run_mock.return_value = Mock(
+            returncode=0,
+            stdout=json.dumps(
+                {
+                    "streams": [
+                        {"avg_frame_rate": "30/1", "width": 1920, "height": 1080}
+                    ],
+                    "format": {"duration": "60.0"},
+                }
+            ),
+            stderr="",
+        )
+
+        quality = camera._probe_recording(
+            "videos/test.mp4", 60.0, 30.0, captured_frames=1795
+        )
+
+        self.assertEqual(quality["frame_count"], 1795)
+        self.assertEqual(quality["missing_frames"], 5)
+        self.assertEqual(quality["method"], "frame_index")
+        self.assertEqual(run_mock.call_count, 1)
+        self.assertNotIn("-count_frames", run_mock.call_args.args[0])
+
     @patch("app.camera._remove_file")
     @patch("app.camera._safe_file_size", return_value=9600)
     @patch("app.camera.open", new_callable=mock_open)
@@ -236,48 +410,23 @@ class CameraLifecycleTests(unittest.TestCase):
         os.chdir(self.tmp.name)
         os.makedirs("videos", exist_ok=True)
         camera.RECORDING_STATE_FILE = "videos/.recording-state.json"
-        camera.capture_process = None
-        camera.audio_process = None
-        camera.ffmpeg_process = None
-        camera.ffmpeg_log_file = None
-        camera.recording_output_file = None
-        camera.recording_raw_file = None
-        camera.recording_audio_file = None
-        camera.recording_audio_device = None
-        camera.recording_audio_lead_seconds = 0.0
-        camera.recording_remux_command = None
-        camera.recording_phase = "idle"
-        camera.recording_started_at_monotonic = None
-        camera.recording_started_at_utc = None
-        camera.recording_camera_device = None
-        camera.recording_video_size = None
-        camera.recording_fps = None
-        camera.recording_capture_format = None
-        camera.recording_generation = 0
-        camera.last_recording_error = None
-        camera.recovery_state_loaded = True
+        self.old_queue_file = camera.FINALIZATION_QUEUE_FILE
+        camera.FINALIZATION_QUEUE_FILE = "videos/.finalization-queue.json"
+        camera._status_environment = None
+        camera._status_refresher = None
+        self.recorder = camera.Recorder()
+        self.recorder.recovery_state_loaded = True
+        recorders = patch.multiple(
+            camera, _default_recorder=self.recorder, _recorders={}
+        )
+        recorders.start()
+        self.addCleanup(recorders.stop)
 
     def tearDown(self):
-        camera.capture_process = None
-        camera.audio_process = None
-        camera.ffmpeg_process = None
-        camera.ffmpeg_log_file = None
-        camera.recording_output_file = None
-        camera.recording_raw_file = None
-        camera.recording_audio_file = None
-        camera.recording_audio_device = None
-        camera.recording_audio_lead_seconds = 0.0
-        camera.recording_remux_command = None
-        camera.recording_phase = "idle"
-        camera.recording_started_at_monotonic = None
-        camera.recording_started_at_utc = None
-        camera.recording_camera_device = None
-        camera.recording_video_size = None
-        camera.recording_fps = None
-        camera.recording_capture_format = None
-        camera.last_recording_error = None
-        camera.recovery_state_loaded = False
+        camera._status_environment = None
+        camera._status_refresher = None
         camera.RECORDING_STATE_FILE = self.old_state_file
+        camera.FINALIZATION_QUEUE_FILE = self.old_queue_file
         os.chdir(self.old_cwd)
         self.tmp.cleanup()
 
@@ -294,28 +443,111 @@ class CameraLifecycleTests(unittest.TestCase):
 
         self.assertEqual(response["status"], "error")
         self.assertIn("not available", response["details"])
-        self.assertIsNone(camera.ffmpeg_process)
+        self.assertIsNone(self.recorder.ffmpeg_process)
+
+    @patch("app.camera.Recorder._start_watchdog_locked")
+    @patch("app.camera.frame_index.FrameIndexer")
+    @patch("app.camera.storage_manager.apply_policy")
+    @patch("app.camera.shutil.disk_usage")
+    @patch("app.camera.preview.PREVIEW_ENABLED", False)
+    @patch("app.camera.standby.STANDBY_ENABLED", True)
+    @patch("app.camera.utils.get_output_filename", return_value="videos/test.mp4")
+    @patch("app.camera.platform.system", return_value="Linux")
+    def test_start_claims_a_matching_standby(
+        self,
+        _system,
+        _output_filename,
+        disk_usage,
+        apply_policy,
+        indexer_class,
+        _watchdog,
+    ):
+        disk_usage.return_value = Mock(free=100 * 1024 ** 3)
+        # Three seconds of pre-recorded frames lead the file.
+        indexer_class.return_value.start.return_value = Mock(count=91)
+        video_process = Mock(stdout=None)
+        video_process.poll.return_value = None
+        writer = Mock()
+
+        def arm(path):
+            Path(path).write_bytes(b"\xff\xd8")
+            return 3.0
+
+        writer.arm.side_effect = arm
+        warm = Mock(
+            key=camera._standby_key("1920x1080", "30", False, "auto"),
+            camera_device="/dev/video0",
+            audio_device=None,
+            audio_capture=None,
+            video_process=video_process,
+            writer=writer,
+            storage_cleanup={"deleted": []},
+        )
+        warm.healthy.return_value = True
+        self.recorder.capture_standby = warm
+
+        with patch.dict(
+            camera.camera_settings,
+            {"resolution": "FHD", "fps": "30", "audio_enabled": False},
+        ), patch("app.camera.subprocess.Popen") as popen:
+            response = camera.start_recording()
+
+        self.assertEqual(response["status"], "recording_started")
+        self.assertTrue(response["standby"])
+        self.assertEqual(response["prerecord_seconds"], 3.0)
+        self.assertLess(response["start_latency_seconds"], 1.0)
+        self.assertLess(
+            self.recorder.recording_started_at_monotonic, time.monotonic() - 2.9
+        )
+        self.assertEqual(response["storage_cleanup"], {"deleted": []})
+        self.assertEqual(
+            [span["name"] for span in response["timings"]["spans"]],
+            ["standby_claim", "camera_discovery", "capture_arm", "first_byte"],
+        )
+        popen.assert_not_called()
+        apply_policy.assert_not_called()
+        writer.arm.assert_called_once_with("videos/test.mp4.mjpeg")
+        self.assertIs(self.recorder.capture_process, video_process)
+        self.assertIs(self.recorder.capture_file_writer, writer)
+        self.assertIsNone(self.recorder.capture_standby)
+        self.recorder.capture_file_writer = None
+
+    @patch("app.camera.preview.PREVIEW_ENABLED", False)
+    @patch("app.camera.standby.STANDBY_ENABLED", True)
+    @patch("app.camera.platform.system", return_value="Linux")
+    def test_standby_with_other_settings_is_not_claimed(self, _system):
+        warm = Mock(key=camera._standby_key("1280x720", "30", False, "auto"))
+        warm.healthy.return_value = True
+        self.recorder.capture_standby = warm
+
+        claimed = self.recorder._claim_standby_locked(
+            camera._standby_key("1920x1080", "30", False, "auto")
+        )
+
+        self.assertIsNone(claimed)
+        warm.stop.assert_called_once_with()
+        self.assertIsNone(self.recorder.capture_standby)
 
     def test_stop_reaps_a_process_that_already_exited(self):
         process = Mock()
         process.poll.return_value = 1
         process.stdin = io.BytesIO()
-        camera.ffmpeg_process = process
-        camera.recording_output_file = "videos/interrupted.mp4"
+        self.recorder.ffmpeg_process = process
+        self.recorder.recording_output_file = "videos/interrupted.mp4"
 
         response = camera.stop_recording()
 
         self.assertEqual(response["status"], "recording_stopped")
         self.assertEqual(response["returncode"], 1)
         self.assertIn("already exited", response["warning"])
-        self.assertIsNone(camera.ffmpeg_process)
+        self.assertIsNone(self.recorder.ffmpeg_process)
 
     def test_fast_second_start_is_idempotent(self):
         process = Mock()
         process.poll.return_value = None
-        camera.capture_process = process
-        camera.recording_phase = "recording"
-        camera.recording_output_file = "videos/active.mp4"
+        self.recorder.capture_process = process
+        self.recorder.recording_phase = "recording"
+        self.recorder.recording_output_file = "videos/active.mp4"
 
         response = camera.start_recording()
 
@@ -323,8 +555,8 @@ class CameraLifecycleTests(unittest.TestCase):
         self.assertEqual(response["file"], "videos/active.mp4")
 
     def test_second_stop_during_finalization_is_idempotent(self):
-        camera.recording_phase = "finalizing"
-        camera.recording_output_file = "videos/active.mp4"
+        self.recorder.recording_phase = "finalizing"
+        self.recorder.recording_output_file = "videos/active.mp4"
 
         response = camera.stop_recording()
 
@@ -340,15 +572,15 @@ class CameraLifecycleTests(unittest.TestCase):
     ):
         process = Mock()
         process.poll.return_value = None
-        camera.capture_process = process
-        camera.recording_phase = "recording"
-        camera.recording_output_file = "videos/active.mp4"
-        camera.recording_raw_file = "videos/active.mp4.mjpeg"
-        camera.recording_started_at_monotonic = time.monotonic() - 12
-        camera.recording_camera_device = "/dev/video0"
-        camera.recording_video_size = "1920x1080"
-        camera.recording_fps = "30"
-        with open(camera.recording_raw_file, "wb") as raw:
+        self.recorder.capture_process = process
+        self.recorder.recording_phase = "recording"
+        self.recorder.recording_output_file = "videos/active.mp4"
+        self.recorder.recording_raw_file = "videos/active.mp4.mjpeg"
+        self.recorder.recording_started_at_monotonic = time.monotonic() - 12
+        self.recorder.recording_camera_device = "/dev/video0"
+        self.recorder.recording_video_size = "1920x1080"
+        self.recorder.recording_fps = "30"
+        with open(self.recorder.recording_raw_file, "wb") as raw:
             raw.write(b"frame-data")
 
         status = camera.get_recording_status()
@@ -363,6 +595,67 @@ class CameraLifecycleTests(unittest.TestCase):
         self.assertEqual(status["fps"], "30")
         self.assertTrue(status["camera"]["available"])
 
+    @patch("app.camera.platform.system", return_value="Linux")
+    @patch("app.camera._find_linux_camera_device", return_value="/dev/video0")
+    def test_status_poll_does_not_wait_for_a_running_start(
+        self,
+        _find_camera,
+        _system,
+    ):
+        camera._status_refresher = Mock()
+        camera._status_refresher.is_alive.return_value = True
+        with self.recorder.recording_lock:
+            self.recorder.recording_phase = "starting"
+            self.recorder.recording_output_file = "videos/starting.mp4"
+            self.recorder._persist_recording_state_locked()
+        holding = threading.Event()
+        release = threading.Event()
+
+        def hold_lock():
+            with self.recorder.recording_lock:
+                holding.set()
+                release.wait(5)
+
+        holder = threading.Thread(target=hold_lock)
+        holder.start()
+        holding.wait(5)
+        try:
+            started = time.monotonic()
+            status = camera.get_recording_status()
+            elapsed = time.monotonic() - started
+        finally:
+            release.set()
+            holder.join()
+
+        self.assertLess(elapsed, 0.5)
+        self.assertEqual(status["state"], "starting")
+        self.assertEqual(status["file"], "videos/starting.mp4")
+        self.assertGreater(status["free_space_bytes"], 0)
+        self.assertTrue(status["camera"]["available"])
+
+    @patch("app.camera.events.publish")
+    def test_state_changes_publish_phase_and_error_events(self, publish_mock):
+        with self.recorder.recording_lock:
+            self.recorder._publish_recording_status_locked()
+            self.recorder.recording_phase = "recording"
+            self.recorder.recording_output_file = "videos/evented.mp4"
+            self.recorder._persist_recording_state_locked()
+            self.recorder._persist_recording_state_locked()
+            self.recorder._set_last_error_locked("video_capture_exited", "gone")
+            self.recorder._persist_recording_state_locked()
+
+        published = [call.args for call in publish_mock.call_args_list]
+        self.assertEqual([event_type for event_type, _data in published], [
+            "recording.phase",
+            "recording.error",
+        ])
+        self.assertEqual(published[0][1]["state"], "recording")
+        self.assertEqual(published[0][1]["previous_state"], "idle")
+        self.assertEqual(published[0][1]["file"], "videos/evented.mp4")
+        self.assertEqual(
+            published[1][1]["last_error"]["code"], "video_capture_exited"
+        )
+
     @patch("app.camera.platform.system", return_value="Linux")
     @patch("app.camera._find_linux_camera_device", return_value="/dev/video0")
     def test_backend_restart_restores_raw_recording(
@@ -385,7 +678,7 @@ class CameraLifecycleTests(unittest.TestCase):
                 },
                 state,
             )
-        camera.recovery_state_loaded = False
+        self.recorder.recovery_state_loaded = False
 
         status = camera.get_recording_status()
 
@@ -395,12 +688,12 @@ class CameraLifecycleTests(unittest.TestCase):
         self.assertEqual(status["last_error"]["code"], "backend_restarted")
 
     @patch("app.camera._probe_recording")
-    @patch("app.camera.subprocess.run")
+    @patch("app.camera._run_ffmpeg")
     def test_stop_finalizes_recovered_raw_video(self, run_mock, probe_mock):
         raw_file = "videos/interrupted.mp4.mjpeg"
         with open(raw_file, "wb") as raw:
             raw.write(b"recoverable frames")
-        run_mock.return_value = Mock(returncode=0)
+        run_mock.return_value = 0
         probe_mock.return_value = {
             "valid": True,
             "healthy": True,
@@ -408,11 +701,11 @@ class CameraLifecycleTests(unittest.TestCase):
             "expected_frames": 300,
             "avg_fps": 30.0,
         }
-        camera.recording_phase = "interrupted"
-        camera.recording_output_file = "videos/interrupted.mp4"
-        camera.recording_raw_file = raw_file
-        camera.recording_fps = "30"
-        camera.recording_remux_command = ["ffmpeg", "recover"]
+        self.recorder.recording_phase = "interrupted"
+        self.recorder.recording_output_file = "videos/interrupted.mp4"
+        self.recorder.recording_raw_file = raw_file
+        self.recorder.recording_fps = "30"
+        self.recorder.recording_remux_command = ["ffmpeg", "recover"]
 
         response = camera.stop_recording()
 
@@ -420,25 +713,601 @@ class CameraLifecycleTests(unittest.TestCase):
         self.assertEqual(response["returncode"], 0)
         self.assertTrue(response["recovered"])
         self.assertFalse(os.path.exists(raw_file))
-        self.assertEqual(camera.recording_phase, "idle")
+        self.assertEqual(self.recorder.recording_phase, "idle")
+
+    @patch("app.camera._probe_recording")
+    @patch("app.camera._run_ffmpeg", return_value=0)
+    def test_recovery_takes_wall_duration_from_frame_index(self, _run, probe_mock):
+        raw_file = "videos/indexed.mp4.mjpeg"
+        with open(raw_file, "wb") as raw:
+            raw.write(b"\xff\xd8a\xff\xd9")
+        camera.frame_index.catch_up(raw_file, wall_time=1000.0)
+        with open(raw_file, "ab") as raw:
+            raw.write(b"\xff\xd8b\xff\xd9")
+        os.utime(raw_file, (1010.0, 1010.0))
+        probe_mock.return_value = {"valid": True, "healthy": True}
+        self.recorder.recording_phase = "interrupted"
+        self.recorder.recording_output_file = "videos/indexed.mp4"
+        self.recorder.recording_raw_file = raw_file
+        self.recorder.recording_fps = "30"
+
+        camera.stop_recording()
+
+        self.assertAlmostEqual(probe_mock.call_args.args[1], 10.0 + 1 / 30)
+        self.assertFalse(os.path.exists(camera.frame_index.index_path(raw_file)))
+
+    @patch("app.camera.subprocess.run")
+    def test_stop_wraps_raw_capture_natively_without_ffmpeg(self, run_mock):
+        raw_file = "videos/native.mp4.mjpeg"
+        sof = b"\xff\xc0\x00\x11\x08\x04\x38\x07\x80\x03" + bytes(9)
+        with open(raw_file, "wb") as raw:
+            raw.write((b"\xff\xd8" + sof + b"frame\xff\xd9") * 60)
+        self.recorder.recording_phase = "interrupted"
+        self.recorder.recording_output_file = "videos/native.mp4"
+        self.recorder.recording_raw_file = raw_file
+        self.recorder.recording_fps = "30"
+        self.recorder.recording_remux_command = ["ffmpeg", "recover"]
+
+        response = camera.stop_recording()
+
+        self.assertEqual(response["returncode"], 0)
+        run_mock.assert_not_called()
+        self.assertEqual(response["quality"]["method"], "sample_table")
+        self.assertEqual(response["quality"]["frame_count"], 60)
+        self.assertEqual(response["quality"]["resolution"], "1920x1080")
+        self.assertFalse(os.path.exists(raw_file))
+        self.assertEqual(
+            [span["name"] for span in response["timings"]["spans"]],
+            ["capture_repair", "native_mux", "probe", "activity", "storage_policy"],
+        )
+        timeline = utils.get_video_activity("native.mp4")
+        self.assertEqual(timeline["frames"], 60)
+        self.assertEqual(timeline["levels"], [0, 0])
+
+    @patch("app.camera.subprocess.run")
+    def test_stop_publishes_the_timelapse_next_to_the_recording(self, run_mock):
+        raw_file = "videos/overview.mp4.mjpeg"
+        sof = b"\xff\xc0\x00\x11\x08\x04\x38\x07\x80\x03" + bytes(9)
+        frame = b"\xff\xd8" + sof + b"frame\xff\xd9"
+        with open(raw_file, "wb") as raw:
+            raw.write(frame * 60)
+        # What the time-lapse writer copied with factor 30.
+        with open("videos/overview.mp4.timelapse.mjpeg", "wb") as capture:
+            capture.write(frame * 2)
+        self.recorder.recording_phase = "interrupted"
+        self.recorder.recording_output_file = "videos/overview.mp4"
+        self.recorder.recording_raw_file = raw_file
+        self.recorder.recording_fps = "30"
+        self.recorder.recording_remux_command = ["ffmpeg", "recover"]
+
+        response = camera.stop_recording()
+
+        self.assertEqual(response["returncode"], 0)
+        self.assertEqual(
+            response["timelapse"],
+            {
+                "file": "videos/overview-timelapse.mp4",
+                "frames": 2,
+                "duration_seconds": 0.067,
+            },
+        )
+        self.assertTrue(os.path.exists("videos/overview-timelapse.mp4"))
+        self.assertFalse(os.path.exists("videos/overview.mp4.timelapse.mjpeg"))
+        self.assertIn("timelapse", [span["name"] for span in response["timings"]["spans"]])
+
+    @patch("app.camera.subprocess.Popen")
+    @patch("app.camera.subprocess.run")
+    def test_stop_copies_audio_encoded_while_recording(self, run_mock, popen_mock):
+        raw_file = "videos/native-audio.mp4.mjpeg"
+        audio_file = "videos/native-audio.mp4.aac"
+        sof = b"\xff\xc0\x00\x11\x08\x04\x38\x07\x80\x03" + bytes(9)
+        with open(raw_file, "wb") as raw:
+            raw.write((b"\xff\xd8" + sof + b"frame\xff\xd9") * 60)
+        adts = bytes([0xFF, 0xF1, 0x4C, 0x40, 0x03, 0x7F, 0xFC]) + bytes(20)
+        with open(audio_file, "wb") as aac:
+            aac.write(adts * 120)
+        self.recorder.recording_phase = "interrupted"
+        self.recorder.recording_output_file = "videos/native-audio.mp4"
+        self.recorder.recording_raw_file = raw_file
+        self.recorder.recording_audio_file = audio_file
+        self.recorder.recording_audio_lead_seconds = 0.1
+        self.recorder.recording_fps = "30"
+
+        response = camera.stop_recording()
+
+        self.assertEqual(response["returncode"], 0)
+        self.assertTrue(response["audio_recovered"])
+        run_mock.assert_not_called()
+        popen_mock.assert_not_called()
+        self.assertFalse(os.path.exists(audio_file))
+
+    def test_marker_records_the_newest_indexed_frame(self):
+        with self.assertRaises(camera.HTTPException) as idle:
+            camera.add_recording_marker("Bleeding")
+        self.assertEqual(idle.exception.detail["code"], "no_recording_running")
+
+        self.recorder.recording_phase = "recording"
+        self.recorder.recording_mode = "raw"
+        self.recorder.recording_output_file = "videos/marked.mp4"
+        self.recorder.recording_raw_file = "videos/marked.mp4.mjpeg"
+        self.recorder.recording_fps = "30"
+        self.recorder.frame_indexer = Mock(count=46)
+        try:
+            response = camera.add_recording_marker(" Bleeding ")
+        finally:
+            self.recorder.frame_indexer = None
+
+        self.assertEqual(response["marker"]["frame"], 45)
+        self.assertEqual(response["marker"]["time_seconds"], 1.5)
+        self.assertEqual(response["marker"]["label"], "Bleeding")
+        self.assertEqual(
+            [marker["frame"] for marker in camera.markers.read_markers("videos/marked.mp4.mjpeg")],
+            [45],
+        )
+
+    @patch("app.camera.Recorder._publish_recording_status_locked")
+    @patch("app.camera.events.publish")
+    def test_pause_and_resume_keep_the_capture_running(self, publish_mock, _status_mock):
+        self.recorder.recording_phase = "recording"
+        self.recorder.recording_output_file = "videos/paused.mp4"
+        self.recorder.recording_raw_file = "videos/paused.mp4.mjpeg"
+        self.recorder.recording_started_at_monotonic = time.monotonic() - 10
+        with open("videos/paused.mp4.mjpeg.pts", "w", encoding="ascii") as sidecar:
+            sidecar.write("0\n")
+        with self.assertRaises(camera.HTTPException) as unsupported:
+            camera.pause_recording()
+        self.assertEqual(unsupported.exception.detail["reason"], "capture_writer")
+
+        writer = Mock()
+        writer.resume.return_value = 4096
+        self.recorder.capture_file_writer = writer
+        self.recorder.audio_process = Mock(spec=camera.audio.StandbyAudioCapture)
+        try:
+            self.assertTrue(
+                self.recorder._build_recording_status_locked(0, None)["pause_supported"]
+            )
+            paused = camera.pause_recording()
+            self.assertEqual(camera.pause_recording()["status"], "already_paused")
+            self.recorder.recording_paused_at -= 5
+            resumed = camera.resume_recording()
+            duration = self.recorder._recording_duration_seconds()
+        finally:
+            self.recorder.capture_file_writer = None
+
+        self.assertEqual(paused["status"], "paused")
+        writer.pause.assert_called_once_with()
+        self.recorder.audio_process.pause.assert_called_once_with()
+        self.recorder.audio_process.resume.assert_called_once_with()
+        self.assertFalse(os.path.exists("videos/paused.mp4.mjpeg.pts"))
+        self.assertEqual(resumed["status"], "resumed")
+        self.assertEqual(resumed["section"], 2)
+        self.assertGreaterEqual(resumed["paused_seconds"], 5)
+        self.assertLess(duration, 5.5)
+        self.assertEqual(
+            [entry["section_offset"] for entry in camera.markers.read_sections("videos/paused.mp4.mjpeg")],
+            [4096],
+        )
+        self.assertEqual(
+            [call.args[0] for call in publish_mock.call_args_list],
+            ["recording.paused", "recording.resumed"],
+        )
+
+    def test_pause_needs_an_in_process_audio_pump(self):
+        self.recorder.recording_phase = "recording"
+        self.recorder.recording_output_file = "videos/paused.mp4"
+        self.recorder.capture_file_writer = Mock()
+        self.recorder.audio_process = Mock()
+        try:
+            self.assertFalse(
+                self.recorder._build_recording_status_locked(0, None)["pause_supported"]
+            )
+            with self.assertRaises(camera.HTTPException) as unsupported:
+                camera.pause_recording()
+        finally:
+            self.recorder.capture_file_writer = None
+
+        self.assertEqual(unsupported.exception.detail["code"], "pause_unsupported")
+        self.assertEqual(unsupported.exception.detail["reason"], "audio_capture")
+
+    @patch("app.camera._probe_recording")
+    @patch("app.camera.subprocess.run")
+    def test_stop_writes_markers_as_chapters(self, run_mock, probe_mock):
+        raw_file = "videos/marked.mp4.mjpeg"
+        sof = b"\xff\xc0\x00\x11\x08\x04\x38\x07\x80\x03" + bytes(9)
+        with open(raw_file, "wb") as raw:
+            raw.write((b"\xff\xd8" + sof + b"frame\xff\xd9") * 60)
+        camera.markers.append_marker(raw_file, 30, "Suture")
+        probe_mock.return_value = {"valid": True, "healthy": True}
+        self.recorder.recording_phase = "interrupted"
+        self.recorder.recording_output_file = "videos/marked.mp4"
+        self.recorder.recording_raw_file = raw_file
+        self.recorder.recording_fps = "30"
+
+        response = camera.stop_recording()
+
+        self.assertEqual(response["returncode"], 0)
+        run_mock.assert_not_called()
+        self.assertIn(b"Suture", Path("videos/marked.mp4").read_bytes())
+        self.assertFalse(os.path.exists(camera.markers.markers_path(raw_file)))
+
+    @patch("app.camera._probe_recording")
+    @patch("app.camera.subprocess.run")
+    def test_stop_publishes_streamed_mp4_without_remux(self, run_mock, probe_mock):
+        raw_file = "videos/streamed.mp4.mjpeg"
+        live_file = "videos/streamed.mp4.part"
+        with open(raw_file, "wb") as raw:
+            raw.write(b"frames")
+        with open(live_file, "wb") as fragmented:
+            fragmented.write(b"fragmented mp4")
+        capture = Mock()
+        capture.poll.return_value = None
+        capture.wait.return_value = 255
+        live = Mock()
+        live.poll.return_value = None
+        live.wait.return_value = 0
+        probe_mock.return_value = {"valid": True, "healthy": True}
+        self.recorder.capture_process = capture
+        self.recorder.live_mux_process = live
+        self.recorder.recording_phase = "recording"
+        self.recorder.recording_mode = "fragmented"
+        self.recorder.recording_output_file = "videos/streamed.mp4"
+        self.recorder.recording_raw_file = raw_file
+        self.recorder.recording_live_file = live_file
+        self.recorder.recording_fps = "30"
+
+        response = camera.stop_recording()
+
+        self.assertEqual(response["returncode"], 0)
+        run_mock.assert_not_called()
+        self.assertTrue(os.path.exists("videos/streamed.mp4"))
+        self.assertFalse(os.path.exists(live_file))
+        self.assertFalse(os.path.exists(raw_file))
+
+    @patch("app.camera._probe_recording")
+    @patch("app.camera._run_ffmpeg", return_value=0)
+    def test_incomplete_stream_falls_back_to_raw_remux(self, run_mock, probe_mock):
+        raw_file = "videos/streamed.mp4.mjpeg"
+        live_file = "videos/streamed.mp4.part"
+        with open(raw_file, "wb") as raw:
+            raw.write(b"frames")
+        with open(live_file, "wb") as fragmented:
+            fragmented.write(b"truncated")
+        live = Mock()
+        live.poll.return_value = 0
+        live.wait.return_value = 0
+        probe_mock.return_value = {"valid": True, "healthy": True}
+        self.recorder.live_mux_process = live
+        self.recorder.recording_phase = "interrupted"
+        self.recorder.recording_output_file = "videos/streamed.mp4"
+        self.recorder.recording_raw_file = raw_file
+        self.recorder.recording_live_file = live_file
+        self.recorder.recording_fps = "30"
+        self.recorder.recording_remux_command = ["ffmpeg", "recover"]
+
+        response = camera.stop_recording()
+
+        self.assertEqual(response["returncode"], 0)
+        self.assertIn("Streaming MP4 was incomplete", response["warning"])
+        run_mock.assert_called_once()
+        self.assertFalse(os.path.exists(live_file))
+
+    @patch("app.camera._probe_recording")
+    @patch("app.camera.subprocess.run")
+    def test_stop_publishes_assembled_segments_without_full_remux(
+        self, run_mock, probe_mock
+    ):
+        output_file = "videos/segmented.mp4"
+        with open(camera.segments.assembly_file(output_file), "wb") as part:
+            part.write(b"assembled fragments")
+        assembler = Mock()
+        assembler.finish.return_value = (0, [])
+        assembler.has_audio = False
+        assembler.pending_bytes.return_value = 0
+        capture = Mock()
+        capture.poll.return_value = None
+        capture.wait.return_value = 255
+        probe_mock.return_value = {"valid": True, "healthy": True}
+        self.recorder.capture_process = capture
+        self.recorder.segment_assembler = assembler
+        self.recorder.recording_phase = "recording"
+        self.recorder.recording_mode = "segmented"
+        self.recorder.recording_output_file = output_file
+        self.recorder.recording_raw_file = camera.segments.segment_path(output_file, 3)
+        self.recorder.recording_fps = "30"
+
+        response = camera.stop_recording()
+
+        self.assertEqual(response["returncode"], 0)
+        assembler.finish.assert_called_once()
+        run_mock.assert_not_called()
+        with open(output_file, "rb") as published:
+            self.assertEqual(published.read(), b"assembled fragments")
+        self.assertFalse(
+            os.path.exists(camera.segments.assembly_file(output_file))
+        )
+
+    @patch("app.camera._probe_recording")
+    @patch("app.camera._run_ffmpeg", return_value=0)
+    def test_stop_without_wait_returns_a_finalization_job(self, _run, probe_mock):
+        raw_file = "videos/async.mp4.mjpeg"
+        with open(raw_file, "wb") as raw:
+            raw.write(b"recoverable frames")
+        probe_mock.return_value = {"valid": True, "healthy": True}
+        self.recorder.recording_phase = "interrupted"
+        self.recorder.recording_output_file = "videos/async.mp4"
+        self.recorder.recording_raw_file = raw_file
+        self.recorder.recording_fps = "30"
+        self.recorder.recording_remux_command = ["ffmpeg", "recover"]
+
+        response = camera.stop_recording(wait=False)
+
+        self.assertEqual(response["status"], "finalizing")
+        job = camera.finalization.get_job(response["job"]["id"])
+        self.assertTrue(job.wait(timeout=5))
+        snapshot = job.snapshot()
+        self.assertEqual(snapshot["state"], "completed")
+        self.assertEqual(snapshot["result"]["returncode"], 0)
+        self.assertEqual(self.recorder.recording_phase, "idle")
+        self.assertFalse(os.path.exists(raw_file))
+
+    @patch("app.camera._probe_recording")
+    def test_recorder_slot_is_free_while_previous_recording_finalizes(
+        self, probe_mock
+    ):
+        raw_file = "videos/queued.mp4.mjpeg"
+        with open(raw_file, "wb") as raw:
+            raw.write(b"recoverable frames")
+        probe_mock.return_value = {"valid": True, "healthy": True}
+        release = threading.Event()
+        self.recorder.recording_phase = "interrupted"
+        self.recorder.recording_output_file = "videos/queued.mp4"
+        self.recorder.recording_raw_file = raw_file
+        self.recorder.recording_fps = "30"
+        self.recorder.recording_remux_command = ["ffmpeg", "recover"]
+
+        def slow_remux(*_args, **_kwargs):
+            release.wait(timeout=5)
+            return 0
+
+        with patch("app.camera._run_ffmpeg", side_effect=slow_remux):
+            # A bounded wait hands out the job id once the timeout passed.
+            response = camera.stop_recording(wait=True, timeout=0.05)
+            self.assertEqual(response["status"], "finalizing")
+            job = camera.finalization.get_job(response["job"]["id"])
+
+            self.assertEqual(self.recorder.recording_phase, "idle")
+            self.assertIsNone(self.recorder.recording_output_file)
+            with open(camera.FINALIZATION_QUEUE_FILE, encoding="utf-8") as queue:
+                self.assertEqual(json.load(queue)[0]["output_file"], "videos/queued.mp4")
+            second_stop = camera.stop_recording(wait=False)
+            self.assertEqual(second_stop["status"], "already_finalizing")
+            self.assertEqual(second_stop["job"]["id"], job.id)
+            release.set()
+            self.assertTrue(job.wait(timeout=5))
+
+        self.assertEqual(job.snapshot()["state"], "completed")
+        self.assertFalse(os.path.exists(raw_file))
+        self.assertFalse(os.path.exists(camera.FINALIZATION_QUEUE_FILE))
+
+    @patch("app.camera._probe_recording")
+    @patch("app.camera._run_ffmpeg", return_value=0)
+    def test_backend_restart_resumes_queued_finalization(self, _run, probe_mock):
+        raw_file = "videos/resumed.mp4.mjpeg"
+        with open(raw_file, "wb") as raw:
+            raw.write(b"recoverable frames")
+        with open(camera.FINALIZATION_QUEUE_FILE, "w", encoding="utf-8") as queue:
+            json.dump(
+                [{
+                    "output_file": "videos/resumed.mp4",
+                    "raw_file": raw_file,
+                    "mode": "raw",
+                    "fps": "30",
+                    "state": "running",
+                }],
+                queue,
+            )
+        probe_mock.return_value = {"valid": True, "healthy": True}
+        self.recorder.recovery_state_loaded = False
+
+        with self.recorder.recording_lock:
+            self.recorder._restore_recording_state_locked()
+        self.assertTrue(self.recorder.finalization_job.wait(timeout=5))
+
+        self.assertEqual(self.recorder.recording_phase, "idle")
+        self.assertEqual(self.recorder.finalization_job.snapshot()["state"], "completed")
+        self.assertFalse(os.path.exists(raw_file))
+        self.assertFalse(os.path.exists(camera.FINALIZATION_QUEUE_FILE))
+
+    @patch("app.camera.time.monotonic")
+    def test_capture_pressure_follows_indexed_frame_rate(self, monotonic_mock):
+        indexer = Mock(count=0)
+        self.recorder.frame_indexer = indexer
+        self.recorder.capture_process = Mock()
+        self.recorder.recording_phase = "recording"
+        self.recorder.recording_fps = "30"
+
+        monotonic_mock.return_value = 100.0
+        self.assertFalse(camera._capture_write_pressure())
+        indexer.count = 30
+        monotonic_mock.return_value = 101.0
+        self.assertFalse(camera._capture_write_pressure())
+        indexer.count = 45
+        monotonic_mock.return_value = 102.0
+        self.assertTrue(camera._capture_write_pressure())
+        self.recorder.recording_phase = "idle"
+        self.assertFalse(camera._capture_write_pressure())
+
+    def test_first_segment_is_indexed_once(self):
+        output_file = "videos/segmented.mp4"
+        first_segment = camera.segments.segment_path(output_file, 0)
+        with open(first_segment, "wb") as raw:
+            raw.write(jpeg(b"a") + jpeg(b"b"))
+        indexer = camera.frame_index.FrameIndexer(first_segment, poll_interval=0.01)
+        self.recorder.frame_indexer = indexer.start()
+        self.recorder.recording_raw_file = first_segment
+        assembler = self.recorder._create_segment_assembler(
+            output_file, "30", None, 0.0, generation=self.recorder.recording_generation
+        )
+        try:
+            assembler.on_segment_opened(first_segment)
+            self.assertIs(self.recorder.frame_indexer, indexer)
+            with open(first_segment, "ab") as raw:
+                raw.write(jpeg(b"c"))
+        finally:
+            self.recorder.frame_indexer.stop()
+
+        offsets = [
+            record.offset
+            for record in camera.frame_index.iter_records(first_segment)
+        ]
+        self.assertEqual(len(offsets), 3)
+        self.assertEqual(len(set(offsets)), 3)
+
+    @patch("app.camera.Recorder._publish_recording_status_locked")
+    @patch("app.camera.events.publish")
+    @patch("app.camera.time.monotonic")
+    def test_paused_capture_does_not_throttle_finalization(
+        self, monotonic_mock, _publish_mock, _status_mock
+    ):
+        indexer = Mock(count=0)
+        self.recorder.frame_indexer = indexer
+        self.recorder.capture_process = Mock()
+        self.recorder.capture_file_writer = Mock()
+        self.recorder.recording_phase = "recording"
+        self.recorder.recording_fps = "30"
+        self.recorder.recording_output_file = "videos/paused.mp4"
+        self.recorder.recording_raw_file = "videos/paused.mp4.mjpeg"
+        monotonic_mock.return_value = 100.0
+        self.assertFalse(camera.finalization.capture_under_pressure())
+        try:
+            camera.pause_recording()
+            for now in (101.0, 102.0, 103.0):
+                monotonic_mock.return_value = now
+                self.assertFalse(camera.finalization.capture_under_pressure())
+            self.recorder.capture_file_writer.resume.return_value = None
+            camera.resume_recording()
+            # The window restarts at resume instead of spanning the pause.
+            indexer.count = 5
+            self.assertFalse(camera.finalization.capture_under_pressure())
+            indexer.count = 35
+            monotonic_mock.return_value = 104.0
+            self.assertFalse(camera.finalization.capture_under_pressure())
+        finally:
+            self.recorder.capture_file_writer = None
+
+    def test_cancelled_finalization_keeps_raw_source(self):
+        raw_file = "videos/cancelled.mp4.mjpeg"
+        with open(raw_file, "wb") as raw:
+            raw.write(b"recoverable frames")
+        self.recorder.recording_phase = "interrupted"
+        self.recorder.recording_output_file = "videos/cancelled.mp4"
+        self.recorder.recording_raw_file = raw_file
+        self.recorder.recording_fps = "30"
+        self.recorder.recording_remux_command = ["ffmpeg", "recover"]
+
+        def cancelled_remux(command, log_output, timeout, job=None, **_kwargs):
+            job.cancel()
+            with open("videos/cancelled.mp4", "wb") as partial:
+                partial.write(b"partial")
+            raise camera.finalization.FinalizationCancelled(job.id)
+
+        with patch("app.camera._run_ffmpeg", side_effect=cancelled_remux):
+            response = camera.stop_recording()
+
+        job = camera.finalization.get_job(response["finalization_job"])
+        self.assertTrue(response["cancelled"])
+        self.assertTrue(response["recoverable"])
+        self.assertEqual(job.snapshot()["state"], "cancelled")
+        self.assertTrue(os.path.exists(raw_file))
+        self.assertFalse(os.path.exists("videos/cancelled.mp4"))
+        self.assertEqual(self.recorder.recording_phase, "interrupted")
+        self.assertEqual(
+            self.recorder.last_recording_error["code"],
+            "recording_finalization_cancelled",
+        )
+
+    @patch("app.camera.subprocess.Popen")
+    def test_ffmpeg_progress_is_reported_to_the_job(self, popen_mock):
+        process = Mock()
+        process.stdout = io.StringIO("total_size=4096\nprogress=end\n")
+        process.wait.return_value = 0
+        popen_mock.return_value = process
+        job = camera.finalization.create_job("videos/progress.mp4")
+
+        return_code = camera._run_ffmpeg(
+            ["ffmpeg", "-i", "in", "out.mp4"],
+            None,
+            10.0,
+            job,
+            phase="remuxing",
+            expected_bytes=8192,
+        )
+
+        self.assertEqual(return_code, 0)
+        self.assertEqual(
+            popen_mock.call_args.args[0][-3:],
+            ["-progress", "pipe:1", "out.mp4"],
+        )
+        snapshot = job.snapshot()
+        self.assertEqual(snapshot["phase"], "remuxing")
+        self.assertEqual(snapshot["bytes_done"], 4096)
+        self.assertEqual(snapshot["progress"], 0.5)
 
-    @patch("app.camera.subprocess.run", return_value=Mock(returncode=1))
+    @patch("app.camera._probe_recording", return_value={"valid": True, "healthy": True})
+    @patch("app.camera._remux_raw_recording", return_value=(0, False, []))
+    def test_interrupted_capture_is_repaired_and_reports_lost_time(
+        self,
+        remux_mock,
+        _probe,
+    ):
+        raw_file = "videos/crashed.mp4.mjpeg"
+        with open(raw_file, "wb") as raw:
+            raw.write(b"".join(b"\xff\xd8" + bytes(10) + b"\xff\xd9" for _ in range(30)))
+            raw.write(b"\xff\xd8torn")
+        os.utime(raw_file, (1000.0, 1000.0))
+        sizes = []
+        remux_mock.side_effect = lambda *args, **kwargs: (
+            sizes.append(os.path.getsize(raw_file)) or (0, False, [])
+        )
+        self.recorder.recording_phase = "interrupted"
+        self.recorder.recording_output_file = "videos/crashed.mp4"
+        self.recorder.recording_raw_file = raw_file
+        self.recorder.recording_fps = "30"
+        self.recorder.last_recording_error = {
+            "code": "backend_restarted",
+            "message": "Backend restarted before the recording was finalized",
+            "at": datetime.fromtimestamp(1010.0, timezone.utc).isoformat(),
+            "recoverable": True,
+        }
+
+        response = camera.stop_recording()
+
+        self.assertEqual(response["returncode"], 0)
+        self.assertEqual(sizes, [30 * 14])
+        recovery = response["recovery"]
+        self.assertEqual(recovery["frames"], 30)
+        self.assertEqual(recovery["truncated_bytes"], 6)
+        self.assertEqual(recovery["recovered_seconds"], 1.0)
+        self.assertAlmostEqual(recovery["lost_after_last_frame_seconds"], 9.967)
+        self.assertFalse(recovery["index_rebuilt"])
+
+    @patch("app.camera._run_ffmpeg", return_value=1)
     def test_failed_recovery_preserves_raw_source(self, _run):
         raw_file = "videos/interrupted.mp4.mjpeg"
         with open(raw_file, "wb") as raw:
             raw.write(b"recoverable frames")
-        camera.recording_phase = "interrupted"
-        camera.recording_output_file = "videos/interrupted.mp4"
-        camera.recording_raw_file = raw_file
-        camera.recording_fps = "30"
-        camera.recording_remux_command = ["ffmpeg", "recover"]
+        self.recorder.recording_phase = "interrupted"
+        self.recorder.recording_output_file = "videos/interrupted.mp4"
+        self.recorder.recording_raw_file = raw_file
+        self.recorder.recording_fps = "30"
+        self.recorder.recording_remux_command = ["ffmpeg", "recover"]
 
         response = camera.stop_recording()
 
         self.assertNotEqual(response["returncode"], 0)
         self.assertTrue(response["recoverable"])
         self.assertTrue(os.path.exists(raw_file))
-        self.assertEqual(camera.recording_phase, "interrupted")
+        self.assertEqual(self.recorder.recording_phase, "interrupted")
 
     @patch("app.camera._stop_capture_process")
     def test_video_disconnect_marks_interrupted_and_stops_audio(self, stop_mock):
@@ -446,16 +1315,18 @@ class CameraLifecycleTests(unittest.TestCase):
         video.poll.return_value = 1
         microphone = Mock()
         microphone.poll.return_value = None
-        camera.capture_process = video
-        camera.audio_process = microphone
-        camera.recording_phase = "recording"
-        camera.recording_output_file = "videos/interrupted.mp4"
-        camera.recording_raw_file = "videos/interrupted.mp4.mjpeg"
+        self.recorder.capture_process = video
+        self.recorder.audio_process = microphone
+        self.recorder.recording_phase = "recording"
+        self.recorder.recording_output_file = "videos/interrupted.mp4"
+        self.recorder.recording_raw_file = "videos/interrupted.mp4.mjpeg"
 
-        camera._refresh_recording_state_locked()
+        self.recorder._refresh_recording_state_locked(0)
 
-        self.assertEqual(camera.recording_phase, "interrupted")
-        self.assertEqual(camera.last_recording_error["code"], "video_capture_exited")
+        self.assertEqual(self.recorder.recording_phase, "interrupted")
+        self.assertEqual(
+            self.recorder.last_recording_error["code"], "video_capture_exited"
+        )
         stop_mock.assert_called_once_with(microphone)
 
     @patch("app.camera.shutil.disk_usage", return_value=Mock(free=0))
@@ -467,22 +1338,189 @@ class CameraLifecycleTests(unittest.TestCase):
     ):
         video = Mock()
         video.poll.return_value = None
-        camera.capture_process = video
-        camera.recording_phase = "recording"
-        camera.recording_output_file = "videos/storage.mp4"
-        camera.recording_raw_file = "videos/storage.mp4.mjpeg"
-        with open(camera.recording_raw_file, "wb") as raw:
+        self.recorder.capture_process = video
+        self.recorder.recording_phase = "recording"
+        self.recorder.recording_output_file = "videos/storage.mp4"
+        self.recorder.recording_raw_file = "videos/storage.mp4.mjpeg"
+        with open(self.recorder.recording_raw_file, "wb") as raw:
             raw.write(b"frame")
 
-        camera._refresh_recording_state_locked()
+        self.recorder._refresh_recording_state_locked(0)
 
-        self.assertEqual(camera.recording_phase, "interrupted")
+        self.assertEqual(self.recorder.recording_phase, "interrupted")
         self.assertEqual(
-            camera.last_recording_error["code"],
+            self.recorder.last_recording_error["code"],
             "storage_reserve_reached",
         )
         stop_mock.assert_any_call(video)
 
+    def test_metrics_stay_readable_after_the_recording_stops(self):
+        self.assertIsNone(camera.get_recording_metrics())
+        self.recorder.capture_metrics = camera.telemetry.CaptureMetrics("videos/m.mp4")
+        self.recorder.capture_metrics.record_frames([100] * 30, 10.0)
+        self.recorder.recording_phase = "recording"
+        self.recorder.recording_output_file = "videos/m.mp4"
+
+        self.assertTrue(camera.get_recording_metrics()["active"])
+
+        self.recorder.recording_phase = "idle"
+        metrics = camera.get_recording_metrics(seconds=1)
+        self.assertFalse(metrics["active"])
+        self.assertEqual((metrics["file"], metrics["frames"]), ("videos/m.mp4", [30]))
+
+    @patch("app.camera._preview_call")
+    @patch("app.camera.shutil.disk_usage")
+    @patch("app.camera._stop_capture_process")
+    def test_watchdog_wakes_on_exit_and_spaces_disk_checks(
+        self,
+        stop_mock,
+        disk_usage_mock,
+        preview_mock,
+    ):
+        video = Mock()
+        video.poll.return_value = None
+        self.recorder.capture_process = video
+        self.recorder.recording_phase = "recording"
+        self.recorder.recording_output_file = "videos/watched.mp4"
+        self.recorder.recording_raw_file = "videos/watched.mp4.mjpeg"
+        disk_usage_mock.return_value = Mock(free=camera.MIN_RECORDING_FREE_BYTES * 4)
+        clock = [100.0]
+        watch = Mock()
+
+        def wait(timeout):
+            if len(watch.wait.call_args_list) == 3:
+                video.poll.return_value = 1
+                return True
+            clock[0] += max(0.0, timeout)
+            return False
+
+        watch.wait.side_effect = wait
+        watch.__enter__ = Mock(return_value=watch)
+        watch.__exit__ = Mock(return_value=None)
+        with patch("app.camera.watchdog.ProcessWatch", return_value=watch), patch(
+            "app.camera.time.monotonic", side_effect=lambda: clock[0]
+        ), patch("app.camera.Recorder._publish_recording_status_locked") as publish_mock:
+            self.recorder._watch_recording(self.recorder.recording_generation, [video])
+
+        self.assertEqual(self.recorder.recording_phase, "interrupted")
+        self.assertEqual(
+            self.recorder.last_recording_error["code"], "video_capture_exited"
+        )
+        # Process state is only polled once the watch reports an exit.
+        self.assertEqual(video.poll.call_count, 1)
+        # An idle disk is checked once to measure and once to find no change.
+        self.assertEqual(disk_usage_mock.call_count, 2)
+        preview_mock.assert_any_call("recording_finished")
+        publish_mock.assert_called()
+
+    @patch("app.camera._preview_call")
+    @patch("app.camera.Recorder._start_watchdog_locked")
+    @patch(
+        "app.camera._wait_for_first_capture_byte",
+        side_effect=lambda *args, **kwargs: time.monotonic(),
+    )
+    @patch("app.camera.frame_index.FrameIndexer")
+    @patch("app.camera.storage_manager.apply_policy", return_value=None)
+    @patch("app.camera.shutil.disk_usage")
+    @patch("app.camera.capture_writer.CAPTURE_WRITER_ENABLED", False)
+    @patch("app.camera.timelapse.enabled", return_value=False)
+    @patch("app.camera.standby.STANDBY_ENABLED", False)
+    @patch(
+        "app.camera.utils.get_output_filename",
+        return_value="videos/12-00-00_17.10.2026.mp4",
+    )
+    @patch("app.camera.platform.system", return_value="Linux")
+    def test_two_cameras_record_side_by_side(
+        self,
+        _system,
+        _output_filename,
+        _timelapse,
+        disk_usage,
+        _apply_policy,
+        _indexer_class,
+        _first_byte,
+        _watchdog,
+        preview_mock,
+    ):
+        second = "/dev/v4l/by-id/usb-Second_Cam-video-index0"
+        disk_usage.return_value = Mock(free=100 * 1024 ** 3)
+
+        def find(timeout=0.0, candidates=None, exclude=frozenset()):
+            for path in candidates or [second, "/dev/video0"]:
+                if os.path.realpath(path) not in exclude:
+                    return path
+            return None
+
+        def popen(*_args, **_kwargs):
+            process = Mock(stdout=None)
+            process.poll.return_value = None
+            return process
+
+        with patch("app.camera._find_linux_camera_device", side_effect=find), patch(
+            "app.camera.list_camera_devices", return_value=[{"id": second}]
+        ), patch("app.camera.subprocess.Popen", side_effect=popen), patch.dict(
+            camera.camera_settings,
+            {"resolution": "FHD", "fps": "30", "audio_enabled": True},
+        ):
+            second_started = camera.start_recording(second)
+            preview_calls = preview_mock.call_count
+            camera.camera_settings["audio_enabled"] = False
+            default_started = camera.start_recording()
+            second_status = camera.get_recording_status(second)
+
+        recorder = camera._recorders[second]
+        self.assertEqual(second_started["status"], "recording_started")
+        self.assertEqual(second_started["device"], second)
+        self.assertFalse(second_started["audio"]["enabled"])
+        self.assertEqual(
+            second_started["file"], "videos/12-00-00_17.10.2026--usb-Second_Cam.mp4"
+        )
+        self.assertEqual(preview_calls, 0)
+        self.assertEqual(default_started["status"], "recording_started")
+        # The default camera skips the device the other recorder holds.
+        self.assertEqual(default_started["device"], "/dev/video0")
+        self.assertEqual(default_started["file"], "videos/12-00-00_17.10.2026.mp4")
+        self.assertEqual(second_status["state"], "recording")
+        self.assertEqual(second_status["camera"]["id"], second)
+        self.assertEqual(
+            recorder.state_file, "videos/.recording-state--usb-Second_Cam.json"
+        )
+        self.assertTrue(os.path.isfile(recorder.state_file))
+        self.assertTrue(os.path.isfile(camera.RECORDING_STATE_FILE))
+        self.assertEqual(recorder.queue_name, second)
+        self.assertIsNot(recorder.recording_lock, self.recorder.recording_lock)
+
+    def test_unknown_camera_has_no_recorder(self):
+        with patch("app.camera.list_camera_devices", return_value=[]):
+            with self.assertRaises(camera.HTTPException) as context:
+                camera.get_recording_status("/dev/v4l/by-id/usb-Gone-video-index0")
+
+        self.assertEqual(context.exception.status_code, 404)
+        self.assertEqual(context.exception.detail["code"], "camera_not_found")
+        self.assertEqual(camera._recorders, {})
+
+    def test_restart_restores_the_recorders_of_other_cameras(self):
+        second = "/dev/v4l/by-id/usb-Second_Cam-video-index0"
+        with open(
+            "videos/.finalization-queue--usb-Second_Cam.json", "w", encoding="utf-8"
+        ) as queue:
+            json.dump(
+                [{"output_file": "videos/a.mp4", "camera_device": second}], queue
+            )
+        with open(
+            "videos/.recording-state--usb-Other.json", "w", encoding="utf-8"
+        ) as state:
+            # Named after another camera than the one it claims.
+            json.dump({"camera_device": second.replace("Second", "Third")}, state)
+
+        camera._restore_recorders()
+
+        self.assertEqual(list(camera._recorders), [second])
+        self.assertEqual(
+            camera._recorders[second].queue_file,
+            "videos/.finalization-queue--usb-Second_Cam.json",
+        )
+
     @patch("app.camera.glob.glob")
     @patch("app.camera._is_character_device", return_value=True)
     def test_camera_discovery_prefers_stable_by_id_capture_link(
@@ -498,6 +1536,33 @@ class CameraLifecycleTests(unittest.TestCase):
 
         self.assertEqual(candidates[0], by_id)
 
+    @patch("app.camera.platform.system", return_value="Linux")
+    @patch("app.camera.os.path.realpath", side_effect=lambda path: path.replace("by-id/", ""))
+    @patch("app.camera.glob.glob")
+    @patch("app.camera._is_character_device", return_value=True)
+    def test_selected_camera_is_pinned_by_its_by_id_path(
+        self,
+        _is_character_device,
+        glob_mock,
+        _realpath,
+        _system,
+    ):
+        first = "/dev/v4l/by-id/usb-left-video-index0"
+        second = "/dev/v4l/by-id/usb-right-video-index0"
+        glob_mock.side_effect = lambda pattern: (
+            [first, second] if "by-id" in pattern else []
+        )
+
+        with patch.dict(os.environ, {}, clear=True), patch.dict(
+            camera.camera_settings, {"camera_device": second}
+        ):
+            candidates = camera._camera_candidates()
+            devices = camera.list_camera_devices()
+
+        self.assertEqual(candidates, [second])
+        self.assertEqual([item["id"] for item in devices], [first, second])
+        self.assertEqual([item["selected"] for item in devices], [False, True])
+
 
 if __name__ == "__main__":
     unittest.main()
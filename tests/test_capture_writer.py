@@ -0,0 +1,119 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from app import capture_writer
+
+
+def _produce(pipe_fd: int, size: int, chunk: int = 40_000):
+    script = (
+        "import sys\n"
+        f"data = (bytes(range(256)) * ({size} // 256 + 1))[:{size}]\n"
+        f"for start in range(0, {size}, {chunk}):\n"
+        f"    sys.stdout.buffer.write(data[start:start + {chunk}])\n"
+        "    sys.stdout.buffer.flush()\n"
+    )
+    return subprocess.Popen([sys.executable, "-c", script], stdout=pipe_fd)
+
+
+class RecordingWriter(capture_writer.CaptureWriter):
+    def __init__(self, raw_file):
+        super().__init__(raw_file)
+        self.offsets = []
+
+    def _write(self, data):
+        self.offsets.append((self.bytes_written, len(data)))
+        super()._write(data)
+
+
+class CaptureWriterTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.raw_file = os.path.join(self.tmp.name, "test.mp4.mjpeg")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_pipe_is_copied_in_aligned_writes(self):
+        size = 3 * 1024 * 1024 + 123
+        writer = RecordingWriter(self.raw_file)
+        producer = _produce(writer.pipe_fd, size)
+        writer.start()
+        producer.wait()
+        writer.close()
+
+        expected = (bytes(range(256)) * (size // 256 + 1))[:size]
+        with open(self.raw_file, "rb") as raw:
+            self.assertEqual(raw.read(), expected)
+        self.assertIsNone(writer.error)
+        self.assertEqual(writer.bytes_written, size)
+        # Only the final drain at EOF may end off the alignment grid, plus
+        # latency flushes when the producer paused on a partial block.
+        aligned = [
+            offset + length
+            for offset, length in writer.offsets[:-1]
+            if (offset + length) % capture_writer.WRITE_ALIGNMENT == 0
+        ]
+        self.assertTrue(aligned)
+        self.assertLess(len(writer.offsets), size // 40_000)
+
+    @patch("app.capture_writer.drop_cache")
+    @patch("app.capture_writer.start_writeback")
+    def test_old_windows_are_written_back_and_dropped(self, writeback_mock, drop_mock):
+        window = 256 * 1024
+        with patch.object(capture_writer, "WRITEBACK_WINDOW_BYTES", window):
+            writer = capture_writer.CaptureWriter(self.raw_file)
+            producer = _produce(writer.pipe_fd, 5 * window)
+            writer.start()
+            producer.wait()
+            writer.close()
+
+        first = writeback_mock.call_args_list[0]
+        self.assertEqual(first.args[1], 0)
+        self.assertEqual(first.args[2] % window, 0)
+        dropped = sum(call.args[2] for call in drop_mock.call_args_list)
+        self.assertEqual(
+            dropped,
+            5 * window - capture_writer.CACHE_KEEP_WINDOWS * window,
+        )
+
+    def test_pause_cuts_the_stream_at_jpeg_boundaries(self):
+        frame = b"\xff\xd8" + b"x" * 20 + b"\xff\xd9"
+        writer = capture_writer.CaptureWriter(self.raw_file)
+
+        def feed(chunk):
+            # What the writer thread does with every chunk it reads.
+            data = writer._paused_data(chunk)
+            if data:
+                writer._last_byte = data[-1:]
+                writer._buffer.extend(data)
+            return data
+
+        feed(frame[:10])
+        writer.pause()
+        # The JPEG in progress is finished, the rest of the stream dropped.
+        self.assertEqual(feed(frame[10:-1]), frame[10:-1])
+        self.assertEqual(feed(frame[-1:] + frame[:5]), frame[-1:])
+        self.assertEqual(feed(frame[5:] + frame), b"")
+        offset = writer.resume()
+        data = feed(frame[7:] + frame[:1]) + feed(frame[1:])
+        writer.close()
+
+        self.assertEqual(offset, len(frame))
+        self.assertEqual(data, frame)
+        self.assertEqual(bytes(writer._buffer), frame * 2)
+        self.assertIsNone(writer.resume())
+
+    def test_unstarted_writer_closes_cleanly(self):
+        writer = capture_writer.CaptureWriter(self.raw_file)
+
+        writer.close()
+
+        self.assertEqual(os.path.getsize(self.raw_file), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
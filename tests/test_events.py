@@ -0,0 +1,98 @@
+import asyncio
+import threading
+import unittest
+from unittest.mock import patch
+
+from app import events, finalization, storage_manager
+
+
+class EventBusTests(unittest.TestCase):
+    def test_event_published_from_a_thread_reaches_the_loop(self):
+        bus = events.EventBus()
+
+        async def scenario():
+            subscription = bus.subscribe(asyncio.get_running_loop())
+            threading.Thread(
+                target=bus.publish,
+                args=("recording.phase", {"state": "recording"}),
+            ).start()
+            return await subscription.get(timeout=2.0)
+
+        event = asyncio.run(scenario())
+
+        self.assertEqual(event["type"], "recording.phase")
+        self.assertEqual(event["data"], {"state": "recording"})
+        self.assertEqual(event["id"], 1)
+
+    def test_reconnect_replays_events_after_last_event_id(self):
+        bus = events.EventBus()
+        for index in range(5):
+            bus.publish("library.changed", {"index": index})
+
+        async def scenario():
+            subscription = bus.subscribe(asyncio.get_running_loop(), last_event_id=3)
+            first = await subscription.get(timeout=1.0)
+            second = await subscription.get(timeout=1.0)
+            rest = await subscription.get(timeout=0.01)
+            return subscription, first, second, rest
+
+        subscription, first, second, rest = asyncio.run(scenario())
+
+        self.assertEqual(subscription.start_id, 5)
+        self.assertEqual([first["id"], second["id"]], [4, 5])
+        self.assertIsNone(rest)
+
+    def test_slow_subscriber_loses_the_oldest_events(self):
+        bus = events.EventBus()
+
+        async def scenario():
+            subscription = bus.subscribe(asyncio.get_running_loop())
+            subscription.queue = asyncio.Queue(2)
+            for index in range(4):
+                bus.publish("finalization.progress", {"index": index})
+            await asyncio.sleep(0)
+            return subscription, [
+                (await subscription.get(timeout=1.0))["data"]["index"]
+                for _ in range(2)
+            ]
+
+        subscription, received = asyncio.run(scenario())
+
+        self.assertEqual(received, [2, 3])
+        self.assertEqual(subscription.dropped, 2)
+
+    def test_format_event_is_a_server_sent_event(self):
+        payload = events.format_event(
+            {"id": 7, "type": "storage.warning", "data": {"level": "low"}}
+        )
+
+        self.assertEqual(
+            payload,
+            b'id: 7\nevent: storage.warning\ndata: {"level":"low"}\n\n',
+        )
+
+
+class EventSourceTests(unittest.TestCase):
+    def test_storage_warning_is_published_once_per_level_change(self):
+        with patch.object(storage_manager, "_space_level", "ok"), patch(
+            "app.storage_manager.events.publish"
+        ) as publish:
+            storage_manager.report_free_space(storage_manager.WARNING_FREE_BYTES - 1)
+            storage_manager.report_free_space(storage_manager.WARNING_FREE_BYTES - 2)
+            storage_manager.report_free_space(storage_manager.WARNING_FREE_BYTES)
+
+        levels = [call.args[1]["level"] for call in publish.call_args_list]
+        self.assertEqual(levels, ["low", "ok"])
+
+    def test_finalization_job_publishes_state_changes(self):
+        job = finalization.FinalizationJob("videos/a.mp4", 100)
+
+        with patch("app.finalization.events.publish") as publish:
+            job.run(lambda running: {"returncode": 0})
+
+        states = [call.args[1]["state"] for call in publish.call_args_list]
+        self.assertEqual(states, ["running", "completed"])
+
+
+if __name__ == "__main__":
+    unittest.main()
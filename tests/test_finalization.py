@@ -0,0 +1,127 @@
+import threading
+import unittest
+from unittest.mock import patch
+
+from app import finalization
+
+
+class FinalizationJobTests(unittest.TestCase):
+    @patch("app.finalization.time.monotonic")
+    def test_snapshot_reports_throughput_and_eta(self, monotonic_mock):
+        monotonic_mock.return_value = 100.0
+        job = finalization.create_job("videos/a.mp4", bytes_total=1000)
+        job._started_monotonic = 100.0
+        job.state = "running"
+        job.update(bytes_done=250)
+        monotonic_mock.return_value = 105.0
+
+        snapshot = job.snapshot()
+
+        self.assertEqual(snapshot["progress"], 0.25)
+        self.assertEqual(snapshot["throughput_bytes_per_second"], 50)
+        self.assertEqual(snapshot["eta_seconds"], 15.0)
+
+    def test_progress_callback_raises_after_cancel(self):
+        job = finalization.create_job("videos/b.mp4")
+        report = job.progress_callback("muxing", 100)
+        report(10)
+
+        self.assertTrue(job.cancel())
+        with self.assertRaises(finalization.FinalizationCancelled):
+            report(20)
+        self.assertEqual(job.snapshot()["bytes_done"], 20)
+
+    def test_finished_job_cannot_be_cancelled(self):
+        job = finalization.create_job("videos/c.mp4")
+        job.run(lambda _job: {"returncode": 0})
+
+        self.assertFalse(job.cancel())
+        self.assertEqual(job.snapshot()["state"], "completed")
+        self.assertEqual(finalization.get_job(job.id), job)
+
+    def test_done_callbacks_run_after_the_job_finishes(self):
+        job = finalization.create_job("videos/d.mp4")
+        finished = []
+        job.add_done_callback(lambda done: finished.append(done.state))
+        self.assertEqual(finished, [])
+
+        job.run(lambda _job: {"returncode": 0})
+        job.add_done_callback(lambda done: finished.append(done.state))
+
+        self.assertEqual(finished, ["completed", "completed"])
+
+    @patch("app.finalization.time.monotonic")
+    def test_pauses_are_bounded_while_capture_stays_starved(self, monotonic_mock):
+        job = finalization.create_job("videos/d.mp4")
+        monotonic_mock.return_value = 10.0
+        with patch.object(finalization, "_PRESSURE_PROBE", lambda: True):
+            self.assertTrue(job.should_pause())
+            self.assertTrue(job.snapshot()["throttled"])
+            monotonic_mock.return_value = 10.0 + finalization.THROTTLE_MAX_PAUSE_SECONDS
+            self.assertFalse(job.should_pause())
+            monotonic_mock.return_value += 1.0
+            self.assertFalse(job.should_pause())
+            monotonic_mock.return_value += finalization.THROTTLE_MIN_RUN_SECONDS
+            self.assertTrue(job.should_pause())
+        self.assertEqual(job.snapshot()["throttle_pauses"], 2)
+
+    def test_queue_runs_jobs_in_order(self):
+        order = []
+        first = finalization.create_job("videos/e.mp4")
+        second = finalization.create_job("videos/f.mp4")
+
+        with patch("app.finalization._lower_thread_priority"):
+            finalization.enqueue(first, lambda job: order.append(job.id) or {"returncode": 0})
+            finalization.enqueue(second, lambda job: order.append(job.id) or {"returncode": 1})
+            self.assertTrue(second.wait(timeout=5))
+
+        self.assertEqual(order, [first.id, second.id])
+        self.assertEqual(second.snapshot()["state"], "failed")
+
+    def test_queue_survives_a_job_raising_base_exception(self):
+        first = finalization.create_job("videos/g.mp4")
+        second = finalization.create_job("videos/h.mp4")
+
+        def interrupted(_job):
+            raise KeyboardInterrupt
+
+        with patch("app.finalization._lower_thread_priority"):
+            finalization.enqueue(first, interrupted)
+            self.assertTrue(first.wait(timeout=5))
+            finalization.enqueue(second, lambda job: {"returncode": 0})
+            self.assertTrue(second.wait(timeout=5))
+
+        self.assertIsInstance(first.exception, KeyboardInterrupt)
+        self.assertEqual(second.snapshot()["state"], "completed")
+
+    def test_queues_of_different_cameras_run_side_by_side(self):
+        blocked = finalization.create_job("videos/i.mp4")
+        other = finalization.create_job("videos/j.mp4")
+        release = threading.Event()
+
+        with patch("app.finalization._lower_thread_priority"):
+            finalization.enqueue(
+                blocked,
+                lambda job: release.wait(5) and {"returncode": 0},
+                queue="/dev/v4l/by-id/usb-Left-video-index0",
+            )
+            finalization.enqueue(
+                other,
+                lambda job: {"returncode": 0},
+                queue="/dev/v4l/by-id/usb-Right-video-index0",
+            )
+            try:
+                self.assertTrue(other.wait(timeout=5))
+                self.assertEqual(
+                    finalization.active_jobs("/dev/v4l/by-id/usb-Left-video-index0"),
+                    [blocked],
+                )
+            finally:
+                release.set()
+            self.assertTrue(blocked.wait(timeout=5))
+
+        self.assertEqual(other.snapshot()["queue"], "/dev/v4l/by-id/usb-Right-video-index0")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+import os
+import tempfile
+import unittest
+
+from app import frame_index
+
+
+def jpeg(payload: bytes) -> bytes:
+    return b"\xff\xd8" + payload + b"\xff\xd9"
+
+
+class FrameIndexTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.raw_file = os.path.join(self.tmp.name, "test.mp4.mjpeg")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _append(self, data: bytes):
+        with open(self.raw_file, "ab") as raw:
+            raw.write(data)
+
+    def test_catch_up_records_offsets_of_complete_frames_only(self):
+        self._append(jpeg(b"one") + jpeg(b"second") + b"\xff\xd8partial")
+
+        indexer = frame_index.catch_up(self.raw_file, wall_time=100.0)
+
+        records = list(frame_index.iter_records(self.raw_file))
+        self.assertEqual(indexer.count, 2)
+        self.assertEqual(
+            records,
+            [
+                frame_index.FrameRecord(0, 7, 100.0),
+                frame_index.FrameRecord(7, 10, 100.0),
+            ],
+        )
+        self.assertEqual(frame_index.count_frames(self.raw_file), 3)
+
+    def test_resume_drops_a_torn_record_and_scans_only_the_tail(self):
+        self._append(jpeg(b"one"))
+        frame_index.catch_up(self.raw_file, wall_time=1.0)
+        with open(frame_index.index_path(self.raw_file), "ab") as index:
+            index.write(b"\x00" * 5)
+        self._append(jpeg(b"two"))
+
+        indexer = frame_index.catch_up(self.raw_file, wall_time=2.0)
+
+        self.assertEqual(indexer.count, 2)
+        self.assertEqual(indexer.first.wall_time, 1.0)
+        self.assertEqual(indexer.last, frame_index.FrameRecord(7, 7, 2.0))
+        summary = frame_index.summary(self.raw_file)
+        self.assertEqual(summary["frames"], 2)
+        self.assertEqual(summary["indexed_bytes"], 14)
+
+    def test_observer_receives_the_sizes_of_each_batch(self):
+        self._append(jpeg(b"one") + jpeg(b"second"))
+        batches = []
+        indexer = frame_index.FrameIndexer(
+            self.raw_file,
+            clock=lambda: 5.0,
+            observer=lambda sizes, wall_time: batches.append((sizes, wall_time)),
+        )
+
+        with open(frame_index.index_path(self.raw_file), "ab") as index:
+            indexer.catch_up(index)
+
+        self.assertEqual(batches, [([7, 10], 5.0)])
+
+    def test_recover_cuts_a_torn_frame_and_scans_only_the_tail(self):
+        self._append(jpeg(b"one"))
+        frame_index.catch_up(self.raw_file, wall_time=1.0)
+        self._append(jpeg(b"two") + b"\xff\xd8torn")
+
+        indexer, rebuilt, truncated = frame_index.recover(self.raw_file)
+
+        self.assertFalse(rebuilt)
+        self.assertEqual((indexer.count, truncated), (2, 6))
+        self.assertEqual(indexer.first.wall_time, 1.0)
+        self.assertEqual(os.path.getsize(self.raw_file), 14)
+
+    def test_recover_rebuilds_an_index_of_another_file(self):
+        self._append(jpeg(b"one") + jpeg(b"two") + jpeg(b"three"))
+        frame_index.catch_up(self.raw_file)
+        with open(self.raw_file, "wb") as raw:
+            raw.write(jpeg(b"x"))
+
+        indexer, rebuilt, truncated = frame_index.recover(self.raw_file)
+
+        self.assertTrue(rebuilt)
+        self.assertEqual((indexer.count, truncated), (1, 0))
+
+    def test_index_of_a_replaced_raw_file_is_ignored(self):
+        self._append(jpeg(b"one") + jpeg(b"two"))
+        frame_index.catch_up(self.raw_file)
+        with open(self.raw_file, "wb") as raw:
+            raw.write(jpeg(b"x"))
+
+        self.assertIsNone(frame_index.summary(self.raw_file))
+        self.assertEqual(frame_index.count_frames(self.raw_file), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
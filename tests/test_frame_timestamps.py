@@ -0,0 +1,49 @@
+import os
+import tempfile
+import unittest
+
+from app import frame_timestamps
+
+
+class FrameTimestampTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.raw_file = os.path.join(self.tmp.name, "test.mp4.mjpeg")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _write(self, text):
+        with open(frame_timestamps.timestamps_path(self.raw_file), "w", encoding="ascii") as sidecar:
+            sidecar.write(text)
+
+    def test_torn_last_line_is_ignored(self):
+        self._write("# timecode format v2\n0\n33\n67\n10")
+
+        self.assertEqual(frame_timestamps.read_timestamps(self.raw_file), [0, 33, 67])
+        self.assertEqual(frame_timestamps.for_frames(self.raw_file, 2), [0, 33])
+        # Fewer timestamps than frames: the sidecar does not describe the file.
+        self.assertIsNone(frame_timestamps.for_frames(self.raw_file, 4))
+
+    def test_decreasing_timestamps_are_not_trusted(self):
+        self._write("# timecode format v2\n0\n33\n20\n")
+
+        self.assertIsNone(frame_timestamps.for_frames(self.raw_file, 3))
+
+    def test_gaps_are_counted_in_missing_frames(self):
+        report = frame_timestamps.timing_report([0, 33, 67, 167, 200, 267], 30.0)
+
+        self.assertEqual(report["gaps"], 2)
+        self.assertEqual(report["missing_frames"], 3)
+        self.assertEqual(report["max_interval_ms"], 100)
+        self.assertEqual(report["duration_seconds"], 0.3)
+
+    def test_capture_output_follows_the_raw_file(self):
+        args = frame_timestamps.capture_output_args(self.raw_file)
+
+        self.assertEqual(args[args.index("-f") + 1], "mkvtimestamp_v2")
+        self.assertEqual(args[-1], f"{self.raw_file}.pts")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+import os
+import tempfile
+import unittest
+
+from app import frame_index, live_view, mp4_info
+from jpeg_samples import jpeg
+
+
+class LiveViewTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.raw_file = os.path.join(self.tmp.name, "test.mp4.mjpeg")
+        self.frames = [jpeg(str(index).encode() * (index + 1)) for index in range(160)]
+        with open(self.raw_file, "wb") as raw:
+            raw.write(b"".join(self.frames))
+        frame_index.catch_up(self.raw_file)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_playlist_lists_only_the_newest_complete_segments(self):
+        playlist = live_view.playlist("test.mp4", 160, 30.0)
+
+        self.assertIn("#EXT-X-MEDIA-SEQUENCE:2\n", playlist)
+        self.assertIn('#EXT-X-MAP:URI="live/test.mp4/init.mp4"', playlist)
+        self.assertEqual(
+            [line for line in playlist.splitlines() if line.endswith(".m4s")],
+            ["live/test.mp4/2.m4s", "live/test.mp4/3.m4s", "live/test.mp4/4.m4s"],
+        )
+        self.assertIn("#EXTINF:1.000,", playlist)
+
+    def test_segments_carry_the_jpegs_unchanged(self):
+        init = live_view.init_segment(self.raw_file, 30.0)
+        length, chunks = live_view.segment(self.raw_file, 4, 160, 30.0)
+        data = b"".join(chunks)
+
+        self.assertEqual(len(data), length)
+        self.assertTrue(data.endswith(b"".join(self.frames[120:150])))
+        output = os.path.join(self.tmp.name, "live.mp4")
+        with open(output, "wb") as stream:
+            stream.write(init + data)
+        info = mp4_info.read_video_info(output)
+        self.assertEqual(info["frames"], 30)
+        self.assertAlmostEqual(info["duration_seconds"], 1.0)
+        self.assertEqual((info["width"], info["height"]), (1920, 1080))
+
+    def test_segments_outside_the_window_are_refused(self):
+        for number, code in (
+            (5, "live_segment_not_ready"),
+            (0, "live_segment_expired"),
+        ):
+            with self.subTest(number=number):
+                with self.assertRaises(live_view.LiveViewError) as raised:
+                    live_view.segment(self.raw_file, number, 160, 30.0)
+                self.assertEqual(raised.exception.code, code)
+
+
+if __name__ == "__main__":
+    unittest.main()
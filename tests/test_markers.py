@@ -0,0 +1,71 @@
+import os
+import tempfile
+import unittest
+
+from app import frame_index, markers
+
+
+class MarkerTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.raw_file = os.path.join(self.tmp.name, "test.mp4.mjpeg")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_markers_become_ordered_chapters_inside_the_video(self):
+        markers.append_marker(self.raw_file, 90, "  Second\n look ")
+        markers.append_marker(self.raw_file, 15)
+        markers.append_marker(self.raw_file, 15, "duplicate")
+        markers.append_marker(self.raw_file, 900, "after the torn tail")
+        with open(markers.markers_path(self.raw_file), "a", encoding="utf-8") as sidecar:
+            sidecar.write('{"frame": 3')
+
+        self.assertEqual(
+            markers.chapters(self.raw_file, 30.0, 300),
+            [(0.5, "Marker 1"), (3.0, "Second look")],
+        )
+
+    def test_every_resumed_section_becomes_a_chapter(self):
+        frame = b"\xff\xd8" + bytes(100) + b"\xff\xd9"
+        with open(self.raw_file, "wb") as raw:
+            raw.write(frame * 90)
+        frame_index.catch_up(self.raw_file)
+        markers.append_section(self.raw_file, 30 * len(frame))
+        markers.append_marker(self.raw_file, 60, "Closure")
+        markers.append_section(self.raw_file, 60 * len(frame))
+
+        self.assertEqual(
+            markers.chapters(self.raw_file, 30.0, 90),
+            [(0.0, "Part 1"), (1.0, "Part 2"), (2.0, "Closure")],
+        )
+        self.assertEqual(markers.read_markers(self.raw_file)[0]["frame"], 60)
+
+    def test_recording_without_pauses_has_no_section_chapters(self):
+        markers.append_section(self.raw_file, 0)
+
+        self.assertEqual(markers.chapters(self.raw_file, 30.0, 90), [])
+
+    def test_marker_count_is_limited_to_what_the_mp4_can_hold(self):
+        with open(markers.markers_path(self.raw_file), "w", encoding="utf-8") as sidecar:
+            sidecar.write('{"frame": 1}\n' * markers.MAX_MARKERS)
+
+        with self.assertRaises(markers.MarkerLimitError):
+            markers.append_marker(self.raw_file, 2)
+
+        markers.remove_markers(self.raw_file)
+        self.assertEqual(markers.read_markers(self.raw_file), [])
+
+    def test_ffmetadata_chapters_end_at_the_next_one(self):
+        path = os.path.join(self.tmp.name, "chapters")
+        markers.write_ffmetadata(path, [(1.0, "a=b; #c"), (2.5, "d")], 4.0)
+
+        with open(path, encoding="utf-8") as metadata:
+            lines = metadata.read().splitlines()
+        self.assertEqual(lines[0], ";FFMETADATA1")
+        self.assertEqual(lines[3:6], ["START=1000", "END=2500", r"title=a\=b\; \#c"])
+        self.assertEqual(lines[-2:], ["END=4000", "title=d"])
+
+
+if __name__ == "__main__":
+    unittest.main()
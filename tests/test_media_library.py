@@ -9,7 +9,7 @@ from unittest.mock import patch
 
 from fastapi import BackgroundTasks, HTTPException
 
-from app import routes, utils
+from app import routes, utils, verification
 
 
 PROBE_JSON = json.dumps(
@@ -24,6 +24,9 @@ PROBE_JSON = json.dumps(
             }
         ],
         "format": {"duration": "12.5"},
+        "chapters": [
+            {"start_time": "1.500000", "end_time": "12.500000", "tags": {"title": "Suture"}}
+        ],
     }
 )
 
@@ -67,6 +70,9 @@ class MediaLibraryTests(unittest.TestCase):
         self.assertEqual(ready["metadata_status"], "ready")
         self.assertEqual(ready["resolution"], "1920x1080")
         self.assertEqual(ready["fps"], 30.0)
+        self.assertEqual(
+            ready["chapters"], [{"start": 1.5, "end": 12.5, "title": "Suture"}]
+        )
         self.assertTrue(ready["thumbnail_ready"])
         self.assertTrue(Path(utils.get_video_thumbnail_path("clip.mp4")).is_file())
 
@@ -139,6 +145,57 @@ class MediaLibraryTests(unittest.TestCase):
         self.assertEqual(result["files"], ["first.mp4", "second.mp4"])
         self.assertEqual(utils.scan_video_library(), [])
 
+    def test_activity_timeline_is_kept_with_the_index_entry(self):
+        Path("videos/a.mp4").write_bytes(b"video")
+        timeline = {"bucket_seconds": 1, "levels": [0, 80], "active_segments": []}
+
+        with self.assertRaises(HTTPException) as missing:
+            routes.get_video_activity("a.mp4", _ok=True)
+        utils.store_video_activity("a.mp4", timeline)
+        self._populate([entry["filename"] for entry in utils.scan_video_library()])
+        utils._VIDEO_INDEX_CACHE = None
+
+        self.assertEqual(missing.exception.detail, "activity_not_available")
+        self.assertEqual(
+            routes.get_video_activity("a.mp4", _ok=True),
+            {"filename": "a.mp4", **timeline},
+        )
+        self.assertNotIn(
+            "activity",
+            routes._public_video_entry(utils.scan_video_library()[0]),
+        )
+
+    def test_full_decode_verification_is_an_opt_in_background_job(self):
+        Path("videos/a.mp4").write_bytes(b"video")
+        verification._RESULTS.clear()
+        result = subprocess.CompletedProcess(
+            [],
+            0,
+            json.dumps(
+                {
+                    "streams": [{"nb_read_frames": "375"}],
+                    "format": {"duration": "12.5"},
+                }
+            ),
+            "",
+        )
+
+        with patch("app.verification.subprocess.run", return_value=result) as run:
+            queued = verification.request_verification("a.mp4")
+            worker = verification._WORKER
+            if worker is not None:
+                worker.join(timeout=5)
+
+        self.assertEqual(queued["state"], "queued")
+        self.assertEqual(run.call_args.args[0][:6], verification.LOW_PRIORITY_PREFIX)
+        job = routes.get_video_verification("a.mp4")
+        self.assertEqual(job["state"], "completed")
+        self.assertEqual(job["decoded_frames"], 375)
+        self.assertTrue(job["passed"])
+        with self.assertRaises(HTTPException) as missing:
+            routes.verify_video("missing.mp4")
+        self.assertEqual(missing.exception.status_code, 404)
+
     def test_library_deletion_is_blocked_while_recording(self):
         Path("videos/clip.mp4").write_bytes(b"video")
         with patch(
@@ -0,0 +1,176 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import Mock, patch
+
+from app import frame_index, motion
+
+
+def jpeg(*intervals: bytes) -> bytes:
+    """A JPEG whose scan holds ``intervals`` separated by restart markers."""
+    scan = b"".join(
+        interval + (bytes([0xFF, 0xD0 + number % 8]) if number < len(intervals) - 1 else b"")
+        for number, interval in enumerate(intervals)
+    )
+    return b"\xff\xd8\xff\xda\x00\x08" + bytes(6) + scan + b"\xff\xd9"
+
+
+class FrameSignatureTests(unittest.TestCase):
+    def test_restart_intervals_are_measured_without_decoding(self):
+        size, intervals = motion.frame_signature(jpeg(b"a" * 10, b"b" * 20, b"c" * 30))
+
+        self.assertEqual(size, len(jpeg(b"a" * 10, b"b" * 20, b"c" * 30)))
+        self.assertEqual(len(intervals), 3)
+        self.assertEqual(intervals[1], 22)
+
+    def test_detail_moving_between_regions_counts_as_change(self):
+        before = motion.frame_signature(jpeg(b"a" * 100, b"b" * 10))
+        after = motion.frame_signature(jpeg(b"a" * 10, b"b" * 100))
+
+        self.assertEqual(before[0], after[0])
+        self.assertGreater(motion.frame_change(before, after), 0.5)
+
+    def test_frames_without_restart_markers_compare_sizes(self):
+        self.assertEqual(motion.frame_signature(b"\xff\xd8xx\xff\xd9"), (6, []))
+        self.assertEqual(motion.frame_change((100, []), (80, [])), 0.2)
+
+
+class MotionDetectorTests(unittest.TestCase):
+    def _feed(self, detector, changes, start=0.0, step=0.1):
+        decisions = []
+        size = 1000
+        detector.observe((size, []), start)
+        for number, change in enumerate(changes, start=1):
+            size = 1000 if size != 1000 else int(1000 * (1 + change))
+            decisions.append(detector.observe((size, []), start + number * step))
+        return [decision for decision in decisions if decision]
+
+    def test_motion_must_last_before_a_start(self):
+        detector = motion.MotionDetector()
+
+        with patch.object(motion, "START_SECONDS", 1.0):
+            self.assertEqual(self._feed(detector, [0.3] * 3), [])
+            self.assertEqual(self._feed(detector, [0.0] * 20, start=0.3), [])
+            self.assertEqual(self._feed(detector, [0.3] * 20, start=3.0), ["start"])
+        self.assertTrue(detector.active)
+
+    def test_stop_needs_a_quiet_period_below_the_lower_level(self):
+        detector = motion.MotionDetector()
+        detector.active = True
+
+        with patch.object(motion, "STOP_SECONDS", 2.0):
+            # Between the two levels the recording keeps running.
+            self.assertEqual(self._feed(detector, [0.035] * 40), [])
+            self.assertEqual(self._feed(detector, [0.0] * 40, start=10.0), ["stop"])
+        self.assertFalse(detector.active)
+
+
+class MotionTriggerTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.raw_file = os.path.join(self.tmp.name, "motion.mp4.mjpeg")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _started_trigger(self, start_response):
+        started = threading.Event()
+
+        def start_recording():
+            started.set()
+            return start_response
+
+        trigger = motion.MotionTrigger(enabled=True)
+        trigger._start_recording = start_recording
+        trigger._stop_recording = Mock(return_value={"status": "queued"})
+        return trigger, started
+
+    def test_idle_motion_starts_one_recording(self):
+        trigger, started = self._started_trigger(
+            {"status": "recording_started", "file": "videos/motion.mp4"}
+        )
+        frames = [jpeg(b"a" * 100, b"b" * 10), jpeg(b"a" * 10, b"b" * 100)]
+
+        with patch.object(motion, "START_SECONDS", 0.0), patch.object(
+            motion, "SAMPLE_INTERVAL_SECONDS", 0.0
+        ), patch("app.motion.events.publish") as publish:
+            for number in range(10):
+                trigger.observe_frame(frames[number % 2])
+            self.assertTrue(started.wait(2))
+            deadline = time.monotonic() + 2
+            while trigger.status()["state"] != "recording" and time.monotonic() < deadline:
+                time.sleep(0.01)
+
+        status = trigger.status()
+        self.assertEqual(status["state"], "recording")
+        self.assertEqual(status["file"], "motion.mp4")
+        self.assertEqual(status["recordings_started"], 1)
+        publish.assert_called_once()
+        self.assertEqual(publish.call_args.args[0], "motion.recording_started")
+
+    def test_quiet_recording_the_trigger_started_is_stopped(self):
+        frame = b"\xff\xd8" + bytes(1000) + b"\xff\xd9"
+        with open(self.raw_file, "wb") as raw:
+            raw.write(frame * 30)
+        frame_index.catch_up(self.raw_file)
+        trigger, _started = self._started_trigger({})
+        trigger._recording_file = "motion.mp4"
+        trigger._detector.active = True
+        trigger._recording_source = lambda: {
+            "name": "motion.mp4",
+            "raw_file": self.raw_file,
+            "fps": 30.0,
+        }
+
+        with patch.object(motion, "STOP_SECONDS", 1.0), patch(
+            "app.motion.events.publish"
+        ) as publish, patch("app.motion.time.monotonic", side_effect=[0.0, 5.0]):
+            trigger._follow_recording()
+            trigger._stop_recording.assert_not_called()
+            with open(self.raw_file, "ab") as raw:
+                raw.write(frame * 30)
+            frame_index.catch_up(self.raw_file)
+            trigger._follow_recording()
+
+        trigger._stop_recording.assert_called_once_with()
+        self.assertEqual(trigger.status()["state"], "watching")
+        self.assertEqual(trigger.status()["recordings_stopped"], 1)
+        publish.assert_called_once_with("motion.recording_stopped", {"file": "motion.mp4"})
+
+    def test_recordings_stopped_elsewhere_are_released(self):
+        trigger, _started = self._started_trigger({})
+        trigger._recording_file = "motion.mp4"
+        trigger._recording_source = lambda: {
+            "name": "manual.mp4",
+            "raw_file": self.raw_file,
+            "fps": 30.0,
+        }
+
+        trigger._follow_recording()
+
+        trigger._stop_recording.assert_not_called()
+        self.assertIsNone(trigger.status()["file"])
+
+    def test_busy_recorder_is_reported(self):
+        trigger, _started = self._started_trigger(
+            {"status": "error", "error_code": "hardware_busy"}
+        )
+        trigger._starting = True
+
+        trigger._start(0.1)
+
+        self.assertEqual(trigger.status()["last_error"], "hardware_busy")
+        self.assertEqual(trigger.status()["state"], "watching")
+
+    def test_disabled_trigger_ignores_frames(self):
+        trigger = motion.MotionTrigger(enabled=False)
+
+        trigger.observe_frame(jpeg(b"a"))
+
+        self.assertEqual(trigger.status()["state"], "disabled")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+import os
+import struct
+import tempfile
+import unittest
+
+from app import mp4_info
+
+
+def box(kind: bytes, payload: bytes = b"") -> bytes:
+    return struct.pack(">I4s", 8 + len(payload), kind) + payload
+
+
+def video_trak(samples: int, duration: int, timescale: int = 15360) -> bytes:
+    tkhd = (
+        bytes(4)
+        + struct.pack(">IIIII", 0, 0, 1, 0, duration)
+        + bytes(8 + 8 + 36)
+        + struct.pack(">II", 1920 << 16, 1080 << 16)
+    )
+    mdhd = bytes(4) + struct.pack(">IIIIHH", 0, 0, timescale, duration, 0, 0)
+    hdlr = bytes(8) + b"vide" + bytes(12) + b"VideoHandler\x00"
+    stsz = bytes(4) + struct.pack(">II", 0, samples)
+    return box(
+        b"trak",
+        box(b"tkhd", tkhd)
+        + box(
+            b"mdia",
+            box(b"mdhd", mdhd)
+            + box(b"hdlr", hdlr)
+            + box(b"minf", box(b"stbl", box(b"stsz", stsz))),
+        ),
+    )
+
+
+def fragment(samples: int, sample_duration: int) -> bytes:
+    # tfhd flag 0x08: default-sample-duration present.
+    tfhd = struct.pack(">I", 0x08) + struct.pack(">II", 1, sample_duration)
+    trun = struct.pack(">II", 0, samples)
+    return box(
+        b"moof",
+        box(b"mfhd", struct.pack(">II", 0, 1))
+        + box(b"traf", box(b"tfhd", tfhd) + box(b"trun", trun)),
+    ) + box(b"mdat", b"\x00" * samples)
+
+
+class Mp4InfoTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "test.mp4")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _write(self, data: bytes):
+        with open(self.path, "wb") as output:
+            output.write(data)
+
+    def test_sample_table_is_read_after_a_large_mdat(self):
+        self._write(
+            box(b"ftyp", b"isom")
+            + box(b"mdat", b"\x00" * 4096)
+            + box(b"moov", video_trak(1800, 60 * 15360))
+        )
+
+        info = mp4_info.read_video_info(self.path)
+
+        self.assertEqual(info["frames"], 1800)
+        self.assertAlmostEqual(info["duration_seconds"], 60.0)
+        self.assertEqual((info["width"], info["height"]), (1920, 1080))
+        self.assertFalse(info["fragmented"])
+
+    def test_fragmented_mp4_counts_samples_from_fragment_headers(self):
+        self._write(
+            box(b"ftyp", b"isom")
+            + box(b"moov", video_trak(0, 0))
+            + fragment(30, 512)
+            + fragment(30, 512)
+            + b"\x00\x00\x10\x00mo"
+        )
+
+        info = mp4_info.read_video_info(self.path)
+
+        self.assertEqual(info["frames"], 60)
+        self.assertAlmostEqual(info["duration_seconds"], 2.0)
+        self.assertTrue(info["fragmented"])
+
+    def test_missing_video_track_is_reported(self):
+        self._write(box(b"ftyp", b"isom") + box(b"mdat", b"data"))
+
+        with self.assertRaises(mp4_info.Mp4InfoError):
+            mp4_info.read_video_info(self.path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,187 @@
+import os
+import struct
+import tempfile
+import unittest
+
+from app import frame_index, mp4_info, mp4_mux
+from jpeg_samples import jpeg
+
+
+def adts_frame(payload: bytes) -> bytes:
+    length = 7 + len(payload)
+    header = bytes(
+        [
+            0xFF,
+            0xF1,
+            (1 << 6) | (3 << 2),
+            (1 << 6) | (length >> 11),
+            (length >> 3) & 0xFF,
+            ((length & 0x07) << 5) | 0x1F,
+            0xFC,
+        ]
+    )
+    return header + payload
+
+
+def top_level_boxes(path: str) -> list[bytes]:
+    boxes = []
+    with open(path, "rb") as source:
+        size = os.path.getsize(path)
+        offset = 0
+        while offset < size:
+            source.seek(offset)
+            box_size, kind = struct.unpack(">I4s", source.read(8))
+            if box_size == 1:
+                box_size = struct.unpack(">Q", source.read(8))[0]
+            boxes.append(kind)
+            offset += box_size
+    return boxes
+
+
+class Mp4MuxTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.raw_file = os.path.join(self.tmp.name, "test.mp4.mjpeg")
+        self.output = os.path.join(self.tmp.name, "test.mp4")
+        self.frames = [jpeg(str(index).encode() * (index + 1)) for index in range(90)]
+        with open(self.raw_file, "wb") as raw:
+            raw.write(b"".join(self.frames))
+        frame_index.catch_up(self.raw_file)
+        self.records = [
+            (record.offset, record.size)
+            for record in frame_index.iter_records(self.raw_file)
+        ]
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_chapters_are_written_as_a_chapter_list(self):
+        result = mp4_mux.write_mp4(
+            self.raw_file,
+            self.output,
+            self.records,
+            30.0,
+            chapters=[(0.5, "Incision"), (2.0, "Шов")],
+        )
+
+        self.assertEqual(result["chapters"], 2)
+        with open(self.output, "rb") as output:
+            data = output.read()
+        chpl = data[data.index(b"chpl") + 4:]
+        self.assertEqual(chpl[:4], b"\x01\x00\x00\x00")
+        self.assertEqual(chpl[8], 2)
+        start, length = struct.unpack_from(">QB", chpl, 9)
+        self.assertEqual((start, chpl[18:18 + length]), (5_000_000, b"Incision"))
+        self.assertLess(data.index(b"chpl"), data.index(b"mdat"))
+        self.assertEqual(mp4_info.read_video_info(self.output)["frames"], 90)
+
+    def test_capture_timestamps_give_variable_frame_durations(self):
+        # A 100 ms stall after frame 44: two frames never arrived.
+        timestamps = [
+            round(index * 1000 / 30) + (67 if index >= 45 else 0)
+            for index in range(90)
+        ]
+
+        result = mp4_mux.write_mp4(
+            self.raw_file, self.output, self.records, 30.0, timestamps_ms=timestamps
+        )
+
+        self.assertAlmostEqual(result["duration_seconds"], 3.0 + 0.067, places=2)
+        info = mp4_info.read_video_info(self.output)
+        self.assertEqual(info["frames"], 90)
+        self.assertAlmostEqual(info["duration_seconds"], result["duration_seconds"])
+
+    def test_video_is_written_faststart_with_byte_exact_payload(self):
+        result = mp4_mux.write_mp4(self.raw_file, self.output, self.records, 30.0)
+
+        self.assertEqual(result["frames"], 90)
+        self.assertEqual(top_level_boxes(self.output), [b"ftyp", b"moov", b"mdat"])
+        info = mp4_info.read_video_info(self.output)
+        self.assertEqual(info["frames"], 90)
+        self.assertAlmostEqual(info["duration_seconds"], 3.0)
+        self.assertEqual((info["width"], info["height"]), (1920, 1080))
+        with open(self.output, "rb") as output:
+            self.assertTrue(output.read().endswith(b"".join(self.frames)))
+
+    def test_frames_stream_from_the_index_sidecar(self):
+        listed = os.path.join(self.tmp.name, "listed.mp4")
+        mp4_mux.write_mp4(self.raw_file, listed, self.records, 30.0)
+
+        indexed = frame_index.IndexedFrames(self.raw_file)
+        result = mp4_mux.write_mp4(self.raw_file, self.output, indexed, 30.0)
+
+        self.assertEqual(len(indexed), 90)
+        self.assertEqual(result["frames"], 90)
+        with open(listed, "rb") as expected, open(self.output, "rb") as streamed:
+            self.assertEqual(streamed.read(), expected.read())
+
+    def test_audio_frames_are_interleaved_without_adts_headers(self):
+        aac_file = os.path.join(self.tmp.name, "audio.aac")
+        payloads = [bytes([index]) * 20 for index in range(150)]
+        with open(aac_file, "wb") as aac:
+            aac.write(b"".join(adts_frame(payload) for payload in payloads))
+
+        track = mp4_mux.read_adts(aac_file)
+        mp4_mux.write_mp4(
+            self.raw_file, self.output, self.records, 30.0, audio=track
+        )
+
+        self.assertEqual((track.sample_rate, track.channels), (48000, 1))
+        self.assertEqual(track.audio_specific_config, b"\x11\x88")
+        with open(self.output, "rb") as output:
+            data = output.read()
+        first_video_chunk = b"".join(self.frames[:30])
+        video_at = data.index(first_video_chunk)
+        self.assertEqual(
+            data[video_at + len(first_video_chunk):][:20], payloads[0]
+        )
+        self.assertNotIn(adts_frame(payloads[1])[:7] + payloads[1], data)
+
+    def test_streamed_aac_lead_is_trimmed_with_frames_and_edit_list(self):
+        track = mp4_mux.AacTrack(
+            "audio.aac", [(index * 10, 10) for index in range(100)], 48000, 1, b""
+        )
+
+        trimmed, skip = mp4_mux.trim_aac(track, 5000, 48000)
+
+        # Priming plus lead is 6024 samples: frames 0-4 go, frame 4 is kept
+        # as decoder pre-roll and the edit list skips the rest.
+        self.assertEqual(trimmed.frames[0], (40, 10))
+        self.assertEqual(skip, 6024 - 4 * 1024)
+        self.assertEqual(len(trimmed.frames), -(-(skip + 48000) // 1024))
+
+    def test_audio_never_plays_past_the_video(self):
+        aac_file = os.path.join(self.tmp.name, "audio.aac")
+        with open(aac_file, "wb") as aac:
+            aac.write(b"".join(adts_frame(bytes(20)) for _ in range(400)))
+
+        mp4_mux.write_mp4(
+            self.raw_file,
+            self.output,
+            self.records,
+            30.0,
+            audio=mp4_mux.read_adts(aac_file),
+            audio_skip_samples=2048,
+        )
+
+        with open(self.output, "rb") as output:
+            data = output.read()
+        elst = data.index(b"elst")
+        _flags, _count, duration, media_time = struct.unpack(
+            ">IIIi", data[elst + 4:elst + 20]
+        )
+        # 400 frames are ~8.5 s of audio; the edit stops with the 3 s video.
+        self.assertEqual((duration, media_time), (3000, 2048))
+
+    def test_jpeg_dimensions_skip_leading_segments(self):
+        app0 = b"\xff\xe0" + struct.pack(">H", 6) + b"JFIF"
+
+        width, height = mp4_mux.jpeg_dimensions(
+            b"\xff\xd8" + app0 + jpeg(b"x", 1280, 720)[2:]
+        )
+
+        self.assertEqual((width, height), (1280, 720))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,8 +1,10 @@
 import io
+import os
+import tempfile
 import unittest
 from unittest.mock import Mock, patch
 
-from app import preview
+from app import frame_index, preview
 
 
 def jpeg(payload: bytes) -> bytes:
@@ -35,6 +37,24 @@ class PreviewFrameTests(unittest.TestCase):
         self.assertEqual(manager._frame_generation, 10)
         self.assertEqual(manager._latest_frame, jpeg(b"9"))
 
+    def test_frame_observer_keeps_idle_capture_without_clients(self):
+        stream = io.BytesIO(b"".join(jpeg(str(index).encode()) for index in range(3)))
+        process = Mock()
+        process.stdout = stream
+        process.poll.return_value = 0
+        seen = []
+        manager = preview.PreviewManager(enabled=True)
+        manager._camera_device = "/dev/video0"
+
+        with patch("app.preview.subprocess.Popen", return_value=process):
+            manager.set_frame_observer(seen.append)
+            manager._producer_thread.join(timeout=2)
+
+        self.assertEqual(seen, [jpeg(b"0"), jpeg(b"1"), jpeg(b"2")])
+        self.assertEqual(manager.status()["subscribers"], 0)
+        manager.set_frame_observer(None)
+        self.assertEqual(manager.status()["mode"], "stopped")
+
     def test_recording_selector_copies_only_ten_of_thirty_fullhd_frames(self):
         buffer = bytearray(
             b"".join(jpeg(str(index).encode()) for index in range(30))
@@ -53,6 +73,35 @@ class PreviewFrameTests(unittest.TestCase):
         self.assertEqual(frames[-1], jpeg(b"27"))
         self.assertEqual(buffer, bytearray())
 
+    def test_recording_preview_reads_indexed_frames_without_rescanning(self):
+        with tempfile.TemporaryDirectory() as directory:
+            raw_file = os.path.join(directory, "test.mp4.mjpeg")
+            with open(raw_file, "wb") as raw:
+                raw.write(jpeg(b"old"))
+            frame_index.catch_up(raw_file)
+            manager = preview.PreviewManager(enabled=True)
+            manager._recording_raw_file = raw_file
+            manager._producer_serial = 1
+            stop_event = preview.threading.Event()
+            thread = preview.threading.Thread(
+                target=manager._run_recording,
+                args=(1, stop_event),
+            )
+            thread.start()
+            try:
+                # Give the tailer time to seek to the end of the index.
+                preview.time.sleep(0.05)
+                with open(raw_file, "ab") as raw:
+                    raw.write(jpeg(b"new"))
+                frame_index.catch_up(raw_file)
+
+                _generation, frame = manager.wait_for_frame(0, timeout=2.0)
+            finally:
+                stop_event.set()
+                thread.join()
+
+        self.assertEqual(frame, jpeg(b"new"))
+
     def test_waiter_receives_only_the_latest_frame(self):
         manager = preview.PreviewManager(enabled=True)
         manager._producer_serial = 3
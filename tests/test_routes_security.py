@@ -1,6 +1,7 @@
 import asyncio
 import os
 import tempfile
+import threading
 import unittest
 from pathlib import Path
 from unittest.mock import Mock, patch
@@ -95,10 +96,25 @@ class RouteSecurityTests(unittest.TestCase):
             "/start",
             "/stop",
             "/recording/status",
+            "/recording/metrics",
+            "/recording/timings",
+            "/recording/motion",
+            "/recording/marker",
+            "/recording/pause",
+            "/recording/resume",
+            "/recording/live.m3u8",
+            "/recording/live/{name}/init.mp4",
+            "/recording/live/{name}/{number}.m4s",
+            "/events",
+            "/cameras",
+            "/recording/finalization/{job_id}",
+            "/recording/finalization/{job_id}/cancel",
             "/preview/status",
             "/preview/stream",
             "/videos",
+            "/videos/{filename}/activity",
             "/videos/{filename}/thumbnail",
+            "/videos/{filename}/verify",
             "/videos/{filename}",
             "/videos/delete",
             "/download/{filename}",
@@ -245,6 +261,54 @@ class RouteSecurityTests(unittest.TestCase):
         )
         apply_mock.assert_not_called()
 
+    def test_update_and_poweroff_wait_for_queued_finalization(self):
+        recorder = routes.camera.Recorder()
+        recorder.recovery_state_loaded = True
+        release = threading.Event()
+        job = routes.finalization.create_job("videos/a.mp4")
+        routes.finalization.enqueue(
+            job,
+            lambda _job: release.wait(5) and {"returncode": 0},
+            queue=recorder.queue_name,
+        )
+        try:
+            with patch.multiple(
+                routes.camera, _default_recorder=recorder, _recorders={}
+            ), patch("app.routes.updater.start_update") as apply_mock, patch(
+                "app.routes.utils.request_poweroff"
+            ) as poweroff_mock:
+                self.assertEqual(
+                    routes.camera.get_recording_status()["state"], "idle"
+                )
+                with self.assertRaises(HTTPException) as update_error:
+                    asyncio.run(routes.update_apply(_ok=True))
+                with self.assertRaises(HTTPException) as poweroff_error:
+                    asyncio.run(routes.system_poweroff(_ok=True))
+        finally:
+            release.set()
+            job.wait(5)
+
+        for error in (update_error, poweroff_error):
+            self.assertEqual(error.exception.status_code, 409)
+            self.assertEqual(error.exception.detail["state"], "finalizing")
+        apply_mock.assert_not_called()
+        poweroff_mock.assert_not_called()
+
+    def test_update_is_rejected_while_another_camera_records(self):
+        with patch(
+            "app.routes.camera.get_recording_status",
+            return_value={"recording": False, "state": "idle"},
+        ), patch(
+            "app.routes.camera.get_other_recording_statuses",
+            return_value=[{"recording": True, "state": "finalizing"}],
+        ), patch("app.routes.updater.start_update") as apply_mock:
+            with self.assertRaises(HTTPException) as context:
+                asyncio.run(routes.update_apply(_ok=True))
+
+        self.assertEqual(context.exception.status_code, 409)
+        self.assertEqual(context.exception.detail["state"], "finalizing")
+        apply_mock.assert_not_called()
+
     def test_recording_start_is_rejected_while_self_test_owns_hardware(self):
         with patch("app.routes.diagnostics.begin_recording_start", return_value=False), patch(
             "app.routes.diagnostics.is_self_test_running", return_value=True
@@ -313,6 +377,44 @@ class RouteSecurityTests(unittest.TestCase):
         self.assertIn("ble_service", authenticated_status)
         self.assertIn("recovery", authenticated_status)
 
+    def test_stop_returns_the_finalization_job_without_waiting(self):
+        queued = {"status": "finalizing", "file": "videos/a.mp4", "job": {"id": "job"}}
+        with patch("app.routes.camera.stop_recording", return_value=queued) as stop:
+            response = routes.stop_recording(_ok=True)
+
+        self.assertEqual(response, queued)
+        stop.assert_called_once_with(
+            wait=False,
+            timeout=routes.camera.STOP_WAIT_TIMEOUT_SECONDS,
+            camera_id=None,
+        )
+
+    def test_stop_verifies_the_recording_once_finalization_completes(self):
+        job = routes.finalization.FinalizationJob("videos/a.mp4")
+        queued = {"status": "finalizing", "file": "videos/a.mp4", "job": job.snapshot()}
+        with patch("app.routes.camera.stop_recording", return_value=queued), patch(
+            "app.routes.finalization.get_job", return_value=job
+        ), patch("app.routes.verification.request_verification") as verify:
+            response = routes.stop_recording(verify=True, _ok=True)
+            verify.assert_not_called()
+            job.run(lambda _job: {"returncode": 0, "file": "videos/a.mp4"})
+
+        self.assertEqual(response["verification"]["state"], "waiting_for_finalization")
+        verify.assert_called_once_with("a.mp4")
+
+    def test_recording_routes_address_one_camera(self):
+        camera_id = "/dev/v4l/by-id/usb-Second-video-index0"
+        with patch("app.routes.diagnostics.begin_recording_start", return_value=True), patch(
+            "app.routes.diagnostics.end_recording_start"
+        ), patch("app.routes.camera.start_recording") as start, patch(
+            "app.routes.camera.pause_recording"
+        ) as pause:
+            routes.start_recording(camera_id=camera_id, _ok=True)
+            routes.recording_pause(camera_id=camera_id, _ok=True)
+
+        start.assert_called_once_with(camera_id)
+        pause.assert_called_once_with(camera_id)
+
     def test_authenticated_owner_can_open_recovery_window(self):
         token = self._provision()
 
@@ -0,0 +1,137 @@
+import os
+import struct
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from app import segments
+
+
+def _box(kind, payload=b""):
+    return struct.pack(">I4s", 8 + len(payload), kind) + payload
+
+
+def _moof(sequence):
+    mfhd = _box(b"mfhd", struct.pack(">II", 0, sequence))
+    return _box(b"moof", mfhd)
+
+
+class SegmentAppendTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.output = os.path.join(self.tmp.name, "test.mp4")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _fragment(self, name, payload):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, "wb") as output:
+            output.write(
+                _box(b"ftyp", b"isom")
+                + _box(b"moov")
+                + _moof(1)
+                + _box(b"mdat", payload)
+                + _box(b"mfra")
+            )
+        return path
+
+    def _boxes(self, path):
+        with open(path, "rb") as source:
+            return [
+                (kind, offset)
+                for offset, _size, kind in segments._iter_boxes(
+                    source, os.path.getsize(path)
+                )
+            ]
+
+    def test_fragments_are_appended_with_continuous_sequence_numbers(self):
+        assembly = segments.assembly_file(self.output)
+
+        sequence = segments.append_fragments(
+            self._fragment("a.mp4", b"first"), assembly, True, 0
+        )
+        sequence = segments.append_fragments(
+            self._fragment("b.mp4", b"second"), assembly, False, sequence
+        )
+
+        self.assertEqual(sequence, 2)
+        boxes = self._boxes(assembly)
+        self.assertEqual(
+            [kind for kind, _offset in boxes],
+            [b"ftyp", b"moov", b"moof", b"mdat", b"moof", b"mdat"],
+        )
+        with open(assembly, "rb") as source:
+            data = source.read()
+        moof_offsets = [offset for kind, offset in boxes if kind == b"moof"]
+        self.assertEqual(
+            [struct.unpack_from(">I", data, offset + 20)[0] for offset in moof_offsets],
+            [1, 2],
+        )
+        self.assertTrue(data.endswith(b"second"))
+
+    def test_segments_are_listed_in_capture_order(self):
+        for index in (10, 2, 0):
+            with open(segments.segment_path(self.output, index), "wb"):
+                pass
+
+        self.assertEqual(
+            [segments.segment_index(path) for path in segments.list_segments(self.output)],
+            [0, 2, 10],
+        )
+
+
+class SegmentAssemblerTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.output = os.path.join(self.tmp.name, "test.mp4")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _assembler(self):
+        return segments.SegmentAssembler(
+            self.output,
+            30,
+            build_command=lambda *args: ["ffmpeg"],
+            count_frames=lambda path: 30,
+            has_audio=True,
+        )
+
+    def test_audio_failure_leaves_every_later_segment_video_only(self):
+        assembler = self._assembler()
+        attempts = []
+
+        def remux(path, fragment_file, frames, with_audio, low_priority):
+            index = segments.segment_index(path)
+            attempts.append((index, with_audio))
+            if with_audio and index == 1:
+                return 1
+            with open(fragment_file, "wb") as fragment:
+                fragment.write(_box(b"ftyp") + _box(b"moov") + _moof(1) + _box(b"mdat", b"x"))
+            return 0
+
+        with patch.object(assembler, "_remux", side_effect=remux):
+            for index in range(3):
+                path = segments.segment_path(self.output, index)
+                with open(path, "wb") as raw:
+                    raw.write(b"frames")
+                assembler._assemble(path, low_priority=False)
+
+        self.assertEqual(attempts, [(0, True), (1, True), (1, False), (2, False)])
+        self.assertFalse(assembler.has_audio)
+        self.assertFalse(segments.read_progress(self.output)["has_audio"])
+
+    def test_background_remux_is_not_started_after_stop(self):
+        assembler = self._assembler()
+        assembler.stop()
+
+        with patch("app.segments.subprocess.Popen") as popen:
+            with self.assertRaises(segments.SegmentError):
+                assembler._remux("seg.mjpeg", "seg.mp4", 30, True, low_priority=True)
+
+        popen.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,257 @@
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+
+from unittest.mock import patch
+
+from app import audio, capture_writer, standby
+
+
+# Streams a JPEG-like frame every 10 ms until killed, as FFmpeg or arecord
+# would while the recorder is idle.
+_STREAM = (
+    "import sys, time\n"
+    "frame = b'\\xff\\xd8' + b'x' * 1000 + b'\\xff\\xd9'\n"
+    "while True:\n"
+    "    sys.stdout.buffer.write(frame)\n"
+    "    sys.stdout.buffer.flush()\n"
+    "    time.sleep(0.01)\n"
+)
+
+
+def _wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() >= deadline:
+            raise AssertionError("condition not reached")
+        time.sleep(0.01)
+
+
+class StandbyStreamTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.raw_file = os.path.join(self.tmp.name, "test.mp4.mjpeg")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_armed_writer_persists_from_the_next_jpeg(self):
+        writer = capture_writer.CaptureWriter(None)
+        producer = subprocess.Popen(
+            [sys.executable, "-c", _STREAM], stdout=writer.pipe_fd
+        )
+        writer.start()
+        try:
+            _wait_until(lambda: writer.bytes_seen > 5000)
+            self.assertEqual(writer.bytes_written, 0)
+            writer.arm(self.raw_file)
+            _wait_until(lambda: writer.bytes_written > 5000)
+        finally:
+            producer.kill()
+            producer.wait()
+            writer.close()
+
+        with open(self.raw_file, "rb") as raw:
+            data = raw.read()
+        self.assertTrue(data.startswith(b"\xff\xd8"))
+        self.assertIsNone(writer.error)
+
+    def test_standby_jpegs_reach_the_frame_observer_until_armed(self):
+        seen = []
+        writer = capture_writer.CaptureWriter(None, frame_observer=seen.append)
+        producer = subprocess.Popen(
+            [sys.executable, "-c", _STREAM], stdout=writer.pipe_fd
+        )
+        writer.start()
+        try:
+            _wait_until(lambda: len(seen) >= 5)
+            writer.arm(self.raw_file)
+            _wait_until(lambda: writer.bytes_written > 5000)
+            observed = len(seen)
+            time.sleep(0.05)
+        finally:
+            producer.kill()
+            producer.wait()
+            writer.close()
+
+        self.assertEqual(len(seen), observed)
+        self.assertTrue(all(frame == b"\xff\xd8" + b"x" * 1000 + b"\xff\xd9" for frame in seen))
+        with open(self.raw_file, "rb") as raw:
+            self.assertTrue(raw.read().startswith(b"\xff\xd8"))
+
+    def test_prerecord_ring_is_written_ahead_of_the_live_stream(self):
+        writer = capture_writer.CaptureWriter(
+            None, preroll_seconds=0.2, preroll_max_bytes=50 * 1004
+        )
+        producer = subprocess.Popen(
+            [sys.executable, "-c", _STREAM], stdout=writer.pipe_fd
+        )
+        writer.start()
+        try:
+            _wait_until(lambda: writer.bytes_seen > 60 * 1004)
+            self.assertEqual(writer.bytes_written, 0)
+            preroll_seconds = writer.arm(self.raw_file)
+            _wait_until(lambda: writer.bytes_written > 40 * 1004)
+        finally:
+            producer.kill()
+            producer.wait()
+            writer.close()
+
+        self.assertGreater(preroll_seconds, 0.1)
+        self.assertLess(preroll_seconds, 0.5)
+        with open(self.raw_file, "rb") as raw:
+            data = raw.read()
+        # Whole frames only, starting at a JPEG.
+        self.assertTrue(data.startswith(b"\xff\xd8"))
+        frame = b"\xff\xd8" + b"x" * 1000 + b"\xff\xd9"
+        self.assertEqual(data[: len(data) // len(frame) * len(frame)].replace(frame, b""), b"")
+        self.assertIsNone(writer.error)
+
+    def test_prerecord_ring_is_bounded_in_bytes(self):
+        writer = capture_writer.CaptureWriter(
+            None, preroll_seconds=10.0, preroll_max_bytes=5 * 1004
+        )
+        writer._fd = None
+        frame = b"\xff\xd8" + b"x" * 1000 + b"\xff\xd9"
+        self.assertEqual(writer._standby_data(frame * 20 + frame[:10]), b"")
+        self.assertEqual(len(writer._preroll), 5)
+        self.assertEqual(writer._standby_tail, frame[:10])
+
+        writer.arm(self.raw_file)
+        data = writer._standby_data(frame[10:])
+        os.close(writer.pipe_fd)
+        os.close(writer._read_fd)
+        os.close(writer._fd)
+        self.assertEqual(data, frame * 6)
+
+    def test_standby_audio_prerecord_is_written_on_arm(self):
+        audio_file = os.path.join(self.tmp.name, "audio.pcm")
+        capture = audio.StandbyAudioCapture(
+            [sys.executable, "-c", _STREAM], subprocess.DEVNULL,
+            preroll_seconds=0.01,
+        )
+        try:
+            _wait_until(lambda: capture.bytes_received > 5000)
+            started_at = capture.arm(audio_file)
+            armed_at = time.monotonic()
+        finally:
+            capture.kill()
+            capture.wait(timeout=5)
+
+        # 10 ms of 48 kHz mono S16 PCM, the newest received.
+        self.assertGreaterEqual(os.path.getsize(audio_file), 960)
+        self.assertLessEqual(started_at, armed_at - 0.01)
+
+    def test_paused_audio_keeps_whole_sample_frames(self):
+        audio_file = os.path.join(self.tmp.name, "audio.pcm")
+        capture = audio.StandbyAudioCapture(
+            [sys.executable, "-c", _STREAM], subprocess.DEVNULL
+        )
+        try:
+            capture.arm(audio_file)
+            _wait_until(lambda: os.path.getsize(audio_file) > 5000)
+            capture.pause()
+            received = capture.bytes_received
+            _wait_until(lambda: capture.bytes_received > received + 5000)
+            paused_size = os.path.getsize(audio_file)
+            received = capture.bytes_received
+            _wait_until(lambda: capture.bytes_received > received + 5000)
+            self.assertEqual(os.path.getsize(audio_file), paused_size)
+            capture.resume()
+            _wait_until(lambda: os.path.getsize(audio_file) > paused_size + 5000)
+        finally:
+            capture.kill()
+            capture.wait(timeout=5)
+
+        self.assertEqual(os.path.getsize(audio_file) % (audio.AUDIO_CHANNELS * 2), 0)
+
+    def test_pause_cuts_audio_at_the_requested_instant(self):
+        capture = audio.StandbyAudioCapture(
+            [sys.executable, "-c", ""], subprocess.DEVNULL
+        )
+        capture.wait(timeout=5)
+        capture._target = io.BytesIO()
+        byte_rate = audio.AUDIO_SAMPLE_RATE * audio.AUDIO_CHANNELS * 2
+        chunk = bytes(audio.STANDBY_READ_SIZE)
+        # Full reads arrive every ~0.68 s; pause at 1.0 s and resume at 2.5 s.
+        requests = {1.0: capture.pause, 2.5: capture.resume}
+        arrived_at = 0.0
+        for number in range(8):
+            arrived_at = (number + 1) * len(chunk) / byte_rate
+            for requested_at in sorted(requests):
+                if requested_at < arrived_at:
+                    with patch("app.audio.time.monotonic", return_value=requested_at):
+                        requests.pop(requested_at)()
+            capture._write_target(chunk, number * len(chunk), arrived_at)
+
+        persisted = len(capture._target.getvalue())
+        expected = (arrived_at - 1.5) * byte_rate
+        # Within one video frame of the unpaused time.
+        self.assertLess(abs(persisted - expected), byte_rate / 30)
+        self.assertEqual(persisted % (audio.AUDIO_CHANNELS * 2), 0)
+
+    def test_standby_audio_is_dropped_until_armed(self):
+        audio_file = os.path.join(self.tmp.name, "audio.pcm")
+        capture = audio.StandbyAudioCapture(
+            [sys.executable, "-c", _STREAM], subprocess.DEVNULL
+        )
+        try:
+            _wait_until(lambda: capture.bytes_received > 5000)
+            self.assertFalse(os.path.exists(audio_file))
+            received = capture.bytes_received
+            capture.arm(audio_file)
+            _wait_until(lambda: os.path.getsize(audio_file) > 5000)
+            self.assertIsNone(capture.poll())
+        finally:
+            capture.kill()
+            capture.wait(timeout=5)
+
+        # Only PCM received after arming reached the file.
+        self.assertLessEqual(
+            os.path.getsize(audio_file), capture.bytes_received - received
+        )
+
+
+class CaptureStandbyTests(unittest.TestCase):
+    def test_start_waits_for_both_streams_and_stop_releases_them(self):
+        with tempfile.TemporaryDirectory() as directory:
+            warm = standby.CaptureStandby(
+                ("1920x1080", "30", True, "auto"),
+                "/dev/video0",
+                [sys.executable, "-c", _STREAM],
+                {"id": "hw:1,0"},
+                [sys.executable, "-c", _STREAM],
+            ).start(os.path.join(directory, "ffmpeg.log"))
+            try:
+                self.assertTrue(warm.healthy())
+                self.assertGreater(warm.writer.bytes_seen, 0)
+                self.assertGreater(warm.audio_capture.bytes_received, 0)
+            finally:
+                video_process = warm.video_process
+                warm.stop()
+
+        self.assertFalse(warm.healthy())
+        self.assertIsNotNone(video_process.poll())
+
+    def test_failed_video_start_stops_the_audio(self):
+        with tempfile.TemporaryDirectory() as directory:
+            warm = standby.CaptureStandby(
+                ("1920x1080", "30", True, "auto"),
+                "/dev/video0",
+                [sys.executable, "-c", "raise SystemExit(1)"],
+                {"id": "hw:1,0"},
+                [sys.executable, "-c", _STREAM],
+            )
+            with self.assertRaises(standby.StandbyError):
+                warm.start(os.path.join(directory, "ffmpeg.log"))
+
+        self.assertIsNone(warm.audio_capture)
+        self.assertFalse(warm.healthy())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+
+from app import telemetry
+
+
+class CaptureMetricsTests(unittest.TestCase):
+    def test_batches_fill_per_second_series(self):
+        samples = iter([(0, 900), (4000, 800), (9000, 700)])
+        metrics = telemetry.CaptureMetrics(
+            "videos/a.mp4",
+            capacity=10,
+            sampler=lambda: next(samples),
+        )
+
+        metrics.record_frames([100, 300], 50.1)
+        metrics.record_frames([200], 50.9)
+        metrics.record_frames([], 51.2)
+        metrics.record_frames([400, 400], 52.0)
+        snapshot = metrics.snapshot()
+
+        self.assertEqual(snapshot["file"], "videos/a.mp4")
+        self.assertEqual(snapshot["start"], 50)
+        self.assertEqual(snapshot["frames"], [3, 0, 2])
+        self.assertEqual(snapshot["bytes"], [600, 0, 800])
+        self.assertEqual(snapshot["jpeg_min_bytes"], [100, 0, 400])
+        self.assertEqual(snapshot["jpeg_avg_bytes"], [200, 0, 400])
+        self.assertEqual(snapshot["jpeg_max_bytes"], [300, 0, 400])
+        self.assertEqual(snapshot["audio_bytes"], [4000, 5000, None])
+        self.assertEqual(snapshot["disk_free_bytes"], [900, 800, 700])
+        # 800 ms for one frame, then 1100 ms shared by two frames.
+        self.assertEqual(snapshot["gap_histogram"][0], [0, 0, 0, 0, 0, 0, 1])
+        self.assertEqual(snapshot["gap_histogram"][2], [0, 0, 0, 0, 0, 0, 2])
+
+    def test_ring_keeps_only_the_latest_seconds(self):
+        metrics = telemetry.CaptureMetrics(capacity=10)
+        for second in range(25):
+            metrics.record_frames([10] * 30, second + 0.5)
+
+        snapshot = metrics.snapshot()
+
+        self.assertEqual(snapshot["start"], 15)
+        self.assertEqual(len(snapshot["frames"]), 10)
+        self.assertEqual(snapshot["gap_histogram"][-1][0], 30)
+        self.assertEqual(metrics.snapshot(seconds=3)["start"], 22)
+
+    def test_a_long_stall_clears_the_skipped_seconds(self):
+        metrics = telemetry.CaptureMetrics(capacity=10)
+        metrics.record_frames([10], 1.0)
+        metrics.record_frames([10], 40.0)
+
+        snapshot = metrics.snapshot()
+
+        self.assertEqual(snapshot["start"], 31)
+        self.assertEqual(snapshot["frames"], [0] * 9 + [1])
+
+
+if __name__ == "__main__":
+    unittest.main()
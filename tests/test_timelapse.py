@@ -0,0 +1,78 @@
+import os
+import tempfile
+import time
+import unittest
+
+from app import frame_index, mp4_info, preview, timelapse
+from jpeg_samples import jpeg
+
+
+class TimelapseTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.output_file = os.path.join(self.tmp.name, "procedure.mp4")
+        self.raw_file = f"{self.output_file}.mjpeg"
+        self.frames = [jpeg(str(index).encode() * 3) for index in range(30)]
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_every_nth_frame_is_selected_like_the_preview(self):
+        selected = [number for number in range(1, 31) if preview.select_frame(number, 10, 1)]
+
+        self.assertEqual(selected, [1, 11, 21])
+        self.assertTrue(all(preview.select_frame(number, 10, 30) for number in range(1, 5)))
+
+    def test_writer_follows_the_growing_index_and_drains_on_stop(self):
+        with open(self.raw_file, "wb") as raw:
+            raw.write(b"".join(self.frames[:12]))
+        frame_index.catch_up(self.raw_file)
+        writer = timelapse.TimelapseWriter(self.raw_file, self.output_file, factor=10)
+        writer.start()
+        deadline = time.monotonic() + 2
+        while writer.frames < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        with open(self.raw_file, "ab") as raw:
+            raw.write(b"".join(self.frames[12:]))
+        frame_index.catch_up(self.raw_file)
+        writer.stop()
+
+        self.assertIsNone(writer.error)
+        self.assertEqual(writer.frames, 3)
+        with open(timelapse.capture_path(self.output_file), "rb") as capture:
+            self.assertEqual(
+                capture.read(),
+                self.frames[0] + self.frames[10] + self.frames[20],
+            )
+
+    def test_finalize_publishes_an_mp4_and_removes_the_capture(self):
+        capture = timelapse.capture_path(self.output_file)
+        with open(capture, "wb") as output:
+            output.write(b"".join(self.frames[:6]))
+
+        result = timelapse.finalize(self.output_file, 30.0)
+
+        target = os.path.join(self.tmp.name, "procedure-timelapse.mp4")
+        self.assertEqual(result, {"file": target, "frames": 6, "duration_seconds": 0.2})
+        self.assertEqual(mp4_info.read_video_info(target)["frames"], 6)
+        self.assertFalse(os.path.exists(capture))
+        self.assertFalse(os.path.exists(frame_index.index_path(capture)))
+        self.assertFalse(os.path.exists(f"{target}.part"))
+
+    def test_recording_without_a_capture_has_no_timelapse(self):
+        self.assertIsNone(timelapse.finalize(self.output_file, 30.0))
+
+    def test_stop_without_frames_ends_the_thread(self):
+        with open(self.raw_file, "wb"):
+            pass
+        frame_index.catch_up(self.raw_file)
+        writer = timelapse.TimelapseWriter(self.raw_file, self.output_file, factor=10).start()
+        time.sleep(0.05)
+        writer.stop()
+
+        self.assertFalse(writer._thread.is_alive())
+        self.assertEqual(writer.frames, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
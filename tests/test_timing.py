@@ -0,0 +1,82 @@
+import unittest
+
+from app import timing
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class TimelineTests(unittest.TestCase):
+    def test_spans_are_relative_to_the_operation_start(self):
+        clock = FakeClock()
+        timeline = timing.Timeline("start", clock=clock)
+        clock.now = 100.25
+        with timeline.span("storage_policy") as span:
+            clock.now = 101.0
+            span["deleted"] = 2
+        timeline.add("audio_open", 101.0, 101.5, attempt=1)
+        clock.now = 102.0
+
+        result = timeline.result()
+
+        self.assertEqual(result["total_ms"], 2000.0)
+        self.assertEqual(
+            result["spans"],
+            [
+                {"name": "storage_policy", "start_ms": 250.0, "duration_ms": 750.0, "deleted": 2},
+                {"name": "audio_open", "start_ms": 1000.0, "duration_ms": 500.0, "attempt": 1},
+            ],
+        )
+
+    def test_span_is_recorded_when_the_phase_raises(self):
+        timeline = timing.Timeline("stop", clock=FakeClock())
+
+        with self.assertRaises(OSError):
+            with timeline.span("remux"):
+                raise OSError("disk gone")
+
+        self.assertEqual([span["name"] for span in timeline.spans], ["remux"])
+
+
+class TimingHistoryTests(unittest.TestCase):
+    def test_percentiles_per_phase_with_retries_summed(self):
+        history = timing.TimingHistory(capacity=100)
+        for value in range(1, 101):
+            history.record(
+                "start",
+                {
+                    "total_ms": float(value),
+                    "spans": [
+                        {"name": "audio_open", "duration_ms": float(value)},
+                        {"name": "audio_open", "duration_ms": 1.0},
+                    ],
+                },
+            )
+
+        summary = history.summary()["start"]
+
+        self.assertEqual(
+            summary["total"],
+            {"count": 100, "p50_ms": 50.0, "p90_ms": 90.0, "p99_ms": 99.0, "max_ms": 100.0},
+        )
+        self.assertEqual(summary["spans"]["audio_open"]["p50_ms"], 51.0)
+
+    def test_history_keeps_only_recent_operations(self):
+        history = timing.TimingHistory(capacity=10)
+        for value in range(25):
+            history.record("stop", {"total_ms": float(value), "spans": []})
+
+        total = history.summary()["stop"]["total"]
+
+        self.assertEqual(total["count"], 10)
+        self.assertEqual(total["max_ms"], 24.0)
+        self.assertEqual(total["p50_ms"], 19.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
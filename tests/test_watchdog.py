@@ -0,0 +1,66 @@
+import os
+import subprocess
+import sys
+import time
+import unittest
+from unittest.mock import Mock, patch
+
+from app import watchdog
+
+
+class ProcessWatchTests(unittest.TestCase):
+    @unittest.skipUnless(hasattr(os, "pidfd_open"), "pidfds are Linux-only")
+    def test_exit_wakes_the_watch_before_the_timeout(self):
+        process = subprocess.Popen([sys.executable, "-c", "pass"])
+        self.addCleanup(process.wait)
+
+        with watchdog.ProcessWatch([process]) as watch:
+            started = time.monotonic()
+            self.assertTrue(watch.event_driven)
+            self.assertTrue(watch.wait(10.0))
+            self.assertLess(time.monotonic() - started, 5.0)
+            # The exit is reported once; the next wait just times out.
+            self.assertFalse(watch.wait(0.01))
+
+    @patch("app.watchdog.time.sleep")
+    @patch("app.watchdog.os.pidfd_open", side_effect=OSError, create=True)
+    def test_without_pidfds_the_watch_polls_at_the_fallback_interval(
+        self,
+        _pidfd_open,
+        sleep_mock,
+    ):
+        with watchdog.ProcessWatch([Mock(spec=["pid"], pid=1234), None]) as watch:
+            self.assertFalse(watch.event_driven)
+            self.assertTrue(watch.wait(30.0))
+
+        sleep_mock.assert_called_once_with(watchdog.POLL_FALLBACK_SECONDS)
+
+
+class FillForecastTests(unittest.TestCase):
+    def test_checks_follow_the_predicted_fill_time(self):
+        forecast = watchdog.FillForecast()
+
+        self.assertEqual(forecast.next_check_in(1000, now=0.0), 0.5)
+        # 100 bytes/s leaves 9 s to the reserve; check again halfway.
+        self.assertEqual(forecast.next_check_in(900, now=1.0), 4.5)
+        self.assertEqual(forecast.next_check_in(50, now=2.0), 0.5)
+
+    def test_paused_writes_keep_the_peak_rate(self):
+        forecast = watchdog.FillForecast()
+        forecast.next_check_in(10_000, now=0.0)
+        forecast.next_check_in(9_000, now=1.0)
+
+        self.assertEqual(forecast.next_check_in(9_000, now=5.0), 4.5)
+
+    def test_idle_disk_is_checked_at_the_longest_interval(self):
+        forecast = watchdog.FillForecast()
+        forecast.next_check_in(10_000, now=0.0)
+
+        self.assertEqual(
+            forecast.next_check_in(10_000, now=1.0),
+            watchdog.STORAGE_CHECK_MAX_SECONDS,
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()